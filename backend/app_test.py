@@ -0,0 +1,79 @@
+import os
+import subprocess
+import sys
+
+from fastapi.testclient import TestClient
+
+from src.app import create_app
+from src.config import Settings
+
+EXPECTED_ROUTES = {
+    ("POST", "/api/generate-flashcards"),
+    ("GET", "/api/my-decks"),
+    ("GET", "/api/decks/{deck_id}"),
+    ("PUT", "/api/decks/{deck_id}"),
+    ("DELETE", "/api/decks/{deck_id}"),
+    ("POST", "/api/decks/merge"),
+    ("POST", "/api/decks/{deck_id}/clone"),
+    ("GET", "/api/my-words"),
+    ("POST", "/api/words"),
+    ("PUT", "/api/words/{word_id}"),
+    ("DELETE", "/api/words/{word_id}"),
+    ("POST", "/api/words/batch"),
+    ("GET", "/api/export/words"),
+    ("GET", "/api/export/decks"),
+    ("POST", "/api/import/words"),
+    ("POST", "/api/practice/conversation"),
+    ("POST", "/api/conversations"),
+    ("POST", "/api/conversations/{conversation_id}/turns"),
+    ("GET", "/api/conversations/{conversation_id}"),
+    ("DELETE", "/api/conversations/{conversation_id}"),
+    ("POST", "/api/speech-to-text"),
+    ("POST", "/api/sessions"),
+    ("POST", "/api/events/batch"),
+    ("GET", "/api/stats/daily"),
+    ("GET", "/api/user-settings"),
+    ("PUT", "/api/user-settings"),
+    ("GET", "/api/usage/daily"),
+}
+
+
+def test_import_needs_no_database_and_prints_no_secrets():
+    env = {k: v for k, v in os.environ.items() if k not in ("DATABASE_URL", "ANTHROPIC_API_KEY")}
+    env["ANTHROPIC_API_KEY"] = "sk-ant-secret-value"
+    result = subprocess.run(
+        [sys.executable, "-c", "import main"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    assert result.returncode == 0, result.stderr
+    assert "sk-ant" not in result.stdout + result.stderr
+
+
+def test_all_routes_registered():
+    app = create_app(Settings())
+    routes = {(method, route.path) for route in app.routes for method in getattr(route, "methods", None) or ()}
+    assert EXPECTED_ROUTES <= routes
+
+
+def test_lifespan_without_database_is_ready():
+    app = create_app(Settings())
+    with TestClient(app) as client:
+        assert client.get("/api/health").json() == {"status": "ok"}
+        response = client.get("/api/ready")
+        assert response.status_code == 200
+        assert response.json()["database"] is False
+        assert app.state.event_buffer is not None
+        assert not app.state.llm.configured
+    # Shutdown closed the buffer
+    assert app.state.ready is False
+
+
+def test_ai_endpoint_without_api_key_fails_cleanly():
+    with TestClient(create_app(Settings())) as client:
+        response = client.post("/api/generate-flashcards", json={"text": "le chien", "user_id": "00000000-0000-0000-0000-000000000001"})
+        assert response.status_code == 500
+        assert response.json()["detail"] == "ANTHROPIC_API_KEY not configured"
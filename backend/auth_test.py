@@ -0,0 +1,133 @@
+import asyncio
+import json
+import time
+import uuid
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from ratelimit_test import FakeClock
+from src.app import create_app
+from src.auth import AuthError, JWKSCache, TokenVerifier
+from src.config import Settings
+
+USER = "00000000-0000-0000-0000-000000000001"
+OTHER = "00000000-0000-0000-0000-000000000002"
+SECRET = "test-jwt-secret-that-is-long-enough-for-hs256"
+
+
+def rsa_jwk(kid: str):
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key()))
+    return private_key, {**jwk, "kid": kid, "alg": "RS256", "use": "sig"}
+
+
+def token(key, algorithm="HS256", kid=None, sub=USER, expires_in=3600, audience="authenticated"):
+    claims = {"sub": sub, "aud": audience, "exp": int(time.time()) + expires_in, "role": "authenticated"}
+    return jwt.encode(claims, key, algorithm=algorithm, headers={"kid": kid} if kid else None)
+
+
+def test_verified_tokens_are_cached_until_they_expire():
+    clock = FakeClock()
+    clock.now = time.time()
+    verifier = TokenVerifier(secret=SECRET, clock=clock)
+
+    async def scenario():
+        short = token(SECRET, expires_in=60)
+        first = await verifier.verify(short)
+        again = await verifier.verify(short)
+        # Past its expiry the cached entry is ignored and the token is checked again
+        clock.now += 120
+        await verifier.verify(short)
+        return first, again
+
+    first, again = asyncio.run(scenario())
+    assert first == again and str(first.user_id) == USER
+    assert (verifier.hits, verifier.misses, verifier.rejected) == (1, 2, 0)
+
+
+def test_bad_tokens_are_rejected():
+    verifier = TokenVerifier(secret=SECRET)
+    bad = [
+        token("another-secret-that-is-long-enough-for-hs256"),
+        token(SECRET, audience="anon"),
+        token(SECRET, expires_in=-3600),
+        jwt.encode({"sub": USER, "aud": "authenticated"}, SECRET, algorithm="HS256"),  # no exp
+        jwt.encode({"sub": USER, "aud": "authenticated", "exp": 9e9}, None, algorithm="none"),
+        "not-a-token",
+    ]
+    for value in bad:
+        with pytest.raises(AuthError):
+            asyncio.run(verifier.verify(value))
+    assert verifier.rejected == len(bad)
+
+
+def test_jwks_is_refreshed_for_rotated_keys_at_most_every_min_interval():
+    old_key, old_jwk = rsa_jwk("old")
+    new_key, new_jwk = rsa_jwk("new")
+    published = {"keys": [old_jwk, {"kty": "oct", "kid": "skip", "k": "c2VjcmV0"}]}
+    fetches = []
+    clock = FakeClock()
+
+    async def fetch():
+        fetches.append(clock.now)
+        return published
+
+    async def scenario():
+        jwks = JWKSCache(fetch, min_refresh_interval=30, clock=clock)
+        await jwks.refresh()
+        verifier = TokenVerifier(jwks)
+        assert str((await verifier.verify(token(old_key, "RS256", kid="old"))).user_id) == USER
+
+        # Rotated: one refresh picks up the new key
+        published["keys"] = [old_jwk, new_jwk]
+        clock.now = 60
+        assert str((await verifier.verify(token(new_key, "RS256", kid="new", sub=OTHER))).user_id) == OTHER
+
+        # Unknown ids don't trigger another fetch within the interval
+        for kid in ("bogus-1", "bogus-2"):
+            with pytest.raises(AuthError):
+                await verifier.verify(token(new_key, "RS256", kid=kid))
+        return jwks
+
+    jwks = asyncio.run(scenario())
+    assert fetches == [0, 60]
+    assert jwks.stats() == {"keys": 2, "refreshes": 2, "failures": 0}
+
+
+def test_endpoints_check_the_token_against_the_user_id():
+    app = create_app(Settings(supabase_jwt_secret=SECRET, auth_required=True))
+    mine = {"Authorization": f"Bearer {token(SECRET)}"}
+    body = {"text": "le chien", "user_id": USER}
+    with TestClient(app) as client:
+        assert client.get("/api/health").status_code == 200
+        assert client.post("/api/generate-flashcards", json=body).status_code == 401
+        assert client.post("/api/generate-flashcards", json=body, headers={"Authorization": "Bearer nope"}).status_code == 401
+        assert client.post("/api/generate-flashcards", json={**body, "user_id": OTHER}, headers=mine).status_code == 403
+        assert client.get("/api/my-decks", params={"user_id": OTHER}, headers=mine).status_code == 403
+        # FastAPI parses a body with no Content-Type as JSON too
+        other = json.dumps({**body, "user_id": OTHER}).encode()
+        assert client.post("/api/generate-flashcards", content=other, headers=mine).status_code == 403
+        assert client.post(
+            "/api/generate-flashcards", content=other, headers={**mine, "Content-Type": "application/vnd.api+json"}
+        ).status_code == 403
+
+        # Past the auth check (then fails for lack of an API key)
+        response = client.post("/api/generate-flashcards", json=body, headers=mine)
+        assert response.json()["detail"] == "ANTHROPIC_API_KEY not configured"
+
+        conversation = uuid.uuid4()
+        with pytest.raises(WebSocketDisconnect) as closed:
+            with client.websocket_connect(f"/api/conversations/{conversation}/ws?user_id={USER}&access_token=nope"):
+                pass
+        assert closed.value.code == 1008
+    assert app.state.auth.stats()["hits"] >= 1
+
+
+def test_tokens_are_optional_until_auth_is_required():
+    with TestClient(create_app(Settings(supabase_jwt_secret=SECRET))) as client:
+        response = client.post("/api/generate-flashcards", json={"text": "le chien", "user_id": USER})
+        assert response.json()["detail"] == "ANTHROPIC_API_KEY not configured"
@@ -0,0 +1,55 @@
+"""
+Measure cold start: interpreter + `import main` (app creation) and lifespan startup.
+
+Runs without a database; set DATABASE_URL to include pool warm-up.
+Run from backend/: python -m benchmarks.cold_start
+"""
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+RUNS = 5
+
+IMPORT_SNIPPET = """
+import time
+start = time.perf_counter()
+import main
+print(time.perf_counter() - start)
+"""
+
+
+def measure_import() -> list[float]:
+    samples = []
+    for _ in range(RUNS):
+        out = subprocess.run(
+            [sys.executable, "-c", IMPORT_SNIPPET],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        ).stdout.strip().splitlines()[-1]
+        samples.append(float(out))
+    return samples
+
+
+async def measure_lifespan() -> float:
+    from src.app import create_app
+
+    app = create_app()
+    start = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        while not app.state.ready:
+            await asyncio.sleep(0.005)
+        ready = time.perf_counter() - start
+    return ready
+
+
+if __name__ == "__main__":
+    imports = measure_import()
+    result = {
+        "import_main_seconds": {"min": round(min(imports), 4), "max": round(max(imports), 4)},
+        "lifespan_ready_seconds": round(asyncio.run(measure_lifespan()), 4),
+        "database": bool(os.getenv("DATABASE_URL")),
+    }
+    print(json.dumps(result, indent=2))
@@ -0,0 +1,179 @@
+"""
+A local stand-in for the Anthropic Messages API, for load tests.
+
+POST /v1/messages answers like the real API: a server-sent event stream
+(message_start, content_block_delta..., message_delta, message_stop) when
+the request asks for ``stream``, one JSON message otherwise. Before the
+first token it waits ``latency`` seconds (time to first token, +/- jitter).
+After that it emits text at ``tokens_per_second``, counting four
+characters as one token.
+
+Replies are shaped for the caller, so the app's parsing paths run for real:
+- a flashcard generation prompt gets a JSON array of cards built from the
+  words of its "Text:";
+- anything else gets a tutor reply that tags a few of the system prompt's
+  vocabulary words with <vocab>.
+
+Run from backend/:
+    python -m benchmarks.fake_llm --port 8090 --latency 0.4 --tokens-per-second 80
+and start the app with ANTHROPIC_BASE_URL=http://127.0.0.1:8090 and any
+ANTHROPIC_API_KEY.
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import uuid
+from dataclasses import dataclass
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+CHARS_PER_TOKEN = 4
+MAX_CARDS = 15
+
+_WORD_RE = re.compile(r"[^\W\d_]{3,}")
+_VOCAB_RE = re.compile(r"^- ([^:\n]+):", re.MULTILINE)
+
+
+@dataclass
+class FakeLLMConfig:
+    latency: float = 0.4
+    jitter: float = 0.25
+    tokens_per_second: float = 80.0
+    reply_tokens: int = 60
+    seed: int | None = None
+
+
+def _text_of(content) -> str:
+    if isinstance(content, str):
+        return content
+    return "".join(block.get("text", "") for block in content if isinstance(block, dict))
+
+
+def flashcards_reply(prompt: str) -> str:
+    text = prompt.split("Text:", 1)[-1]
+    cards, seen = [], set()
+    for word in _WORD_RE.findall(text):
+        key = word.lower()
+        if key not in seen:
+            seen.add(key)
+            cards.append({"front": key, "back": key[::-1]})
+        if len(cards) == MAX_CARDS:
+            break
+    return json.dumps(cards, ensure_ascii=False)
+
+
+def tutor_reply(system: str, reply_tokens: int, rng: random.Random) -> str:
+    vocab = _VOCAB_RE.findall(system) or ["mot"]
+    words = []
+    while len(" ".join(words)) < reply_tokens * CHARS_PER_TOKEN:
+        if rng.random() < 0.15:
+            words.append(f"<vocab>{rng.choice(vocab).strip()}</vocab>")
+        else:
+            words.append(rng.choice(("très", "bien", "et", "tu", "aimes", "le", "jardin", "aujourd'hui", "pourquoi")))
+    return " ".join(words).capitalize() + " ?"
+
+
+def reply_for(body: dict, config: FakeLLMConfig, rng: random.Random) -> str:
+    messages = body.get("messages") or [{"content": ""}]
+    prompt = _text_of(messages[-1].get("content", ""))
+    if "flashcards" in prompt and "Text:" in prompt:
+        return flashcards_reply(prompt)
+    return tutor_reply(_text_of(body.get("system") or ""), config.reply_tokens, rng)
+
+
+def chunks(text: str) -> list[str]:
+    return [text[i:i + CHARS_PER_TOKEN] for i in range(0, len(text), CHARS_PER_TOKEN)]
+
+
+def _sse(event: dict) -> bytes:
+    return f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n".encode()
+
+
+def create_fake_llm(config: FakeLLMConfig | None = None) -> FastAPI:
+    config = config or FakeLLMConfig()
+    rng = random.Random(config.seed)
+    app = FastAPI()
+    app.state.config = config
+    app.state.requests = 0
+
+    def first_token_delay() -> float:
+        return max(0.0, config.latency * (1 + rng.uniform(-config.jitter, config.jitter)))
+
+    @app.post("/v1/messages")
+    async def messages(request: Request):
+        body = await request.json()
+        app.state.requests += 1
+        text = reply_for(body, config, rng)
+        parts = chunks(text)
+        model = body.get("model", "fake")
+        input_tokens = len(json.dumps(body.get("messages", [])) + _text_of(body.get("system") or "")) // CHARS_PER_TOKEN
+        message = {
+            "id": f"msg_{uuid.uuid4().hex[:24]}",
+            "type": "message",
+            "role": "assistant",
+            "model": model,
+            "content": [],
+            "stop_reason": None,
+            "stop_sequence": None,
+            "usage": {"input_tokens": input_tokens, "output_tokens": 1},
+        }
+        token_delay = 1 / config.tokens_per_second if config.tokens_per_second > 0 else 0.0
+
+        if not body.get("stream"):
+            await asyncio.sleep(first_token_delay() + token_delay * len(parts))
+            message.update(
+                content=[{"type": "text", "text": text}],
+                stop_reason="end_turn",
+                usage={"input_tokens": input_tokens, "output_tokens": len(parts)},
+            )
+            return JSONResponse(message)
+
+        async def events():
+            yield _sse({"type": "message_start", "message": message})
+            yield _sse({"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}})
+            await asyncio.sleep(first_token_delay())
+            for i, part in enumerate(parts):
+                if i:
+                    await asyncio.sleep(token_delay)
+                yield _sse({"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": part}})
+            yield _sse({"type": "content_block_stop", "index": 0})
+            yield _sse({
+                "type": "message_delta",
+                "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                "usage": {"output_tokens": len(parts)},
+            })
+            yield _sse({"type": "message_stop"})
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency", type=float, default=0.4, help="seconds to first token")
+    parser.add_argument("--jitter", type=float, default=0.25, help="+/- fraction applied to --latency")
+    parser.add_argument("--tokens-per-second", type=float, default=80.0)
+    parser.add_argument("--reply-tokens", type=int, default=60, help="length of conversation replies")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    config = FakeLLMConfig(
+        latency=args.latency,
+        jitter=args.jitter,
+        tokens_per_second=args.tokens_per_second,
+        reply_tokens=args.reply_tokens,
+        seed=args.seed,
+    )
+    uvicorn.run(create_fake_llm(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,354 @@
+"""
+Throughput and latency baseline for the API under a realistic request mix.
+
+By default this starts two local processes: the fake Anthropic server
+(benchmarks/fake_llm.py) and the app (uvicorn main:app). The app is pointed
+at DATABASE_URL, which should be a local Postgres with the migrations
+applied (python -m src.migrate). Before measuring, the harness seeds some
+users, each with a generated deck and a batch of saved words.
+
+Then ``--concurrency`` workers send requests back to back for
+``--duration`` seconds. Each request type is picked by weight from
+``--mix``:
+- generate: POST /api/generate-flashcards with fresh text
+- conversation: POST /api/practice/conversation, growing a conversation
+  up to --turns turns, then starting again
+- decks: GET /api/my-decks
+- words: GET /api/my-words with a short search prefix
+- stats: GET /api/stats/daily
+
+Requests sent during the ``--warmup`` seconds are not counted. The report
+is JSON: RPS, error count and p50/p95/p99/max latency (ms) per endpoint and
+overall. It is printed and, with --output, also written to a file.
+
+The workers are closed-loop: each waits for its response before sending
+the next request. When the server slows down, the offered load drops with
+it, so compare runs at equal concurrency.
+
+Run from backend/:
+    DATABASE_URL=postgresql://... python -m benchmarks.load_bench --concurrency 20 --duration 30
+To test an app that is already running (with its own ANTHROPIC_BASE_URL), pass
+    --base-url http://127.0.0.1:8000
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+
+import httpx
+
+DEFAULT_MIX = "generate=1,conversation=4,decks=6,words=6,stats=4"
+READY_TIMEOUT = 60.0
+REQUEST_TIMEOUT = 120.0
+
+VOCABULARY = (
+    "chien chat maison jardin soleil pluie livre école travail voiture ville marché fromage pain "
+    "fenêtre porte arbre fleur rivière montagne plage voyage musique cuisine ami famille matin soir"
+).split()
+OPENERS = ("Bonjour !", "Je voudrais parler du voyage.", "Peux-tu m'aider ?", "J'aime la cuisine.")
+
+
+@dataclass
+class Sample:
+    endpoint: str
+    seconds: float
+    status: int  # 0 when the request failed without a response
+
+
+@dataclass
+class User:
+    id: str
+    deck_ids: list[str] = field(default_factory=list)
+
+
+def parse_mix(value: str) -> dict[str, float]:
+    """"generate=1,decks=6" -> {"generate": 1.0, "decks": 6.0}, dropping zero weights"""
+    mix = {}
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        name, weight = item.split("=", 1)
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(f"Unknown endpoint in mix: {name!r} (choose from {', '.join(OPERATIONS)})")
+        if float(weight) > 0:
+            mix[name] = float(weight)
+    if not mix:
+        raise ValueError("The mix needs at least one endpoint with a positive weight")
+    return mix
+
+
+def percentile(ordered: list[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return 0.0
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def _latency_summary(samples: list[Sample], elapsed: float) -> dict:
+    ordered = sorted(s.seconds * 1000 for s in samples)
+    errors = sum(1 for s in samples if not 200 <= s.status < 300)
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "rps": round(len(samples) / elapsed, 2) if elapsed > 0 else 0.0,
+        "p50_ms": round(percentile(ordered, 50), 1),
+        "p95_ms": round(percentile(ordered, 95), 1),
+        "p99_ms": round(percentile(ordered, 99), 1),
+        "max_ms": round(ordered[-1], 1) if ordered else 0.0,
+        "statuses": dict(sorted(Counter(str(s.status) for s in samples).items())),
+    }
+
+
+def summarize(samples: list[Sample], elapsed: float) -> dict:
+    by_endpoint = defaultdict(list)
+    for sample in samples:
+        by_endpoint[sample.endpoint].append(sample)
+    return {
+        "elapsed_seconds": round(elapsed, 2),
+        "total": _latency_summary(samples, elapsed),
+        "endpoints": {name: _latency_summary(group, elapsed) for name, group in sorted(by_endpoint.items())},
+    }
+
+
+def sample_text(rng: random.Random, words: int = 40) -> str:
+    return " ".join(rng.choice(VOCABULARY) for _ in range(words)) + f" ({uuid.uuid4().hex[:8]})."
+
+
+# One function per mix entry: (client, user, worker state, rng) -> response
+
+async def generate(client, user, state, rng):
+    response = await client.post("/api/generate-flashcards", json={
+        "text": sample_text(rng), "difficulty": rng.choice(("easy", "medium", "hard")), "user_id": user.id,
+    })
+    if response.status_code == 200:
+        user.deck_ids.append(response.json()["deck_id"])
+    return response
+
+
+async def conversation(client, user, state, rng):
+    messages = state.get("messages")
+    first = not messages or len(messages) >= state["turns"] * 2
+    if first:
+        messages = state["messages"] = [{"role": "user", "content": rng.choice(OPENERS)}]
+    response = await client.post("/api/practice/conversation", json={
+        "deck_id": rng.choice(user.deck_ids),
+        "user_id": user.id,
+        "messages": messages,
+        "is_first_message": first,
+    })
+    if response.status_code == 200:
+        messages.append({"role": "assistant", "content": response.json()["message"]})
+        messages.append({"role": "user", "content": f"Oui, {rng.choice(VOCABULARY)} !"})
+    else:
+        state["messages"] = None
+    return response
+
+
+async def decks(client, user, state, rng):
+    return await client.get("/api/my-decks", params={"user_id": user.id})
+
+
+async def words(client, user, state, rng):
+    return await client.get("/api/my-words", params={
+        "user_id": user.id, "search": rng.choice(VOCABULARY)[:2], "page": rng.choice((1, 1, 1, 2)),
+    })
+
+
+async def stats(client, user, state, rng):
+    return await client.get("/api/stats/daily", params={"user_id": user.id})
+
+
+OPERATIONS = {
+    "generate": generate,
+    "conversation": conversation,
+    "decks": decks,
+    "words": words,
+    "stats": stats,
+}
+
+
+async def seed(client: httpx.AsyncClient, count: int, rng: random.Random) -> list[User]:
+    """Users with one generated deck and a page or two of saved words each"""
+    users = [User(id=str(uuid.uuid4())) for _ in range(count)]
+
+    async def seed_user(user: User):
+        response = await generate(client, user, {}, rng)
+        response.raise_for_status()
+        response = await client.post("/api/words/batch", json={
+            "user_id": user.id,
+            "words": [
+                {"word": f"{word}{i}", "definition": word[::-1], "user_id": user.id}
+                for i, word in enumerate(rng.sample(VOCABULARY, 25))
+            ],
+        })
+        response.raise_for_status()
+
+    await asyncio.gather(*(seed_user(user) for user in users))
+    return users
+
+
+async def run_load(
+    base_url: str,
+    mix: dict[str, float],
+    concurrency: int,
+    duration: float,
+    warmup: float = 0.0,
+    users: int = 20,
+    turns: int = 4,
+    seed_value: int | None = None,
+    transport: httpx.AsyncBaseTransport | None = None,
+) -> dict:
+    rng = random.Random(seed_value)
+    limits = httpx.Limits(max_connections=concurrency + users, max_keepalive_connections=concurrency + users)
+    async with httpx.AsyncClient(
+        base_url=base_url, timeout=REQUEST_TIMEOUT, limits=limits, transport=transport
+    ) as client:
+        population = await seed(client, users, rng)
+        names, weights = list(mix), list(mix.values())
+
+        samples: list[Sample] = []
+        started = time.perf_counter()
+        measure_from = started + warmup
+        stop_at = measure_from + duration
+
+        async def worker(index: int):
+            worker_rng = random.Random(rng.random())
+            user = population[index % len(population)]
+            state = {"turns": turns}
+            while time.perf_counter() < stop_at:
+                name = worker_rng.choices(names, weights)[0]
+                start = time.perf_counter()
+                try:
+                    status = (await OPERATIONS[name](client, user, state, worker_rng)).status_code
+                except httpx.HTTPError:
+                    status = 0
+                if start >= measure_from:
+                    samples.append(Sample(name, time.perf_counter() - start, status))
+
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+        elapsed = time.perf_counter() - measure_from
+
+    return summarize(samples, elapsed)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_ready(url: str, process: subprocess.Popen):
+    deadline = time.monotonic() + READY_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{process.args} exited with code {process.returncode}")
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} was not ready after {READY_TIMEOUT}s")
+
+
+@contextlib.contextmanager
+def local_stack(args):
+    """Start the fake LLM and the app; yield the app's base URL"""
+    if not os.getenv("DATABASE_URL"):
+        raise SystemExit("Set DATABASE_URL to a local Postgres (or pass --base-url)")
+
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    llm_port, app_port = _free_port(), _free_port()
+    processes = []
+    try:
+        fake_llm = subprocess.Popen([
+            sys.executable, "-m", "benchmarks.fake_llm", "--port", str(llm_port),
+            "--latency", str(args.llm_latency), "--tokens-per-second", str(args.llm_tokens_per_second),
+            *(["--seed", str(args.seed)] if args.seed is not None else []),
+        ], cwd=backend_dir)
+        processes.append(fake_llm)
+        _wait_ready(f"http://127.0.0.1:{llm_port}/docs", fake_llm)
+
+        env = {
+            **os.environ,
+            "ANTHROPIC_BASE_URL": f"http://127.0.0.1:{llm_port}",
+            "ANTHROPIC_API_KEY": "fake-key",
+            "ENVIRONMENT": "production",
+            "LOG_LEVEL": os.getenv("LOG_LEVEL", "WARNING"),
+            # Measure the app, not the per-user token budgets
+            "USER_TOKENS_PER_MINUTE": os.getenv("USER_TOKENS_PER_MINUTE", "100000000"),
+            "GLOBAL_TOKENS_PER_MINUTE": os.getenv("GLOBAL_TOKENS_PER_MINUTE", "100000000"),
+        }
+        app = subprocess.Popen([
+            sys.executable, "-m", "uvicorn", "main:app", "--port", str(app_port),
+            "--workers", str(args.workers), "--log-level", "warning", "--no-access-log",
+        ], cwd=backend_dir, env=env)
+        processes.append(app)
+        _wait_ready(f"http://127.0.0.1:{app_port}/api/ready", app)
+
+        yield f"http://127.0.0.1:{app_port}"
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the API with a fake LLM")
+    parser.add_argument("--base-url", help="test an app that is already running instead of starting one")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"endpoint weights (default {DEFAULT_MIX})")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=30.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=5.0, help="unmeasured seconds before --duration")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=4, help="conversation turns before starting a new one")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the started app")
+    parser.add_argument("--llm-latency", type=float, default=0.4, help="fake LLM seconds to first token")
+    parser.add_argument("--llm-tokens-per-second", type=float, default=80.0)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--output", help="also write the JSON report here")
+    args = parser.parse_args()
+    mix = parse_mix(args.mix)
+
+    with contextlib.ExitStack() as stack:
+        base_url = args.base_url or stack.enter_context(local_stack(args))
+        report = asyncio.run(run_load(
+            base_url, mix, args.concurrency, args.duration,
+            warmup=args.warmup, users=args.users, turns=args.turns, seed_value=args.seed,
+        ))
+
+    report["config"] = {
+        "base_url": args.base_url or "local",
+        "mix": mix,
+        "concurrency": args.concurrency,
+        "duration_seconds": args.duration,
+        "warmup_seconds": args.warmup,
+        "users": args.users,
+        "workers": args.workers,
+        "llm_latency_seconds": None if args.base_url else args.llm_latency,
+        "llm_tokens_per_second": None if args.base_url else args.llm_tokens_per_second,
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Event-loop time spent logging one generate-flashcards request: the old
+print() banners vs. the queue-backed JSON logger.
+
+Two sinks:
+- fast: a line-buffered file, as with a terminal or a container log pipe
+  that keeps up. Every print() line is a write on the event loop.
+- slow: a pipe drained at about 4 MB/s, as when the log collector falls
+  behind. Once the pipe buffer fills, print() blocks the loop. The queue
+  handler keeps returning immediately, and the listener thread absorbs the
+  backlog.
+
+With the queue handler the loop builds the record, renders the message and
+enqueues it. Formatting, redaction and writes happen on the listener
+thread. That thread still shares the GIL, which is why the fast-sink
+numbers are close.
+
+Run from backend/: python -m benchmarks.logging_bench
+"""
+import contextlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from src.logs import configure_logging, stop_logging
+
+REQUESTS = 5000
+DRAIN_CHUNK = 4096
+DRAIN_PAUSE = 0.001
+TEXT = "Le petit chien brun court dans le jardin pendant que le chat dort au soleil. " * 20
+
+
+def old_request(deck_id: str):
+    # The prints generate_flashcards used to make per request
+    print(f"\n{'='*80}")
+    print("📝 Generating flashcards:")
+    print(f"   Text: {TEXT[:100]}...")
+    print("   Difficulty: medium")
+    print("   User ID: 5b0c9f3e-8a2d-4c1e-9f7a-2d3e4f5a6b7c")
+    print("🤖 Calling Claude API...")
+    print("📥 AI Response received")
+    print("✅ Parsed 12 flashcards")
+    print("💾 Saving to database...")
+    print(f"✅ Saved deck {deck_id} with 12 flashcards")
+    print(f"{'='*80}\n")
+
+
+def new_request(logger: logging.Logger, deck_id: str):
+    logger.info("Generating flashcards", extra={
+        "user_id": "5b0c9f3e-8a2d-4c1e-9f7a-2d3e4f5a6b7c", "difficulty": "medium", "text_chars": len(TEXT),
+    })
+    logger.info("Saved generated deck", extra={"deck_id": deck_id, "cards": 12, "input_tokens": 900, "output_tokens": 300})
+
+
+def measure(fn) -> float:
+    start = time.perf_counter()
+    for i in range(REQUESTS):
+        fn(str(i))
+    return (time.perf_counter() - start) / REQUESTS * 1e6
+
+
+def run(sink) -> dict:
+    with contextlib.redirect_stdout(sink):
+        old_us = measure(old_request)
+
+    configure_logging(stream=sink)
+    logger = logging.getLogger("src.bench")
+    new_us = measure(lambda deck_id: new_request(logger, deck_id))
+    # Waits for the listener to write the backlog (not measured)
+    stop_logging()
+    return {
+        "print_us_per_request": round(old_us, 1),
+        "queue_logging_us_per_request": round(new_us, 1),
+        "speedup": round(old_us / new_us, 1),
+    }
+
+
+def slow_pipe():
+    read_fd, write_fd = os.pipe()
+
+    def drain():
+        while os.read(read_fd, DRAIN_CHUNK):
+            time.sleep(DRAIN_PAUSE)
+
+    threading.Thread(target=drain, daemon=True).start()
+    return os.fdopen(write_fd, "w", buffering=1, encoding="utf-8")
+
+
+def main():
+    results = {"requests": REQUESTS}
+    with tempfile.TemporaryFile("w", buffering=1, encoding="utf-8") as sink:
+        results["fast_sink"] = run(sink)
+    with slow_pipe() as sink:
+        results["slow_sink"] = run(sink)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
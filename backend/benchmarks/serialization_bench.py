@@ -0,0 +1,86 @@
+"""
+Compare the old and new response paths for /api/my-words and /api/decks/{id}.
+
+Old: isoformat()/str() per field -> response_model validation -> jsonable_encoder -> json.dumps
+New: raw values -> orjson
+
+Run from backend/: python -m benchmarks.serialization_bench
+"""
+import json
+import timeit
+import uuid
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from src.routers.words import word_to_dict
+from src.responses import FastJSONResponse
+from src.schema import WordResponse
+
+ROUNDS = 2000
+
+
+def make_words(n):
+    now = datetime.now(timezone.utc)
+    return [
+        SimpleNamespace(
+            id=uuid.uuid4(), word=f"mot{i}", definition=f"word number {i}", example="Un exemple de phrase.",
+            pronunciation="/mo/", created_at=now, updated_at=now,
+        )
+        for i in range(n)
+    ]
+
+
+def old_words(words, adapter):
+    content = [
+        {
+            "id": str(w.id),
+            "word": w.word,
+            "definition": w.definition,
+            "example": w.example if w.example else None,
+            "pronunciation": w.pronunciation if w.pronunciation else None,
+            "created_at": w.created_at.isoformat(),
+            "updated_at": w.updated_at.isoformat() if w.updated_at else None,
+        }
+        for w in words
+    ]
+    validated = adapter.dump_python(adapter.validate_python(content), mode="json")
+    return json.dumps(jsonable_encoder(validated), ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def new_words(words):
+    return FastJSONResponse([word_to_dict(w) for w in words]).body
+
+
+def old_deck(deck_id, cards, created_at):
+    content = {
+        "deck_id": str(deck_id), "title": "Deck", "flashcards": [{"front": f, "back": b} for f, b in cards],
+        "count": len(cards), "difficulty": "medium", "created_at": created_at.isoformat(),
+    }
+    return json.dumps(jsonable_encoder(content), ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def new_deck(deck_id, cards, created_at):
+    return FastJSONResponse({
+        "deck_id": deck_id, "title": "Deck", "flashcards": [{"front": f, "back": b} for f, b in cards],
+        "count": len(cards), "difficulty": "medium", "created_at": created_at,
+    }).body
+
+
+def report(name, old, new):
+    old_us = min(timeit.repeat(old, number=ROUNDS, repeat=3)) / ROUNDS * 1e6
+    new_us = min(timeit.repeat(new, number=ROUNDS, repeat=3)) / ROUNDS * 1e6
+    print(f"{name:<28} old {old_us:8.1f} us   new {new_us:8.1f} us   {old_us / new_us:5.1f}x")
+
+
+if __name__ == "__main__":
+    adapter = TypeAdapter(list[WordResponse])
+    words = make_words(100)
+    report("my-words (page_size=100)", lambda: old_words(words, adapter), lambda: new_words(words))
+
+    cards = [(f"mot{i}", f"word{i}") for i in range(500)]
+    deck_id, created_at = uuid.uuid4(), datetime.now(timezone.utc)
+    report("decks/{id} (500 cards)", lambda: old_deck(deck_id, cards, created_at),
+           lambda: new_deck(deck_id, cards, created_at))
@@ -0,0 +1,119 @@
+import asyncio
+import json
+import uuid
+
+from src.cache import MISSING, LocalCache, cached
+from src.invalidation import InvalidationBus
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class RecordingSession:
+    def __init__(self):
+        self.statements = []
+
+    async def execute(self, statement, params=None):
+        self.statements.append(params)
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = LocalCache(ttl=10, clock=clock)
+    cache.set(("deck", 1), "value")
+    assert cache.get(("deck", 1)) == "value"
+    clock.now = 11
+    assert cache.get(("deck", 1)) is MISSING
+    assert len(cache) == 0
+
+
+def test_least_recently_used_entry_is_dropped():
+    cache = LocalCache(max_entries=2)
+    cache.set(("deck", 1), 1)
+    cache.set(("deck", 2), 2)
+    cache.get(("deck", 1))
+    cache.set(("deck", 3), 3)
+    assert cache.get(("deck", 2)) is MISSING
+    assert cache.get(("deck", 1)) == 1
+
+
+def test_evict_group_drops_every_page_for_that_user():
+    user = uuid.uuid4()
+    cache = LocalCache()
+    cache.set(("words", user, 1, 20, ""), ["a"])
+    cache.set(("words", user, 2, 20, ""), ["b"])
+    cache.set(("words", uuid.uuid4(), 1, 20, ""), ["c"])
+    # Idents arrive as strings over NOTIFY
+    assert cache.evict_group("words", str(user)) == 2
+    assert len(cache) == 1
+
+
+def test_loader_that_raced_an_eviction_is_not_cached():
+    async def scenario():
+        cache = LocalCache()
+
+        async def load():
+            # A write commits while the (now stale) read is in progress
+            cache.evict_group("deck", 1)
+            return "stale"
+
+        value = await cached(cache, ("deck", 1), load)
+        return value, cache.get(("deck", 1))
+
+    assert asyncio.run(scenario()) == ("stale", MISSING)
+
+
+def test_misses_are_not_cached():
+    async def scenario():
+        cache = LocalCache()
+        calls = 0
+
+        async def load():
+            nonlocal calls
+            calls += 1
+            return None
+
+        await cached(cache, ("deck", 1), load)
+        await cached(cache, ("deck", 1), load)
+        return calls
+
+    assert asyncio.run(scenario()) == 2
+
+
+def test_publish_evicts_locally_and_notifies_in_the_writers_transaction():
+    async def scenario():
+        deck_id = uuid.uuid4()
+        cache = LocalCache()
+        bus = InvalidationBus(cache, "postgresql+asyncpg://localhost/test")
+        cache.enabled = True
+        cache.set(("deck", deck_id), "cached")
+        session = RecordingSession()
+        await bus.publish(session, ("deck", deck_id))
+        return deck_id, cache, session
+
+    deck_id, cache, session = asyncio.run(scenario())
+    assert cache.get(("deck", deck_id)) is MISSING
+    payload = json.loads(session.statements[0]["payload"])
+    assert payload["g"] == [["deck", str(deck_id)]]
+
+
+def test_notifications_from_other_workers_evict():
+    cache = LocalCache()
+    bus = InvalidationBus(cache)
+    cache.set(("stats", "u1", "today"), {"combined": {}})
+    bus.handle(json.dumps({"w": "other", "g": [["stats", "u1"]]}))
+    bus.handle("not json")
+    assert cache.get(("stats", "u1", "today")) is MISSING
+    assert bus.received == 1
+
+
+def test_cache_stays_off_until_the_listener_connects():
+    cache = LocalCache()
+    InvalidationBus(cache, "postgresql+asyncpg://localhost/test")
+    cache.set(("deck", 1), "value")
+    assert cache.get(("deck", 1)) is MISSING
@@ -0,0 +1,250 @@
+"""
+Conversation sessions and the conversation WebSocket. The offline tests
+run turns against a session that records statements; the round trip test
+runs the whole flow on Postgres when TEST_DATABASE_URL is set (see
+query_plan_test.py).
+"""
+import asyncio
+import json
+import os
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from fastapi import WebSocketDisconnect
+from fastapi.testclient import TestClient
+from sqlalchemy.dialects import postgresql
+
+from llm_routing_test import ScriptedLLM
+from ratelimit_test import FakeClock
+from src import conversations
+from src.app import create_app
+from src.cache import MISSING
+from src.config import Settings
+from src.conversation_socket import PracticeClock
+from src.database import get_db
+from src.schema import ConversationSettings
+from src.tutor import build_system_prompt, find_words_used
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+USER = uuid.UUID("00000000-0000-0000-0000-000000000001")
+VOCABULARY = [{"word": "chien", "definition": "dog"}, {"word": "chat", "definition": "cat"}]
+
+
+class RecordingSession:
+    """Stands in for AsyncSession: records statements, updates match `rowcount` rows"""
+
+    def __init__(self, rowcount: int = 1):
+        self.rowcount = rowcount
+        self.statements = []
+        self.commits = 0
+
+    async def execute(self, statement, params=None):
+        self.statements.append(statement)
+        return SimpleNamespace(rowcount=self.rowcount)
+
+    async def commit(self):
+        self.commits += 1
+
+    async def rollback(self):
+        pass
+
+    async def close(self):
+        pass
+
+
+def make_app(session: RecordingSession):
+    app = create_app(Settings())
+
+    async def override_db():
+        yield session
+
+    app.dependency_overrides[get_db] = override_db
+    return app
+
+
+def start_conversation(app) -> uuid.UUID:
+    """A fresh session in the worker's memory, answered by a scripted model (call inside the client)"""
+    app.state.llm_router.llm = ScriptedLLM()
+    conversation = conversations.Conversation(
+        id=uuid.uuid4(), user_id=USER, deck_id=uuid.uuid4(),
+        settings=ConversationSettings().model_dump(), vocabulary=VOCABULARY,
+        messages=[], version=0, history_tokens=0,
+    )
+    app.state.cache.set(conversations.cache_key(conversation.id), conversation)
+    return conversation.id
+
+
+def compiled(statement) -> str:
+    return str(statement.compile(dialect=postgresql.dialect()))
+
+
+def test_turns_send_only_the_new_message_and_skip_the_database_read():
+    session = RecordingSession()
+    with TestClient(make_app(session)) as client:
+        conversation_id = start_conversation(client.app)
+        first = client.post(f"/api/conversations/{conversation_id}/turns", json={"user_id": str(USER), "content": "Bonjour"})
+        second = client.post(f"/api/conversations/{conversation_id}/turns", json={"user_id": str(USER), "content": "Le chien"})
+        history = client.get(f"/api/conversations/{conversation_id}", params={"user_id": str(USER)}).json()
+
+    assert first.status_code == 200, first.text
+    assert (first.json()["turns"], second.json()["turns"]) == (1, 2)
+    assert [m["content"] for m in history["messages"]] == ["Bonjour", "reply 1", "Le chien", "reply 2"]
+
+    # One UPDATE per turn and no SELECT: the history came from memory
+    updates = [compiled(s) for s in session.statements]
+    assert len(updates) == 2 and all(sql.startswith("UPDATE conversation_sessions") for sql in updates)
+    assert "conversation_sessions.messages || " in updates[0]
+    # Each UPDATE carries only that turn's two messages, pinned to the version it read
+    second_params = session.statements[1].compile(dialect=postgresql.dialect()).params
+    assert [m["content"] for m in second_params["param_1"]] == ["Le chien", "reply 2"]
+    assert second_params["version_1"] == 1
+
+
+def test_other_users_cannot_see_or_extend_a_conversation():
+    other = "00000000-0000-0000-0000-000000000002"
+    with TestClient(make_app(RecordingSession())) as client:
+        conversation_id = start_conversation(client.app)
+        turn = client.post(f"/api/conversations/{conversation_id}/turns", json={"user_id": other, "content": "Salut"})
+        fetched = client.get(f"/api/conversations/{conversation_id}", params={"user_id": other})
+    assert turn.status_code == fetched.status_code == 404
+
+
+def test_concurrent_turn_gets_409_and_drops_the_stale_copy():
+    with TestClient(make_app(RecordingSession(rowcount=0))) as client:
+        conversation_id = start_conversation(client.app)
+        response = client.post(f"/api/conversations/{conversation_id}/turns", json={"user_id": str(USER), "content": "Salut"})
+        cached = client.app.state.cache.get(conversations.cache_key(conversation_id))
+    assert response.status_code == 409
+    assert cached is MISSING
+
+
+def test_tutor_prompt_and_word_matching():
+    first = build_system_prompt(VOCABULARY, ConversationSettings(immersionLevel=90, topic="food"), True)
+    later = build_system_prompt(VOCABULARY, ConversationSettings(), False)
+    assert "- chien: dog\n- chat: cat" in first
+    assert "Respond ENTIRELY in target language" in first and "Food & dining" in first
+    assert first.endswith("natural use of the vocabulary words.")
+    assert later.endswith("Continue the conversation naturally, incorporating vocabulary words.")
+    assert find_words_used("Le <vocab>Chien</vocab> dort", VOCABULARY) == ["chien"]
+
+
+@pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set")
+def test_conversation_round_trip_on_postgres():
+    import asyncpg
+
+    from query_plan_test import SCHEMA_SQL
+    from src import database, migrate
+
+    async def prepare():
+        conn = await asyncpg.connect(database.asyncpg_dsn(TEST_DATABASE_URL))
+        try:
+            await conn.execute(SCHEMA_SQL)
+            await migrate.migrate(TEST_DATABASE_URL)
+            deck_id = await conn.fetchval("INSERT INTO decks (user_id, title) VALUES ($1, 'Animaux') RETURNING id", USER)
+            await conn.execute(
+                "INSERT INTO flashcards (deck_id, user_id, front, back) VALUES ($1, $2, 'chien', 'dog'), ($1, $2, 'chat', 'cat')",
+                deck_id, USER,
+            )
+            return deck_id
+        finally:
+            await conn.close()
+
+    deck_id = asyncio.run(prepare())
+    app = create_app(Settings(database_url=TEST_DATABASE_URL, pool_warmup=False))
+    with TestClient(app) as client:
+        app.state.llm_router.llm = ScriptedLLM()
+        created = client.post("/api/conversations", json={"user_id": str(USER), "deck_id": str(deck_id)})
+        assert created.status_code == 201, created.text
+        conversation_id = created.json()["id"]
+        for content in ("Bonjour", "Le chien"):
+            turn = client.post(f"/api/conversations/{conversation_id}/turns", json={"user_id": str(USER), "content": content})
+            assert turn.status_code == 200, turn.text
+
+        # A cold worker reloads the history from Postgres
+        app.state.cache.clear()
+        history = client.get(f"/api/conversations/{conversation_id}", params={"user_id": str(USER)}).json()
+        deleted = client.delete(f"/api/conversations/{conversation_id}", params={"user_id": str(USER)})
+        missing = client.get(f"/api/conversations/{conversation_id}", params={"user_id": str(USER)})
+
+    assert history["turns"] == 2
+    assert json.dumps([m["content"] for m in history["messages"]]) == json.dumps(["Bonjour", "reply 1", "Le chien", "reply 2"])
+    assert deleted.status_code == 200
+    assert missing.status_code == 404
+
+
+def test_socket_streams_the_reply_and_refuses_a_second_turn_while_busy():
+    session = RecordingSession()
+    with TestClient(make_app(session)) as client:
+        conversation_id = start_conversation(client.app)
+        client.app.state.llm_router.llm = ScriptedLLM((0.2, None))
+        with client.websocket_connect(f"/api/conversations/{conversation_id}/ws?user_id={USER}") as ws:
+            ready = ws.receive_json()
+            ws.send_json({"type": "message", "content": "Bonjour"})
+            ws.send_json({"type": "speech", "content": "Le chien"})
+            frames = []
+            while not frames or frames[-1]["type"] != "done":
+                frames.append(ws.receive_json())
+            ws.send_json({"type": "ping"})
+            pong = ws.receive_json()
+
+    assert ready["type"] == "ready" and ready["turns"] == 0
+    assert frames[0] == {"type": "busy"}
+    assert "".join(f["text"] for f in frames if f["type"] == "token") == "reply 1"
+    assert frames[-1] == {"type": "done", "message": "reply 1", "words_used": [], "turns": 1}
+    assert pong == {"type": "pong"}
+    assert len(session.statements) == 1
+
+
+def test_socket_handshake_checks_the_owner():
+    other = "00000000-0000-0000-0000-000000000002"
+    with TestClient(make_app(RecordingSession())) as client:
+        conversation_id = start_conversation(client.app)
+        with pytest.raises(WebSocketDisconnect) as exc:
+            with client.websocket_connect(f"/api/conversations/{conversation_id}/ws?user_id={other}"):
+                pass
+    assert exc.value.code == 1008
+
+
+def test_socket_closes_when_idle_and_records_the_session(monkeypatch):
+    buffered = []
+
+    class RecordingBuffer:
+        async def add(self, events):
+            buffered.extend(events)
+            return len(events), 0
+
+        async def close(self):
+            pass
+
+    monkeypatch.setattr(PracticeClock, "active_seconds", lambda self: 42)
+    app = make_app(RecordingSession())
+    app.state.settings.ws_idle_timeout = 0.1
+    with TestClient(app) as client:
+        conversation_id = start_conversation(app)
+        app.state.event_buffer = RecordingBuffer()
+        with client.websocket_connect(f"/api/conversations/{conversation_id}/ws?user_id={USER}") as ws:
+            ws.receive_json()
+            with pytest.raises(WebSocketDisconnect) as exc:
+                ws.receive_json()
+
+    assert (exc.value.code, exc.value.reason) == (1000, "Idle timeout")
+    [event] = buffered
+    assert (event.table, event.user_id) == ("practice_sessions", USER)
+    assert event.values["practice_type"] == "conversation"
+    assert event.values["duration_seconds"] == 42
+
+
+def test_practice_clock_counts_until_the_last_activity_minus_pauses():
+    clock = FakeClock()
+    practice = PracticeClock(clock)
+    clock.now = 60
+    practice.touch()
+    practice.pause()
+    clock.now = 300
+    practice.resume()
+    clock.now = 330
+    practice.touch()
+    clock.now = 900  # idle since 330
+    assert practice.active_seconds() == 90
+    assert practice.idle_seconds() == 570
@@ -0,0 +1,119 @@
+import asyncio
+import uuid
+
+from fastapi.testclient import TestClient
+from sqlalchemy.dialects import postgresql
+
+from query_plan_test import SCHEMA_SQL, TEST_DATABASE_URL, needs_database
+from src import database, deck_ops, migrate
+from src.app import create_app
+from src.config import Settings
+from src.openers import OpenerQueue
+
+USER = uuid.UUID("00000000-0000-0000-0000-000000000001")
+OTHER = uuid.UUID("00000000-0000-0000-0000-000000000002")
+
+
+def test_dedupe_keeps_the_first_card_per_normalized_front():
+    sql = str(deck_ops._copy_cards(uuid.uuid4(), USER, [uuid.uuid4()], dedupe=True).compile(dialect=postgresql.dialect()))
+    assert "DISTINCT ON (lower(btrim(flashcards.front)))" in sql
+    assert "ORDER BY lower(btrim(flashcards.front)), deck_position, flashcards.id" in sql
+
+    plain = str(deck_ops._copy_cards(uuid.uuid4(), USER, [uuid.uuid4()], dedupe=False).compile(dialect=postgresql.dialect()))
+    assert "DISTINCT" not in plain
+
+
+def test_merge_needs_two_different_decks():
+    deck_id = str(uuid.uuid4())
+    with TestClient(create_app(Settings())) as client:
+        response = client.post("/api/decks/merge", json={"user_id": str(USER), "deck_ids": [deck_id, deck_id]})
+    assert response.status_code == 400
+
+
+async def _seed() -> dict:
+    import asyncpg
+
+    conn = await asyncpg.connect(database.asyncpg_dsn(TEST_DATABASE_URL))
+    try:
+        await conn.execute(SCHEMA_SQL)
+        await migrate.migrate(TEST_DATABASE_URL)
+        decks = {}
+        for name, user_id, cards in (
+            ("animals", USER, [("Chien", "dog"), ("chat", "cat"), (" chien ", "hound")]),
+            ("more", USER, [("CHAT", "kitty"), ("oiseau", "bird")]),
+            ("theirs", OTHER, [("vache", "cow")]),
+        ):
+            decks[name] = await conn.fetchval(
+                "INSERT INTO decks (title, user_id, difficulty) VALUES ($1, $2, 'easy') RETURNING id", name, user_id
+            )
+            for front, back in cards:
+                await conn.execute(
+                    "INSERT INTO flashcards (deck_id, user_id, front, back) VALUES ($1, $2, $3, $4)",
+                    decks[name], user_id, front, back,
+                )
+        return decks
+    finally:
+        await conn.close()
+
+
+async def _cards(deck_id) -> list[tuple[str, str]]:
+    import asyncpg
+
+    conn = await asyncpg.connect(database.asyncpg_dsn(TEST_DATABASE_URL))
+    try:
+        rows = await conn.fetch("SELECT front, back FROM flashcards WHERE deck_id = $1 ORDER BY id", uuid.UUID(deck_id))
+        return [(row["front"], row["back"]) for row in rows]
+    finally:
+        await conn.close()
+
+
+async def _deck_exists(deck_id) -> bool:
+    import asyncpg
+
+    conn = await asyncpg.connect(database.asyncpg_dsn(TEST_DATABASE_URL))
+    try:
+        return await conn.fetchval("SELECT EXISTS (SELECT 1 FROM decks WHERE id = $1)", deck_id)
+    finally:
+        await conn.close()
+
+
+@needs_database
+def test_clone_and_merge(monkeypatch):
+    enqueued = []
+    monkeypatch.setattr(OpenerQueue, "enqueue", lambda self, deck_id: enqueued.append(str(deck_id)))
+    decks = asyncio.run(_seed())
+    settings = Settings(database_url=TEST_DATABASE_URL, pool_warmup=False)
+    mine = {"user_id": str(USER)}
+    with TestClient(create_app(settings)) as client:
+        clone = client.post(f"/api/decks/{decks['animals']}/clone", params=mine, json={}).json()
+        assert (clone["title"], clone["card_count"], clone["difficulty"]) == ("Copy of animals", 3, "easy")
+
+        clone = client.post(f"/api/decks/{decks['animals']}/clone", params=mine, json={"title": "Mine", "dedupe": True}).json()
+        assert (clone["title"], clone["card_count"]) == ("Mine", 2)
+        assert asyncio.run(_cards(clone["id"])) == [("Chien", "dog"), ("chat", "cat")]
+        assert enqueued[-1] == clone["id"]
+
+        # A rename leaves the cards, and so the openers, alone
+        client.put(f"/api/decks/{clone['id']}", params=mine, json={"title": "Renamed"}).raise_for_status()
+        assert enqueued.count(clone["id"]) == 1
+
+        # Someone else's deck, or no deck at all
+        for deck_id in (decks["theirs"], uuid.uuid4()):
+            assert client.post(f"/api/decks/{deck_id}/clone", params=mine, json={}).status_code == 404
+        response = client.post("/api/decks/merge", json={**mine, "deck_ids": [str(decks["animals"]), str(decks["theirs"])]})
+        assert response.status_code == 404
+
+        # The first deck listed wins duplicates; cards keep deck order
+        merged = client.post("/api/decks/merge", json={
+            **mine, "deck_ids": [str(decks["more"]), str(decks["animals"])], "title": "All",
+        }).json()
+        assert (merged["title"], merged["card_count"]) == ("All", 3)
+        assert asyncio.run(_cards(merged["id"])) == [("CHAT", "kitty"), ("oiseau", "bird"), ("Chien", "dog")]
+        assert asyncio.run(_deck_exists(decks["more"]))
+
+        merged = client.post("/api/decks/merge", json={
+            **mine, "deck_ids": [str(decks["animals"]), str(decks["more"])], "dedupe": False, "delete_sources": True,
+        }).json()
+        assert (merged["title"], merged["card_count"]) == ("Merged deck (2 decks)", 5)
+        assert not asyncio.run(_deck_exists(decks["animals"])) and not asyncio.run(_deck_exists(decks["more"]))
+        assert len(asyncio.run(_cards(merged["id"]))) == 5
@@ -0,0 +1,172 @@
+"""
+Batched word enrichment. The last test runs a batch on Postgres when
+TEST_DATABASE_URL is set (see query_plan_test.py).
+"""
+import asyncio
+import json
+import os
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from src.enrichment import (
+    EnrichmentWorker, build_prompt, claim_statement, lexicon_entries, parse_enrichment, write_statement,
+)
+from src.llm import Completion
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+
+class EnrichingLLM:
+    """Answers an enrichment prompt for every word except those in `skip`"""
+
+    def __init__(self, skip=()):
+        self.skip = set(skip)
+        self.calls = 0
+
+    async def complete(self, model: str, endpoint: str, messages: list, **kwargs) -> Completion:
+        self.calls += 1
+        words = json.loads(messages[0]["content"].split("Words: ", 1)[1])
+        answers = [
+            {
+                "id": w["id"], "example": f"Exemple avec {w['word']}.", "pronunciation": f"/{w['word']}/",
+                "source_language": "fr", "target_language": "en",
+            }
+            for w in words if w["word"] not in self.skip
+        ]
+        return Completion(text="```json\n" + json.dumps(answers) + "\n```", model=model)
+
+
+def test_prompt_round_trip_keeps_only_known_ids():
+    batch = [SimpleNamespace(id=uuid.uuid4(), word=w, definition=d) for w, d in (("chien", "dog"), ("chat", "cat"))]
+    assert '"word": "chien"' in build_prompt(batch)
+
+    response = json.dumps([
+        {"id": 1, "example": "Le chat dort.", "pronunciation": "/ʃa/", "source_language": "FR", "target_language": "english"},
+        {"id": 7, "example": "Unknown id", "pronunciation": "/x/"},
+        {"id": 0, "example": "", "pronunciation": ""},
+        "not an object",
+    ])
+    assert parse_enrichment(f"Here you go:\n{response}", batch) == [(batch[1].id, "Le chat dort.", "/ʃa/", "fr", None)]
+    with pytest.raises(json.JSONDecodeError):
+        parse_enrichment("[{oops", batch)
+
+
+def test_one_word_definitions_feed_the_lexicon():
+    batch = [
+        SimpleNamespace(id=uuid.uuid4(), word=w, definition=d)
+        for w, d in (("Chien", "dog"), ("chat", "a small cat"), ("l'eau", "water"), ("Hund", "dog"))
+    ]
+    results = parse_enrichment(json.dumps([
+        {"id": i, "example": "Exemple.", "source_language": src, "target_language": "en"}
+        for i, src in enumerate(("fr", "fr", "fr", "de"))
+    ]), batch)
+    assert lexicon_entries(results, batch) == {
+        ("fr", "en"): [("chien", "chien", "dog", None)],
+        ("de", "en"): [("hund", "hund", "dog", None)],
+    }
+
+
+def test_claim_skips_locked_rows_and_write_back_is_one_statement():
+    claim = str(claim_statement(50).compile(dialect=postgresql.dialect()))
+    assert "FOR UPDATE SKIP LOCKED" in claim and "RETURNING" in claim
+    # The last attempt takes the word out of the queue
+    assert "enriched_at=CASE WHEN (words.enrich_attempts + %(enrich_attempts_1)s >= %(param_1)s) THEN now()" in claim
+
+    results = [(uuid.uuid4(), f"Exemple {i}.", None) for i in range(3)]
+    write = write_statement(results).compile(dialect=postgresql.dialect())
+    assert str(write).startswith("UPDATE words SET example=coalesce(nullif(words.example")
+    assert "FROM unnest(" in str(write)
+    assert [len(write.params[p]) for p in ("param_1", "param_2", "param_3")] == [3, 3, 3]
+
+
+def test_worker_drains_full_batches_and_yields_when_busy():
+    rounds = [(50, 48), (50, 50), (12, 12), (50, 50)]
+    busy = False
+
+    async def enrich(batch_size):
+        return rounds.pop(0)
+
+    worker = EnrichmentWorker(enrich, batch_size=50, busy=lambda: busy)
+    assert asyncio.run(worker.run_once()) == 110
+    assert worker.stats() == {"enabled": True, "batches": 3, "claimed": 112, "enriched": 110, "failures": 0}
+
+    busy = True
+    assert asyncio.run(worker.run_once()) == 0
+    assert rounds == [(50, 50)]
+
+
+def test_worker_counts_failed_rounds():
+    async def enrich(batch_size):
+        raise json.JSONDecodeError("bad", "", 0)
+
+    worker = EnrichmentWorker(enrich)
+    assert asyncio.run(worker.run_once()) == 0
+    assert worker.failures == 1
+
+
+@pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set")
+def test_batch_fills_empty_fields_on_postgres():
+    import asyncpg
+
+    from query_plan_test import SCHEMA_SQL
+    from src import database, migrate
+    from src.cache import LocalCache
+    from src.enrichment import MAX_ATTEMPTS, enrich_batch
+    from src.invalidation import InvalidationBus
+    from src.llm_routing import LLMRouter
+    from src.ratelimit import AdmissionController
+
+    user = uuid.uuid4()
+
+    async def scenario():
+        conn = await asyncpg.connect(database.asyncpg_dsn(TEST_DATABASE_URL))
+        try:
+            await conn.execute(SCHEMA_SQL)
+            await migrate.migrate(TEST_DATABASE_URL)
+            await conn.execute(
+                """
+                INSERT INTO words (user_id, word, definition, example, pronunciation) VALUES
+                    ($1, 'chien', 'dog', '', ''),
+                    ($1, 'chat', 'cat', 'Mon chat.', NULL),
+                    ($1, 'oiseau', 'bird', NULL, NULL),
+                    ($1, 'done', 'done', 'Already.', '/d/')
+                """,
+                user,
+            )
+
+            database.init_engine(TEST_DATABASE_URL)
+            llm = EnrichingLLM(skip={"oiseau"})
+            cache = LocalCache()
+            counts = await enrich_batch(10, LLMRouter(llm, hedge_ratio=0), AdmissionController(), InvalidationBus(cache, None))
+            again = await enrich_batch(10, LLMRouter(llm, hedge_ratio=0), AdmissionController(), InvalidationBus(cache, None))
+
+            # Past its lease, the skipped word gets its last attempt, then leaves the queue
+            await conn.execute(
+                "UPDATE words SET enrich_attempts = $1 - 1, enrich_claimed_at = now() - interval '1 day' WHERE word = 'oiseau'",
+                MAX_ATTEMPTS,
+            )
+            last = await enrich_batch(10, LLMRouter(llm, hedge_ratio=0), AdmissionController(), InvalidationBus(cache, None))
+            done = await enrich_batch(10, LLMRouter(llm, hedge_ratio=0), AdmissionController(), InvalidationBus(cache, None))
+            rows = await conn.fetch(
+                "SELECT word, example, pronunciation, enriched_at IS NOT NULL AS enriched, enrich_attempts FROM words ORDER BY word"
+            )
+            learned = await conn.fetch("SELECT word, translation, source FROM lexicon ORDER BY word")
+            return counts, (again, last, done), llm.calls, {r["word"]: tuple(r)[1:] for r in rows}, [tuple(r) for r in learned]
+        finally:
+            await database.dispose_engine()
+            await conn.close()
+
+    counts, rounds, calls, rows, learned = asyncio.run(scenario())
+    assert counts == (3, 2)
+    # The skipped word is leased, so the second round finds nothing to claim;
+    # after its last attempt it is never claimed again
+    assert (rounds, calls) == (((0, 0), (1, 0), (0, 0)), 2)
+    assert rows["chien"] == ("Exemple avec chien.", "/chien/", True, 1)
+    assert rows["chat"] == ("Mon chat.", "/chat/", True, 1)
+    assert rows["oiseau"] == (None, None, True, MAX_ATTEMPTS)
+    # Nothing to fill in: never sent to the model
+    assert rows["done"] == ("Already.", "/d/", False, 0)
+    assert learned == [("chat", "cat", "enrichment"), ("chien", "dog", "enrichment")]
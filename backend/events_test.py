@@ -0,0 +1,175 @@
+import asyncio
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+from query_plan_test import SCHEMA_SQL, TEST_DATABASE_URL, needs_database
+from src import database, migrate
+from src.app import create_app
+from src.config import Settings
+from src.events import WriteBehindBuffer, BufferedEvent, BufferFullError, BufferClosedError
+
+
+class RecordingWriter:
+    """Collects flushed batches; can be told to fail the next N calls"""
+
+    def __init__(self, fail_times=0):
+        self.batches = []
+        self.fail_times = fail_times
+
+    async def __call__(self, batch):
+        if self.fail_times > 0:
+            self.fail_times -= 1
+            raise RuntimeError("database unavailable")
+        self.batches.append([e.client_event_id for e in batch])
+
+    @property
+    def written(self):
+        return [key for batch in self.batches for key in batch]
+
+
+def make_events(user_id, keys):
+    return [
+        BufferedEvent(table="practice_sessions", user_id=user_id, client_event_id=key, values={"duration_seconds": 60})
+        for key in keys
+    ]
+
+
+def test_flushes_when_batch_size_reached():
+    async def scenario():
+        writer = RecordingWriter()
+        buffer = WriteBehindBuffer(writer, max_batch_size=3, flush_interval=60)
+        await buffer.start()
+        await buffer.add(make_events(uuid.uuid4(), ["a", "b", "c"]))
+        await asyncio.sleep(0.05)
+        await buffer.close()
+        return writer
+
+    writer = asyncio.run(scenario())
+    assert writer.batches == [["a", "b", "c"]]
+
+
+def test_flushes_on_interval():
+    async def scenario():
+        writer = RecordingWriter()
+        buffer = WriteBehindBuffer(writer, max_batch_size=100, flush_interval=0.05)
+        await buffer.start()
+        await buffer.add(make_events(uuid.uuid4(), ["a"]))
+        await asyncio.sleep(0.2)
+        flushed_before_close = list(writer.written)
+        await buffer.close()
+        return flushed_before_close
+
+    assert asyncio.run(scenario()) == ["a"]
+
+
+def test_close_flushes_pending_and_rejects_new_events():
+    async def scenario():
+        writer = RecordingWriter()
+        buffer = WriteBehindBuffer(writer, max_batch_size=2, flush_interval=60)
+        await buffer.start()
+        user = uuid.uuid4()
+        buffer._wake.set = lambda: None  # keep the size trigger from firing
+        await buffer.add(make_events(user, ["a", "b", "c"]))
+        await buffer.close()
+        with pytest.raises(BufferClosedError):
+            await buffer.add(make_events(user, ["d"]))
+        return writer, buffer
+
+    writer, buffer = asyncio.run(scenario())
+    assert writer.batches == [["a", "b"], ["c"]]
+    assert buffer.pending_count == 0
+
+
+def test_failed_flush_keeps_events_in_order():
+    async def scenario():
+        writer = RecordingWriter(fail_times=1)
+        buffer = WriteBehindBuffer(writer, max_batch_size=10, flush_interval=60)
+        await buffer.add(make_events(uuid.uuid4(), ["a", "b"]))
+        with pytest.raises(RuntimeError):
+            await buffer.flush()
+        assert buffer.pending_count == 2
+        await buffer.add(make_events(uuid.uuid4(), ["c"]))
+        await buffer.flush()
+        return writer, buffer
+
+    writer, buffer = asyncio.run(scenario())
+    assert writer.written == ["a", "b", "c"]
+    assert buffer.flush_failures == 1
+
+
+def test_shutdown_retries_until_timeout():
+    async def scenario():
+        writer = RecordingWriter(fail_times=2)
+        buffer = WriteBehindBuffer(writer, flush_interval=60, shutdown_timeout=5)
+        await buffer.add(make_events(uuid.uuid4(), ["a"]))
+        await buffer.close()
+        return writer
+
+    assert asyncio.run(scenario()).written == ["a"]
+
+
+def test_duplicate_keys_are_reported_not_buffered():
+    async def scenario():
+        writer = RecordingWriter()
+        buffer = WriteBehindBuffer(writer, flush_interval=60)
+        user = uuid.uuid4()
+        first = await buffer.add(make_events(user, ["a", "a", "b"]))
+        second = await buffer.add(make_events(user, ["b"]))
+        await buffer.flush()
+        # Already flushed keys are still recognised on resend
+        third = await buffer.add(make_events(user, ["a"]))
+        # Same key from a different user is a different event
+        fourth = await buffer.add(make_events(uuid.uuid4(), ["a"]))
+        return first, second, third, fourth
+
+    assert asyncio.run(scenario()) == ((2, 1), (0, 1), (0, 1), (1, 0))
+
+
+def test_rejects_when_full():
+    async def scenario():
+        buffer = WriteBehindBuffer(RecordingWriter(), max_batch_size=100, max_pending=2)
+        await buffer.add(make_events(uuid.uuid4(), ["a", "b"]))
+        with pytest.raises(BufferFullError):
+            await buffer.add(make_events(uuid.uuid4(), ["c"]))
+
+    asyncio.run(scenario())
+
+
+async def _prepare_sessions():
+    import asyncpg
+
+    conn = await asyncpg.connect(database.asyncpg_dsn(TEST_DATABASE_URL))
+    try:
+        await conn.execute(SCHEMA_SQL)
+        await migrate.migrate(TEST_DATABASE_URL)
+    finally:
+        await conn.close()
+
+
+async def _sessions(user_id) -> list[int]:
+    import asyncpg
+
+    conn = await asyncpg.connect(database.asyncpg_dsn(TEST_DATABASE_URL))
+    try:
+        rows = await conn.fetch("SELECT duration_seconds FROM practice_sessions WHERE user_id = $1", user_id)
+        return [row["duration_seconds"] for row in rows]
+    finally:
+        await conn.close()
+
+
+@needs_database
+def test_resent_session_without_occurred_at_is_stored_once():
+    asyncio.run(_prepare_sessions())
+    user_id = uuid.uuid4()
+    body = {"user_id": str(user_id), "events": [{"idempotency_key": "s-1", "type": "session", "duration_seconds": 60}]}
+
+    # A fresh app each time: another worker, or the same one after a restart,
+    # so the buffer's in-memory dedup can't help. Each resend gets a new
+    # completed_at.
+    for _ in range(2):
+        with TestClient(create_app(Settings(database_url=TEST_DATABASE_URL, pool_warmup=False))) as client:
+            assert client.post("/api/events/batch", json=body).status_code == 202
+
+    assert asyncio.run(_sessions(user_id)) == [60]
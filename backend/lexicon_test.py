@@ -0,0 +1,141 @@
+"""
+Shared lexicon. The last test generates two decks on Postgres when
+TEST_DATABASE_URL is set (see query_plan_test.py).
+"""
+import asyncio
+import json
+import os
+import uuid
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from src import lexicon
+from src.llm import Completion
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+
+class TranslatingLLM:
+    """Translates the words it is asked about from `dictionary` (front, back, level), marking the rest skipped"""
+
+    def __init__(self, dictionary):
+        self.dictionary = dictionary
+        self.prompts = []
+
+    async def complete(self, model: str, endpoint: str, messages: list, **kwargs) -> Completion:
+        self.prompts.append(json.loads(messages[0]["content"].split("Words: ", 1)[1]))
+        answers = [
+            dict(zip(("word", "front", "back", "level"), (w, *self.dictionary[w]))) if w in self.dictionary
+            else {"word": w, "front": None, "back": None}
+            for w in self.prompts[-1]
+        ]
+        return Completion(text=json.dumps(answers), model=model)
+
+
+def test_tokenize_keeps_distinct_words_in_order():
+    text = "Le chien et l'oiseau. LE CHIEN dort peut-être, à 10h!"
+    assert lexicon.tokenize(text) == ["le", "chien", "et", "oiseau", "dort", "peut-être"]
+    assert lexicon.supports("fr") and not lexicon.supports("ja") and not lexicon.supports(None)
+
+
+def test_answers_become_cards_and_skipped_words_are_remembered():
+    words = ["les", "chiens", "chien", "mangent", "jardin", "parterre"]
+    response = json.dumps([
+        {"word": "les", "front": None, "back": None},
+        {"word": "Chiens", "front": "chien", "back": "dog", "level": "easy"},
+        {"word": "mangent", "front": "manger", "back": "eat", "level": "Easy"},
+        {"word": "chats", "front": "chat", "back": "cat", "level": "easy"},  # never asked
+        {"word": "chien", "front": "", "back": "dog", "level": "easy"},  # malformed
+        {"word": "parterre", "front": "parterre", "back": "flowerbed"},  # no level
+    ])
+    learned = lexicon.parse_translations(f"Sure:\n{response}", words)
+    # Only the explicit skip is a non-word; "chien", "parterre" and the
+    # dropped "jardin" are asked about again next time
+    assert learned == [
+        ("les", None, None, None),
+        ("chiens", "chien", "dog", "easy"),
+        ("mangent", "manger", "eat", "easy"),
+    ]
+    # One card per dictionary form
+    assert lexicon.to_cards(words, {e.word: e for e in learned}) == [
+        {"front": "chien", "back": "dog"},
+        {"front": "manger", "back": "eat"},
+    ]
+
+    statement = str(lexicon.record_statement(learned, "fr", "en", "generation").compile(dialect=postgresql.dialect()))
+    assert "ON CONFLICT (word, source_language, target_language) DO UPDATE" in statement
+    assert "coalesce(lexicon.translation, excluded.translation)" in statement
+    assert "WHERE lexicon.translation IS NULL AND excluded.translation IS NOT NULL OR lexicon.level IS NULL" in statement
+
+
+def test_cards_follow_the_requested_difficulty():
+    entries = {e.word: e for e in (
+        lexicon.Translation("chien", "chien", "dog", "easy"),
+        lexicon.Translation("aboie", "aboyer", "bark", "medium"),
+        lexicon.Translation("hargneux", "hargneux", "surly", "hard"),
+        lexicon.Translation("le", None, None),
+    )}
+    words = ["le", "chien", "hargneux", "aboie"]
+    fronts = {
+        difficulty: [card["front"] for card in lexicon.to_cards(words, entries, difficulty)]
+        for difficulty in lexicon.LEVELS
+    }
+    assert fronts == {
+        "easy": ["chien"],
+        "medium": ["chien", "aboyer"],
+        "hard": ["chien", "hargneux", "aboyer"],
+    }
+
+
+@pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set")
+def test_second_generation_only_asks_about_new_words():
+    import asyncpg
+
+    from query_plan_test import SCHEMA_SQL
+    from src import database, migrate
+    from src.llm_routing import LLMRouter
+    from src.ratelimit import AdmissionController
+    from src.routers.flashcards import create_deck_from_text
+    from src.schema import TextInput
+
+    user = uuid.uuid4()
+    llm = TranslatingLLM({
+        "chien": ("chien", "dog", "easy"), "chiens": ("chien", "dog", "easy"), "chat": ("chat", "cat", "easy"),
+        "hargneux": ("hargneux", "surly", "hard"),
+    })
+
+    async def scenario():
+        conn = await asyncpg.connect(database.asyncpg_dsn(TEST_DATABASE_URL))
+        try:
+            await conn.execute(SCHEMA_SQL)
+            await migrate.migrate(TEST_DATABASE_URL)
+
+            database.init_engine(TEST_DATABASE_URL)
+            router, admission = LLMRouter(llm, hedge_ratio=0), AdmissionController()
+            decks = []
+            for text, difficulty in (
+                ("Le chien et le chat", "medium"),
+                ("Les chiens et le chat", "medium"),
+                ("Le chat et le chien", "medium"),
+                ("Le chien hargneux", "easy"),
+                ("Le chien hargneux", "hard"),
+            ):
+                body = TextInput(text=text, user_id=str(user), source_language="fr", difficulty=difficulty)
+                decks.append(await create_deck_from_text(body, user, router, admission))
+            rows = await conn.fetch("SELECT word, lemma, translation, level FROM lexicon ORDER BY word")
+            return decks, [tuple(r) for r in rows]
+        finally:
+            await database.dispose_engine()
+            await conn.close()
+
+    decks, rows = asyncio.run(scenario())
+    assert llm.prompts == [["le", "chien", "et", "chat"], ["les", "chiens"], ["hargneux"]]
+    assert [d["flashcards"] for d in decks] == [
+        [{"front": "chien", "back": "dog"}, {"front": "chat", "back": "cat"}],
+        [{"front": "chien", "back": "dog"}, {"front": "chat", "back": "cat"}],
+        [{"front": "chat", "back": "cat"}, {"front": "chien", "back": "dog"}],
+        [{"front": "chien", "back": "dog"}],
+        [{"front": "chien", "back": "dog"}, {"front": "hargneux", "back": "surly"}],
+    ]
+    assert ("chiens", "chien", "dog", "easy") in rows and ("le", None, None, None) in rows
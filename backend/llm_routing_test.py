@@ -0,0 +1,151 @@
+import asyncio
+
+import anthropic
+import httpx
+import pytest
+
+from ratelimit_test import FakeClock
+from src.llm import Completion, LLMNotConfiguredError
+from src.llm_routing import (
+    FAST_MODEL,
+    CircuitBreaker,
+    CircuitOpen,
+    LLMDeadlineExceeded,
+    LLMRouter,
+    Route,
+    RoutingPolicy,
+)
+
+STRONG = "claude-sonnet-4-20250514"
+ROUTE = Route(STRONG, FAST_MODEL, deadline=1.0)
+
+
+def upstream_error():
+    return anthropic.APIConnectionError(request=httpx.Request("POST", "https://api.anthropic.com/v1/messages"))
+
+
+class ScriptedLLM:
+    """Each call takes the next (delay, error) step; calls are logged by model"""
+
+    def __init__(self, *steps):
+        self.steps = list(steps)
+        self.calls = []
+
+    async def complete(self, model: str, endpoint: str, on_text=None, **kwargs) -> Completion:
+        self.calls.append(model)
+        delay, error = self.steps.pop(0) if self.steps else (0, None)
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        text = f"reply {len(self.calls)}"
+        if on_text is not None:
+            for part in ("reply", f" {len(self.calls)}"):
+                await on_text(part)
+        return Completion(text=text, model=model)
+
+
+def test_policy_picks_the_tier_by_task_and_size():
+    policy = RoutingPolicy(short_text_tokens=100, long_history_tokens=100)
+    assert policy.generation("easy", "mot " * 1000).model == FAST_MODEL
+    assert policy.generation("medium", "le chien").model == FAST_MODEL
+    assert policy.generation("medium", "mot " * 1000).model == STRONG
+    assert policy.generation("hard", "le chien").model == STRONG
+
+    assert policy.conversation(50, 10).model == FAST_MODEL
+    assert policy.conversation(90, 10).model == STRONG
+    assert policy.conversation(50, 200).model == STRONG
+    assert policy.conversation(50, 10).fallback == STRONG
+
+
+def test_deadline_cancels_a_slow_call():
+    llm = ScriptedLLM((5, None))
+    router = LLMRouter(llm, hedge_ratio=0)
+
+    with pytest.raises(LLMDeadlineExceeded) as exc:
+        asyncio.run(router.complete(Route(STRONG, None, deadline=0.05), max_tokens=10, messages=[]))
+    assert exc.value.status_code == 504
+    assert router.deadlines_exceeded == 1
+
+
+def test_slow_call_is_hedged_after_the_p95():
+    async def scenario():
+        llm = ScriptedLLM(*([(0.01, None)] * 20), (1.0, None), (0.01, None))
+        router = LLMRouter(llm, hedge_ratio=1.0, hedge_min_samples=20, hedge_min_delay=0.02)
+        for _ in range(20):
+            await router.complete(ROUTE, max_tokens=10, messages=[])
+        completion = await router.complete(ROUTE, max_tokens=10, messages=[])
+        return router, llm, completion
+
+    router, llm, completion = asyncio.run(scenario())
+    assert completion.text == "reply 22"
+    assert (router.hedges, router.hedge_wins) == (1, 1)
+    assert len(llm.calls) == 22
+
+
+def test_hedges_are_capped_by_ratio():
+    async def scenario():
+        llm = ScriptedLLM(*([(0.01, None)] * 20), (0.1, None))
+        router = LLMRouter(llm, hedge_ratio=0.01, hedge_min_samples=20, hedge_min_delay=0.02)
+        for _ in range(21):
+            await router.complete(ROUTE, max_tokens=10, messages=[])
+        return router
+
+    assert asyncio.run(scenario()).hedges == 0
+
+
+def test_breaker_opens_falls_back_and_recovers():
+    clock = FakeClock()
+
+    async def scenario():
+        llm = ScriptedLLM(*([(0, upstream_error())] * 10))
+        router = LLMRouter(llm, hedge_ratio=0, breaker_cooldown=30, clock=clock)
+        for _ in range(10):
+            with pytest.raises(anthropic.APIConnectionError):
+                await router.complete(ROUTE, max_tokens=10, messages=[])
+        assert router.breaker(STRONG).state == CircuitBreaker.OPEN
+
+        # Open: the fast tier takes the call
+        fallback = await router.complete(ROUTE, max_tokens=10, messages=[])
+
+        # Both open: fail fast without calling out
+        router.breaker(FAST_MODEL)._open()
+        calls = len(llm.calls)
+        with pytest.raises(CircuitOpen) as exc:
+            await router.complete(ROUTE, max_tokens=10, messages=[])
+        assert exc.value.status_code == 503
+        assert exc.value.headers["Retry-After"] == "30"
+        assert len(llm.calls) == calls
+
+        # After the cooldown one probe goes through and closes the breaker
+        clock.now = 31
+        probe = await router.complete(ROUTE, max_tokens=10, messages=[])
+        return router, fallback, probe
+
+    router, fallback, probe = asyncio.run(scenario())
+    assert fallback.model == FAST_MODEL
+    assert probe.model == STRONG
+    assert router.breaker(STRONG).state == CircuitBreaker.CLOSED
+    assert router.fallbacks == 1
+
+
+def test_half_open_breaker_allows_a_single_probe():
+    clock = FakeClock()
+    breaker = CircuitBreaker(cooldown=10, clock=clock)
+    breaker._open()
+    clock.now = 10
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record(False)
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_request_errors_do_not_trip_the_breaker():
+    async def scenario():
+        llm = ScriptedLLM(*([(0, LLMNotConfiguredError("no key"))] * 12))
+        router = LLMRouter(llm, hedge_ratio=0)
+        for _ in range(12):
+            with pytest.raises(LLMNotConfiguredError):
+                await router.complete(ROUTE, max_tokens=10, messages=[])
+        return router
+
+    assert asyncio.run(scenario()).breaker(STRONG).state == CircuitBreaker.CLOSED
@@ -0,0 +1,142 @@
+import asyncio
+import json
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from metrics_test import stream_events
+from src.app import create_app
+from src.config import Settings
+from src.llm import LLMClient
+from src.llm_transport import (
+    Cassette,
+    CassetteMissError,
+    RecordingTransport,
+    ReplayTransport,
+    fingerprint,
+    open_transport,
+)
+
+MESSAGES = [{"role": "user", "content": "Bonjour"}]
+
+
+class SlowStream:
+    """Yields events with a pause before each text delta, like a real stream"""
+
+    def __init__(self, events, pause: float):
+        self.events = events
+        self.pause = pause
+
+    async def __aiter__(self):
+        for event in self.events:
+            if event.type == "content_block_delta":
+                await asyncio.sleep(self.pause)
+            yield event
+
+
+class FakeAnthropic:
+    def __init__(self, events, pause: float = 0.0):
+        self.events = events
+        self.pause = pause
+        self.messages = self
+        self.calls = 0
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        return SlowStream(self.events, self.pause)
+
+    async def close(self):
+        pass
+
+
+def record(path, pause=0.0, chunks=("Salut", " toi")) -> FakeAnthropic:
+    live = FakeAnthropic(stream_events("claude-test", list(chunks), 12, 3), pause)
+
+    async def scenario():
+        llm = LLMClient(client=RecordingTransport(live, Cassette(str(path))))
+        return await llm.complete(messages=MESSAGES, max_tokens=50, system="Be kind")
+
+    assert asyncio.run(scenario()).text == "".join(chunks)
+    return live
+
+
+def replay(path, speed=1.0, messages=MESSAGES):
+    async def scenario():
+        llm = LLMClient(client=ReplayTransport(Cassette(str(path)), speed=speed))
+        return await llm.complete(messages=messages, max_tokens=50, system="Be kind")
+
+    return asyncio.run(scenario())
+
+
+def test_fingerprint_ignores_stream_and_key_order():
+    a = fingerprint({"model": "m", "max_tokens": 5, "messages": MESSAGES, "stream": True})
+    b = fingerprint({"messages": MESSAGES, "max_tokens": 5, "model": "m"})
+    c = fingerprint({"model": "m", "max_tokens": 5, "messages": [{"role": "user", "content": "Salut"}]})
+    assert a == b != c
+
+
+def test_replay_serves_the_recorded_completion(tmp_path):
+    path = tmp_path / "llm.jsonl"
+    record(path)
+
+    completion = replay(path, speed=0)
+    assert completion.text == "Salut toi"
+    assert (completion.model, completion.input_tokens, completion.output_tokens) == ("claude-test", 12, 3)
+
+    [line] = path.read_text(encoding="utf-8").splitlines()
+    interaction = json.loads(line)
+    assert interaction["request"]["system"] == "Be kind"
+    assert "stream" not in interaction["request"]
+
+
+def test_replay_keeps_stream_timing(tmp_path):
+    path = tmp_path / "llm.jsonl"
+    record(path, pause=0.05)
+
+    start = time.perf_counter()
+    replay(path, speed=1.0)
+    recorded_pace = time.perf_counter() - start
+
+    start = time.perf_counter()
+    replay(path, speed=0)
+    no_delay = time.perf_counter() - start
+
+    assert recorded_pace >= 0.09
+    assert no_delay < 0.05
+
+
+def test_repeated_recordings_replay_in_turn(tmp_path):
+    path = tmp_path / "llm.jsonl"
+    record(path, chunks=("one",))
+    record(path, chunks=("two",))
+
+    cassette = Cassette(str(path))
+    assert len(cassette) == 2
+
+    async def scenario():
+        llm = LLMClient(client=ReplayTransport(cassette, speed=0))
+        return [(await llm.complete(messages=MESSAGES, max_tokens=50, system="Be kind")).text for _ in range(3)]
+
+    assert asyncio.run(scenario()) == ["one", "two", "one"]
+
+
+def test_unrecorded_request_is_a_miss(tmp_path):
+    path = tmp_path / "llm.jsonl"
+    record(path)
+    with pytest.raises(CassetteMissError):
+        replay(path, messages=[{"role": "user", "content": "Something else"}])
+
+
+def test_app_uses_the_configured_transport(tmp_path):
+    path = str(tmp_path / "llm.jsonl")
+    with TestClient(create_app(Settings(llm_transport="replay", llm_cassette=path))) as client:
+        llm = client.app.state.llm
+        assert llm.configured
+        assert isinstance(llm._client, ReplayTransport)
+
+    with pytest.raises(ValueError):
+        open_transport(Settings(llm_transport="record", llm_cassette=path))
+    with pytest.raises(ValueError):
+        open_transport(Settings(llm_transport="replay"))
+    assert open_transport(Settings()) is None
@@ -0,0 +1,111 @@
+import asyncio
+import json
+
+import httpx
+from anthropic import AsyncAnthropic
+from fastapi import FastAPI, Response
+
+from benchmarks.fake_llm import FakeLLMConfig, create_fake_llm
+from benchmarks.load_bench import parse_mix, percentile, run_load
+from src.llm import LLMClient
+
+
+def fake_llm_client(**config) -> LLMClient:
+    app = create_fake_llm(FakeLLMConfig(latency=0.0, tokens_per_second=0, seed=1, **config))
+    http_client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app))
+    return LLMClient(client=AsyncAnthropic(api_key="fake", base_url="http://fake", http_client=http_client))
+
+
+def test_fake_llm_streams_flashcards_the_app_can_parse():
+    async def scenario():
+        llm = fake_llm_client()
+        completion = await llm.complete(
+            messages=[{"role": "user", "content": "Extract vocabulary and create flashcards.\nText: Le chien et le chat."}],
+            max_tokens=100,
+        )
+        await llm.close()
+        return completion
+
+    completion = asyncio.run(scenario())
+    assert json.loads(completion.text) == [
+        {"front": "chien", "back": "neihc"},
+        {"front": "chat", "back": "tahc"},
+    ]
+    assert completion.output_tokens == -(-len(completion.text) // 4)
+    assert completion.input_tokens > 0
+
+
+def test_fake_llm_tutor_reply_uses_deck_vocabulary():
+    async def scenario():
+        llm = fake_llm_client(reply_tokens=200)
+        completion = await llm.complete(
+            messages=[{"role": "user", "content": "Bonjour"}],
+            system="VOCABULARY WORDS TO PRACTICE:\n- fromage: cheese\n",
+            max_tokens=100,
+        )
+        await llm.close()
+        return completion
+
+    assert "<vocab>fromage</vocab>" in asyncio.run(scenario()).text
+
+
+def test_percentiles_and_mix():
+    ordered = [float(i) for i in range(1, 101)]
+    assert (percentile(ordered, 50), percentile(ordered, 95), percentile(ordered, 99)) == (50.0, 95.0, 99.0)
+    assert percentile([7.0], 99) == 7.0
+    assert parse_mix("generate=1, decks=6,stats=0") == {"generate": 1.0, "decks": 6.0}
+
+
+def stub_api() -> FastAPI:
+    app = FastAPI()
+    app.state.turns = []
+
+    @app.post("/api/generate-flashcards")
+    async def generate(body: dict):
+        return {"deck_id": "d1", "flashcards": [], "count": 0, "difficulty": body["difficulty"], "processing_time": 0}
+
+    @app.post("/api/words/batch")
+    async def batch(body: dict):
+        return {"saved": len(body["words"]), "skipped": 0, "errors": []}
+
+    @app.post("/api/practice/conversation")
+    async def conversation(body: dict):
+        app.state.turns.append(len(body["messages"]))
+        return {"message": "Salut", "words_used": []}
+
+    @app.get("/api/my-decks")
+    async def decks():
+        return []
+
+    @app.get("/api/my-words")
+    async def words():
+        return []
+
+    @app.get("/api/stats/daily")
+    async def stats():
+        return Response(status_code=503)
+
+    return app
+
+
+def test_run_load_reports_each_endpoint():
+    app = stub_api()
+    report = asyncio.run(run_load(
+        "http://stub",
+        parse_mix("conversation=2,decks=1,words=1,stats=1"),
+        concurrency=4,
+        duration=0.3,
+        users=2,
+        turns=2,
+        seed_value=3,
+        transport=httpx.ASGITransport(app=app),
+    ))
+
+    assert set(report["endpoints"]) == {"conversation", "decks", "words", "stats"}
+    assert report["total"]["requests"] == sum(e["requests"] for e in report["endpoints"].values())
+    assert report["endpoints"]["stats"]["errors"] == report["endpoints"]["stats"]["requests"]
+    assert report["endpoints"]["decks"]["errors"] == 0
+    for key in ("rps", "p50_ms", "p95_ms", "p99_ms"):
+        assert key in report["endpoints"]["words"]
+    # Conversations grow by a turn at a time and restart after --turns
+    assert set(app.state.turns) == {1, 3}
@@ -0,0 +1,98 @@
+import json
+import logging
+import queue
+
+from fastapi.testclient import TestClient
+
+from src.app import create_app
+from src.config import Settings
+from src.logs import (
+    JSONFormatter,
+    NonBlockingQueueHandler,
+    RequestIdFilter,
+    SamplingFilter,
+    parse_sample_rates,
+    request_id_var,
+)
+
+
+def make_logger(name: str, maxsize: int = 100, sampler: SamplingFilter | None = None):
+    log_queue = queue.Queue(maxsize=maxsize)
+    handler = NonBlockingQueueHandler(log_queue)
+    for log_filter in (RequestIdFilter(), sampler or SamplingFilter()):
+        handler.addFilter(log_filter)
+    logger = logging.getLogger(f"logs_test.{name}")
+    logger.handlers = [handler]
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    return logger, handler, log_queue
+
+
+def formatted(log_queue) -> list[dict]:
+    lines = []
+    while not log_queue.empty():
+        lines.append(json.loads(JSONFormatter().format(log_queue.get_nowait())))
+    return lines
+
+
+def test_records_are_json_with_request_id_and_fields():
+    logger, _, log_queue = make_logger("fields")
+    token = request_id_var.set("req-123")
+    try:
+        logger.info("Saved deck %s", "abc", extra={"cards": 12})
+    finally:
+        request_id_var.reset(token)
+
+    [entry] = formatted(log_queue)
+    assert entry["msg"] == "Saved deck abc"
+    assert entry["level"] == "info"
+    assert entry["request_id"] == "req-123"
+    assert entry["cards"] == 12
+
+
+def test_user_text_and_secrets_are_redacted():
+    logger, _, log_queue = make_logger("redaction")
+    try:
+        raise ValueError("bad key sk-ant-abc123 for someone@example.com")
+    except ValueError:
+        logger.exception("Failed with Bearer abc.def", extra={"text": "Le chien mange.", "messages": ["hi"]})
+
+    [entry] = formatted(log_queue)
+    assert entry["text"] == {"redacted": True, "chars": 15}
+    assert entry["messages"]["redacted"] is True
+    assert "abc.def" not in entry["msg"]
+    assert "sk-ant-abc123" not in entry["exc"] and "someone@example.com" not in entry["exc"]
+    assert "ValueError" in entry["exc"]
+
+
+def test_sampled_events_keep_their_rate_and_warnings_always_pass():
+    rolls = iter([0.05, 0.5])
+    sampler = SamplingFilter({"request": 0.1}, rand=lambda: next(rolls))
+    logger, _, log_queue = make_logger("sampling", sampler=sampler)
+    logger.info("Request handled", extra={"event": "request"})
+    logger.info("Request handled", extra={"event": "request"})
+    logger.warning("Request handled", extra={"event": "request"})
+
+    entries = formatted(log_queue)
+    assert len(entries) == 2
+    assert entries[0]["sample_rate"] == 0.1
+    assert parse_sample_rates("request=0.1, slow_query=2") == {"request": 0.1, "slow_query": 1.0}
+
+
+def test_full_queue_drops_instead_of_blocking():
+    logger, handler, log_queue = make_logger("full", maxsize=2)
+    for i in range(5):
+        logger.info("event %d", i)
+    assert log_queue.qsize() == 2
+    assert handler.dropped == 3
+
+
+def test_requests_get_an_id_header():
+    with TestClient(create_app(Settings())) as client:
+        generated = client.get("/api/health").headers["x-request-id"]
+        echoed = client.get("/api/health", headers={"X-Request-ID": "abc-123"}).headers["x-request-id"]
+        replaced = client.get("/api/health", headers={"X-Request-ID": "bad id\n"}).headers["x-request-id"]
+
+    assert len(generated) == 32
+    assert echoed == "abc-123"
+    assert replaced != "bad id\n"
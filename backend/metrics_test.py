@@ -0,0 +1,103 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src import metrics
+from src.app import create_app
+from src.config import Settings
+from src.llm import LLMClient
+
+
+class FakeStream:
+    def __init__(self, events):
+        self.events = events
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for event in self.events:
+            yield event
+
+
+class FakeMessages:
+    def __init__(self, events):
+        self.events = events
+        self.calls = []
+
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+        return FakeStream(self.events)
+
+
+def stream_events(model: str, chunks: list[str], input_tokens: int, output_tokens: int) -> list:
+    events = [SimpleNamespace(
+        type="message_start",
+        message=SimpleNamespace(model=model, usage=SimpleNamespace(input_tokens=input_tokens, output_tokens=1)),
+    )]
+    events += [
+        SimpleNamespace(type="content_block_delta", delta=SimpleNamespace(type="text_delta", text=chunk))
+        for chunk in chunks
+    ]
+    events.append(SimpleNamespace(type="message_delta", usage=SimpleNamespace(output_tokens=output_tokens)))
+    events.append(SimpleNamespace(type="message_stop"))
+    return events
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = metrics.Registry()
+    histogram = metrics.Histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0), registry=registry)
+    histogram.labels('/a"b').observe(0.05)
+    histogram.labels('/a"b').observe(0.1)
+    histogram.labels('/a"b').observe(5)
+
+    text = registry.render()
+    assert 'latency_seconds_bucket{route="/a\\"b",le="0.1"} 2' in text
+    assert 'latency_seconds_bucket{route="/a\\"b",le="1"} 2' in text
+    assert 'latency_seconds_bucket{route="/a\\"b",le="+Inf"} 3' in text
+    assert 'latency_seconds_count{route="/a\\"b"} 3' in text
+
+
+def test_metric_names_are_unique_per_registry():
+    registry = metrics.Registry()
+    metrics.Counter("things_total", "Things", registry=registry)
+    with pytest.raises(ValueError):
+        metrics.Counter("things_total", "Things", registry=registry)
+
+
+def test_requests_are_timed_by_route_template():
+    with TestClient(create_app(Settings())) as client:
+        client.get("/items/5")
+        text = client.get("/metrics").text
+
+    assert 'http_request_duration_seconds_count{method="GET",route="/items/{item_id}",status="200"}' in text
+    assert "# TYPE http_requests_in_flight gauge" in text
+
+
+def test_metrics_token_is_enforced_when_configured():
+    with TestClient(create_app(Settings(metrics_token="scrape-me"))) as client:
+        assert client.get("/metrics").status_code == 401
+        assert client.get("/metrics", headers={"Authorization": "Bearer scrape-m"}).status_code == 401
+        assert client.get("/metrics", headers={"Authorization": "Bearer scrape-me"}).status_code == 200
+        # The internal stats are behind the same token
+        assert client.get("/api/internal/stats").status_code == 401
+        assert client.get("/api/internal/stats", headers={"Authorization": "Bearer scrape-me"}).status_code == 200
+
+
+def test_llm_calls_record_latency_ttft_and_tokens():
+    fake = SimpleNamespace(messages=FakeMessages(stream_events("test-model", ["Bon", "jour"], 12, 7)))
+    llm = LLMClient(client=fake)
+
+    completion = asyncio.run(llm.complete(
+        messages=[{"role": "user", "content": "hi"}], max_tokens=10, endpoint="practice_conversation"
+    ))
+
+    assert completion.text == "Bonjour"
+    assert (completion.input_tokens, completion.output_tokens) == (12, 7)
+    assert fake.messages.calls[0]["stream"] is True
+    text = metrics.REGISTRY.render()
+    assert 'llm_tokens_total{endpoint="practice_conversation",model="test-model",direction="output"} 7' in text
+    assert 'llm_time_to_first_token_seconds_count{endpoint="practice_conversation",model="test-model"} 1' in text
+    assert 'llm_request_duration_seconds_count{endpoint="practice_conversation",model="test-model",outcome="ok"} 1' in text
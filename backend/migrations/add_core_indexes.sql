@@ -0,0 +1,12 @@
+-- Indexes for the deck, flashcard and word queries in src/routers
+-- Checked by query_plan_test.py (EXPLAIN against seeded data)
+
+-- /api/my-decks (user's decks, newest first), /api/export/decks
+CREATE INDEX IF NOT EXISTS idx_decks_user_created ON decks(user_id, created_at DESC);
+
+-- /api/decks/{id}, card counts in /api/my-decks, clone/merge, /api/export/decks
+-- (id second so a deck's cards come back in insertion order)
+CREATE INDEX IF NOT EXISTS idx_flashcards_deck_id ON flashcards(deck_id, id);
+
+-- /api/my-words pages and count (newest first), /api/export/words
+CREATE INDEX IF NOT EXISTS idx_words_user_created ON words(user_id, created_at DESC);
@@ -0,0 +1,8 @@
+-- How advanced each lexicon word is, so lexicon cards follow the requested
+-- difficulty (see src/lexicon.py)
+--
+-- 'easy', 'medium' or 'hard'. NULL for non-words, and for entries saved
+-- before this or by the enrichment worker: a generation asks the model
+-- about those again once, and the answer fills the level in.
+
+ALTER TABLE lexicon ADD COLUMN IF NOT EXISTS level VARCHAR(10);
@@ -0,0 +1,12 @@
+-- Background enrichment of saved words (see src/enrichment.py)
+
+ALTER TABLE words ADD COLUMN IF NOT EXISTS enriched_at TIMESTAMP WITH TIME ZONE;
+ALTER TABLE words ADD COLUMN IF NOT EXISTS enrich_attempts SMALLINT NOT NULL DEFAULT 0;
+ALTER TABLE words ADD COLUMN IF NOT EXISTS enrich_claimed_at TIMESTAMP WITH TIME ZONE;
+
+-- Words that already have both fields need no model call
+UPDATE words SET enriched_at = CURRENT_TIMESTAMP
+WHERE enriched_at IS NULL AND COALESCE(example, '') <> '' AND COALESCE(pronunciation, '') <> '';
+
+-- The worker's queue: only words still waiting are indexed
+CREATE INDEX IF NOT EXISTS idx_words_unenriched ON words(created_at) WHERE enriched_at IS NULL;
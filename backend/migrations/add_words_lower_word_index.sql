@@ -0,0 +1,4 @@
+-- Case-insensitive word lookups per user
+-- Used by duplicate checks in /api/words/batch and /api/import/words
+
+CREATE INDEX IF NOT EXISTS idx_words_user_lower_word ON words(user_id, lower(word));
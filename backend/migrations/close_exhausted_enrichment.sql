@@ -0,0 +1,9 @@
+-- Words that used up their enrichment attempts (see src/enrichment.py)
+--
+-- They kept enriched_at NULL, so they stayed in idx_words_unenriched and
+-- were scanned again on every worker round. The worker now sets
+-- enriched_at on a word's last attempt; this does the same for words
+-- that already ran out.
+
+UPDATE words SET enriched_at = CURRENT_TIMESTAMP
+WHERE enriched_at IS NULL AND enrich_attempts >= 3;
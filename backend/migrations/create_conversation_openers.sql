@@ -0,0 +1,14 @@
+-- Pre-generated first tutor messages per deck and setting combination (see src/openers.py)
+
+CREATE TABLE IF NOT EXISTS conversation_openers (
+    deck_id UUID NOT NULL REFERENCES decks(id) ON DELETE CASCADE,
+    immersion_bucket SMALLINT NOT NULL,
+    focus_mode VARCHAR(20) NOT NULL,
+    topic VARCHAR(50) NOT NULL,
+    -- Hash of the deck's cards when the opener was written; a mismatch means it is stale
+    cards_fingerprint VARCHAR(64) NOT NULL,
+    message TEXT NOT NULL,
+    model VARCHAR(100) NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (deck_id, immersion_bucket, focus_mode, topic)
+);
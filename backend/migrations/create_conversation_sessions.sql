@@ -0,0 +1,16 @@
+-- Server-side conversation history (see src/conversations.py)
+
+CREATE TABLE IF NOT EXISTS conversation_sessions (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    user_id UUID NOT NULL,
+    deck_id UUID NOT NULL REFERENCES decks(id) ON DELETE CASCADE,
+    settings JSONB NOT NULL,
+    vocabulary JSONB NOT NULL,
+    messages JSONB NOT NULL DEFAULT '[]'::jsonb,
+    version INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Deleting a deck cascades here
+CREATE INDEX IF NOT EXISTS idx_conversation_sessions_deck ON conversation_sessions(deck_id);
@@ -0,0 +1,15 @@
+-- Translations shared across users, so common words skip the model (see src/lexicon.py)
+
+CREATE TABLE IF NOT EXISTS lexicon (
+    -- Lowercased, NFC-normalized, as the word appears in texts
+    word VARCHAR(100) NOT NULL,
+    source_language VARCHAR(3) NOT NULL,
+    target_language VARCHAR(3) NOT NULL,
+    -- Dictionary form and translation; both NULL when it is not a vocabulary word
+    lemma VARCHAR(100),
+    translation VARCHAR(100),
+    -- 'generation' or 'enrichment'
+    source VARCHAR(20) NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (word, source_language, target_language)
+);
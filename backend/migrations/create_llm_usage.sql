@@ -0,0 +1,28 @@
+-- Per-call LLM usage ledger and per-user daily totals (see src/usage.py)
+
+CREATE TABLE IF NOT EXISTS llm_usage (
+    id BIGSERIAL PRIMARY KEY,
+    -- NULL for background work (openers, enrichment)
+    user_id UUID,
+    endpoint VARCHAR(50) NOT NULL,
+    model VARCHAR(100) NOT NULL,
+    -- 'ok', 'error', 'deadline' or 'cancelled'
+    outcome VARCHAR(20) NOT NULL,
+    input_tokens INTEGER NOT NULL DEFAULT 0,
+    output_tokens INTEGER NOT NULL DEFAULT 0,
+    duration_ms INTEGER NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_llm_usage_user_created ON llm_usage (user_id, created_at);
+
+-- Maintained by the ledger's writer in the same transaction as llm_usage
+CREATE TABLE IF NOT EXISTS llm_usage_daily (
+    user_id UUID NOT NULL,
+    day DATE NOT NULL,
+    calls INTEGER NOT NULL DEFAULT 0,
+    input_tokens BIGINT NOT NULL DEFAULT 0,
+    output_tokens BIGINT NOT NULL DEFAULT 0,
+    duration_ms BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, day)
+);
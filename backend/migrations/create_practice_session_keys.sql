@@ -0,0 +1,21 @@
+-- Idempotency keys for buffered practice sessions (see src/events.py)
+--
+-- practice_sessions is partitioned by completed_at, so a unique index on it
+-- must include completed_at. A resend whose completed_at differs (a client
+-- that leaves out occurred_at) would then be stored twice. The keys live in
+-- this small unpartitioned table instead: the writer claims a key before it
+-- inserts the session, in the same transaction.
+
+CREATE TABLE IF NOT EXISTS practice_session_keys (
+    user_id UUID NOT NULL,
+    client_event_id VARCHAR(100) NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, client_event_id)
+);
+
+INSERT INTO practice_session_keys (user_id, client_event_id)
+SELECT DISTINCT user_id, client_event_id FROM practice_sessions WHERE client_event_id IS NOT NULL
+ON CONFLICT DO NOTHING;
+
+-- Superseded by the keys table; one less index on every insert
+DROP INDEX IF EXISTS idx_practice_sessions_user_client_event;
@@ -0,0 +1,25 @@
+-- Idempotency keys for buffered practice events (see src/events.py)
+
+-- Add client_event_id column to practice_sessions (if it doesn't exist)
+ALTER TABLE practice_sessions ADD COLUMN IF NOT EXISTS client_event_id VARCHAR(100);
+
+-- Unique per user so client retries and buffer re-flushes are no-ops
+CREATE UNIQUE INDEX IF NOT EXISTS idx_practice_sessions_user_client_event
+    ON practice_sessions(user_id, client_event_id)
+    WHERE client_event_id IS NOT NULL;
+
+-- Create review_events table (one row per card review)
+CREATE TABLE IF NOT EXISTS review_events (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    user_id UUID NOT NULL,
+    deck_id UUID,
+    flashcard_id INTEGER,
+    result VARCHAR(20) NOT NULL,
+    response_ms INTEGER,
+    client_event_id VARCHAR(100) NOT NULL,
+    occurred_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Create indexes for review_events
+CREATE UNIQUE INDEX IF NOT EXISTS idx_review_events_user_client_event ON review_events(user_id, client_event_id);
+CREATE INDEX IF NOT EXISTS idx_review_events_user_date ON review_events(user_id, occurred_at);
@@ -0,0 +1,20 @@
+-- One word per (user_id, lower(word))
+--
+-- /api/words/batch and /api/import/words skip a word the user already has
+-- (case-insensitive). Checked with NOT EXISTS against a plain index, two
+-- imports running at once could both insert the same word. With a unique
+-- index they insert with ON CONFLICT DO NOTHING instead.
+--
+-- Duplicates saved before this (through /api/words, or by concurrent
+-- imports) are removed first; the oldest copy of each word is kept.
+
+DELETE FROM words w
+USING words older
+WHERE older.user_id = w.user_id
+  AND lower(older.word) = lower(w.word)
+  AND (COALESCE(older.created_at, '-infinity'), older.id) < (COALESCE(w.created_at, '-infinity'), w.id);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_words_user_lower_word_unique ON words(user_id, lower(word));
+
+-- Superseded by the unique index
+DROP INDEX IF EXISTS idx_words_user_lower_word;
@@ -0,0 +1,81 @@
+-- Partition practice_sessions by month on completed_at (see src/partitions.py)
+--
+-- The table is append-only and carried five overlapping indexes. Each
+-- month gets its own partition, practice_sessions_YYYY_MM (UTC months).
+-- Rows outside every partition go to practice_sessions_default, so an
+-- insert never fails for lack of a partition.
+--
+-- Indexes kept, each created on every partition:
+-- - the primary key, (id, completed_at). A partitioned table's unique
+--   indexes must include the partition key;
+-- - (user_id, practice_type, completed_at), for the daily stats;
+-- - the idempotency key for buffered events, now with completed_at.
+--   A retried event has the same completed_at (the client's occurred_at).
+-- Dropped: user_id, completed_at, session_type and (user_id, completed_at),
+-- which are all covered by the stats index or the partition bounds.
+--
+-- An existing table is copied into the new layout and then dropped.
+-- Table grants and row level security policies are not copied.
+
+DO $$
+DECLARE
+    kind "char" := (SELECT c.relkind FROM pg_class c WHERE c.oid = to_regclass('practice_sessions'));
+    first_month DATE := date_trunc('month', CURRENT_TIMESTAMP AT TIME ZONE 'UTC')::date;
+    last_month DATE := (date_trunc('month', CURRENT_TIMESTAMP AT TIME ZONE 'UTC') + interval '3 months')::date;
+    partition_month DATE;
+BEGIN
+    IF kind = 'p' THEN
+        RETURN;  -- Already partitioned
+    END IF;
+
+    CREATE TABLE practice_sessions_partitioned (
+        id UUID NOT NULL DEFAULT gen_random_uuid(),
+        user_id UUID NOT NULL,
+        deck_id UUID REFERENCES decks(id) ON DELETE SET NULL,
+        practice_type VARCHAR(20) NOT NULL DEFAULT 'flashcard',
+        duration_seconds INTEGER NOT NULL,
+        completed_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        client_event_id VARCHAR(100)
+    ) PARTITION BY RANGE (completed_at);
+
+    CREATE TABLE practice_sessions_default PARTITION OF practice_sessions_partitioned DEFAULT;
+
+    IF kind = 'r' THEN
+        first_month := LEAST(
+            first_month,
+            (SELECT date_trunc('month', min(completed_at) AT TIME ZONE 'UTC')::date FROM practice_sessions)
+        );
+    END IF;
+
+    partition_month := first_month;
+    WHILE partition_month <= last_month LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF practice_sessions_partitioned FOR VALUES FROM (%L) TO (%L)',
+            'practice_sessions_' || to_char(partition_month, 'YYYY_MM'),
+            to_char(partition_month, 'YYYY-MM-DD') || ' 00:00:00+00',
+            to_char(partition_month + interval '1 month', 'YYYY-MM-DD') || ' 00:00:00+00'
+        );
+        partition_month := (partition_month + interval '1 month')::date;
+    END LOOP;
+
+    IF kind = 'r' THEN
+        -- A NULL completed_at never counted towards any day's stats; keep it
+        -- out of them (it lands in the default partition)
+        INSERT INTO practice_sessions_partitioned
+            (id, user_id, deck_id, practice_type, duration_seconds, completed_at, client_event_id)
+        SELECT id, user_id, deck_id, practice_type, duration_seconds,
+               COALESCE(completed_at, 'epoch'), client_event_id
+        FROM practice_sessions;
+        DROP TABLE practice_sessions;
+    END IF;
+
+    ALTER TABLE practice_sessions_partitioned RENAME TO practice_sessions;
+    ALTER TABLE practice_sessions ADD PRIMARY KEY (id, completed_at);
+END $$;
+
+CREATE INDEX IF NOT EXISTS idx_practice_sessions_user_type_date
+    ON practice_sessions(user_id, practice_type, completed_at);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_practice_sessions_user_client_event
+    ON practice_sessions(user_id, client_event_id, completed_at)
+    WHERE client_event_id IS NOT NULL;
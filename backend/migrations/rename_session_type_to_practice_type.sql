@@ -0,0 +1,20 @@
+-- The models and queries use practice_sessions.practice_type, but
+-- create_practice_tables.sql and add_session_type_column.sql created the
+-- column as session_type. Rename it (indexes follow the column).
+
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1
+        FROM information_schema.columns
+        WHERE table_name = 'practice_sessions'
+        AND column_name = 'session_type'
+    ) AND NOT EXISTS (
+        SELECT 1
+        FROM information_schema.columns
+        WHERE table_name = 'practice_sessions'
+        AND column_name = 'practice_type'
+    ) THEN
+        ALTER TABLE practice_sessions RENAME COLUMN session_type TO practice_type;
+    END IF;
+END $$;
@@ -0,0 +1,161 @@
+"""
+Pre-generated conversation openers. The last test generates and serves
+openers on Postgres when TEST_DATABASE_URL is set (see query_plan_test.py).
+"""
+import asyncio
+import os
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from conversations_test import USER, VOCABULARY, RecordingSession
+from llm_routing_test import ScriptedLLM
+from ratelimit_test import FakeClock
+from src import conversations
+from src.cache import LocalCache
+from src.invalidation import InvalidationBus
+from src.llm_routing import LLMRouter
+from src.openers import OpenerQueue, cards_fingerprint, opener_settings
+from src.ratelimit import AdmissionController
+from src.schema import ConversationSettings
+from src.tutor import OPENING_MESSAGE
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+
+class RecordingLedger:
+    """Collects the user each LLM call is recorded for"""
+
+    def __init__(self):
+        self.users = []
+
+    async def record(self, user_id, endpoint, *args):
+        self.users.append((user_id, endpoint))
+
+
+class OpenerSession(RecordingSession):
+    """SELECTs find a stored opener; UPDATEs are recorded"""
+
+    async def execute(self, statement, params=None):
+        self.statements.append(statement)
+        return SimpleNamespace(rowcount=self.rowcount, first=lambda: SimpleNamespace(message="Bonjour !", model="stored"))
+
+
+def test_openers_cover_every_bucket_and_focus_mode_per_topic():
+    combinations = {(s.immersionLevel, s.focusMode, s.topic) for s in opener_settings(["general", "food"])}
+    assert len(combinations) == 12
+
+    fingerprint = cards_fingerprint(VOCABULARY)
+    assert cards_fingerprint(list(reversed(VOCABULARY))) == fingerprint
+    assert cards_fingerprint([*VOCABULARY, {"word": "oiseau", "definition": "bird"}]) != fingerprint
+
+
+def test_queue_debounces_edits_and_yields_to_interactive_requests():
+    clock = FakeClock()
+    generated = []
+    busy = False
+
+    async def generate(deck_id):
+        generated.append(deck_id)
+        return 6
+
+    async def scenario():
+        queue = OpenerQueue(generate, delay=30, max_pending=1, busy=lambda: busy, clock=clock)
+        deck, other = uuid.uuid4(), uuid.uuid4()
+        queue.enqueue(deck)
+        clock.now = 20
+        queue.enqueue(deck)  # edited again: pushed back to t=50
+        queue.enqueue(other)  # full
+        clock.now = 40
+        assert await queue.run_due() == 0
+        clock.now = 50
+        return queue, deck, await queue.run_due()
+
+    queue, deck, written = asyncio.run(scenario())
+    assert (generated, written) == ([deck], 6)
+    assert queue.stats() == {"enabled": True, "pending": 0, "generated": 6, "failures": 0, "dropped": 1}
+
+    busy = True
+    queue.enqueue(deck)
+    clock.now = 100
+    assert asyncio.run(queue.run_due()) == 0
+    assert queue.pending_count == 1
+
+
+def test_first_turn_is_served_from_the_stored_opener():
+    llm = ScriptedLLM()
+    session = OpenerSession()
+    conversation = conversations.Conversation(
+        id=uuid.uuid4(), user_id=USER, deck_id=uuid.uuid4(),
+        settings=ConversationSettings().model_dump(), vocabulary=VOCABULARY,
+        messages=[], version=0, history_tokens=0,
+    )
+    cache = LocalCache()
+    streamed = []
+
+    async def on_text(text):
+        streamed.append(text)
+
+    async def scenario():
+        return await conversations.take_turn(
+            session, cache, InvalidationBus(cache, None), LLMRouter(llm), AdmissionController(),
+            conversation, OPENING_MESSAGE, on_text=on_text
+        )
+
+    result = asyncio.run(scenario())
+    assert (result.completion.text, result.completion.model) == ("Bonjour !", "stored")
+    assert streamed == ["Bonjour !"]
+    assert llm.calls == []
+    assert result.conversation.messages == [
+        {"role": "user", "content": OPENING_MESSAGE},
+        {"role": "assistant", "content": "Bonjour !"},
+    ]
+
+
+@pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set")
+def test_openers_are_generated_and_replaced_when_cards_change():
+    import asyncpg
+
+    from query_plan_test import SCHEMA_SQL
+    from src import database, migrate
+    from src.openers import find_opener, generate_openers
+
+    async def scenario():
+        conn = await asyncpg.connect(database.asyncpg_dsn(TEST_DATABASE_URL))
+        try:
+            await conn.execute(SCHEMA_SQL)
+            await migrate.migrate(TEST_DATABASE_URL)
+            deck_id = await conn.fetchval("INSERT INTO decks (user_id, title) VALUES ($1, 'Animaux') RETURNING id", USER)
+            await conn.execute(
+                "INSERT INTO flashcards (deck_id, user_id, front, back) VALUES ($1, $2, 'chien', 'dog'), ($1, $2, 'chat', 'cat')",
+                deck_id, USER,
+            )
+
+            database.init_engine(TEST_DATABASE_URL)
+            llm, ledger = ScriptedLLM(), RecordingLedger()
+            router, admission = LLMRouter(llm, hedge_ratio=0, ledger=ledger), AdmissionController()
+            first = await generate_openers(deck_id, router, admission, ["general"])
+            again = await generate_openers(deck_id, router, admission, ["general"])
+
+            settings = ConversationSettings(immersionLevel=90, focusMode="natural")
+            async with database.AsyncSessionLocal() as db:
+                opener = await find_opener(db, deck_id, settings, VOCABULARY)
+
+            # A new card makes every opener stale
+            await conn.execute("INSERT INTO flashcards (deck_id, user_id, front, back) VALUES ($1, $2, 'oiseau', 'bird')", deck_id, USER)
+            async with database.AsyncSessionLocal() as db:
+                stale = await find_opener(db, deck_id, settings, VOCABULARY)
+            regenerated = await generate_openers(deck_id, router, admission, ["general"])
+            rows = await conn.fetchval("SELECT count(*) FROM conversation_openers WHERE deck_id = $1", deck_id)
+            return first, again, opener, stale, regenerated, rows, ledger.users
+        finally:
+            await database.dispose_engine()
+            await conn.close()
+
+    first, again, opener, stale, regenerated, rows, users = asyncio.run(scenario())
+    assert (first, again, regenerated, rows) == (6, 0, 6, 6)
+    # Every call is attributed to the deck's owner
+    assert users == [(USER, "conversation_opener")] * 12
+    assert opener is not None and opener.text.startswith("reply")
+    assert stale is None
@@ -0,0 +1,140 @@
+import asyncio
+import gzip
+import json
+import uuid
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+from query_plan_test import SCHEMA_SQL, TEST_DATABASE_URL, needs_database
+from src import database, migrate
+from src.partitions import (
+    DEFAULT_PARTITION, add_months, archive_month, bounds, create_partition, existing_partitions, maintain, month_of,
+    partition_month, partition_name, plan,
+)
+
+
+def test_months_and_partition_names():
+    assert add_months(date(2026, 11, 1), 2) == date(2027, 1, 1)
+    assert add_months(date(2026, 1, 1), -13) == date(2024, 12, 1)
+    # Months are UTC months
+    assert month_of(datetime(2026, 11, 1, 0, 30, tzinfo=timezone(timedelta(hours=2)))) == date(2026, 10, 1)
+
+    assert partition_name(date(2026, 3, 1)) == "practice_sessions_2026_03"
+    assert partition_month("practice_sessions_2026_03") == date(2026, 3, 1)
+    assert partition_month(DEFAULT_PARTITION) is None
+    assert bounds(date(2026, 12, 1)) == (
+        datetime(2026, 12, 1, tzinfo=timezone.utc), datetime(2027, 1, 1, tzinfo=timezone.utc)
+    )
+
+
+def test_plan_creates_upcoming_months_and_archives_old_ones():
+    existing = [DEFAULT_PARTITION] + [partition_name(date(2025, m, 1)) for m in range(1, 13)] + [
+        partition_name(date(2026, 1, 1)), partition_name(date(2026, 3, 1))
+    ]
+    now = datetime(2026, 1, 15, tzinfo=timezone.utc)
+    todo = plan(existing, now, months_ahead=3, retain_months=10)
+    assert todo.create == [date(2026, 2, 1), date(2026, 4, 1)]
+    assert todo.archive == [date(2025, 1, 1), date(2025, 2, 1)]
+
+    assert plan(existing, now, months_ahead=0, retain_months=0) == ([], [])
+
+    # Late rows for months already archived sit in the default partition
+    todo = plan(existing, now, months_ahead=0, retain_months=10, in_default=[date(2024, 6, 1), date(2026, 1, 1)])
+    assert todo.archive == [date(2024, 6, 1), date(2025, 1, 1), date(2025, 2, 1)]
+
+
+class FailingCommitConnection:
+    """Copies one row, then fails to commit"""
+
+    def transaction(self):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        raise ConnectionError("connection lost during commit")
+
+    async def execute(self, *args):
+        return "DELETE 1"
+
+    async def copy_from_query(self, query, *args, output, **kwargs):
+        output.write(b"id,user_id\n1,2\n")
+        return "COPY 1"
+
+
+def test_failed_archive_leaves_no_file_behind(tmp_path):
+    with pytest.raises(ConnectionError):
+        asyncio.run(archive_month(FailingCommitConnection(), date(2025, 1, 1), tmp_path))
+    assert list(tmp_path.iterdir()) == []
+
+
+async def _maintain_scenario(archive_dir):
+    import asyncpg
+
+    now = datetime.now(timezone.utc)
+    current, old, upcoming = month_of(now), add_months(month_of(now), -14), add_months(month_of(now), 5)
+    user_id = uuid.uuid4()
+    conn = await asyncpg.connect(database.asyncpg_dsn(TEST_DATABASE_URL))
+    try:
+        await conn.execute(SCHEMA_SQL)
+        await migrate.migrate(TEST_DATABASE_URL)
+        assert partition_name(add_months(current, 3)) in await existing_partitions(conn)
+
+        # Months without a partition land in the default one
+        for moment in (bounds(old)[0], bounds(upcoming)[0], now):
+            await conn.execute(
+                "INSERT INTO practice_sessions (user_id, duration_seconds, completed_at) VALUES ($1, 60, $2)",
+                user_id, moment,
+            )
+        assert await conn.fetchval(f"SELECT count(*) FROM {DEFAULT_PARTITION}") == 2
+        assert await create_partition(conn, old) == 1
+
+        todo = await maintain(TEST_DATABASE_URL, months_ahead=5, retain_months=12, archive_dir=archive_dir)
+        assert todo.create == [add_months(current, 4), upcoming]
+        assert todo.archive == [old]
+        assert await conn.fetchval(f"SELECT count(*) FROM {DEFAULT_PARTITION}") == 0
+        assert await conn.fetchval(f"SELECT count(*) FROM {partition_name(upcoming)}") == 1
+        assert partition_name(old) not in await existing_partitions(conn)
+
+        # A late event for the archived month is swept out of the default partition
+        await conn.execute(
+            "INSERT INTO practice_sessions (user_id, duration_seconds, completed_at) VALUES ($1, 90, $2)",
+            user_id, bounds(old)[0] + timedelta(days=3),
+        )
+        todo = await maintain(TEST_DATABASE_URL, months_ahead=5, retain_months=12, archive_dir=archive_dir)
+        assert todo == ([], [old])
+        assert await conn.fetchval(f"SELECT count(*) FROM {DEFAULT_PARTITION}") == 0
+
+        # Today's stats read one partition
+        start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        raw = await conn.fetchval(
+            """
+            EXPLAIN (FORMAT JSON) SELECT sum(duration_seconds) FROM practice_sessions
+            WHERE user_id = $1 AND completed_at >= $2 AND completed_at < $3 AND practice_type = 'flashcard'
+            """,
+            user_id, start, start + timedelta(days=1),
+        )
+        return old, relations(json.loads(raw)[0]["Plan"])
+    finally:
+        await conn.close()
+
+
+def relations(plan: dict) -> set[str]:
+    found = {plan["Relation Name"]} if "Relation Name" in plan else set()
+    for child in plan.get("Plans", ()):
+        found |= relations(child)
+    return found
+
+
+@needs_database
+def test_maintenance_creates_moves_and_archives_partitions(tmp_path):
+    old, scanned = asyncio.run(_maintain_scenario(tmp_path))
+    assert scanned == {partition_name(month_of(datetime.now(timezone.utc)))}
+
+    for name, seconds in ((f"{partition_name(old)}.csv.gz", "60"), (f"{partition_name(old)}.2.csv.gz", "90")):
+        with gzip.open(tmp_path / name, "rt") as f:
+            lines = f.read().splitlines()
+        assert lines[0].startswith("id,user_id,") and len(lines) == 2
+        assert f",{seconds}," in lines[1]
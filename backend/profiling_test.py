@@ -0,0 +1,91 @@
+import asyncio
+import time
+
+from fastapi.testclient import TestClient
+
+from src.app import create_app
+from src.config import Settings
+from src.profiling import ProfilingMiddleware
+
+AUTH = {"Authorization": "Bearer t"}
+
+
+def spin(seconds: float):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def make_app(**overrides):
+    app = create_app(Settings(profile_token="t", profile_interval_ms=2, **overrides))
+
+    @app.get("/busy")
+    async def busy():
+        spin(0.1)
+        return {}
+
+    @app.get("/idle")
+    async def idle():
+        await asyncio.sleep(0.1)
+        return {}
+
+    return app
+
+
+def test_busy_request_gets_cpu_samples():
+    with TestClient(make_app()) as client:
+        response = client.get("/busy", headers={"X-Profile": "t"})
+        profile_id = response.headers["x-profile-id"]
+        cpu = client.get(f"/api/internal/profiles/{profile_id}?mode=cpu", headers=AUTH)
+
+    assert cpu.status_code == 200
+    assert "attachment" in cpu.headers["content-disposition"]
+    assert "spin (profiling_test.py" in cpu.text
+    assert "<waiting>" not in cpu.text
+
+
+def test_idle_request_shows_where_it_waits():
+    with TestClient(make_app()) as client:
+        profile_id = client.get("/idle", headers={"X-Profile": "t"}).headers["x-profile-id"]
+        [summary] = client.get("/api/internal/profiles", headers=AUTH).json()
+        wall = client.get(f"/api/internal/profiles/{profile_id}", headers=AUTH).text
+
+    assert summary["route"] == "/idle"
+    assert summary["wall_samples"] > 0
+    assert summary["cpu_samples"] < summary["wall_samples"]
+    assert "idle (profiling_test.py" in wall
+    assert wall.splitlines()[0].rsplit(" ", 1)[0].endswith(";<waiting>")
+
+
+def test_requests_without_the_token_are_not_profiled():
+    with TestClient(make_app()) as client:
+        plain = client.get("/busy")
+        wrong = client.get("/busy", headers={"X-Profile": "nope"})
+        profiles = client.get("/api/internal/profiles", headers=AUTH).json()
+        unauthorized = client.get("/api/internal/profiles")
+        missing = client.get("/api/internal/profiles/999", headers=AUTH)
+
+    assert "x-profile-id" not in plain.headers and "x-profile-id" not in wrong.headers
+    assert profiles == []
+    assert unauthorized.status_code == 401
+    assert missing.status_code == 404
+
+
+def test_ring_buffer_keeps_the_most_recent():
+    with TestClient(make_app(profile_keep=2)) as client:
+        ids = [client.get("/idle", headers={"X-Profile": "t"}).headers["x-profile-id"] for _ in range(3)]
+        listed = [p["id"] for p in client.get("/api/internal/profiles", headers=AUTH).json()]
+
+    assert listed == [int(ids[2]), int(ids[1])]
+
+
+def test_middleware_is_not_installed_when_disabled():
+    app = create_app(Settings())
+    assert all(m.cls is not ProfilingMiddleware for m in app.user_middleware)
+    assert any(m.cls is ProfilingMiddleware for m in make_app().user_middleware)
+
+
+def test_profiles_always_need_the_token():
+    with TestClient(create_app(Settings(profile_sample_rate=1.0))) as client:
+        client.get("/api/health")
+        assert client.get("/api/internal/profiles").status_code == 403
@@ -0,0 +1,189 @@
+"""
+Query-plan regression tests.
+
+The database tests need a scratch Postgres database in TEST_DATABASE_URL
+(postgresql+asyncpg://...). Its deck, flashcard, word and practice tables are
+dropped and recreated. They seed realistic volumes, run the migrations, call
+the endpoints while capturing their SQL through engine events, and assert
+with EXPLAIN that none of those queries scans a whole table.
+
+    TEST_DATABASE_URL=postgresql+asyncpg://localhost/giraffe_test python -m pytest -q query_plan_test.py
+"""
+import asyncio
+import json
+import os
+import re
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from src import database, migrate
+from src.app import create_app
+from src.config import Settings
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+needs_database = pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set")
+
+USERS = 200
+DECKS_PER_USER = 20
+CARDS_PER_DECK = 30
+WORDS_PER_USER = 500
+SESSIONS_PER_USER = 100
+
+# Tables that grow with usage; a Seq Scan on any of them is a regression
+LARGE_TABLES = {"decks", "flashcards", "words", "practice_sessions", "review_events"}
+
+# practice_sessions_2026_10, practice_sessions_default
+PARTITION_SUFFIX = re.compile(r"_(\d{4}_\d{2}|default)$")
+
+SCHEMA_SQL = """
+DROP TABLE IF EXISTS schema_migrations, practice_session_keys, llm_usage, llm_usage_daily, lexicon, conversation_openers, conversation_sessions, review_events, practice_sessions, user_settings, flashcards, decks, words CASCADE;
+CREATE TABLE decks (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    title VARCHAR,
+    user_id UUID NOT NULL,
+    source_text TEXT,
+    difficulty VARCHAR DEFAULT 'medium',
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE flashcards (
+    id SERIAL PRIMARY KEY,
+    deck_id UUID NOT NULL REFERENCES decks(id) ON DELETE CASCADE,
+    user_id UUID NOT NULL,
+    front TEXT NOT NULL,
+    back TEXT NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE words (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    user_id UUID NOT NULL,
+    word VARCHAR NOT NULL,
+    definition TEXT NOT NULL,
+    example TEXT,
+    pronunciation VARCHAR,
+    status VARCHAR DEFAULT 'pending',
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+SEED_SQL = f"""
+CREATE TEMP TABLE seed_users AS
+    SELECT gen_random_uuid() AS user_id FROM generate_series(1, {USERS});
+INSERT INTO decks (user_id, title, created_at)
+    SELECT user_id, 'Deck ' || n, now() - n * interval '1 hour'
+    FROM seed_users, generate_series(1, {DECKS_PER_USER}) AS n;
+INSERT INTO flashcards (deck_id, user_id, front, back)
+    SELECT d.id, d.user_id, 'mot' || n, 'word' || n
+    FROM decks d, generate_series(1, {CARDS_PER_DECK}) AS n;
+INSERT INTO words (user_id, word, definition, created_at)
+    SELECT user_id, 'mot' || n, 'definition ' || n, now() - n * interval '1 minute'
+    FROM seed_users, generate_series(1, {WORDS_PER_USER}) AS n;
+INSERT INTO practice_sessions (user_id, practice_type, duration_seconds, completed_at)
+    SELECT user_id, CASE WHEN n % 2 = 0 THEN 'flashcard' ELSE 'conversation' END, 60 + n,
+           now() - n * interval '3 hours'
+    FROM seed_users, generate_series(1, {SESSIONS_PER_USER}) AS n;
+ANALYZE;
+"""
+
+
+def test_manifest_files_exist_and_are_unique():
+    assert len(set(migrate.MIGRATIONS)) == len(migrate.MIGRATIONS)
+    for name in migrate.MIGRATIONS:
+        assert (migrate.MIGRATIONS_DIR / name).is_file(), name
+
+
+def test_plan_skips_applied_and_rejects_edited_migrations():
+    migrations = [("a.sql", "SELECT 1;"), ("b.sql", "SELECT 2;")]
+    assert migrate.plan(migrations, {"a.sql": migrate.checksum("SELECT 1;")}) == [("b.sql", "SELECT 2;")]
+    with pytest.raises(migrate.MigrationError):
+        migrate.plan(migrations, {"a.sql": migrate.checksum("SELECT 0;")})
+    with pytest.raises(migrate.MigrationError):
+        migrate.plan(migrations, {"gone.sql": "x"})
+
+
+def seq_scans(plan: dict) -> list[str]:
+    """Relations read by a Seq Scan anywhere in an EXPLAIN (FORMAT JSON) plan"""
+    found = []
+    if plan.get("Node Type") == "Seq Scan":
+        found.append(plan.get("Relation Name"))
+    for child in plan.get("Plans", ()):
+        found.extend(seq_scans(child))
+    return found
+
+
+def table_of(relation: str) -> str:
+    """The table a relation belongs to; partitions count as their table"""
+    return PARTITION_SUFFIX.sub("", relation)
+
+
+async def _prepare_database() -> uuid.UUID:
+    import asyncpg
+
+    conn = await asyncpg.connect(database.asyncpg_dsn(TEST_DATABASE_URL))
+    try:
+        await conn.execute(SCHEMA_SQL)
+        await migrate.migrate(TEST_DATABASE_URL)
+        await conn.execute(SEED_SQL)
+        return await conn.fetchval("SELECT user_id FROM decks LIMIT 1")
+    finally:
+        await conn.close()
+
+
+async def _explain(statements: list[tuple[str, tuple]]) -> dict[str, list[str]]:
+    import asyncpg
+
+    conn = await asyncpg.connect(database.asyncpg_dsn(TEST_DATABASE_URL))
+    problems = {}
+    try:
+        for statement, params in statements:
+            if not statement.lstrip().upper().startswith("SELECT"):
+                continue
+            raw = await conn.fetchval(f"EXPLAIN (FORMAT JSON) {statement}", *params)
+            plan = json.loads(raw)[0]["Plan"]
+            scans = [name for name in seq_scans(plan) if table_of(name) in LARGE_TABLES]
+            if scans:
+                problems[statement] = scans
+    finally:
+        await conn.close()
+    return problems
+
+
+@pytest.fixture(scope="module")
+def seeded_user():
+    return asyncio.run(_prepare_database())
+
+
+@needs_database
+def test_endpoint_queries_use_indexes(seeded_user):
+    user_id = str(seeded_user)
+    captured: list[tuple[str, tuple]] = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        captured.append((statement, tuple(parameters or ())))
+
+    settings = Settings(database_url=TEST_DATABASE_URL, pool_warmup=False)
+    with TestClient(create_app(settings)) as client:
+        event.listen(database.get_engine().sync_engine, "before_cursor_execute", capture)
+        decks = client.get("/api/my-decks", params={"user_id": user_id}).json()
+        client.get("/api/my-decks", params={"user_id": user_id, "sort_by": "title", "search": "1"})
+        client.get(f"/api/decks/{decks[0]['id']}")
+        client.get("/api/my-words", params={"user_id": user_id, "page": 3})
+        client.get("/api/my-words", params={"user_id": user_id, "search": "mot1"})
+        client.get("/api/stats/daily", params={"user_id": user_id})
+        client.get("/api/user-settings", params={"user_id": user_id})
+        client.get("/api/export/words", params={"user_id": user_id})
+        client.get("/api/export/decks", params={"user_id": user_id})
+        client.post("/api/words/batch", json={
+            "user_id": user_id,
+            "words": [{"word": "mot1", "definition": "word 1"}],
+        })
+        event.remove(database.get_engine().sync_engine, "before_cursor_execute", capture)
+
+    assert captured
+    problems = asyncio.run(_explain(captured))
+    assert not problems, "Sequential scans on large tables:\n" + "\n\n".join(
+        f"{tables}: {statement}" for statement, tables in problems.items()
+    )
@@ -0,0 +1,97 @@
+import asyncio
+import json
+import uuid
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from src.models import Deck, Flashcard
+from src.query_stats import QueryMetrics, QueryStatsMiddleware, assert_max_queries, instrument_engine, track_queries
+from src.routers import decks
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+    # Hand-written DDL: sqlite can't render the Postgres UUID column type
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE decks (id CHAR(32) PRIMARY KEY, title VARCHAR, user_id CHAR(32) NOT NULL,"
+            " source_text TEXT, difficulty VARCHAR, created_at DATETIME)"
+        ))
+        conn.execute(text(
+            "CREATE TABLE flashcards (id INTEGER PRIMARY KEY, deck_id CHAR(32) NOT NULL REFERENCES decks(id),"
+            " user_id CHAR(32) NOT NULL, front TEXT NOT NULL, back TEXT NOT NULL, created_at DATETIME)"
+        ))
+    return engine
+
+
+class SyncSessionAdapter:
+    """Lets an endpoint that awaits db.execute() run on a sync sqlite session"""
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    async def execute(self, statement):
+        return self.session.execute(statement)
+
+
+def test_queries_are_counted_and_timed(engine):
+    with engine.connect() as conn:
+        with track_queries(record_statements=True) as stats:
+            conn.execute(text("SELECT 1"))
+            conn.execute(text("SELECT 2"))
+        conn.execute(text("SELECT 3"))
+
+    assert stats.count == 2
+    assert stats.total_ms >= stats.slowest_ms > 0
+    assert stats.statements == ["SELECT 1", "SELECT 2"]
+
+
+def test_assert_max_queries_lists_statements_when_exceeded(engine):
+    with engine.connect() as conn:
+        with pytest.raises(AssertionError, match="at most 1 queries, ran 2"):
+            with assert_max_queries(1):
+                conn.execute(text("SELECT 1"))
+                conn.execute(text("SELECT 2"))
+
+
+def test_middleware_reports_headers_and_route_metrics(engine):
+    app = FastAPI()
+    metrics = QueryMetrics()
+    app.add_middleware(QueryStatsMiddleware, metrics=metrics)
+
+    @app.get("/things/{thing_id}")
+    async def read_thing(thing_id: int):
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            conn.execute(text("SELECT 2"))
+        return {"id": thing_id}
+
+    response = TestClient(app).get("/things/1")
+
+    assert response.headers["x-db-query-count"] == "2"
+    assert float(response.headers["x-db-time-ms"]) >= 0
+    assert metrics.snapshot()["GET /things/{thing_id}"]["max_queries"] == 2
+
+
+def test_deck_list_is_one_query_regardless_of_deck_count(engine):
+    user_uuid = uuid.uuid4()
+    with Session(engine) as session:
+        for n in range(5):
+            deck = Deck(id=uuid.uuid4(), title=f"Deck {n}", user_id=user_uuid)
+            session.add(deck)
+            session.add_all(Flashcard(deck_id=deck.id, user_id=user_uuid, front=f"f{i}", back=f"b{i}") for i in range(n))
+        session.commit()
+
+        with assert_max_queries(1):
+            response = asyncio.run(decks.get_my_decks(
+                user_id=str(user_uuid), search="", sort_by="count", db=SyncSessionAdapter(session)
+            ))
+
+    counts = [deck["card_count"] for deck in json.loads(response.body)]
+    assert counts == [4, 3, 2, 1, 0]
@@ -0,0 +1,111 @@
+import asyncio
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.app import create_app
+from src.config import Settings
+from src.ratelimit import AdmissionController, RateLimitExceeded, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_bucket_refills_over_time():
+    bucket = TokenBucket(capacity=100, rate=10, now=0)
+    assert bucket.take(100, now=0) == 0
+    assert bucket.take(50, now=0) == pytest.approx(5.0)
+    assert bucket.take(50, now=5) == 0
+
+
+def test_oversized_request_waits_for_a_full_bucket():
+    bucket = TokenBucket(capacity=100, rate=10, now=0)
+    assert bucket.take(500, now=0) == 0
+    assert bucket.take(500, now=5) == pytest.approx(5.0)
+
+
+def test_user_budget_is_weighted_by_tokens():
+    clock = FakeClock()
+    admission = AdmissionController(user_capacity=1000, user_rate=10, clock=clock)
+    admission.check("alice", 900)
+    with pytest.raises(RateLimitExceeded) as exc:
+        admission.check("alice", 300)
+    assert exc.value.status_code == 429
+    assert exc.value.headers["Retry-After"] == "20"
+    # Small requests still fit, and other users are unaffected
+    admission.check("alice", 100)
+    admission.check("bob", 900)
+    clock.now = 20
+    admission.check("alice", 200)
+
+
+def test_global_budget_refunds_user_on_rejection():
+    clock = FakeClock()
+    admission = AdmissionController(user_capacity=1000, user_rate=1, global_capacity=1000, global_rate=1, clock=clock)
+    admission.check("alice", 800)
+    with pytest.raises(RateLimitExceeded):
+        admission.check("bob", 800)
+    assert admission.rejected_global == 1
+    # Bob's bucket was refunded, so a smaller call is admitted
+    admission.check("bob", 200)
+
+
+def test_queue_depth_cap_rejects_fast():
+    async def scenario():
+        admission = AdmissionController(max_concurrent=1, max_queue=1)
+        release = asyncio.Event()
+
+        async def call():
+            async with admission.slot():
+                await release.wait()
+
+        running = asyncio.create_task(call())
+        await asyncio.sleep(0)
+        queued = asyncio.create_task(call())
+        await asyncio.sleep(0)
+        assert admission.in_flight == 1 and admission.queue_depth == 1
+
+        with pytest.raises(RateLimitExceeded):
+            async with admission.slot():
+                pass
+
+        release.set()
+        await asyncio.gather(running, queued)
+        return admission
+
+    admission = asyncio.run(scenario())
+    assert admission.rejected_queue == 1
+    assert admission.in_flight == 0
+
+
+def test_endpoint_returns_429_with_retry_after():
+    app = create_app(Settings(user_tokens_per_minute=2000))
+    with TestClient(app) as client:
+        body = {"text": "le chien " * 500, "user_id": "00000000-0000-0000-0000-000000000001"}
+        first = client.post("/api/generate-flashcards", json=body)
+        second = client.post("/api/generate-flashcards", json=body)
+    # First call passes admission (then fails for lack of an API key)
+    assert first.status_code == 500
+    assert second.status_code == 429
+    assert int(second.headers["Retry-After"]) >= 1
+
+
+def test_every_spelling_of_a_user_id_shares_one_bucket():
+    user_id = uuid.UUID("00000000-0000-0000-0000-000000000001")
+    spellings = [user_id.hex, str(user_id).upper(), f"{{{user_id}}}", user_id.urn]
+    app = create_app(Settings(user_tokens_per_minute=2000))
+    with TestClient(app) as client:
+        text = {"text": "le chien " * 500}
+        codes = [client.post("/api/generate-flashcards", json={**text, "user_id": s}).status_code for s in spellings]
+        assert codes == [500, 429, 429, 429]
+
+        # A malformed id is rejected before it is charged
+        conversation = {"deck_id": str(uuid.uuid4()), "messages": [{"role": "user", "content": "Bonjour " * 3000}]}
+        assert client.post("/api/practice/conversation", json={**conversation, "user_id": "nope"}).status_code == 400
+        assert list(app.state.admission._users) == [str(user_id)]
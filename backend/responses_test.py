@@ -0,0 +1,46 @@
+import json
+import uuid
+from datetime import datetime, timezone
+
+from fastapi.testclient import TestClient
+
+from src.app import create_app
+from src.config import Settings
+from src.responses import GZIP_MINIMUM_SIZE, FastJSONResponse
+
+
+def test_uuid_and_datetime_render_as_str_and_isoformat():
+    word_id = uuid.uuid4()
+    created_at = datetime(2026, 10, 19, 10, 44, 31, 120500, tzinfo=timezone.utc)
+    updated_at = datetime(2026, 10, 19, 10, 44, 31)
+    body = FastJSONResponse({"id": word_id, "created_at": created_at, "updated_at": updated_at, "tags": None}).body
+
+    # The shape the handlers produced before, with str() and isoformat()
+    assert json.loads(body) == {
+        "id": str(word_id),
+        "created_at": created_at.isoformat(),
+        "updated_at": updated_at.isoformat(),
+        "tags": None,
+    }
+
+
+def test_large_responses_are_gzipped():
+    app = create_app(Settings())
+    rows = [{"id": uuid.UUID(int=i), "word": f"mot{i}"} for i in range(100)]
+
+    @app.get("/test/rows")
+    async def all_rows(count: int):
+        return rows[:count]
+
+    with TestClient(app) as client:
+        small = client.get("/test/rows", params={"count": 1}, headers={"Accept-Encoding": "gzip"})
+        assert len(small.content) < GZIP_MINIMUM_SIZE
+        assert "content-encoding" not in small.headers
+
+        large = client.get("/test/rows", params={"count": 100}, headers={"Accept-Encoding": "gzip"})
+        assert large.headers["content-encoding"] == "gzip"
+        assert large.json()[99] == {"id": str(uuid.UUID(int=99)), "word": "mot99"}
+
+        raw = client.get("/test/rows", params={"count": 100}, headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in raw.headers
+        assert len(raw.content) > GZIP_MINIMUM_SIZE
@@ -0,0 +1,86 @@
+import asyncio
+import uuid
+
+import pytest
+
+from src.routers.flashcards import generation_key
+from src.schema import TextInput
+from src.singleflight import SingleFlight
+
+
+def test_concurrent_callers_share_one_computation():
+    async def scenario():
+        flight = SingleFlight()
+        calls = 0
+
+        async def load():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return {"deck": 1}
+
+        results = await asyncio.gather(*(flight.do(("deck", 1), load) for _ in range(5)))
+        return flight, calls, results
+
+    flight, calls, results = asyncio.run(scenario())
+    assert calls == 1
+    assert all(r == {"deck": 1} for r in results)
+    assert flight.stats() == {"deck": {"executions": 1, "shared": 4}}
+
+
+def test_sequential_calls_run_again():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def load():
+            return 1
+
+        await flight.do(("deck", 1), load)
+        await flight.do(("deck", 1), load)
+        return flight.stats()
+
+    assert asyncio.run(scenario()) == {"deck": {"executions": 2, "shared": 0}}
+
+
+def test_errors_fan_out_to_every_caller():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        return await asyncio.gather(*(flight.do(("stats", 1), fail) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert len(results) == 3 and all(isinstance(r, ValueError) for r in results)
+
+
+def test_cancelled_caller_does_not_cancel_shared_work():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def load():
+            await asyncio.sleep(0.02)
+            return "done"
+
+        first = asyncio.create_task(flight.do(("generate", 1), load))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(flight.do(("generate", 1), load))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(scenario()) == "done"
+
+
+def test_generation_key_ignores_how_the_user_id_is_spelled():
+    user_id = uuid.UUID("00000000-0000-0000-0000-000000000001")
+    keys = {
+        generation_key(TextInput(text="le  chien\n", user_id=spelling), uuid.UUID(spelling))
+        for spelling in (str(user_id), user_id.hex, str(user_id).upper(), user_id.urn)
+    }
+    assert len(keys) == 1
+    assert generation_key(TextInput(text="le chat", user_id=str(user_id)), user_id) not in keys
@@ -0,0 +1,260 @@
+"""
+Application factory.
+
+Nothing here touches the network at import time: the database engine, the
+LLM client and the event buffer are created by the lifespan, and the
+connection pool is warmed before /api/ready reports ready.
+"""
+import asyncio
+import functools
+import logging
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import Depends, FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+
+from src import database
+from src.auth import JWKSCache, TokenVerifier, authenticate, fetch_jwks, jwks_url
+from src.cache import LocalCache
+from src.config import Settings
+from src.enrichment import EnrichmentWorker, enrich_batch
+from src.events import WriteBehindBuffer, write_events
+from src.invalidation import InvalidationBus
+from src.llm import LLMClient
+from src.llm_routing import LLMRouter, RoutingPolicy
+from src.llm_transport import open_transport
+from src.logs import RequestIdMiddleware, configure_logging
+from src.metrics import MetricsMiddleware
+from src.openers import OpenerQueue, generate_openers
+from src.profiling import Profiler, ProfilingMiddleware
+from src.query_stats import QueryMetrics, QueryStatsMiddleware, instrument_engine
+from src.ratelimit import AdmissionController
+from src.singleflight import SingleFlight
+from src.usage import UsageLedger, write_usage
+from src.responses import FastJSONResponse, GZIP_MINIMUM_SIZE
+from src.routers import system, flashcards, decks, words, bulk, practice, sessions, conversations, usage
+
+logger = logging.getLogger(__name__)
+
+WARMUP_RETRY_SECONDS = 5.0
+
+
+async def _warm_up(app: FastAPI, started: float):
+    """Warm the pool, retrying until the database is reachable, then mark ready"""
+    settings = app.state.settings
+    while True:
+        try:
+            await database.warm_pool(settings.db_pool_size)
+            break
+        except Exception as e:
+            logger.warning("Connection pool warm-up failed, retrying in %ss: %s", WARMUP_RETRY_SECONDS, e)
+            await asyncio.sleep(WARMUP_RETRY_SECONDS)
+    app.state.startup_seconds = round(time.perf_counter() - started, 3)
+    app.state.ready = True
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    settings: Settings = app.state.settings
+    started = time.perf_counter()
+    warmup_task = None
+
+    if settings.database_url:
+        database.init_engine(
+            settings.database_url,
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+        )
+        instrument_engine(database.get_engine(), slow_query_ms=settings.slow_query_ms)
+
+    # Access tokens are verified locally (see src/auth.py)
+    jwks = None
+    if settings.supabase_url:
+        jwks = JWKSCache(
+            functools.partial(fetch_jwks, jwks_url(settings.supabase_url)),
+            refresh_interval=settings.jwks_refresh_interval,
+        )
+        await jwks.start()
+    app.state.auth = TokenVerifier(
+        jwks,
+        settings.supabase_jwt_secret,
+        issuer=f"{settings.supabase_url.rstrip('/')}/auth/v1" if settings.supabase_url else None,
+    )
+    if settings.auth_required and not app.state.auth.configured:
+        logger.error("AUTH_REQUIRED is set without SUPABASE_URL or SUPABASE_JWT_SECRET: every request will get 401")
+
+    # Read cache, kept coherent across workers via LISTEN/NOTIFY
+    app.state.cache = LocalCache(
+        max_entries=settings.cache_max_entries,
+        ttl=settings.cache_ttl_seconds,
+    )
+    app.state.invalidation = InvalidationBus(
+        app.state.cache,
+        settings.invalidation_database_url or settings.database_url,
+    )
+    await app.state.invalidation.start()
+
+    # Per-call LLM usage and daily quotas (see src/usage.py)
+    app.state.usage = UsageLedger(
+        WriteBehindBuffer(
+            functools.partial(write_usage, invalidation=app.state.invalidation),
+            max_batch_size=settings.event_batch_size,
+            flush_interval=settings.event_flush_interval,
+            max_pending=settings.event_max_pending,
+        ),
+        app.state.cache,
+        daily_token_quota=settings.usage_daily_token_quota,
+        enabled=settings.database_url is not None,
+    )
+    await app.state.usage.start()
+
+    # LLM_TRANSPORT=record|replay swaps the live API for a cassette
+    app.state.llm = LLMClient(
+        api_key=settings.anthropic_api_key,
+        base_url=settings.anthropic_base_url,
+        client=open_transport(settings),
+    )
+    app.state.llm_router = LLMRouter(
+        app.state.llm,
+        RoutingPolicy(
+            fast_model=settings.llm_fast_model,
+            strong_model=settings.llm_strong_model,
+            generation_deadline=settings.llm_generation_deadline,
+            conversation_deadline=settings.llm_conversation_deadline,
+        ),
+        hedge_ratio=settings.llm_hedge_ratio,
+        breaker_cooldown=settings.llm_breaker_cooldown,
+        ledger=app.state.usage,
+    )
+    # Budgets hold one minute of tokens and refill continuously
+    app.state.admission = AdmissionController(
+        user_capacity=settings.user_tokens_per_minute,
+        user_rate=settings.user_tokens_per_minute / 60,
+        global_capacity=settings.global_tokens_per_minute,
+        global_rate=settings.global_tokens_per_minute / 60,
+        max_concurrent=settings.llm_max_concurrent,
+        max_queue=settings.llm_max_queue,
+    )
+
+    # Pre-generated first conversation turns (see src/openers.py)
+    app.state.opener_queue = OpenerQueue(
+        functools.partial(
+            generate_openers,
+            llm_router=app.state.llm_router,
+            admission=app.state.admission,
+            topics=settings.opener_topics,
+        ),
+        delay=settings.opener_delay,
+        busy=lambda: app.state.admission.queue_depth > 0,
+        enabled=bool(settings.database_url and settings.opener_topics and app.state.llm.configured),
+    )
+    await app.state.opener_queue.start()
+
+    app.state.singleflight = SingleFlight()
+
+    # Example sentences and pronunciations for saved words (see src/enrichment.py)
+    app.state.enrichment = EnrichmentWorker(
+        functools.partial(
+            enrich_batch,
+            llm_router=app.state.llm_router,
+            admission=app.state.admission,
+            invalidation=app.state.invalidation,
+        ),
+        batch_size=settings.enrich_batch_size,
+        interval=settings.enrich_interval,
+        busy=lambda: app.state.admission.queue_depth > 0,
+        enabled=bool(settings.database_url and settings.enrich_batch_size > 0 and app.state.llm.configured),
+    )
+    await app.state.enrichment.start()
+
+    # Buffered ingestion for high-frequency practice events (see src/events.py)
+    app.state.event_buffer = WriteBehindBuffer(
+        functools.partial(write_events, invalidation=app.state.invalidation),
+        max_batch_size=settings.event_batch_size,
+        flush_interval=settings.event_flush_interval,
+        max_pending=settings.event_max_pending,
+    )
+    await app.state.event_buffer.start()
+
+    if settings.database_url and settings.pool_warmup:
+        warmup_task = asyncio.create_task(_warm_up(app, started))
+    else:
+        app.state.startup_seconds = round(time.perf_counter() - started, 3)
+        app.state.ready = True
+
+    try:
+        yield
+    finally:
+        app.state.ready = False
+        if warmup_task is not None:
+            warmup_task.cancel()
+        # Flush buffered events before the worker exits
+        await app.state.event_buffer.close()
+        # Background LLM work stops before what it writes through
+        await app.state.opener_queue.close()
+        await app.state.enrichment.close()
+        await app.state.usage.close()
+        await app.state.invalidation.close()
+        await app.state.llm.close()
+        if app.state.auth.jwks is not None:
+            await app.state.auth.jwks.close()
+        await database.dispose_engine()
+
+
+def create_app(settings: Settings | None = None) -> FastAPI:
+    settings = settings or Settings.from_env()
+    configure_logging(settings.log_level, settings.log_sample_rates)
+
+    app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
+    app.state.settings = settings
+    app.state.ready = False
+    app.state.startup_seconds = None
+    app.state.query_metrics = QueryMetrics()
+    app.state.profiler = Profiler(keep=settings.profile_keep, interval=settings.profile_interval_ms / 1000)
+
+    # Log allowed origins (only in non-production)
+    if not settings.is_production:
+        logger.info("CORS allowed origins", extra={"origins": settings.allowed_origins})
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=settings.allowed_origins,
+        allow_credentials=True,
+        allow_methods=["GET", "POST", "PUT", "DELETE", "PATCH"],
+        allow_headers=["*"],
+    )
+
+    # Compress large payloads (deck and word lists, exports)
+    app.add_middleware(GZipMiddleware, minimum_size=GZIP_MINIMUM_SIZE)
+
+    # Per-request query count and DB time: headers in development, metrics always
+    app.add_middleware(
+        QueryStatsMiddleware,
+        metrics=app.state.query_metrics,
+        headers=not settings.is_production,
+    )
+
+    # Sampling profiler, only installed when it can be triggered
+    if settings.profile_token or settings.profile_sample_rate > 0:
+        app.add_middleware(
+            ProfilingMiddleware,
+            profiler=app.state.profiler,
+            sample_rate=settings.profile_sample_rate,
+            token=settings.profile_token,
+        )
+
+    # Latency histograms and in-flight gauges for /metrics (outermost, so it
+    # times everything above)
+    app.add_middleware(MetricsMiddleware)
+
+    # Request ids for log records and the X-Request-ID header
+    app.add_middleware(RequestIdMiddleware)
+
+    # Health, readiness and metrics stay open; everything else checks the caller's token
+    app.include_router(system.router)
+    for module in (flashcards, decks, words, bulk, practice, sessions, conversations, usage):
+        app.include_router(module.router, dependencies=[Depends(authenticate)])
+
+    return app
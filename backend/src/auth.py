@@ -0,0 +1,320 @@
+"""
+Local verification of Supabase access tokens.
+
+The frontend signs in with Supabase, and every endpoint used to trust the
+``user_id`` the client sent. Asking the auth service about each request
+would add a network round trip to every route. Instead, the token's
+signature is checked in-process:
+
+- Asymmetric tokens (RS256/ES256) are checked against the project's JWKS
+  (``{SUPABASE_URL}/auth/v1/.well-known/jwks.json``). The key set is
+  fetched at startup and refreshed in the background every
+  ``refresh_interval``. A token signed with a key id we don't know (the
+  project rotated keys) triggers one refresh, at most every
+  ``min_refresh_interval``, so a stream of bogus key ids can't hammer the
+  auth service.
+- Legacy HS256 tokens are checked with SUPABASE_JWT_SECRET.
+- A verified token is kept in an LRU keyed by the SHA-256 of the token,
+  until it expires. A repeat request costs one hash and one dict lookup,
+  not a signature check.
+
+``authenticate`` is a dependency on every router except the system one
+(health, readiness, metrics):
+- A valid ``Authorization: Bearer <token>`` makes the token's subject the
+  caller. A ``user_id`` in the query string or at the top level of the JSON
+  body that names anyone else gets 403. A WebSocket passes the token as
+  ``?access_token=``, because browsers can't set headers on the handshake.
+- A missing token is allowed while AUTH_REQUIRED is off, so the frontend
+  can roll out tokens first. Once it is on, it gets 401.
+- An invalid or expired token always gets 401 (WebSockets close with 1008).
+- With neither SUPABASE_URL nor SUPABASE_JWT_SECRET set, tokens can't be
+  checked and are ignored; with AUTH_REQUIRED on, every request gets 401.
+"""
+import asyncio
+import hashlib
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import httpx
+import jwt
+from fastapi import HTTPException, Request, WebSocketException, status
+from starlette.requests import HTTPConnection
+
+from src.metrics import AUTH_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+ASYMMETRIC_ALGORITHMS = ("RS256", "ES256")
+
+
+class AuthError(Exception):
+    """The token can't be trusted"""
+
+
+@dataclass(frozen=True)
+class Principal:
+    user_id: uuid.UUID
+    expires_at: float  # unix time
+
+
+def jwks_url(supabase_url: str) -> str:
+    return f"{supabase_url.rstrip('/')}/auth/v1/.well-known/jwks.json"
+
+
+async def fetch_jwks(url: str) -> dict:
+    async with httpx.AsyncClient(timeout=5.0) as client:
+        response = await client.get(url)
+        response.raise_for_status()
+        return response.json()
+
+
+class JWKSCache:
+    def __init__(
+        self,
+        fetch,
+        refresh_interval: float = 600.0,
+        min_refresh_interval: float = 30.0,
+        clock=time.monotonic,
+    ):
+        self._fetch = fetch  # async () -> {"keys": [...]}
+        self.refresh_interval = refresh_interval
+        self.min_refresh_interval = min_refresh_interval
+        self._clock = clock
+        self._keys: dict[str, jwt.PyJWK] = {}
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+        self.refreshed_at: float | None = None
+
+        self.refreshes = 0
+        self.failures = 0
+
+    async def start(self):
+        """Load the key set, then keep it fresh in the background"""
+        await self.refresh()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def refresh(self) -> bool:
+        """Replace the key set; on failure the old keys stay in use"""
+        async with self._lock:
+            return await self._refresh()
+
+    async def _refresh(self) -> bool:
+        self.refreshed_at = self._clock()
+        try:
+            data = await self._fetch()
+        except Exception as e:
+            self.failures += 1
+            logger.warning("Could not fetch JWKS: %s", e)
+            return False
+
+        keys = {}
+        for jwk in data.get("keys", []):
+            try:
+                key = jwt.PyJWK(jwk)
+            except jwt.PyJWKError:
+                # An algorithm or key type we don't use
+                continue
+            if key.key_id:
+                keys[key.key_id] = key
+        self._keys = keys
+        self.refreshes += 1
+        return True
+
+    async def get(self, kid: str) -> jwt.PyJWK | None:
+        """The key with this id, refreshing once if it is unknown"""
+        key = self._keys.get(kid)
+        if key is not None:
+            return key
+        async with self._lock:
+            # Another request may have just refreshed
+            if kid not in self._keys and (
+                self.refreshed_at is None or self._clock() - self.refreshed_at >= self.min_refresh_interval
+            ):
+                await self._refresh()
+        return self._keys.get(kid)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            await self.refresh()
+
+    def stats(self) -> dict:
+        return {"keys": len(self._keys), "refreshes": self.refreshes, "failures": self.failures}
+
+
+class TokenVerifier:
+    def __init__(
+        self,
+        jwks: JWKSCache | None = None,
+        secret: str | None = None,
+        audience: str = "authenticated",
+        issuer: str | None = None,
+        leeway: float = 30.0,
+        max_entries: int = 10_000,
+        clock=time.time,
+    ):
+        self.jwks = jwks
+        self.secret = secret
+        self.audience = audience
+        self.issuer = issuer
+        self.leeway = leeway
+        self.max_entries = max_entries
+        self._clock = clock
+        self._verified: OrderedDict[bytes, Principal] = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.rejected = 0
+
+    @property
+    def configured(self) -> bool:
+        return self.jwks is not None or self.secret is not None
+
+    async def verify(self, token: str) -> Principal:
+        """The token's subject, or AuthError"""
+        digest = hashlib.sha256(token.encode("utf-8")).digest()
+        principal = self._verified.get(digest)
+        if principal is not None and principal.expires_at > self._clock():
+            self._verified.move_to_end(digest)
+            self.hits += 1
+            return principal
+
+        self.misses += 1
+        try:
+            principal = await self._decode(token)
+        except (jwt.PyJWTError, AuthError, ValueError) as e:
+            self.rejected += 1
+            raise AuthError(str(e)) from e
+
+        self._verified[digest] = principal
+        self._verified.move_to_end(digest)
+        if len(self._verified) > self.max_entries:
+            self._verified.popitem(last=False)
+        return principal
+
+    async def _decode(self, token: str) -> Principal:
+        header = jwt.get_unverified_header(token)
+        algorithm = header.get("alg")
+        if algorithm == "HS256" and self.secret:
+            key = self.secret
+        elif algorithm in ASYMMETRIC_ALGORITHMS and self.jwks is not None:
+            key = await self.jwks.get(header.get("kid") or "")
+            if key is None:
+                raise AuthError("Unknown signing key")
+        else:
+            raise AuthError(f"Unsupported token algorithm {algorithm}")
+
+        claims = jwt.decode(
+            token,
+            key,
+            algorithms=[algorithm],
+            audience=self.audience,
+            issuer=self.issuer,
+            leeway=self.leeway,
+            options={"require": ["exp", "sub"]},
+        )
+        return Principal(uuid.UUID(claims["sub"]), float(claims["exp"]))
+
+    def stats(self) -> dict:
+        return {
+            "configured": self.configured,
+            "cached_tokens": len(self._verified),
+            "hits": self.hits,
+            "misses": self.misses,
+            "rejected": self.rejected,
+            "jwks": self.jwks.stats() if self.jwks is not None else None,
+        }
+
+
+def bearer_token(connection: HTTPConnection) -> str | None:
+    scheme, _, token = connection.headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        return token.strip()
+    if connection.scope["type"] == "websocket":
+        return connection.query_params.get("access_token") or None
+    return None
+
+
+def parsed_as_json(content_type: str | None) -> bool:
+    """Whether FastAPI parses a body with this Content-Type as JSON
+
+    It does for application/json and application/*+json, and for a body sent
+    with no Content-Type at all.
+    """
+    if not content_type:
+        return True
+    main, _, subtype = content_type.partition(";")[0].strip().lower().partition("/")
+    return main == "application" and (subtype == "json" or subtype.endswith("+json"))
+
+
+async def claimed_user_id(connection: HTTPConnection) -> str | None:
+    """The user_id the client sent in the query string or the JSON body"""
+    claimed = connection.query_params.get("user_id")
+    if claimed is not None or not isinstance(connection, Request):
+        return claimed
+    route = connection.scope.get("route")
+    # Only bodies FastAPI has already parsed for the endpoint (the cached
+    # JSON), never a streamed upload
+    if getattr(route, "body_field", None) is None or not parsed_as_json(connection.headers.get("content-type")):
+        return None
+    try:
+        body = await connection.json()
+    except (ValueError, RuntimeError):
+        # Not JSON (the endpoint answers 422), or a form FastAPI already consumed
+        return None
+    return body.get("user_id") if isinstance(body, dict) else None
+
+
+def _deny(connection: HTTPConnection, status_code: int, detail: str):
+    if connection.scope["type"] == "websocket":
+        return WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason=detail)
+    headers = {"WWW-Authenticate": "Bearer"} if status_code == 401 else None
+    return HTTPException(status_code=status_code, detail=detail, headers=headers)
+
+
+async def authenticate(connection: HTTPConnection) -> uuid.UUID | None:
+    """Dependency: the signed-in user, checked against the user_id the client sent"""
+    state = connection.app.state
+    verifier: TokenVerifier = state.auth
+    token = bearer_token(connection) if verifier.configured else None
+    if token is None:
+        if state.settings.auth_required:
+            AUTH_REQUESTS.labels("missing").inc()
+            raise _deny(connection, 401, "Not authenticated")
+        AUTH_REQUESTS.labels("anonymous").inc()
+        return None
+
+    hits = verifier.hits
+    try:
+        principal = await verifier.verify(token)
+    except AuthError as e:
+        AUTH_REQUESTS.labels("invalid").inc()
+        logger.info("Rejected access token: %s", e)
+        raise _deny(connection, 401, "Invalid or expired token")
+    AUTH_REQUESTS.labels("cached" if verifier.hits > hits else "verified").inc()
+
+    claimed = await claimed_user_id(connection)
+    if claimed is not None:
+        try:
+            matches = uuid.UUID(str(claimed)) == principal.user_id
+        except ValueError:
+            matches = True  # The endpoint answers 400 for a malformed id
+        if not matches:
+            AUTH_REQUESTS.labels("forbidden").inc()
+            raise _deny(connection, 403, "user_id does not match the signed-in user")
+
+    connection.state.user_id = principal.user_id
+    return principal.user_id
@@ -0,0 +1,122 @@
+"""
+In-process TTL/LRU cache for read-heavy endpoints.
+
+Keys are tuples whose first two elements name an invalidation group, e.g.
+("deck", deck_id) or ("words", user_id, page, page_size, search) in group
+("words", user_id). Writers evict whole groups through the invalidation bus
+(src/invalidation.py), which also reaches the other workers.
+
+Each group has a version that is bumped on eviction. A loader that started
+before an eviction must not write its (possibly stale) result back, so
+``set`` takes the version read before loading and drops the value if it has
+changed since.
+"""
+import time
+from collections import OrderedDict
+
+MISSING = object()
+
+
+class LocalCache:
+    def __init__(self, max_entries: int = 10_000, ttl: float = 300.0, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: OrderedDict[tuple, tuple[float, object]] = OrderedDict()
+        self._groups: dict[tuple, set] = {}
+        self._versions: OrderedDict[tuple, int] = OrderedDict()
+        self._version_counter = 0
+        # Disabled while cross-worker invalidations might be missed
+        self.enabled = True
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def group_of(key: tuple) -> tuple:
+        # Idents are compared as strings, the form they arrive in over NOTIFY
+        return (key[0], str(key[1]))
+
+    def version(self, key: tuple) -> int:
+        return self._versions.get(self.group_of(key), 0)
+
+    def get(self, key: tuple):
+        if not self.enabled:
+            self.misses += 1
+            return MISSING
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < self._clock():
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            return MISSING
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: tuple, value, version: int | None = None, ttl: float | None = None):
+        if not self.enabled:
+            return
+        if version is not None and version != self.version(key):
+            return
+        self._entries[key] = (self._clock() + (ttl or self.ttl), value)
+        self._entries.move_to_end(key)
+        self._groups.setdefault(self.group_of(key), set()).add(key)
+        while len(self._entries) > self.max_entries:
+            oldest, _ = self._entries.popitem(last=False)
+            self._discard_from_group(oldest)
+
+    def evict_group(self, kind: str, ident) -> int:
+        """Drop every entry in group (kind, ident); returns how many were dropped"""
+        group = (kind, str(ident))
+        self._bump(group)
+        keys = self._groups.pop(group, ())
+        for key in keys:
+            self._entries.pop(key, None)
+        self.evictions += len(keys)
+        return len(keys)
+
+    def clear(self):
+        for group in list(self._groups):
+            self._bump(group)
+        self._entries.clear()
+        self._groups.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _bump(self, group: tuple):
+        # Versions come from one counter, so a forgotten group never reuses a
+        # version a loader might still be holding
+        self._version_counter += 1
+        self._versions[group] = self._version_counter
+        self._versions.move_to_end(group)
+        if len(self._versions) > self.max_entries * 4:
+            self._versions.popitem(last=False)
+
+    def _remove(self, key: tuple):
+        self._entries.pop(key, None)
+        self._discard_from_group(key)
+
+    def _discard_from_group(self, key: tuple):
+        group = self.group_of(key)
+        keys = self._groups.get(group)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._groups[group]
+
+
+async def cached(cache: LocalCache, key: tuple, loader, flight=None):
+    """Return the cached value for key, or load it (coalesced through flight if given) and cache it"""
+    value = cache.get(key)
+    if value is not MISSING:
+        return value
+
+    version = cache.version(key)
+    value = await (flight.do(key, loader) if flight is not None else loader())
+    # Misses (None) are not cached
+    if value is not None:
+        cache.set(key, value, version=version)
+    return value
@@ -0,0 +1,146 @@
+import os
+from dataclasses import dataclass, field
+
+from src.logs import parse_sample_rates
+
+
+def _origins(value: str) -> list[str]:
+    # Supports multiple origins: "http://localhost:5173,https://your-app.vercel.app"
+    return [origin.strip() for origin in value.split(",") if origin.strip()]
+
+
+def _list(value: str) -> list[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+@dataclass
+class Settings:
+    """Runtime configuration, read once when the app is created"""
+    database_url: str | None = None
+    # Direct (non-pgbouncer) URL for the LISTEN connection; defaults to database_url
+    invalidation_database_url: str | None = None
+    anthropic_api_key: str | None = None
+    # Alternative Anthropic-compatible endpoint (the load test's fake server)
+    anthropic_base_url: str | None = None
+    # live, or record/replay against a cassette file (see src/llm_transport.py)
+    llm_transport: str = "live"
+    llm_cassette: str | None = None
+    llm_replay_speed: float = 1.0
+    # Model routing, deadlines, hedging and circuit breaking (see src/llm_routing.py)
+    llm_fast_model: str = "claude-3-5-haiku-20241022"
+    llm_strong_model: str = "claude-sonnet-4-20250514"
+    llm_generation_deadline: float = 90.0
+    llm_conversation_deadline: float = 30.0
+    llm_hedge_ratio: float = 0.05
+    llm_breaker_cooldown: float = 30.0
+    environment: str = "development"
+    allowed_origins: list[str] = field(default_factory=lambda: ["http://localhost:5173"])
+    # Structured logging (see src/logs.py)
+    log_level: str = "INFO"
+    log_sample_rates: dict[str, float] = field(default_factory=lambda: {"request": 0.1})
+    # Supabase access tokens (see src/auth.py): the project URL (for its JWKS)
+    # and/or the legacy HS256 secret; AUTH_REQUIRED refuses requests without one
+    supabase_url: str | None = None
+    supabase_jwt_secret: str | None = None
+    auth_required: bool = False
+    jwks_refresh_interval: float = 600.0
+    # When set, /metrics requires "Authorization: Bearer <token>"
+    metrics_token: str | None = None
+
+    # Request profiling (see src/profiling.py); off unless a token or rate is set
+    profile_token: str | None = None
+    profile_sample_rate: float = 0.0
+    profile_keep: int = 20
+    profile_interval_ms: float = 5.0
+
+    # Connection pool
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    pool_warmup: bool = True
+    # Statements slower than this are logged (see src/query_stats.py)
+    slow_query_ms: float = 200.0
+
+    # Write-behind event buffer (see src/events.py)
+    event_batch_size: int = 500
+    event_flush_interval: float = 1.0
+    event_max_pending: int = 10_000
+
+    # AI endpoint admission control (see src/ratelimit.py), in estimated LLM tokens
+    user_tokens_per_minute: int = 20_000
+    global_tokens_per_minute: int = 400_000
+    llm_max_concurrent: int = 16
+    llm_max_queue: int = 32
+
+    # Daily LLM tokens per user (see src/usage.py); 0 disables the quota
+    usage_daily_token_quota: int = 0
+
+    # Per-worker read cache (see src/cache.py and src/invalidation.py)
+    cache_ttl_seconds: float = 300.0
+    cache_max_entries: int = 10_000
+
+    # Pre-generated conversation openers (see src/openers.py): topics to cover
+    # (empty disables) and how long after a deck's last edit to generate
+    opener_topics: list[str] = field(default_factory=lambda: ["general"])
+    opener_delay: float = 30.0
+
+    # Background word enrichment (see src/enrichment.py): words per model call
+    # (0 disables) and seconds between rounds
+    enrich_batch_size: int = 50
+    enrich_interval: float = 30.0
+
+    # Conversation WebSockets (see src/conversation_socket.py) close after this long without activity
+    ws_idle_timeout: float = 300.0
+
+    @property
+    def is_production(self) -> bool:
+        return self.environment == "production"
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        return cls(
+            database_url=os.getenv("DATABASE_URL") or None,
+            invalidation_database_url=os.getenv("INVALIDATION_DATABASE_URL") or None,
+            anthropic_api_key=os.getenv("ANTHROPIC_API_KEY") or None,
+            anthropic_base_url=os.getenv("ANTHROPIC_BASE_URL") or None,
+            llm_transport=os.getenv("LLM_TRANSPORT", "live").lower(),
+            llm_cassette=os.getenv("LLM_CASSETTE") or None,
+            llm_replay_speed=float(os.getenv("LLM_REPLAY_SPEED", "1.0")),
+            llm_fast_model=os.getenv("LLM_FAST_MODEL", "claude-3-5-haiku-20241022"),
+            llm_strong_model=os.getenv("LLM_STRONG_MODEL", "claude-sonnet-4-20250514"),
+            llm_generation_deadline=float(os.getenv("LLM_GENERATION_DEADLINE_SECONDS", "90")),
+            llm_conversation_deadline=float(os.getenv("LLM_CONVERSATION_DEADLINE_SECONDS", "30")),
+            llm_hedge_ratio=float(os.getenv("LLM_HEDGE_RATIO", "0.05")),
+            llm_breaker_cooldown=float(os.getenv("LLM_BREAKER_COOLDOWN_SECONDS", "30")),
+            environment=os.getenv("ENVIRONMENT", "development"),
+            allowed_origins=_origins(os.getenv("ALLOWED_ORIGINS", "http://localhost:5173")),
+            log_level=os.getenv("LOG_LEVEL", "INFO"),
+            log_sample_rates=parse_sample_rates(os.getenv("LOG_SAMPLE_RATES", "request=0.1")),
+            supabase_url=os.getenv("SUPABASE_URL") or None,
+            supabase_jwt_secret=os.getenv("SUPABASE_JWT_SECRET") or None,
+            auth_required=os.getenv("AUTH_REQUIRED", "false").lower() == "true",
+            jwks_refresh_interval=float(os.getenv("JWKS_REFRESH_SECONDS", "600")),
+            metrics_token=os.getenv("METRICS_TOKEN") or None,
+            profile_token=os.getenv("PROFILE_TOKEN") or None,
+            profile_sample_rate=float(os.getenv("PROFILE_SAMPLE_RATE", "0")),
+            profile_keep=int(os.getenv("PROFILE_KEEP", "20")),
+            profile_interval_ms=float(os.getenv("PROFILE_INTERVAL_MS", "5")),
+            db_pool_size=int(os.getenv("DB_POOL_SIZE", "5")),
+            db_max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "10")),
+            pool_warmup=os.getenv("DB_POOL_WARMUP", "true").lower() != "false",
+            slow_query_ms=float(os.getenv("DB_SLOW_QUERY_MS", "200")),
+            event_batch_size=int(os.getenv("EVENT_BATCH_SIZE", "500")),
+            event_flush_interval=float(os.getenv("EVENT_FLUSH_INTERVAL", "1.0")),
+            event_max_pending=int(os.getenv("EVENT_MAX_PENDING", "10000")),
+            user_tokens_per_minute=int(os.getenv("USER_TOKENS_PER_MINUTE", "20000")),
+            global_tokens_per_minute=int(os.getenv("GLOBAL_TOKENS_PER_MINUTE", "400000")),
+            llm_max_concurrent=int(os.getenv("LLM_MAX_CONCURRENT", "16")),
+            llm_max_queue=int(os.getenv("LLM_MAX_QUEUE", "32")),
+            usage_daily_token_quota=int(os.getenv("USAGE_DAILY_TOKEN_QUOTA", "0")),
+            cache_ttl_seconds=float(os.getenv("CACHE_TTL_SECONDS", "300")),
+            cache_max_entries=int(os.getenv("CACHE_MAX_ENTRIES", "10000")),
+            opener_topics=_list(os.getenv("OPENER_TOPICS", "general")),
+            opener_delay=float(os.getenv("OPENER_DELAY_SECONDS", "30")),
+            enrich_batch_size=int(os.getenv("ENRICH_BATCH_SIZE", "50")),
+            enrich_interval=float(os.getenv("ENRICH_INTERVAL_SECONDS", "30")),
+            ws_idle_timeout=float(os.getenv("WS_IDLE_TIMEOUT_SECONDS", "300")),
+        )
@@ -0,0 +1,248 @@
+"""
+WebSocket channel for conversation practice.
+
+One connection stays open for the whole practice session, so turns don't
+pay for a new HTTP request each time, and the tutor's reply is streamed as
+it is written rather than sent when it is complete. The socket is bound to
+a server-side conversation session (src/conversations.py). The session's
+owner is checked once, in the handshake.
+
+Client -> server (JSON text frames):
+    {"type": "message", "content": "..."}   a typed turn
+    {"type": "speech", "content": "..."}    a speech-transcribed turn
+    {"type": "timing", "action": "pause"}   stop the practice clock (or "resume")
+    {"type": "end"}                         record the session and close
+    {"type": "ping"}                        answered with {"type": "pong"}
+
+Server -> client:
+    {"type": "ready", "id", "deck_id", "settings", "turns"}
+    {"type": "token", "text": "..."}        reply text as it is generated
+    {"type": "done", "message", "words_used", "turns"}
+    {"type": "busy"}                        a turn arrived while one was being answered
+    {"type": "error", "status", "detail"}   the turn failed; the socket stays open
+    {"type": "session", "duration_seconds", "saved"}
+
+Backpressure: one turn is answered at a time per socket. Turns sent while
+one is in flight are refused with "busy" instead of queued. Token frames
+are awaited as they are sent, so a slow reader slows the upstream stream
+rather than piling frames up in memory. The per-user token budgets and
+the global concurrency limit (src/ratelimit.py) apply to every turn.
+
+Idle timeout: a socket with no turn in flight and no message, speech or
+timing frame for ``idle_timeout`` seconds is closed. Pings keep the
+connection through proxies but don't count as activity.
+
+When the socket closes (end, idle timeout or disconnect), the practice
+time is recorded as a "conversation" practice session through the
+write-behind event buffer (src/events.py). The time runs from connect to
+the last activity, minus pauses. Each connection records once, under its
+own idempotency key.
+"""
+import asyncio
+import logging
+import time
+import uuid
+from datetime import datetime, timezone
+
+from fastapi import HTTPException, WebSocket, WebSocketDisconnect, status
+from pydantic import ValidationError
+
+from src import conversations
+from src.events import BufferedEvent, BufferClosedError, BufferFullError, WriteBehindBuffer
+from src.llm import LLMNotConfiguredError
+from src.metrics import WS_CONNECTIONS, WS_MESSAGES
+from src.schema import SocketMessage
+
+logger = logging.getLogger(__name__)
+
+
+class PracticeClock:
+    """Active practice time: from connect to the last activity, minus pauses"""
+
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self.started = self.last_active = clock()
+        self._paused_at = None
+        self._paused = 0.0
+
+    def touch(self):
+        self.last_active = self._clock()
+
+    def pause(self):
+        if self._paused_at is None:
+            self._paused_at = self._clock()
+
+    def resume(self):
+        if self._paused_at is not None:
+            self._paused += self._clock() - self._paused_at
+            self._paused_at = None
+        self.touch()
+
+    def idle_seconds(self) -> float:
+        return self._clock() - self.last_active
+
+    def active_seconds(self) -> int:
+        end = self._paused_at if self._paused_at is not None else self.last_active
+        return max(0, round(end - self.started - self._paused))
+
+
+class ConversationSocket:
+    def __init__(
+        self,
+        websocket: WebSocket,
+        conversation: conversations.Conversation,
+        db,
+        idle_timeout: float = 300.0,
+        clock=time.monotonic,
+    ):
+        state = websocket.app.state
+        self.websocket = websocket
+        self.conversation = conversation
+        self.db = db
+        self.cache = state.cache
+        self.invalidation = state.invalidation
+        self.llm_router = state.llm_router
+        self.admission = state.admission
+        self.event_buffer: WriteBehindBuffer = state.event_buffer
+        self.idle_timeout = idle_timeout
+        self.clock = PracticeClock(clock)
+        self.connection_id = uuid.uuid4().hex
+        self._turn: asyncio.Task | None = None
+        self._recorded = False
+
+    @property
+    def busy(self) -> bool:
+        return self._turn is not None and not self._turn.done()
+
+    async def send(self, message: dict):
+        await self.websocket.send_json(message)
+
+    async def run(self):
+        await self.websocket.accept()
+        WS_CONNECTIONS.inc()
+        try:
+            await self.send({"type": "ready", **conversations.summary(self.conversation)})
+            while await self._receive():
+                pass
+        except WebSocketDisconnect:
+            pass
+        finally:
+            WS_CONNECTIONS.dec()
+            if self._turn is not None:
+                # Nobody is listening any more; stop paying for the reply
+                self._turn.cancel()
+                await asyncio.gather(self._turn, return_exceptions=True)
+            await self.record_session()
+
+    async def _receive(self) -> bool:
+        """Handle the next frame; False once the socket should close"""
+        remaining = self.idle_timeout if self.busy else self.idle_timeout - self.clock.idle_seconds()
+        try:
+            raw = await asyncio.wait_for(self.websocket.receive_text(), timeout=max(remaining, 0))
+        except TimeoutError:
+            if self.busy or self.clock.idle_seconds() < self.idle_timeout:
+                return True
+            await self.websocket.close(code=status.WS_1000_NORMAL_CLOSURE, reason="Idle timeout")
+            return False
+
+        try:
+            message = SocketMessage.model_validate_json(raw)
+        except ValidationError as e:
+            await self.send({"type": "error", "status": 422, "detail": e.errors(include_url=False, include_context=False)})
+            return True
+
+        WS_MESSAGES.labels(message.type).inc()
+        if message.type == "ping":
+            await self.send({"type": "pong"})
+            return True
+
+        self.clock.touch()
+        if message.type == "timing":
+            if message.action == "pause":
+                self.clock.pause()
+            else:
+                self.clock.resume()
+        elif message.type == "end":
+            saved = await self.record_session()
+            await self.send({"type": "session", "duration_seconds": self.clock.active_seconds(), "saved": saved})
+            await self.websocket.close(code=status.WS_1000_NORMAL_CLOSURE)
+            return False
+        elif not message.content:
+            await self.send({"type": "error", "status": 422, "detail": "content is required"})
+        elif self.busy:
+            await self.send({"type": "busy"})
+        else:
+            self.clock.resume()
+            self._turn = asyncio.create_task(self._answer(message.content, message.type))
+        return True
+
+    async def _send_token(self, text: str):
+        await self.send({"type": "token", "text": text})
+
+    async def _answer(self, content: str, source: str):
+        try:
+            # The session may have moved on (another tab, a 409 last turn)
+            conversation = await conversations.get_conversation(self.cache, self.db, self.conversation.id)
+            if conversation is None:
+                raise HTTPException(status_code=404, detail="Conversation not found")
+
+            result = await conversations.take_turn(
+                self.db, self.cache, self.invalidation, self.llm_router, self.admission,
+                conversation, content, on_text=self._send_token
+            )
+            self.conversation = result.conversation
+
+            logger.info("Generated conversation turn", extra={
+                "conversation_id": str(conversation.id),
+                "source": source,
+                "turns": result.conversation.turns,
+                "words_used": len(result.words_used),
+                "model": result.completion.model,
+                "output_tokens": result.completion.output_tokens,
+            })
+            await self.send({
+                "type": "done",
+                "message": result.completion.text,
+                "words_used": result.words_used,
+                "turns": result.conversation.turns,
+            })
+
+        except HTTPException as e:
+            error = {"type": "error", "status": e.status_code, "detail": e.detail}
+            if e.headers and "Retry-After" in e.headers:
+                error["retry_after"] = int(e.headers["Retry-After"])
+            await self.send(error)
+        except LLMNotConfiguredError as e:
+            await self.send({"type": "error", "status": 500, "detail": str(e)})
+        except Exception as e:
+            logger.exception("Error in conversation socket turn")
+            await self.send({"type": "error", "status": 500, "detail": str(e)})
+        finally:
+            # Don't hold a pooled connection while the socket waits for the next turn
+            await self.db.close()
+            self.clock.touch()
+
+    async def record_session(self) -> bool:
+        """Buffer this connection's practice time as a session (once)"""
+        duration = self.clock.active_seconds()
+        if self._recorded or duration < 1:
+            return self._recorded
+        try:
+            await self.event_buffer.add([BufferedEvent(
+                table="practice_sessions",
+                user_id=self.conversation.user_id,
+                client_event_id=f"conversation-socket:{self.connection_id}",
+                values={
+                    "id": uuid.uuid4(),
+                    "deck_id": self.conversation.deck_id,
+                    "practice_type": "conversation",
+                    "duration_seconds": duration,  # Stored as SECONDS
+                    "completed_at": datetime.now(timezone.utc),
+                },
+            )])
+        except (BufferFullError, BufferClosedError) as e:
+            logger.warning("Could not record conversation session: %s", e)
+            return False
+        self._recorded = True
+        return True
+
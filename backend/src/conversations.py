@@ -0,0 +1,232 @@
+"""
+Server-side conversation sessions.
+
+A session keeps its settings, a snapshot of the deck's vocabulary and the
+message history under one id, so each turn only sends the new user message.
+Deck ownership is checked once, when the session is created.
+
+History is stored in conversation_sessions. While a session is active it
+is also held in the worker's LocalCache under ("conversation", id), so a
+turn that hits the cache reads nothing from Postgres. Idle sessions age out
+of memory (TTL/LRU) and are reloaded on their next turn.
+
+Each turn is written through with one UPDATE. It appends the two new
+messages in SQL, so the statement doesn't grow with the history, and it
+only matches the version the turn started from. Of two turns racing on one
+session (a double submit, or a stale copy on another worker), one wins and
+the other gets None (take_turn answers 409). Writes publish the session's
+group on the invalidation bus, which drops the other workers' copies.
+
+``take_turn`` is one tutor turn: budgets, prompt, model call (or the
+stored opener) and write-through. It is shared by POST
+/api/conversations/{id}/turns and the conversation WebSocket
+(src/conversation_socket.py), which streams the reply as it is written.
+"""
+import uuid
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, replace
+
+from fastapi import HTTPException
+from sqlalchemy import delete, func, literal, select, update
+from sqlalchemy.dialects.postgresql import JSONB
+
+from src.cache import LocalCache, cached
+from src.invalidation import InvalidationBus
+from src.llm import Completion
+from src.llm_routing import LLMRouter
+from src.models import ConversationSession
+from src.openers import find_opener
+from src.ratelimit import AdmissionController
+from src.schema import ConversationSettings
+from src.tokens import estimate_tokens, turn_budget
+from src.tutor import OPENING_MESSAGE, build_system_prompt, find_words_used
+
+
+class ConversationConflict(HTTPException):
+    def __init__(self):
+        super().__init__(status_code=409, detail="Conversation was updated by another request, please retry")
+
+
+@dataclass(frozen=True)
+class Conversation:
+    id: uuid.UUID
+    user_id: uuid.UUID
+    deck_id: uuid.UUID
+    settings: dict
+    vocabulary: list[dict]
+    messages: list[dict]
+    version: int
+    history_tokens: int
+
+    @property
+    def turns(self) -> int:
+        return len(self.messages) // 2
+
+
+@dataclass
+class TurnResult:
+    conversation: Conversation  # after the turn
+    completion: Completion
+    words_used: list[str]
+
+
+def cache_key(conversation_id) -> tuple:
+    return ("conversation", conversation_id)
+
+
+def summary(conversation: Conversation) -> dict:
+    return {
+        "id": str(conversation.id),
+        "deck_id": str(conversation.deck_id),
+        "settings": conversation.settings,
+        "turns": conversation.turns,
+    }
+
+
+def history_tokens(messages: list[dict]) -> int:
+    return sum(estimate_tokens(m["content"]) for m in messages)
+
+
+def from_row(row: ConversationSession) -> Conversation:
+    return Conversation(
+        id=row.id,
+        user_id=row.user_id,
+        deck_id=row.deck_id,
+        settings=row.settings,
+        vocabulary=row.vocabulary,
+        messages=row.messages or [],
+        version=row.version,
+        history_tokens=history_tokens(row.messages or []),
+    )
+
+
+async def load_conversation(db, conversation_id: uuid.UUID) -> Conversation | None:
+    result = await db.execute(select(ConversationSession).where(ConversationSession.id == conversation_id))
+    row = result.scalar_one_or_none()
+    return from_row(row) if row is not None else None
+
+
+async def get_conversation(cache: LocalCache, db, conversation_id: uuid.UUID) -> Conversation | None:
+    """The session from this worker's memory, or from Postgres on a miss"""
+    return await cached(cache, cache_key(conversation_id), lambda: load_conversation(db, conversation_id))
+
+
+async def create_conversation(
+    db,
+    user_id: uuid.UUID,
+    deck_id: uuid.UUID,
+    settings: dict,
+    vocabulary: list[dict]
+) -> Conversation:
+    row = ConversationSession(
+        id=uuid.uuid4(),
+        user_id=user_id,
+        deck_id=deck_id,
+        settings=settings,
+        vocabulary=vocabulary,
+        messages=[],
+        version=0,
+    )
+    db.add(row)
+    await db.commit()
+    return Conversation(row.id, user_id, deck_id, settings, vocabulary, [], 0, 0)
+
+
+async def append_turn(
+    db,
+    invalidation: InvalidationBus,
+    conversation: Conversation,
+    new_messages: list[dict]
+) -> Conversation | None:
+    """Append messages if the session is still at conversation.version; None if it moved on"""
+    result = await db.execute(
+        update(ConversationSession)
+        .where(ConversationSession.id == conversation.id, ConversationSession.version == conversation.version)
+        .values(
+            messages=ConversationSession.messages.op("||")(literal(new_messages, JSONB)),
+            version=ConversationSession.version + 1,
+            updated_at=func.now(),
+        )
+    )
+    if result.rowcount != 1:
+        await db.rollback()
+        return None
+
+    await invalidation.publish(db, cache_key(conversation.id))
+    await db.commit()
+    return replace(
+        conversation,
+        messages=conversation.messages + new_messages,
+        version=conversation.version + 1,
+        history_tokens=conversation.history_tokens + history_tokens(new_messages),
+    )
+
+
+async def delete_conversation(db, invalidation: InvalidationBus, conversation_id: uuid.UUID, user_id: uuid.UUID) -> bool:
+    result = await db.execute(
+        delete(ConversationSession)
+        .where(ConversationSession.id == conversation_id, ConversationSession.user_id == user_id)
+    )
+    if result.rowcount != 1:
+        await db.rollback()
+        return False
+    await invalidation.publish(db, cache_key(conversation_id))
+    await db.commit()
+    return True
+
+
+async def take_turn(
+    db,
+    cache: LocalCache,
+    invalidation: InvalidationBus,
+    llm_router: LLMRouter,
+    admission: AdmissionController,
+    conversation: Conversation,
+    content: str,
+    on_text: Callable[[str], Awaitable[None]] | None = None
+) -> TurnResult:
+    """Answer the student's next message and append both messages to the session"""
+    settings = ConversationSettings(**conversation.settings)
+    user_message = {"role": "user", "content": content}
+    messages = [*conversation.messages, user_message]
+    system_prompt = build_system_prompt(
+        conversation.vocabulary, settings, is_first_message=not conversation.messages
+    )
+
+    # Charge the token budgets before calling the model (fast 429, or 413 past the context window)
+    budget = turn_budget(system_prompt, messages)
+    await llm_router.check_quota(conversation.user_id)
+    admission.check(str(conversation.user_id), budget.total)
+    history_tokens = conversation.history_tokens + estimate_tokens(content)
+
+    # The opening turn is usually pre-generated (see src/openers.py)
+    completion = None
+    if not conversation.messages and content == OPENING_MESSAGE:
+        completion = await find_opener(db, conversation.deck_id, settings, conversation.vocabulary)
+        if completion is not None and on_text is not None:
+            await on_text(completion.text)
+
+    if completion is None:
+        # Native-level immersion and long histories go to the strong model
+        route = llm_router.policy.conversation(settings.immersionLevel, history_tokens)
+
+        async with admission.slot():
+            completion = await llm_router.complete(
+                route,
+                endpoint="practice_conversation",
+                budget=budget,
+                user_id=conversation.user_id,
+                system=system_prompt,
+                messages=messages,
+                on_text=on_text
+            )
+
+    reply = {"role": "assistant", "content": completion.text}
+    updated = await append_turn(db, invalidation, conversation, [user_message, reply])
+    if updated is None:
+        # Our copy is stale; the retry reloads it
+        cache.evict_group(*cache_key(conversation.id))
+        raise ConversationConflict()
+    cache.set(cache_key(updated.id), updated)
+
+    return TurnResult(updated, completion, find_words_used(completion.text, conversation.vocabulary))
@@ -1,28 +1,18 @@
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
-import os
-
-# Get database URL from environment
-DATABASE_URL = os.getenv("DATABASE_URL")
-
-if not DATABASE_URL:
-    raise ValueError("DATABASE_URL environment variable is not set")
-
-# Create async engine with pgbouncer compatibility
-engine = create_async_engine(
-    DATABASE_URL,
-    echo=False,  # Turn off SQL logging for cleaner output
-    future=True,
-    pool_pre_ping=True,
-    connect_args={
-        "statement_cache_size": 0,  # Disable prepared statements for pgbouncer
-        "prepared_statement_cache_size": 0,
-    },
-)
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+import asyncio
+import time
+
+from src.metrics import CallbackGauge, DB_POOL_CHECKOUT_SECONDS
 
-# Session factory
+# The engine is created by the app lifespan (init_engine), not at import
+# time, so modules can be imported without DATABASE_URL or a database
+engine = None
+
+# Session factory (bound to the engine in init_engine)
 AsyncSessionLocal = async_sessionmaker(
-    engine,
     class_=AsyncSession,
     expire_on_commit=False,
     autocommit=False,
@@ -32,6 +22,74 @@ AsyncSessionLocal = async_sessionmaker(
 # Base class for models
 Base = declarative_base()
 
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long each checkout waited for a connection"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_SECONDS.observe(time.perf_counter() - start)
+
+def _pool_state() -> dict:
+    if engine is None:
+        return {}
+    pool = engine.pool
+    return {
+        ("size",): pool.size(),
+        ("checked_out",): pool.checkedout(),
+        ("overflow",): max(pool.overflow(), 0),
+        ("idle",): pool.checkedin(),
+    }
+
+CallbackGauge("db_pool_connections", "Connection pool state", _pool_state, ("state",))
+
+def init_engine(database_url: str, pool_size: int = 5, max_overflow: int = 10):
+    """Create the async engine and bind the session factory to it"""
+    global engine
+
+    # Create async engine with pgbouncer compatibility
+    engine = create_async_engine(
+        database_url,
+        echo=False,  # Turn off SQL logging for cleaner output
+        future=True,
+        pool_pre_ping=True,
+        poolclass=TimedQueuePool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        connect_args={
+            "statement_cache_size": 0,  # Disable prepared statements for pgbouncer
+            "prepared_statement_cache_size": 0,
+        },
+    )
+    AsyncSessionLocal.configure(bind=engine)
+    return engine
+
+def asyncpg_dsn(database_url: str) -> str:
+    """SQLAlchemy URL -> plain postgresql:// URL for asyncpg.connect"""
+    return database_url.replace("postgresql+asyncpg://", "postgresql://", 1)
+
+def get_engine():
+    if engine is None:
+        raise RuntimeError("Database engine is not initialised (is DATABASE_URL set?)")
+    return engine
+
+async def dispose_engine():
+    global engine
+    if engine is not None:
+        await engine.dispose()
+        engine = None
+
+async def warm_pool(connections: int):
+    """Open `connections` pooled connections up front so the first requests don't pay for connect"""
+    async def touch():
+        async with get_engine().connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    # Hold them concurrently so the pool really opens that many
+    await asyncio.gather(*(touch() for _ in range(connections)))
+
 # Dependency for getting DB sessions
 async def get_db():
     """Dependency that provides a database session"""
@@ -43,4 +101,4 @@ async def get_db():
             await session.rollback()
             raise
         finally:
-            await session.close()
\ No newline at end of file
+            await session.close()
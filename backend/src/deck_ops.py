@@ -0,0 +1,114 @@
+"""
+Server-side deck clone and merge.
+
+Cards are copied with INSERT ... SELECT so no per-card Python objects are
+created, and the caller's session keeps everything in one transaction.
+Optional deduplication keeps the first card for each normalized front
+(lower(btrim(front))), in source-deck order.
+"""
+import uuid
+
+from sqlalchemy import select, insert, delete, func, literal, any_
+from sqlalchemy.dialects.postgresql import ARRAY, UUID
+
+from src.models import Deck, Flashcard
+
+# Core tables: these statements never load ORM objects
+decks = Deck.__table__
+flashcards = Flashcard.__table__
+
+
+def _copy_cards(new_deck_id, user_uuid, source_ids: list, dedupe: bool):
+    """Build INSERT ... SELECT copying cards from source decks into new_deck_id"""
+    ids_param = literal(source_ids, ARRAY(UUID(as_uuid=True)))
+    position = func.array_position(ids_param, flashcards.c.deck_id).label("deck_position")
+    normalized = func.lower(func.btrim(flashcards.c.front))
+
+    cards = select(flashcards.c.id, flashcards.c.front, flashcards.c.back, position).where(
+        flashcards.c.deck_id == any_(ids_param)
+    )
+    if dedupe:
+        cards = cards.distinct(normalized).order_by(normalized, position, flashcards.c.id)
+    cards = cards.subquery()
+
+    rows = select(
+        literal(new_deck_id, UUID(as_uuid=True)),
+        literal(user_uuid, UUID(as_uuid=True)),
+        cards.c.front,
+        cards.c.back,
+        func.now(),
+    ).order_by(cards.c.deck_position, cards.c.id)
+
+    return insert(flashcards).from_select(
+        ["deck_id", "user_id", "front", "back", "created_at"], rows, include_defaults=False
+    )
+
+
+async def clone_deck(db, deck_uuid, user_uuid, title: str | None = None, dedupe: bool = False):
+    """Copy a deck and its cards; returns the new deck row, or None if not found"""
+    new_id = uuid.uuid4()
+    new_title = literal(title) if title else func.concat("Copy of ", func.coalesce(decks.c.title, "Untitled Deck"))
+
+    result = await db.execute(
+        insert(decks)
+        .from_select(
+            ["id", "title", "user_id", "source_text", "difficulty", "created_at"],
+            select(
+                literal(new_id, UUID(as_uuid=True)),
+                new_title,
+                decks.c.user_id,
+                decks.c.source_text,
+                decks.c.difficulty,
+                func.now(),
+            ).where(decks.c.id == deck_uuid, decks.c.user_id == user_uuid),
+            include_defaults=False,
+        )
+        .returning(decks.c.id, decks.c.title, decks.c.difficulty, decks.c.created_at)
+    )
+    deck = result.one_or_none()
+    if deck is None:
+        return None, 0
+
+    cards_result = await db.execute(_copy_cards(new_id, user_uuid, [deck_uuid], dedupe))
+    return deck, cards_result.rowcount
+
+
+async def merge_decks(
+    db,
+    deck_uuids: list,
+    user_uuid,
+    title: str | None = None,
+    dedupe: bool = True,
+    delete_sources: bool = False,
+):
+    """Combine decks into a new deck; returns the new deck row, or None if any deck is missing"""
+    ids_param = literal(deck_uuids, ARRAY(UUID(as_uuid=True)))
+    owned = await db.execute(
+        select(decks.c.id, decks.c.difficulty).where(decks.c.id == any_(ids_param), decks.c.user_id == user_uuid)
+    )
+    difficulties = {row.id: row.difficulty for row in owned}
+    if len(difficulties) != len(deck_uuids):
+        return None, 0
+
+    new_id = uuid.uuid4()
+    result = await db.execute(
+        insert(decks)
+        .values(
+            id=new_id,
+            title=title or f"Merged deck ({len(deck_uuids)} decks)",
+            user_id=user_uuid,
+            source_text=None,
+            difficulty=difficulties[deck_uuids[0]],
+            created_at=func.now(),
+        )
+        .returning(decks.c.id, decks.c.title, decks.c.difficulty, decks.c.created_at)
+    )
+    deck = result.one()
+
+    cards_result = await db.execute(_copy_cards(new_id, user_uuid, deck_uuids, dedupe))
+
+    if delete_sources:
+        # Flashcards go with their decks (ON DELETE CASCADE)
+        await db.execute(delete(decks).where(decks.c.id == any_(ids_param), decks.c.user_id == user_uuid))
+
+    return deck, cards_result.rowcount
@@ -0,0 +1,293 @@
+"""
+Background enrichment of saved words.
+
+Words are often saved with only a definition (the generated-deck preview
+sends an empty example and pronunciation). This worker fills in both. It
+collects waiting words across all users and asks the model about many of
+them in a single prompt, so the prompt scaffolding and round trip are
+paid once per batch rather than once per word.
+
+Each round works in three steps:
+1. Claim: one UPDATE ... WHERE id IN (SELECT ... FOR UPDATE SKIP LOCKED)
+   stamps up to ``batch_size`` waiting words with enrich_claimed_at and
+   bumps enrich_attempts, then commits. Workers on other processes skip
+   rows that are locked or claimed, so no word goes to the model twice.
+   No lock or connection is held while the model writes. A claim that was
+   never finished (the worker died) expires after CLAIM_LEASE.
+2. One model call on the fast tier for the whole batch. Words are sent
+   as a JSON list with short numeric ids.
+3. Write back: one UPDATE ... FROM unnest(ids, examples, pronunciations)
+   fills only the fields that are still empty (values the user typed are
+   kept) and sets enriched_at. The owners' word caches are invalidated.
+   The model also names each word's languages, so one-word definitions
+   are added to the shared lexicon (src/lexicon.py).
+
+A word the model skips stays waiting. It is retried after the lease, up
+to MAX_ATTEMPTS times. The last claim also sets enriched_at, so a word
+that is never answered leaves the queue (and idx_words_unenriched)
+instead of being scanned again every round; a late answer is still
+written back. Like the opener queue (src/openers.py), the worker
+waits while interactive requests are queuing for LLM slots.
+"""
+import asyncio
+import json
+import logging
+import re
+from collections import defaultdict
+from datetime import timedelta
+from typing import NamedTuple
+
+from sqlalchemy import Text, case, column, func, literal, or_, select, update
+from sqlalchemy.dialects.postgresql import ARRAY, UUID
+
+from src import lexicon
+from src.database import AsyncSessionLocal
+from src.invalidation import InvalidationBus
+from src.llm_routing import LLMRouter
+from src.models import Word
+from src.ratelimit import AdmissionController
+from src.tokens import enrichment_budget
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 3
+CLAIM_LEASE = timedelta(minutes=10)
+
+# Same limits as WordCreate
+EXAMPLE_MAX_CHARS = 1000
+PRONUNCIATION_MAX_CHARS = 100
+
+
+class Enrichment(NamedTuple):
+    id: object
+    example: str | None
+    pronunciation: str | None
+    source_language: str | None = None  # the word's language
+    target_language: str | None = None  # the definition's language
+
+
+def claim_statement(batch_size: int):
+    """Stamp up to batch_size waiting words as claimed, returning them
+
+    A word's last attempt takes it out of the queue for good.
+    """
+    waiting = (
+        select(Word.id)
+        .where(
+            Word.enriched_at.is_(None),
+            Word.enrich_attempts < MAX_ATTEMPTS,
+            or_(Word.enrich_claimed_at.is_(None), Word.enrich_claimed_at < func.now() - CLAIM_LEASE),
+            or_(func.coalesce(Word.example, "") == "", func.coalesce(Word.pronunciation, "") == ""),
+        )
+        .order_by(Word.created_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    return (
+        update(Word)
+        .where(Word.id.in_(waiting.scalar_subquery()))
+        .values(
+            enrich_attempts=Word.enrich_attempts + 1,
+            enrich_claimed_at=func.now(),
+            enriched_at=case((Word.enrich_attempts + 1 >= MAX_ATTEMPTS, func.now()), else_=None),
+            updated_at=Word.updated_at,  # Not a user-visible change
+        )
+        .returning(Word.id, Word.user_id, Word.word, Word.definition)
+    )
+
+
+def write_statement(results: list[tuple]):
+    """Fill empty example/pronunciation fields from (id, example, pronunciation, ...) rows"""
+    ids, examples, pronunciations = zip(*(r[:3] for r in results))
+    enriched = func.unnest(
+        literal(list(ids), ARRAY(UUID(as_uuid=True))),
+        literal(list(examples), ARRAY(Text)),
+        literal(list(pronunciations), ARRAY(Text)),
+    ).table_valued(
+        column("id", UUID(as_uuid=True)), column("example", Text), column("pronunciation", Text)
+    ).render_derived(name="enriched")
+    return (
+        update(Word)
+        .where(Word.id == enriched.c.id)
+        .values(
+            example=func.coalesce(func.nullif(Word.example, ""), enriched.c.example),
+            pronunciation=func.coalesce(func.nullif(Word.pronunciation, ""), enriched.c.pronunciation),
+            enriched_at=func.now(),
+            enrich_claimed_at=None,
+        )
+    )
+
+
+def build_prompt(batch: list) -> str:
+    words = [{"id": i, "word": w.word, "definition": w.definition} for i, w in enumerate(batch)]
+    return f"""
+    Add an example sentence and a pronunciation for each vocabulary word.
+
+    STRICT RULES:
+    1. example: ONE short, natural sentence in the word's own language that uses the word
+    2. pronunciation: IPA between slashes
+    3. source_language / target_language: ISO 639-1 codes of the word and of its definition
+    4. Keep each word's "id"
+    5. Return ONLY a valid JSON array with one object per word, no markdown
+
+    Example: [{{"id": 0, "example": "Le chien dort.", "pronunciation": "/ʃjɛ̃/", "source_language": "fr", "target_language": "en"}}]
+
+    Words: {json.dumps(words, ensure_ascii=False)}
+    """
+
+
+def language(value) -> str | None:
+    code = str(value or "").strip().lower()
+    return code if re.fullmatch(lexicon.LANGUAGE_PATTERN, code) else None
+
+
+def parse_enrichment(ai_response: str, batch: list) -> list[Enrichment]:
+    """An Enrichment for each word the model answered for"""
+    start, end = ai_response.find("["), ai_response.rfind("]")
+    items = json.loads(ai_response[start:end + 1]) if start != -1 else []
+
+    results = {}
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        index = item.get("id")
+        if not isinstance(index, int) or not 0 <= index < len(batch):
+            continue
+        example = str(item.get("example") or "").strip()[:EXAMPLE_MAX_CHARS]
+        pronunciation = str(item.get("pronunciation") or "").strip()[:PRONUNCIATION_MAX_CHARS]
+        if example or pronunciation:
+            results[index] = Enrichment(
+                batch[index].id, example or None, pronunciation or None,
+                language(item.get("source_language")), language(item.get("target_language")),
+            )
+    return list(results.values())
+
+
+def lexicon_entries(results: list[Enrichment], batch: list) -> dict[tuple, list[lexicon.Translation]]:
+    """One-word definitions of the enriched words, by (source, target) language"""
+    words = {w.id: w for w in batch}
+    entries = defaultdict(list)
+    for result in results:
+        saved = words[result.id]
+        definition = (saved.definition or "").strip()
+        if not (result.source_language and result.target_language) or result.source_language == result.target_language:
+            continue
+        if lexicon.tokenize(saved.word) != [lexicon.normalize_word(saved.word)] or not definition or " " in definition:
+            continue
+        word = lexicon.normalize_word(saved.word)
+        entries[result.source_language, result.target_language].append(
+            lexicon.Translation(word, word, definition[:lexicon.MAX_WORD_CHARS])
+        )
+    return entries
+
+
+async def enrich_batch(
+    batch_size: int,
+    llm_router: LLMRouter,
+    admission: AdmissionController,
+    invalidation: InvalidationBus
+) -> tuple[int, int]:
+    """Claim, enrich and write back one batch, returning (claimed, enriched)"""
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(claim_statement(batch_size))
+        batch = result.all()
+        await db.commit()
+    if not batch:
+        return 0, 0
+
+    async with admission.slot():
+        completion = await llm_router.complete(
+            llm_router.policy.enrichment(),
+            endpoint="enrich_words",
+            budget=enrichment_budget(len(batch)),
+            messages=[{"role": "user", "content": build_prompt(batch)}]
+        )
+
+    results = parse_enrichment(completion.text, batch)
+    if results:
+        enriched_ids = {r[0] for r in results}
+        async with AsyncSessionLocal() as db:
+            await db.execute(write_statement(results))
+            for (source, target), entries in lexicon_entries(results, batch).items():
+                await db.execute(lexicon.record_statement(entries, source, target, "enrichment"))
+            await invalidation.publish(db, *{("words", w.user_id) for w in batch if w.id in enriched_ids})
+            await db.commit()
+
+    logger.info("Enriched words", extra={
+        "claimed": len(batch),
+        "enriched": len(results),
+        "model": completion.model,
+        "output_tokens": completion.output_tokens,
+    })
+    return len(batch), len(results)
+
+
+class EnrichmentWorker:
+    def __init__(
+        self,
+        enrich,
+        batch_size: int = 50,
+        interval: float = 30.0,
+        busy=lambda: False,
+        enabled: bool = True,
+    ):
+        self._enrich = enrich  # async (batch_size) -> (claimed, enriched)
+        self.batch_size = batch_size
+        self.interval = interval
+        self._busy = busy
+        self.enabled = enabled
+        self._task: asyncio.Task | None = None
+
+        self.batches = 0
+        self.claimed = 0
+        self.enriched = 0
+        self.failures = 0
+
+    async def start(self):
+        """Start the background enrichment loop"""
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        """Stop enriching; claimed words are picked up again after the lease"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def run_once(self) -> int:
+        """Enrich full batches until the queue is drained, returning words enriched"""
+        enriched = 0
+        while not self._busy():
+            try:
+                claimed, done = await self._enrich(self.batch_size)
+            except Exception as e:
+                self.failures += 1
+                logger.warning("Word enrichment failed: %s", e)
+                break
+            if claimed:
+                self.batches += 1
+            self.claimed += claimed
+            self.enriched += done
+            enriched += done
+            if claimed < self.batch_size:
+                break
+        return enriched
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.run_once()
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "batches": self.batches,
+            "claimed": self.claimed,
+            "enriched": self.enriched,
+            "failures": self.failures,
+        }
+
@@ -0,0 +1,259 @@
+"""
+Write-behind buffer for high-frequency practice events.
+
+Session and review events are accepted into an in-process buffer and flushed
+to Postgres as multi-row inserts, either when the buffer reaches
+``max_batch_size`` events or every ``flush_interval`` seconds, whichever
+comes first.
+
+Durability semantics:
+- An event is acknowledged (HTTP 202) once it is in this worker's memory.
+  It becomes durable at the next successful flush.
+- A hard crash (SIGKILL, OOM) loses at most the events accepted since the
+  last flush. Clients that need a synchronous guarantee use /api/sessions.
+- A failed flush keeps its events at the front of the buffer and retries on
+  the next trigger. Retries and client resends never duplicate:
+  review_events inserts use ON CONFLICT DO NOTHING on
+  (user_id, client_event_id). practice_sessions is partitioned by
+  completed_at, so its keys are claimed first in practice_session_keys (in
+  the same transaction), and only sessions whose key was new are inserted.
+  A resend with a different occurred_at is still a duplicate.
+- Graceful shutdown (``close()``) stops accepting new events and flushes what
+  is left, retrying until ``shutdown_timeout`` runs out.
+- When ``max_pending`` events are waiting (the database is down or slow),
+  ``add()`` raises BufferFullError so the endpoint can answer 503.
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+
+from src.database import AsyncSessionLocal
+from src.models import PracticeSession, PracticeSessionKey, ReviewEvent
+
+logger = logging.getLogger(__name__)
+
+
+class BufferFullError(Exception):
+    """Raised when the buffer holds max_pending events and cannot accept more"""
+
+
+class BufferClosedError(Exception):
+    """Raised when events are added after the buffer has been closed"""
+
+
+@dataclass
+class BufferedEvent:
+    table: str  # "practice_sessions" or "review_events"
+    user_id: object
+    client_event_id: str
+    values: dict = field(default_factory=dict)
+
+    @property
+    def key(self):
+        return (self.table, self.user_id, self.client_event_id)
+
+
+class WriteBehindBuffer:
+    def __init__(
+        self,
+        writer,
+        max_batch_size: int = 500,
+        flush_interval: float = 1.0,
+        max_pending: int = 10_000,
+        shutdown_timeout: float = 10.0,
+        recent_keys: int = 50_000,
+    ):
+        self._writer = writer
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.shutdown_timeout = shutdown_timeout
+
+        self._pending: list[BufferedEvent] = []
+        self._pending_keys: set = set()
+        # Keys flushed recently, so quick client resends are reported as
+        # duplicates without a database round trip
+        self._recent_keys: OrderedDict = OrderedDict()
+        self._recent_limit = recent_keys
+
+        self._flush_lock = asyncio.Lock()
+        self._wake = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._closed = False
+
+        self.flushed_count = 0
+        self.flush_failures = 0
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    async def start(self):
+        """Start the background flush loop"""
+        if self._task is None:
+            self._closed = False
+            self._task = asyncio.create_task(self._run())
+
+    async def add(self, events: list[BufferedEvent]) -> tuple[int, int]:
+        """Buffer events, returning (accepted, duplicates)"""
+        if self._closed:
+            raise BufferClosedError("Event buffer is shutting down")
+
+        fresh = []
+        seen = set()
+        for event in events:
+            key = event.key
+            if key in seen or key in self._pending_keys or key in self._recent_keys:
+                continue
+            seen.add(key)
+            fresh.append(event)
+
+        if len(self._pending) + len(fresh) > self.max_pending:
+            raise BufferFullError("Event buffer is full")
+
+        self._pending.extend(fresh)
+        self._pending_keys.update(seen)
+
+        if len(self._pending) >= self.max_batch_size:
+            self._wake.set()
+
+        return len(fresh), len(events) - len(fresh)
+
+    async def flush(self) -> int:
+        """Write everything currently buffered, returning the number of events written"""
+        written = 0
+        async with self._flush_lock:
+            while self._pending:
+                batch = self._pending[:self.max_batch_size]
+                del self._pending[:len(batch)]
+                try:
+                    await self._writer(batch)
+                except BaseException:
+                    # Put the batch back in order and let the next trigger retry
+                    self._pending[:0] = batch
+                    self.flush_failures += 1
+                    raise
+
+                for event in batch:
+                    self._pending_keys.discard(event.key)
+                    self._remember(event.key)
+                written += len(batch)
+                self.flushed_count += len(batch)
+        return written
+
+    async def close(self):
+        """Stop accepting events and flush the remainder before shutdown"""
+        self._closed = True
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        deadline = time.monotonic() + self.shutdown_timeout
+        delay = 0.1
+        while self._pending:
+            try:
+                await self.flush()
+            except Exception as e:
+                if time.monotonic() + delay > deadline:
+                    logger.error("Event buffer dropped %d events at shutdown: %s", len(self._pending), e)
+                    return
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 1.0)
+
+    async def _run(self):
+        backoff = self.flush_interval
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=backoff)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+            if not self._pending:
+                continue
+            try:
+                await self.flush()
+                backoff = self.flush_interval
+            except Exception as e:
+                # Back off while the database is unhealthy
+                backoff = min(backoff * 2, 30.0)
+                logger.warning("Event buffer flush failed (%d pending): %s", len(self._pending), e)
+
+    def _remember(self, key):
+        self._recent_keys[key] = None
+        if len(self._recent_keys) > self._recent_limit:
+            self._recent_keys.popitem(last=False)
+
+
+async def insert_sessions(session, rows: list[dict]):
+    """Insert sessions whose (user_id, client_event_id) hasn't been claimed yet"""
+    result = await session.execute(
+        insert(PracticeSessionKey)
+        .values([{"user_id": row["user_id"], "client_event_id": row["client_event_id"]} for row in rows])
+        .on_conflict_do_nothing()
+        .returning(PracticeSessionKey.user_id, PracticeSessionKey.client_event_id)
+    )
+    claimed = {tuple(key) for key in result.all()}
+    fresh = []
+    for row in rows:
+        key = (row["user_id"], row["client_event_id"])
+        if key in claimed:
+            claimed.discard(key)
+            fresh.append(row)
+    if fresh:
+        await session.execute(insert(PracticeSession).values(fresh))
+
+
+async def insert_reviews(session, rows: list[dict]):
+    await session.execute(
+        insert(ReviewEvent).values(rows).on_conflict_do_nothing(index_elements=["user_id", "client_event_id"])
+    )
+
+
+async def write_events(batch: list[BufferedEvent], invalidation=None):
+    """Default writer: one idempotent multi-row insert per table, in one transaction"""
+
+    writers = {
+        "practice_sessions": insert_sessions,
+        "review_events": insert_reviews,
+    }
+    by_table: dict[str, list[dict]] = {}
+    for event in batch:
+        row = dict(event.values, user_id=event.user_id, client_event_id=event.client_event_id)
+        by_table.setdefault(event.table, []).append(row)
+
+    # New sessions change these users' cached daily stats
+    stale = [("stats", user_id) for user_id in {row["user_id"] for row in by_table.get("practice_sessions", ())}]
+
+    try:
+        async with AsyncSessionLocal() as session:
+            for table, rows in by_table.items():
+                await writers[table](session, rows)
+            if invalidation is not None and stale:
+                await invalidation.publish(session, *stale)
+            await session.commit()
+    except IntegrityError:
+        # A row references something that no longer exists (e.g. a deleted
+        # deck). Insert row by row so one bad event can't block the batch.
+        for table, rows in by_table.items():
+            for row in rows:
+                async with AsyncSessionLocal() as session:
+                    try:
+                        await writers[table](session, [row])
+                        await session.commit()
+                    except IntegrityError as e:
+                        await session.rollback()
+                        logger.warning("Dropping event %s: %s", row["client_event_id"], e.orig)
+        if invalidation is not None and stale:
+            async with AsyncSessionLocal() as session:
+                await invalidation.publish(session, *stale)
+                await session.commit()
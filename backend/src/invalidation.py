@@ -0,0 +1,134 @@
+"""
+Cross-worker cache invalidation over Postgres LISTEN/NOTIFY.
+
+Writers call ``publish(db, ("deck", deck_id), ...)`` inside their
+transaction. The local cache is evicted straight away, and a NOTIFY is
+queued on the same transaction, so Postgres delivers it to every worker only
+if the write commits. Each worker keeps one dedicated connection that
+LISTENs on the channel and evicts the named groups from its LocalCache.
+
+A worker whose listener is down might miss invalidations, so its cache is
+disabled until the listener reconnects, and it starts again empty.
+
+LISTEN needs a session-level connection. Behind pgbouncer in transaction
+mode, point INVALIDATION_DATABASE_URL at Postgres directly.
+"""
+import asyncio
+import json
+import logging
+import uuid
+
+from fastapi import Request
+from sqlalchemy import text
+
+from src.cache import LocalCache
+from src.database import asyncpg_dsn
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "cache_invalidation"
+# Postgres limits NOTIFY payloads to 8000 bytes
+MAX_GROUPS_PER_NOTIFY = 100
+KEEPALIVE_SECONDS = 30.0
+RECONNECT_MAX_SECONDS = 30.0
+
+_NOTIFY_SQL = text("SELECT pg_notify(:channel, :payload)")
+
+
+class InvalidationBus:
+    def __init__(self, cache: LocalCache, database_url: str | None = None):
+        self.cache = cache
+        self.database_url = database_url
+        self.worker_id = uuid.uuid4().hex[:12]
+        self._task: asyncio.Task | None = None
+        self._connection = None
+        self.received = 0
+        self.published = 0
+
+        # Without a listener other workers' writes are invisible, so only
+        # cache once it is connected
+        if database_url:
+            cache.enabled = False
+
+    async def publish(self, db, *groups: tuple):
+        """Evict groups locally and NOTIFY all workers when db's transaction commits"""
+        groups = [[kind, str(ident)] for kind, ident in groups]
+        for kind, ident in groups:
+            self.cache.evict_group(kind, ident)
+
+        if db is None or not self.database_url:
+            return
+        for start in range(0, len(groups), MAX_GROUPS_PER_NOTIFY):
+            payload = json.dumps({"w": self.worker_id, "g": groups[start:start + MAX_GROUPS_PER_NOTIFY]})
+            await db.execute(_NOTIFY_SQL, {"channel": CHANNEL, "payload": payload})
+        self.published += 1
+
+    def handle(self, payload: str):
+        """Apply one notification payload to the local cache"""
+        try:
+            message = json.loads(payload)
+            groups = message["g"]
+        except (ValueError, KeyError, TypeError):
+            logger.warning("Ignoring malformed invalidation payload", extra={"payload_chars": len(payload)})
+            return
+        self.received += 1
+        # Our own notifications are applied too: the early local eviction
+        # can race a reader that re-cached the pre-commit value
+        for kind, ident in groups:
+            self.cache.evict_group(kind, ident)
+
+    async def start(self):
+        if self.database_url and self._task is None:
+            self._task = asyncio.create_task(self._listen_forever())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _listen_forever(self):
+        import asyncpg
+
+        delay = 1.0
+        while True:
+            try:
+                self._connection = await asyncpg.connect(asyncpg_dsn(self.database_url))
+                await self._connection.add_listener(
+                    CHANNEL, lambda _conn, _pid, _channel, payload: self.handle(payload)
+                )
+                # Anything cached before now may have missed invalidations
+                self.cache.clear()
+                self.cache.enabled = True
+                delay = 1.0
+
+                while True:
+                    await asyncio.sleep(KEEPALIVE_SECONDS)
+                    await self._connection.execute("SELECT 1")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Invalidation listener disconnected, retrying in %.0fs: %s", delay, e)
+            finally:
+                self.cache.enabled = False
+                if self._connection is not None:
+                    try:
+                        await self._connection.close(timeout=1)
+                    except Exception:
+                        pass
+                    self._connection = None
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RECONNECT_MAX_SECONDS)
+
+
+def get_cache(request: Request) -> LocalCache:
+    """Dependency that provides the app's local cache"""
+    return request.app.state.cache
+
+
+def get_invalidation(request: Request) -> InvalidationBus:
+    """Dependency that provides the app's invalidation bus"""
+    return request.app.state.invalidation
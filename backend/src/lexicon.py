@@ -0,0 +1,188 @@
+"""
+Shared lexicon of word translations, across all users.
+
+Thousands of students generate flashcards for the same common words, and
+each generation used to pay the model to translate all of them again. The
+lexicon table remembers, per (word, source language, target language), the
+dictionary form, one-word translation and level (easy, medium, hard) the
+model gave. It also remembers words the model chose not to make a card of
+(articles, names, numbers).
+
+When a generation request names its source language:
+1. The text is tokenized locally and every distinct word is looked up in
+   one primary-key query.
+2. Known words become cards straight from the lexicon, and known non-words
+   are dropped. A deck only gets the words at or below its difficulty: an
+   easy deck the easy words, a hard deck every word. Known words without a
+   level (saved before levels, or by the enrichment worker) count as
+   unknown, so their level is asked for once.
+3. Only the unknown words are sent to the model, as a list rather than the
+   whole text. So the prompt and the reply shrink as the lexicon grows, and
+   a text made only of known words needs no model call at all.
+4. The model's answers, and the words it explicitly skipped, are written
+   back with the new deck. A word the reply leaves out or answers
+   incompletely is not recorded, so the next request asks about it again.
+
+Saved words feed it too. The enrichment worker (src/enrichment.py) asks for
+each word's languages, and one-word definitions are added to the lexicon.
+An existing translation is never overwritten.
+
+Languages written without spaces between words (Chinese, Japanese, Thai...)
+can't be split locally; their requests keep the whole-text prompt.
+"""
+import json
+import re
+import unicodedata
+from typing import NamedTuple
+
+from sqlalchemy import case, func, select, tuple_
+from sqlalchemy.dialects.postgresql import insert
+
+from src.metrics import LEXICON_WORDS
+from src.models import LexiconEntry
+
+# Word levels, the same values as a generation's difficulty
+LEVELS = ("easy", "medium", "hard")
+
+# ISO 639-1 / 639-3 codes
+LANGUAGE_PATTERN = "^[a-z]{2,3}$"
+SCRIPTIO_CONTINUA = {"zh", "ja", "th", "lo", "km", "my", "bo"}
+
+# Same limit as the lexicon.word column
+MAX_WORD_CHARS = 100
+# Words per model call; longer lists are split into several calls
+MAX_UNKNOWN_WORDS = 150
+
+# Runs of letters, with inner hyphens ("peut-être"); apostrophes split elisions ("l'eau")
+WORD_RE = re.compile(r"[^\W\d_]+(?:-[^\W\d_]+)*")
+
+
+class Translation(NamedTuple):
+    word: str  # normalize_word() form, as it appears in texts
+    lemma: str | None  # dictionary form; None if it is not a vocabulary word
+    translation: str | None
+    level: str | None = None  # one of LEVELS; None for a non-word
+
+
+def supports(source_language: str | None) -> bool:
+    """Whether texts in this language can be resolved through the lexicon"""
+    return source_language is not None and source_language not in SCRIPTIO_CONTINUA
+
+
+def normalize_word(word: str) -> str:
+    return unicodedata.normalize("NFC", word.strip()).lower()
+
+
+def tokenize(text: str) -> list[str]:
+    """Distinct normalized words of the text, in order of first appearance"""
+    words = {}
+    for match in WORD_RE.finditer(unicodedata.normalize("NFC", text)):
+        word = match.group().lower()
+        if 1 < len(word) <= MAX_WORD_CHARS:
+            words.setdefault(word, None)
+    return list(words)
+
+
+async def lookup(db, words: list[str], source_language: str, target_language: str) -> dict[str, Translation]:
+    """The lexicon's entries for these words; a word without a level is left out"""
+    if not words:
+        return {}
+    result = await db.execute(
+        select(LexiconEntry.word, LexiconEntry.lemma, LexiconEntry.translation, LexiconEntry.level).where(
+            tuple_(LexiconEntry.word, LexiconEntry.source_language, LexiconEntry.target_language).in_(
+                [(word, source_language, target_language) for word in words]
+            )
+        )
+    )
+    known = {row.word: Translation(*row) for row in result if row.lemma is None or row.level is not None}
+    LEXICON_WORDS.labels("known").inc(len(known))
+    LEXICON_WORDS.labels("unknown").inc(len(words) - len(known))
+    return known
+
+
+def build_prompt(words: list[str], source_language: str, target_language: str) -> str:
+    return f"""
+    Translate these vocabulary words from language "{source_language}" to language "{target_language}" for flashcards.
+
+    STRICT RULES:
+    1. Return one item for EVERY word
+    2. word: the word exactly as given
+    3. front: its dictionary form, ONE word (e.g., "chien" for "chiens")
+    4. back: ONE word translation (e.g., "dog")
+    5. level: how advanced the word is for a learner, "easy", "medium" or "hard"
+    6. Articles, pronouns, prepositions, conjunctions, numbers and proper names get "front": null and "back": null
+    7. Return ONLY valid JSON array, no markdown
+
+    Example: [{{"word": "chiens", "front": "chien", "back": "dog", "level": "easy"}}, {{"word": "les", "front": null, "back": null}}]
+
+    Words: {json.dumps(words, ensure_ascii=False)}
+    """
+
+
+def parse_translations(ai_response: str, words: list[str]) -> list[Translation]:
+    """Entries for the asked words the reply answers
+
+    A word marked skipped ("front": null) becomes a non-word (no lemma). A
+    word left out or answered incompletely gets no entry, so one bad reply
+    can't mark it a non-word for every user.
+    """
+    start, end = ai_response.find("["), ai_response.rfind("]")
+    items = json.loads(ai_response[start:end + 1]) if start != -1 else []
+
+    answered = {}
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        word = normalize_word(str(item.get("word") or ""))
+        if word in answered:
+            continue
+        if "front" in item and item["front"] is None:
+            answered[word] = Translation(word, None, None)
+            continue
+        front = str(item.get("front") or "").strip()[:MAX_WORD_CHARS]
+        back = str(item.get("back") or "").strip()[:MAX_WORD_CHARS]
+        level = str(item.get("level") or "").strip().lower()
+        if front and back and level in LEVELS:
+            answered[word] = Translation(word, front, back, level)
+    return [answered[word] for word in words if word in answered]
+
+
+def to_cards(words: list[str], entries: dict[str, Translation], difficulty: str = "medium") -> list[dict]:
+    """Flashcards for the words at or below the difficulty, in text order, one per dictionary form"""
+    levels = LEVELS[:LEVELS.index(difficulty) + 1]
+    cards = {}
+    for word in words:
+        entry = entries.get(word)
+        if entry is not None and entry.lemma and entry.level in levels:
+            cards.setdefault(entry.lemma.lower(), {"front": entry.lemma, "back": entry.translation})
+    return list(cards.values())
+
+
+def record_statement(entries: list[Translation], source_language: str, target_language: str, source: str):
+    """Insert new entries; a known non-word is upgraded, a missing level filled in, a translation never replaced"""
+    rows = {
+        entry.word: {
+            "word": entry.word,
+            "source_language": source_language,
+            "target_language": target_language,
+            "lemma": entry.lemma,
+            "translation": entry.translation,
+            "level": entry.level,
+            "source": source,
+        }
+        for entry in entries
+    }
+    statement = insert(LexiconEntry).values(list(rows.values()))
+    excluded = statement.excluded
+    upgraded = LexiconEntry.translation.is_(None)
+    return statement.on_conflict_do_update(
+        index_elements=["word", "source_language", "target_language"],
+        set_={
+            "lemma": func.coalesce(LexiconEntry.lemma, excluded.lemma),
+            "translation": func.coalesce(LexiconEntry.translation, excluded.translation),
+            "level": func.coalesce(LexiconEntry.level, excluded.level),
+            "source": case((upgraded, excluded.source), else_=LexiconEntry.source),
+        },
+        where=(upgraded & excluded.translation.isnot(None))
+        | (LexiconEntry.level.is_(None) & excluded.level.isnot(None)),
+    )
@@ -0,0 +1,106 @@
+"""
+LLM client shared by the AI endpoints.
+
+One AsyncAnthropic client is created by the app lifespan and reused for
+every request (connection pooling, no per-request client construction),
+and calls no longer block the event loop.
+
+Calls are streamed so time-to-first-token can be measured; latency, TTFT
+and token usage are recorded per calling endpoint (see src/metrics.py).
+Callers that relay the reply as it is written (the conversation WebSocket)
+pass ``on_text``, which is awaited with each text delta.
+Offline, the API can be swapped for recorded streams (src/llm_transport.py).
+"""
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+
+from anthropic import AsyncAnthropic
+from fastapi import Request
+
+from src.metrics import LLM_REQUEST_SECONDS, LLM_TTFT_SECONDS, LLM_TOKENS
+
+DEFAULT_MODEL = "claude-sonnet-4-20250514"
+
+
+class LLMNotConfiguredError(Exception):
+    """Raised when an AI endpoint is called without ANTHROPIC_API_KEY"""
+
+
+@dataclass
+class Completion:
+    text: str
+    model: str
+    input_tokens: int = 0
+    output_tokens: int = 0
+
+
+class LLMClient:
+    def __init__(self, api_key: str | None = None, client=None, base_url: str | None = None):
+        self._client = client
+        if self._client is None and api_key:
+            # base_url points at a compatible server, e.g. benchmarks/fake_llm.py
+            self._client = AsyncAnthropic(api_key=api_key, base_url=base_url)
+
+    @property
+    def configured(self) -> bool:
+        return self._client is not None
+
+    async def complete(
+        self,
+        messages: list[dict],
+        max_tokens: int,
+        system: str | None = None,
+        model: str = DEFAULT_MODEL,
+        endpoint: str = "other",
+        on_text: Callable[[str], Awaitable[None]] | None = None,
+    ) -> Completion:
+        if self._client is None:
+            raise LLMNotConfiguredError("ANTHROPIC_API_KEY not configured")
+
+        kwargs = {"model": model, "max_tokens": max_tokens, "messages": messages, "stream": True}
+        if system is not None:
+            kwargs["system"] = system
+
+        start = time.perf_counter()
+        outcome = "error"
+        completion = Completion(text="", model=model)
+        try:
+            completion = await self._stream(kwargs, endpoint, start, on_text)
+            outcome = "ok"
+            return completion
+        finally:
+            LLM_REQUEST_SECONDS.labels(endpoint, completion.model, outcome).observe(time.perf_counter() - start)
+            LLM_TOKENS.labels(endpoint, completion.model, "input").inc(completion.input_tokens)
+            LLM_TOKENS.labels(endpoint, completion.model, "output").inc(completion.output_tokens)
+
+    async def _stream(self, kwargs: dict, endpoint: str, start: float, on_text=None) -> Completion:
+        completion = Completion(text="", model=kwargs["model"])
+        parts = []
+        first_token = True
+        stream = await self._client.messages.create(**kwargs)
+        async for event in stream:
+            if event.type == "message_start":
+                completion.model = event.message.model or completion.model
+                completion.input_tokens = event.message.usage.input_tokens or 0
+            elif event.type == "content_block_delta" and event.delta.type == "text_delta":
+                if first_token:
+                    first_token = False
+                    LLM_TTFT_SECONDS.labels(endpoint, completion.model).observe(time.perf_counter() - start)
+                parts.append(event.delta.text)
+                if on_text is not None:
+                    await on_text(event.delta.text)
+            elif event.type == "message_delta":
+                # Cumulative output token count
+                completion.output_tokens = event.usage.output_tokens or 0
+        completion.text = "".join(parts)
+        return completion
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.close()
+
+
+def get_llm(request: Request) -> LLMClient:
+    """Dependency that provides the app's LLM client"""
+    return request.app.state.llm
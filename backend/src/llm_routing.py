@@ -0,0 +1,359 @@
+"""
+Model routing, deadlines, hedging and circuit breaking for LLM calls.
+
+``RoutingPolicy`` picks a model tier for each call. Easy or short flashcard
+extractions and low-immersion conversation turns go to the fast tier. Hard
+or long extractions, fully immersive turns and long histories go to the
+strong tier. Each Route also carries a deadline for the whole call.
+
+``LLMRouter.complete(route, ...)`` makes the call:
+- Deadline: the call is cancelled when the route's deadline passes and the
+  caller gets a 504, instead of hanging on a slow upstream.
+- Hedging: once a (model, endpoint) pair has enough history, a call still
+  running after that pair's rolling p95 latency gets a second, identical
+  request. The first one to finish wins and the other is cancelled. Hedges
+  are capped at a fraction of all calls (LLM_HEDGE_RATIO) so a slow
+  upstream isn't sent twice the traffic. Streamed calls (``on_text``) are
+  never hedged, since both attempts would write to the same client.
+- Circuit breaking: each model has a breaker. It opens when at least half
+  of its recent calls failed with upstream errors (5xx, 429, connection
+  errors, deadlines). While it is open, calls go to the other tier if that
+  one is healthy. Otherwise they fail at once with 503 + Retry-After. After
+  the cooldown a single probe call is let through, and its result closes
+  or reopens the breaker.
+
+Every call, whatever its outcome, is recorded in the usage ledger
+(src/usage.py) for the ``user_id`` it was made for.
+
+Like src/ratelimit.py, everything is in-process and takes an injectable
+clock.
+"""
+import asyncio
+import math
+import time
+from collections import deque
+from dataclasses import dataclass
+
+import anthropic
+from fastapi import HTTPException, Request
+
+from src.llm import DEFAULT_MODEL, Completion, LLMClient
+from src.metrics import LLM_CIRCUIT_OPEN, LLM_DEADLINE_EXCEEDED, LLM_HEDGES
+from src.tokens import TokenBudget, estimate_tokens, record
+
+FAST_MODEL = "claude-3-5-haiku-20241022"
+
+
+class LLMDeadlineExceeded(HTTPException):
+    def __init__(self, deadline: float):
+        super().__init__(status_code=504, detail=f"AI service did not respond within {deadline:g}s")
+
+
+class CircuitOpen(HTTPException):
+    def __init__(self, retry_after: float):
+        self.retry_after = max(1, math.ceil(retry_after))
+        super().__init__(
+            status_code=503,
+            detail="AI service is unavailable, please retry shortly",
+            headers={"Retry-After": str(self.retry_after)},
+        )
+
+
+@dataclass(frozen=True)
+class Route:
+    model: str
+    fallback: str | None
+    deadline: float  # seconds for the whole call, hedges included
+
+
+class RoutingPolicy:
+    def __init__(
+        self,
+        fast_model: str = FAST_MODEL,
+        strong_model: str = DEFAULT_MODEL,
+        generation_deadline: float = 90.0,
+        conversation_deadline: float = 30.0,
+        short_text_tokens: int = 500,
+        long_history_tokens: int = 2_000,
+    ):
+        self.fast_model = fast_model
+        self.strong_model = strong_model
+        self.generation_deadline = generation_deadline
+        self.conversation_deadline = conversation_deadline
+        self.short_text_tokens = short_text_tokens
+        self.long_history_tokens = long_history_tokens
+
+    def _route(self, strong: bool, deadline: float) -> Route:
+        if strong:
+            return Route(self.strong_model, self.fast_model, deadline)
+        return Route(self.fast_model, self.strong_model, deadline)
+
+    def generation(self, difficulty: str, text: str) -> Route:
+        """Flashcard extraction: easy or short medium texts don't need the strong model"""
+        short = estimate_tokens(text) <= self.short_text_tokens
+        strong = difficulty == "hard" or (difficulty == "medium" and not short)
+        return self._route(strong, self.generation_deadline)
+
+    def enrichment(self) -> Route:
+        """Background word enrichment: simple output, nobody waiting on it"""
+        return self._route(False, self.generation_deadline)
+
+    def conversation(self, immersion_level: int, history_tokens: int) -> Route:
+        """Tutor turn: native-level immersion and long histories get the strong model"""
+        strong = immersion_level > 66 or history_tokens > self.long_history_tokens
+        return self._route(strong, self.conversation_deadline)
+
+
+class LatencyWindow:
+    """The most recent call latencies for one (model, endpoint)"""
+
+    def __init__(self, size: int = 200):
+        self._samples: deque[float] = deque(maxlen=size)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def add(self, seconds: float):
+        self._samples.append(seconds)
+
+    def percentile(self, q: float) -> float:
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))]
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_ratio: float = 0.5,
+        min_calls: int = 10,
+        window: int = 20,
+        cooldown: float = 30.0,
+        clock=time.monotonic,
+    ):
+        self.failure_ratio = failure_ratio
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+        self._clock = clock
+        self._results: deque[bool] = deque(maxlen=window)
+        self.state = self.CLOSED
+        self.opened_at = 0.0
+        self._probing = False
+        self.opened = 0
+
+    def allow(self) -> bool:
+        """Whether a call may go through now (half-open lets a single probe through)"""
+        if self.state == self.OPEN and self._clock() - self.opened_at >= self.cooldown:
+            self.state = self.HALF_OPEN
+            self._probing = False
+        if self.state == self.HALF_OPEN:
+            if self._probing:
+                return False
+            self._probing = True
+        return self.state != self.OPEN
+
+    def retry_after(self) -> float:
+        if self.state == self.OPEN:
+            return self.cooldown - (self._clock() - self.opened_at)
+        return 1.0
+
+    def record(self, ok: bool):
+        if self.state == self.HALF_OPEN:
+            self._probing = False
+            if ok:
+                self.state = self.CLOSED
+                self._results.clear()
+            else:
+                self._open()
+            return
+
+        self._results.append(ok)
+        failures = self._results.count(False)
+        if len(self._results) >= self.min_calls and failures / len(self._results) >= self.failure_ratio:
+            self._open()
+
+    def release(self):
+        """The probe ended without a result (e.g. the client went away)"""
+        self._probing = False
+
+    def _open(self):
+        self.state = self.OPEN
+        self.opened_at = self._clock()
+        self.opened += 1
+        self._results.clear()
+
+
+def is_upstream_failure(error: BaseException) -> bool:
+    """Errors that say the model is unhealthy (not that our request was bad)"""
+    if isinstance(error, (anthropic.APIConnectionError, TimeoutError)):
+        return True
+    if isinstance(error, anthropic.APIStatusError):
+        return error.status_code >= 500 or error.status_code == 429
+    return False
+
+
+class LLMRouter:
+    def __init__(
+        self,
+        llm: LLMClient,
+        policy: RoutingPolicy | None = None,
+        hedge_ratio: float = 0.05,
+        hedge_min_samples: int = 20,
+        hedge_min_delay: float = 0.5,
+        breaker_cooldown: float = 30.0,
+        ledger=None,
+        clock=time.monotonic,
+    ):
+        self.llm = llm
+        self.ledger = ledger  # src/usage.UsageLedger
+        self.policy = policy or RoutingPolicy()
+        self.hedge_ratio = hedge_ratio
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_min_delay = hedge_min_delay
+        self.breaker_cooldown = breaker_cooldown
+        self._clock = clock
+        self._latencies: dict[tuple[str, str], LatencyWindow] = {}
+        self.breakers: dict[str, CircuitBreaker] = {}
+
+        # Counters for monitoring
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.fallbacks = 0
+        self.deadlines_exceeded = 0
+
+    def breaker(self, model: str) -> CircuitBreaker:
+        breaker = self.breakers.get(model)
+        if breaker is None:
+            breaker = self.breakers[model] = CircuitBreaker(cooldown=self.breaker_cooldown, clock=self._clock)
+        return breaker
+
+    def _pick_model(self, route: Route) -> str:
+        if self.breaker(route.model).allow():
+            return route.model
+        if route.fallback and self.breaker(route.fallback).allow():
+            self.fallbacks += 1
+            return route.fallback
+        retry_after = min(self.breaker(m).retry_after() for m in (route.model, route.fallback) if m)
+        raise CircuitOpen(retry_after)
+
+    def _hedge_delay(self, model: str, endpoint: str) -> float | None:
+        window = self._latencies.get((model, endpoint))
+        if self.hedge_ratio <= 0 or window is None or len(window) < self.hedge_min_samples:
+            return None
+        if self.hedges + 1 > self.hedge_ratio * self.calls:
+            return None
+        return max(self.hedge_min_delay, window.percentile(95))
+
+    async def check_quota(self, user_id):
+        """Raise 429 once the user has used their daily tokens (see src/usage.py)"""
+        if self.ledger is not None:
+            await self.ledger.check_quota(user_id)
+
+    async def complete(
+        self,
+        route: Route,
+        endpoint: str = "other",
+        budget: TokenBudget | None = None,
+        user_id=None,
+        **kwargs
+    ) -> Completion:
+        """Call the routed model within the route's deadline, hedging slow calls"""
+        # The budget sets max_tokens, and its estimate is logged against the usage
+        if budget is not None:
+            kwargs["max_tokens"] = budget.max_tokens
+        model = self._pick_model(route)
+        breaker = self.breaker(model)
+        self.calls += 1
+        recorded = False
+        outcome, completion = "cancelled", None
+        start = self._clock()
+        try:
+            async with asyncio.timeout(route.deadline):
+                completion = await self._hedged(model, endpoint, kwargs)
+        except TimeoutError:
+            breaker.record(False)
+            recorded = True
+            outcome = "deadline"
+            self.deadlines_exceeded += 1
+            LLM_DEADLINE_EXCEEDED.labels(endpoint, model).inc()
+            raise LLMDeadlineExceeded(route.deadline)
+        except Exception as e:
+            outcome = "error"
+            if is_upstream_failure(e):
+                breaker.record(False)
+                recorded = True
+            raise
+        else:
+            breaker.record(True)
+            recorded = True
+            outcome = "ok"
+            if budget is not None:
+                record(endpoint, budget, completion)
+            return completion
+        finally:
+            if not recorded:
+                breaker.release()
+            LLM_CIRCUIT_OPEN.labels(model).set(1 if breaker.state == CircuitBreaker.OPEN else 0)
+            if self.ledger is not None:
+                await self.ledger.record(user_id, endpoint, model, outcome, self._clock() - start, completion)
+
+    async def _call(self, model: str, endpoint: str, kwargs: dict) -> Completion:
+        start = self._clock()
+        completion = await self.llm.complete(model=model, endpoint=endpoint, **kwargs)
+        self._latencies.setdefault((model, endpoint), LatencyWindow()).add(self._clock() - start)
+        return completion
+
+    async def _hedged(self, model: str, endpoint: str, kwargs: dict) -> Completion:
+        delay = None if kwargs.get("on_text") else self._hedge_delay(model, endpoint)
+        if delay is None:
+            return await self._call(model, endpoint, kwargs)
+
+        primary = asyncio.create_task(self._call(model, endpoint, kwargs))
+        pending = {primary}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=delay)
+            if not done:
+                self.hedges += 1
+                LLM_HEDGES.labels(endpoint, model).inc()
+                pending.add(asyncio.create_task(self._call(model, endpoint, kwargs)))
+
+            # First success wins; fail only when every attempt has failed
+            while True:
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+                if not pending:
+                    raise error
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "fallbacks": self.fallbacks,
+            "deadlines_exceeded": self.deadlines_exceeded,
+            "breakers": {
+                model: {"state": breaker.state, "opened": breaker.opened}
+                for model, breaker in self.breakers.items()
+            },
+            "p95_seconds": {
+                f"{model}:{endpoint}": round(window.percentile(95), 3)
+                for (model, endpoint), window in self._latencies.items()
+            },
+        }
+
+
+def get_llm_router(request: Request) -> LLMRouter:
+    """Dependency that provides the app's model router"""
+    return request.app.state.llm_router
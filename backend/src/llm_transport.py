@@ -0,0 +1,174 @@
+"""
+Record/replay transports for the LLM client.
+
+LLMClient only needs an object with ``messages.create(**kwargs)`` returning
+a stream of events and ``close()``. Normally that is AsyncAnthropic. With
+LLM_TRANSPORT set, it is one of these instead:
+
+- ``record``: calls the real API and appends each completed stream to the
+  LLM_CASSETTE file. Every event is stored with its offset from the start of
+  the call, so time to first token and token pacing are kept.
+- ``replay``: serves streams from the cassette without any network access.
+  Events are replayed at their recorded offsets, scaled by LLM_REPLAY_SPEED
+  (1 = as recorded, 0 = no delays).
+
+Interactions are keyed by a fingerprint of the request: model, max_tokens,
+system and messages as canonical JSON. If one request was recorded several
+times, replay returns the recordings in turn. A request that was never
+recorded raises CassetteMissError rather than calling out.
+
+A cassette is JSON lines, one interaction per line, and the request is
+stored next to its fingerprint so the file can be read and edited by hand.
+Because prompts include user text, keep cassettes to test data.
+"""
+import asyncio
+import hashlib
+import itertools
+import json
+import os
+import time
+from types import SimpleNamespace
+
+from anthropic import AsyncAnthropic
+
+TRANSPORTS = ("live", "record", "replay")
+
+
+class CassetteMissError(LookupError):
+    """Raised in replay mode for a request the cassette has no recording of"""
+
+
+def fingerprint(request: dict) -> str:
+    """Stable id of an LLM request; ignores ``stream`` and key order"""
+    relevant = {key: value for key, value in request.items() if key != "stream"}
+    canonical = json.dumps(relevant, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def to_plain(value):
+    """An SDK event (pydantic model or namespace) as JSON-compatible data"""
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json")
+    if isinstance(value, SimpleNamespace):
+        value = vars(value)
+    if isinstance(value, dict):
+        return {key: to_plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_plain(item) for item in value]
+    return value
+
+
+def to_event(value):
+    """Recorded event data back into attribute access, as LLMClient reads it"""
+    if isinstance(value, dict):
+        return SimpleNamespace(**{key: to_event(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return [to_event(item) for item in value]
+    return value
+
+
+class Cassette:
+    """Recorded interactions in a JSON-lines file, indexed by request fingerprint"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._interactions: dict[str, list[dict]] = {}
+        self._cursors: dict[str, itertools.cycle] = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        self._add(json.loads(line))
+
+    def __len__(self) -> int:
+        return sum(len(recordings) for recordings in self._interactions.values())
+
+    def _add(self, interaction: dict):
+        self._interactions.setdefault(interaction["fingerprint"], []).append(interaction)
+        self._cursors.pop(interaction["fingerprint"], None)
+
+    def next(self, key: str) -> dict:
+        if key not in self._interactions:
+            raise CassetteMissError(f"No recorded LLM completion for request {key[:12]} in {self.path}")
+        if key not in self._cursors:
+            self._cursors[key] = itertools.cycle(self._interactions[key])
+        return next(self._cursors[key])
+
+    def append(self, request: dict, events: list[dict]):
+        interaction = {
+            "fingerprint": fingerprint(request),
+            "request": {key: value for key, value in request.items() if key != "stream"},
+            "events": events,
+        }
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(interaction, ensure_ascii=False, default=str) + "\n")
+        self._add(interaction)
+
+
+class RecordingTransport:
+    """Passes calls to a real client and records each completed stream"""
+
+    def __init__(self, client, cassette: Cassette):
+        self.client = client
+        self.cassette = cassette
+        # Same shape as AsyncAnthropic: transport.messages.create(...)
+        self.messages = self
+
+    async def create(self, **kwargs):
+        start = time.perf_counter()
+        stream = await self.client.messages.create(**kwargs)
+        return self._record(kwargs, stream, start)
+
+    async def _record(self, request: dict, stream, start: float):
+        events = []
+        async for event in stream:
+            events.append({"t": round(time.perf_counter() - start, 4), "event": to_plain(event)})
+            yield event
+        # Only streams that ran to the end are stored
+        self.cassette.append(request, events)
+
+    async def close(self):
+        await self.client.close()
+
+
+class ReplayTransport:
+    """Serves recorded streams, with their timing, without touching the network"""
+
+    def __init__(self, cassette: Cassette, speed: float = 1.0):
+        self.cassette = cassette
+        self.speed = speed
+        self.messages = self
+
+    async def create(self, **kwargs):
+        interaction = self.cassette.next(fingerprint(kwargs))
+        return self._replay(interaction["events"], time.perf_counter())
+
+    async def _replay(self, events: list[dict], start: float):
+        for recorded in events:
+            if self.speed > 0:
+                delay = start + recorded["t"] * self.speed - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            yield to_event(recorded["event"])
+
+    async def close(self):
+        pass
+
+
+def open_transport(settings):
+    """The client LLMClient should use for LLM_TRANSPORT, or None for the live API"""
+    mode = settings.llm_transport
+    if mode not in TRANSPORTS:
+        raise ValueError(f"LLM_TRANSPORT must be one of {', '.join(TRANSPORTS)}, not {mode!r}")
+    if mode == "live":
+        return None
+    if not settings.llm_cassette:
+        raise ValueError(f"LLM_TRANSPORT={mode} needs LLM_CASSETTE (a .jsonl path)")
+
+    cassette = Cassette(settings.llm_cassette)
+    if mode == "replay":
+        return ReplayTransport(cassette, speed=settings.llm_replay_speed)
+    if not settings.anthropic_api_key:
+        raise ValueError("LLM_TRANSPORT=record needs ANTHROPIC_API_KEY")
+    client = AsyncAnthropic(api_key=settings.anthropic_api_key, base_url=settings.anthropic_base_url)
+    return RecordingTransport(client, cassette)
@@ -0,0 +1,237 @@
+"""
+Structured JSON logging.
+
+Modules log through ``logging.getLogger(__name__)`` as usual. Records under
+the ``src`` logger go to a QueueHandler, so the event loop only pays for
+building the record and a non-blocking put. A QueueListener thread formats
+each record as one JSON line and writes it to stdout. When the queue is full
+(stdout is stuck), records are dropped and counted rather than blocking.
+
+The calling side does only what can't wait: it attaches the request id
+(from RequestIdMiddleware), samples high-volume records that carry an
+``event`` field (LOG_SAMPLE_RATES="request=0.1,session_saved=0.5"; warnings
+and errors are never sampled), and renders the message and traceback.
+Redaction runs on the listener thread, before anything is written: fields
+like ``text`` or ``messages`` are replaced by their length, and keys,
+bearer tokens and emails are masked in messages, fields and tracebacks.
+
+Structured fields go in ``extra``:
+    logger.info("Generated flashcards", extra={"deck_id": deck.id, "cards": 12})
+"""
+import atexit
+import json
+import logging
+import queue
+import random
+import re
+import sys
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements.txt
+    orjson = None
+
+LOGGER_NAME = "src"
+QUEUE_SIZE = 10_000
+
+# extra fields that may hold user-written text
+REDACTED_FIELDS = frozenset({
+    "text", "content", "messages", "message_text", "source_text", "first_message", "transcript", "ai_response",
+})
+_SECRET_PATTERNS = [
+    (re.compile(r"sk-ant-[A-Za-z0-9_\-]+"), "sk-ant-[redacted]"),
+    (re.compile(r"(?i)bearer\s+[A-Za-z0-9._\-]+"), "Bearer [redacted]"),
+    (re.compile(r"eyJ[A-Za-z0-9_\-]+\.[A-Za-z0-9_\-]+\.[A-Za-z0-9_\-]*"), "[jwt]"),
+    (re.compile(r"[A-Za-z0-9._%+\-]+@[A-Za-z0-9.\-]+\.[A-Za-z]{2,}"), "[email]"),
+]
+_REQUEST_ID_RE = re.compile(r"^[A-Za-z0-9._\-]{1,64}$")
+
+# LogRecord attributes that are not user-supplied extra fields
+_RECORD_ATTRS = frozenset(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id", "sample_rate"}
+
+request_id_var: ContextVar[str | None] = ContextVar("request_id", default=None)
+
+
+def scrub(text: str) -> str:
+    for pattern, replacement in _SECRET_PATTERNS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+def parse_sample_rates(value: str) -> dict[str, float]:
+    """"request=0.1,session_saved=0.5" -> {"request": 0.1, "session_saved": 0.5}"""
+    rates = {}
+    for item in value.split(","):
+        if "=" in item:
+            name, rate = item.split("=", 1)
+            rates[name.strip()] = min(max(float(rate), 0.0), 1.0)
+    return rates
+
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a fraction of records whose ``event`` has a configured sample rate"""
+
+    def __init__(self, rates: dict[str, float] | None = None, rand=random.random):
+        super().__init__()
+        self.rates = rates or {}
+        self._rand = rand
+
+    def filter(self, record):
+        rate = self.rates.get(getattr(record, "event", None))
+        if rate is None or record.levelno >= logging.WARNING:
+            return True
+        if self._rand() >= rate:
+            return False
+        # So counts can be scaled back up
+        record.sample_rate = rate
+        return True
+
+
+def redact(entry: dict) -> dict:
+    for key, value in entry.items():
+        if key in REDACTED_FIELDS:
+            entry[key] = {"redacted": True, "chars": len(str(value))}
+        elif isinstance(value, str):
+            entry[key] = scrub(value)
+    return entry
+
+
+class JSONFormatter(logging.Formatter):
+    """One redacted JSON object per record (runs on the listener thread)"""
+
+    def format(self, record) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS or key in ("request_id", "sample_rate"):
+                if value is not None:
+                    entry[key] = value
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        redact(entry)
+        if orjson is not None:
+            return orjson.dumps(entry, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler that drops (and counts) records instead of blocking when the queue is full"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Freeze the message args and traceback while they are still valid.
+        # The record is ours alone (one handler, no propagation), so it is
+        # updated in place rather than copied.
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_handler: NonBlockingQueueHandler | None = None
+_listener: QueueListener | None = None
+_sampler = SamplingFilter()
+
+
+def configure_logging(level: str = "INFO", sample_rates: dict[str, float] | None = None, stream=None):
+    """Route the app's loggers through the queue; safe to call more than once"""
+    global _handler, _listener
+
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.setLevel(level.upper())
+    _sampler.rates = sample_rates or {}
+    if _handler is not None:
+        return logger
+
+    log_queue = queue.Queue(maxsize=QUEUE_SIZE)
+    _handler = NonBlockingQueueHandler(log_queue)
+    for log_filter in (RequestIdFilter(), _sampler):
+        _handler.addFilter(log_filter)
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JSONFormatter())
+    _listener = QueueListener(log_queue, output)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+    logger.addHandler(_handler)
+    logger.propagate = False
+    return logger
+
+
+def stop_logging():
+    """Write out everything queued and detach the queue handler"""
+    global _handler, _listener
+    if _listener is not None:
+        _listener.stop()
+        atexit.unregister(_listener.stop)
+        logging.getLogger(LOGGER_NAME).removeHandler(_handler)
+    _handler = _listener = None
+
+
+def dropped_count() -> int:
+    return _handler.dropped if _handler is not None else 0
+
+
+class RequestIdMiddleware:
+    """Tag each request (and its log records) with an id, logging a sampled summary line"""
+
+    def __init__(self, app):
+        self.app = app
+        self.logger = logging.getLogger(f"{LOGGER_NAME}.access")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = dict(scope.get("headers", ())).get(b"x-request-id", b"").decode("latin-1")
+        request_id = incoming if _REQUEST_ID_RE.match(incoming) else uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+        status = 500
+
+        async def send_with_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message = {**message, "headers": [*message.get("headers", []), (b"x-request-id", request_id.encode())]}
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            route = scope.get("route")
+            self.logger.info("Request handled", extra={
+                "event": "request",
+                "method": scope["method"],
+                "route": route.path if route is not None else scope["path"],
+                "status": status,
+                "duration_ms": round((time.perf_counter() - start) * 1000, 1),
+            })
+            request_id_var.reset(token)
@@ -0,0 +1,296 @@
+"""
+Prometheus-style metrics, rendered in the text exposition format at /metrics.
+
+Collectors are plain objects updated with attribute arithmetic: no locks, no
+allocation after a label set's first use (children are cached by label
+values). Every writer runs on the event loop thread, including the pool
+checkout hook, which SQLAlchemy calls from a greenlet on that thread.
+
+Metrics are module-level like the engine they partly describe, so the
+connection pool and the LLM client can record without reaching app state.
+"""
+import bisect
+import hmac
+import time
+
+from fastapi import HTTPException, Request
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+LLM_BUCKETS = (0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0, 120.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+RATIO_BUCKETS = (0.25, 0.5, 0.75, 0.9, 1.1, 1.25, 1.5, 2.0, 4.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), registry: "Registry | None" = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple, object] = {}
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def labels(self, *values):
+        values = tuple(str(v) for v in values)
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            child = self._children[values] = self._new_child()
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in list(self._children.items()):
+            lines.extend(self._render_child(values, child))
+        return lines
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1.0):
+        self._children[()].inc(amount)
+
+    def _render_child(self, values, child):
+        return [f"{self.name}{_labels(self.labelnames, values)} {_number(child.value)}"]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0):
+        self._children[()].dec(amount)
+
+    def set(self, value: float):
+        self._children[()].set(value)
+
+
+class CallbackGauge(_Metric):
+    """Gauge whose values are read from fn() -> {label values: value} at render time"""
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, fn, labelnames: tuple = (), registry: "Registry | None" = None):
+        self.fn = fn
+        super().__init__(name, documentation, labelnames, registry)
+        self._children.clear()
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        try:
+            values = self.fn()
+        except Exception:
+            values = {}
+        for label_values, value in values.items():
+            lines.append(f"{self.name}{_labels(self.labelnames, label_values)} {_number(value)}")
+        return lines
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: tuple):
+        self.bounds = bounds
+        # One slot per bound plus +Inf; made cumulative when rendered
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    def time(self):
+        return _Timer(self)
+
+
+class _Timer:
+    __slots__ = ("child", "start")
+
+    def __init__(self, child):
+        self.child = child
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.child.observe(time.perf_counter() - self.start)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS,
+                 registry: "Registry | None" = None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self._children[()].observe(value)
+
+    def time(self):
+        return self._children[()].time()
+
+    def _render_child(self, values, child):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), child.counts):
+            cumulative += count
+            le = f'le="{_number(bound)}"'
+            lines.append(f"{self.name}_bucket{_labels(self.labelnames, values, le)} {cumulative}")
+        lines.append(f"{self.name}_sum{_labels(self.labelnames, values)} {_number(child.sum)}")
+        lines.append(f"{self.name}_count{_labels(self.labelnames, values)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+
+    def get(self, name: str) -> _Metric:
+        return self._metrics[name]
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template",
+    ("method", "route", "status"),
+)
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests being handled", ("method",))
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request", "SQL statements run per HTTP request", ("route",), buckets=QUERY_COUNT_BUCKETS,
+)
+DB_QUERY_SECONDS = Counter("db_query_seconds_total", "Time spent in SQL statements by route", ("route",))
+DB_POOL_CHECKOUT_SECONDS = Histogram(
+    "db_pool_checkout_seconds", "Time waiting for a pooled database connection (including connects)",
+)
+LLM_REQUEST_SECONDS = Histogram(
+    "llm_request_duration_seconds", "LLM call latency", ("endpoint", "model", "outcome"), buckets=LLM_BUCKETS,
+)
+LLM_TTFT_SECONDS = Histogram(
+    "llm_time_to_first_token_seconds", "Time until the first streamed LLM token", ("endpoint", "model"),
+    buckets=LLM_BUCKETS,
+)
+LLM_TOKENS = Counter("llm_tokens_total", "LLM tokens used", ("endpoint", "model", "direction"))
+LLM_TOKEN_ESTIMATE_RATIO = Histogram(
+    "llm_token_estimate_ratio", "Actual / locally estimated LLM tokens per call", ("endpoint", "direction"),
+    buckets=RATIO_BUCKETS,
+)
+LLM_HEDGES = Counter("llm_hedged_requests_total", "Second LLM requests sent after the p95 delay", ("endpoint", "model"))
+LLM_DEADLINE_EXCEEDED = Counter(
+    "llm_deadline_exceeded_total", "LLM calls cancelled at their deadline", ("endpoint", "model"),
+)
+LLM_CIRCUIT_OPEN = Gauge("llm_circuit_open", "1 while the model's circuit breaker is open", ("model",))
+CONVERSATION_OPENERS = Counter(
+    "conversation_opener_lookups_total", "First turns looked up in the pre-generated openers", ("result",),
+)
+LEXICON_WORDS = Counter(
+    "lexicon_words_total", "Distinct words of generation texts by whether the shared lexicon knew them", ("result",),
+)
+AUTH_REQUESTS = Counter(
+    "auth_requests_total", "Requests by access token check result (cached, verified, invalid, ...)", ("result",),
+)
+WS_CONNECTIONS = Gauge("websocket_connections", "Open conversation WebSockets")
+WS_MESSAGES = Counter("websocket_messages_total", "Conversation WebSocket frames received by type", ("type",))
+
+
+def route_label(scope) -> str:
+    """Route template for a handled request (not the raw path, to bound cardinality)"""
+    route = scope.get("route")
+    return route.path if route is not None else "unmatched"
+
+
+class MetricsMiddleware:
+    """Record latency and in-flight counts for every HTTP request"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        in_flight = HTTP_IN_FLIGHT.labels(method)
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            in_flight.dec()
+            HTTP_REQUEST_SECONDS.labels(method, route_label(scope), status).observe(time.perf_counter() - start)
+
+
+def check_metrics_access(request: Request):
+    """Require `Authorization: Bearer <METRICS_TOKEN>` when a metrics token is configured"""
+    token = request.app.state.settings.metrics_token
+    if token and not hmac.compare_digest(request.headers.get("authorization", "").encode(), f"Bearer {token}".encode()):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
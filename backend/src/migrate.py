@@ -0,0 +1,161 @@
+"""
+Migration runner for backend/migrations.
+
+MIGRATIONS lists the SQL files in the order they must run. Applied files are
+recorded in schema_migrations with a checksum, so each one runs once, and a
+file that was edited after it was applied is reported instead of silently
+skipped. Each file runs in its own transaction, under an advisory lock so
+several workers or deploy hooks can't apply the same migration twice.
+
+The files are idempotent (IF NOT EXISTS), so running this against a
+database that was set up by hand only records them.
+
+decks, flashcards and words are created by the hosting project (Supabase),
+not by these files.
+
+Usage, from backend/:
+    python -m src.migrate            apply pending migrations
+    python -m src.migrate --status   list applied and pending migrations
+
+Uses MIGRATIONS_DATABASE_URL if set (a direct, non-pgbouncer connection),
+otherwise DATABASE_URL.
+"""
+import asyncio
+import hashlib
+import os
+import sys
+from pathlib import Path
+
+from src.database import asyncpg_dsn
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "migrations"
+
+# Append new files at the end; never reorder or rename applied ones
+MIGRATIONS = (
+    "create_practice_tables.sql",
+    "add_session_type_column.sql",
+    "create_review_events.sql",
+    "add_words_lower_word_index.sql",
+    "rename_session_type_to_practice_type.sql",
+    "add_core_indexes.sql",
+    "create_conversation_sessions.sql",
+    "create_conversation_openers.sql",
+    "add_words_enrichment.sql",
+    "create_lexicon.sql",
+    "create_llm_usage.sql",
+    "partition_practice_sessions.sql",
+    "create_practice_session_keys.sql",
+    "make_words_lower_word_unique.sql",
+    "add_lexicon_level.sql",
+    "close_exhausted_enrichment.sql",
+)
+
+# pg_advisory_xact_lock key for the runner
+LOCK_ID = 4_172_031
+
+CREATE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    name VARCHAR(255) PRIMARY KEY,
+    checksum VARCHAR(64) NOT NULL,
+    applied_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+
+class MigrationError(Exception):
+    """Raised when the applied migrations don't match the files on disk"""
+
+
+def checksum(sql: str) -> str:
+    return hashlib.sha256(sql.encode("utf-8")).hexdigest()
+
+
+def load_migrations(names=MIGRATIONS, directory: Path = MIGRATIONS_DIR) -> list[tuple[str, str]]:
+    """(name, sql) for each migration, in order"""
+    return [(name, (directory / name).read_text(encoding="utf-8")) for name in names]
+
+
+def plan(migrations: list[tuple[str, str]], applied: dict[str, str]) -> list[tuple[str, str]]:
+    """The migrations still to run, given {name: checksum} of those already applied"""
+    unknown = set(applied) - {name for name, _ in migrations}
+    if unknown:
+        raise MigrationError(f"Applied migrations missing from the manifest: {', '.join(sorted(unknown))}")
+
+    pending = []
+    for name, sql in migrations:
+        if name not in applied:
+            pending.append((name, sql))
+        elif applied[name] != checksum(sql):
+            raise MigrationError(f"{name} was changed after it was applied; add a new migration instead")
+    return pending
+
+
+async def _applied(conn) -> dict[str, str]:
+    rows = await conn.fetch("SELECT name, checksum FROM schema_migrations")
+    return {row["name"]: row["checksum"] for row in rows}
+
+
+async def migrate(database_url: str, migrations: list[tuple[str, str]] | None = None) -> list[str]:
+    """Apply pending migrations; returns the names that were applied"""
+    import asyncpg
+
+    migrations = migrations if migrations is not None else load_migrations()
+    conn = await asyncpg.connect(asyncpg_dsn(database_url))
+    try:
+        await conn.execute(CREATE_TABLE_SQL)
+        applied_now = []
+        while True:
+            async with conn.transaction():
+                await conn.execute("SELECT pg_advisory_xact_lock($1)", LOCK_ID)
+                # Re-read under the lock: another runner may have got there first
+                pending = plan(migrations, await _applied(conn))
+                if not pending:
+                    return applied_now
+                name, sql = pending[0]
+                print(f"Applying {name}...")
+                await conn.execute(sql)
+                await conn.execute(
+                    "INSERT INTO schema_migrations (name, checksum) VALUES ($1, $2)", name, checksum(sql)
+                )
+            applied_now.append(name)
+    finally:
+        await conn.close()
+
+
+async def status(database_url: str) -> list[tuple[str, bool]]:
+    """(name, applied) for each migration in the manifest"""
+    import asyncpg
+
+    conn = await asyncpg.connect(asyncpg_dsn(database_url))
+    try:
+        await conn.execute(CREATE_TABLE_SQL)
+        applied = await _applied(conn)
+    finally:
+        await conn.close()
+    return [(name, name in applied) for name in MIGRATIONS]
+
+
+def main(argv: list[str]) -> int:
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    database_url = os.getenv("MIGRATIONS_DATABASE_URL") or os.getenv("DATABASE_URL")
+    if not database_url:
+        print("Set DATABASE_URL (or MIGRATIONS_DATABASE_URL) to run migrations")
+        return 1
+
+    try:
+        if "--status" in argv:
+            for name, applied in asyncio.run(status(database_url)):
+                print(f"{'applied' if applied else 'pending':8} {name}")
+        else:
+            applied = asyncio.run(migrate(database_url))
+            print(f"Applied {len(applied)} migration(s)" if applied else "Database is up to date")
+    except MigrationError as e:
+        print(f"Migration error: {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
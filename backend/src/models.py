@@ -1,6 +1,6 @@
-from sqlalchemy import Column, String, Text, DateTime, Integer, ForeignKey
+from sqlalchemy import Column, String, Text, Date, DateTime, Integer, BigInteger, SmallInteger, ForeignKey
 from sqlalchemy.orm import relationship
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.dialects.postgresql import JSONB, UUID
 from datetime import datetime
 import uuid
 from src.database import Base
@@ -49,6 +49,10 @@ class Word(Base):
     status = Column(String, default="pending")  # pending, approved, rejected
     created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
     updated_at = Column(DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Background enrichment of example/pronunciation (see src/enrichment.py)
+    enriched_at = Column(DateTime(timezone=True), nullable=True)
+    enrich_attempts = Column(SmallInteger, nullable=False, default=0)
+    enrich_claimed_at = Column(DateTime(timezone=True), nullable=True)
     
     def __repr__(self):
         return f"<Word {self.id}: {self.word}>"
@@ -61,7 +65,8 @@ class PracticeSession(Base):
     deck_id = Column(UUID(as_uuid=True), ForeignKey("decks.id", ondelete="SET NULL"), nullable=True)
     practice_type = Column(String, nullable=False, default="flashcard")  # "flashcard" or "conversation"
     duration_seconds = Column(Integer, nullable=False)  # Total practice time in seconds
-    completed_at = Column(DateTime(timezone=True), default=datetime.utcnow)
+    completed_at = Column(DateTime(timezone=True), nullable=False, default=datetime.utcnow)  # Monthly partition key
+    client_event_id = Column(String, nullable=True)  # Idempotency key for buffered events
     
     # Relationship to deck
     deck = relationship("Deck")
@@ -69,6 +74,32 @@ class PracticeSession(Base):
     def __repr__(self):
         return f"<PracticeSession {self.id}: {self.practice_type} {self.duration_seconds}s>"
 
+class PracticeSessionKey(Base):
+    __tablename__ = "practice_session_keys"
+    
+    # Claimed before a buffered session is inserted (see src/events.py)
+    user_id = Column(UUID(as_uuid=True), primary_key=True)
+    client_event_id = Column(String, primary_key=True)
+    created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<PracticeSessionKey {self.user_id}: {self.client_event_id}>"
+
+class ReviewEvent(Base):
+    __tablename__ = "review_events"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(UUID(as_uuid=True), nullable=False)
+    deck_id = Column(UUID(as_uuid=True), nullable=True)  # No FK: events outlive deleted decks
+    flashcard_id = Column(Integer, nullable=True)
+    result = Column(String, nullable=False)  # "correct", "incorrect" or "skipped"
+    response_ms = Column(Integer, nullable=True)
+    client_event_id = Column(String, nullable=False)  # Idempotency key from the client
+    occurred_at = Column(DateTime(timezone=True), default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<ReviewEvent {self.id}: card {self.flashcard_id} {self.result}>"
+
 class UserSetting(Base):
     __tablename__ = "user_settings"
     
@@ -79,4 +110,79 @@ class UserSetting(Base):
     updated_at = Column(DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow)
     
     def __repr__(self):
-        return f"<UserSetting {self.id}: {self.daily_goal_minutes}min/day>"
\ No newline at end of file
+        return f"<UserSetting {self.id}: {self.daily_goal_minutes}min/day>"
+
+class ConversationSession(Base):
+    __tablename__ = "conversation_sessions"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(UUID(as_uuid=True), nullable=False)
+    deck_id = Column(UUID(as_uuid=True), ForeignKey("decks.id", ondelete="CASCADE"), nullable=False)
+    settings = Column(JSONB, nullable=False)  # ConversationSettings as a dict
+    vocabulary = Column(JSONB, nullable=False)  # [{"word", "definition"}] from the deck when the session started
+    messages = Column(JSONB, nullable=False, default=list)  # [{"role", "content"}], appended to per turn
+    version = Column(Integer, nullable=False, default=0)  # Bumped per turn (optimistic concurrency)
+    created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
+    updated_at = Column(DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<ConversationSession {self.id}: {self.version} turns>"
+
+class ConversationOpener(Base):
+    __tablename__ = "conversation_openers"
+    
+    deck_id = Column(UUID(as_uuid=True), ForeignKey("decks.id", ondelete="CASCADE"), primary_key=True)
+    immersion_bucket = Column(SmallInteger, primary_key=True)  # tutor.immersion_bucket()
+    focus_mode = Column(String(20), primary_key=True)
+    topic = Column(String(50), primary_key=True)
+    cards_fingerprint = Column(String(64), nullable=False)  # openers.cards_fingerprint() of the deck when written
+    message = Column(Text, nullable=False)
+    model = Column(String(100), nullable=False)
+    created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<ConversationOpener {self.deck_id}: {self.immersion_bucket}/{self.focus_mode}/{self.topic}>"
+
+class LexiconEntry(Base):
+    __tablename__ = "lexicon"
+    
+    word = Column(String(100), primary_key=True)  # lexicon.normalize_word()
+    source_language = Column(String(3), primary_key=True)
+    target_language = Column(String(3), primary_key=True)
+    lemma = Column(String(100), nullable=True)  # NULL: not a vocabulary word
+    translation = Column(String(100), nullable=True)
+    level = Column(String(10), nullable=True)  # easy, medium, hard; NULL: not asked yet
+    source = Column(String(20), nullable=False)  # 'generation' or 'enrichment'
+    created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<LexiconEntry {self.word} ({self.source_language}->{self.target_language}): {self.translation}>"
+
+class LLMUsage(Base):
+    __tablename__ = "llm_usage"
+    
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    user_id = Column(UUID(as_uuid=True), nullable=True)  # NULL for background work
+    endpoint = Column(String(50), nullable=False)
+    model = Column(String(100), nullable=False)
+    outcome = Column(String(20), nullable=False)  # 'ok', 'error', 'deadline' or 'cancelled'
+    input_tokens = Column(Integer, nullable=False, default=0)
+    output_tokens = Column(Integer, nullable=False, default=0)
+    duration_ms = Column(Integer, nullable=False)  # wall time, hedges included
+    created_at = Column(DateTime(timezone=True), nullable=False, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<LLMUsage {self.endpoint} {self.model}: {self.input_tokens}+{self.output_tokens} tokens>"
+
+class LLMUsageDaily(Base):
+    __tablename__ = "llm_usage_daily"
+    
+    user_id = Column(UUID(as_uuid=True), primary_key=True)
+    day = Column(Date, primary_key=True)  # UTC
+    calls = Column(Integer, nullable=False, default=0)
+    input_tokens = Column(BigInteger, nullable=False, default=0)
+    output_tokens = Column(BigInteger, nullable=False, default=0)
+    duration_ms = Column(BigInteger, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f"<LLMUsageDaily {self.user_id} {self.day}: {self.calls} calls>"
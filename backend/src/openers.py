@@ -0,0 +1,263 @@
+"""
+Pre-generated conversation openers.
+
+Every conversation starts with the practice page's OPENING_MESSAGE and the
+first-message prompt. The student used to wait on an empty chat for a
+cold model call. The reply only depends on the deck's cards and three
+settings: the immersion bucket, the focus mode and the topic. So it is
+generated ahead of time and stored in conversation_openers, and the first
+turn becomes a primary-key lookup.
+
+- When a deck's cards are written (generated, cloned, merged), the
+  endpoint enqueues it on the worker's OpenerQueue after committing. A
+  title edit doesn't: openers only depend on the cards. Enqueues are
+  debounced per deck (``delay``), so a burst of edits only generates once.
+- For each deck, the queue fills in the missing or stale openers for
+  every immersion bucket x focus mode x OPENER_TOPICS. With the default
+  topic ("general") that is six calls. Decks are handled one at a time.
+  Each call takes an admission slot like any other LLM call, and the
+  queue waits while interactive requests are queuing for slots. Nothing
+  is charged to the deck owner's token budget, but each call is recorded
+  in the usage ledger (src/usage.py) for the deck's owner.
+- Each opener stores a fingerprint of the cards it was written for, and a
+  lookup only matches the deck's current fingerprint. A stale opener is
+  never served, even when the cards were edited outside this API. The
+  next generation deletes the stale rows.
+- The queue lives in memory. A restart drops pending decks, which fall
+  back to a live first turn until their next edit.
+"""
+import asyncio
+import hashlib
+import itertools
+import json
+import logging
+import time
+
+from fastapi import Request
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+
+from src.database import AsyncSessionLocal
+from src.llm import Completion
+from src.llm_routing import LLMRouter
+from src.metrics import CONVERSATION_OPENERS
+from src.models import ConversationOpener, Deck, Flashcard
+from src.ratelimit import AdmissionController
+from src.schema import ConversationSettings
+from src.tokens import estimate_tokens, turn_budget
+from src.tutor import FOCUS_MODES, OPENING_MESSAGE, build_system_prompt, immersion_bucket
+
+logger = logging.getLogger(__name__)
+
+# One immersion level per tutor.immersion_bucket
+IMMERSION_LEVELS = (0, 50, 100)
+
+
+def cards_fingerprint(vocabulary_words: list[dict]) -> str:
+    """Identity of a deck's cards, independent of the order they were read in"""
+    cards = sorted([w["word"], w["definition"]] for w in vocabulary_words)
+    return hashlib.sha256(json.dumps(cards, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def opener_settings(topics: list[str]) -> list[ConversationSettings]:
+    """The setting combinations openers are generated for"""
+    return [
+        ConversationSettings(immersionLevel=level, focusMode=focus_mode, topic=topic)
+        for level, focus_mode, topic in itertools.product(IMMERSION_LEVELS, FOCUS_MODES, topics)
+    ]
+
+
+def opener_key(settings: ConversationSettings) -> tuple:
+    return (immersion_bucket(settings.immersionLevel), settings.focusMode, settings.topic)
+
+
+async def find_opener(db, deck_id, settings: ConversationSettings, vocabulary_words: list[dict]) -> Completion | None:
+    """The stored first tutor message for these cards and settings, if there is one"""
+    bucket, focus_mode, topic = opener_key(settings)
+    result = await db.execute(
+        select(ConversationOpener.message, ConversationOpener.model).where(
+            ConversationOpener.deck_id == deck_id,
+            ConversationOpener.immersion_bucket == bucket,
+            ConversationOpener.focus_mode == focus_mode,
+            ConversationOpener.topic == topic,
+            ConversationOpener.cards_fingerprint == cards_fingerprint(vocabulary_words),
+        )
+    )
+    row = result.first()
+    CONVERSATION_OPENERS.labels("hit" if row is not None else "miss").inc()
+    return Completion(text=row.message, model=row.model) if row is not None else None
+
+
+async def generate_openers(deck_id, llm_router: LLMRouter, admission: AdmissionController, topics: list[str]) -> int:
+    """Write the deck's missing or stale openers, returning how many were generated"""
+    async with AsyncSessionLocal() as db:
+        owner = await db.scalar(select(Deck.user_id).where(Deck.id == deck_id))
+        if owner is None:
+            return 0
+        cards = await db.execute(select(Flashcard.front, Flashcard.back).where(Flashcard.deck_id == deck_id))
+        vocabulary_words = [{"word": front, "definition": back} for front, back in cards]
+        if not vocabulary_words:
+            return 0
+        fingerprint = cards_fingerprint(vocabulary_words)
+
+        # Openers written for other cards can never match again
+        await db.execute(
+            delete(ConversationOpener)
+            .where(ConversationOpener.deck_id == deck_id, ConversationOpener.cards_fingerprint != fingerprint)
+        )
+        current = await db.execute(
+            select(ConversationOpener.immersion_bucket, ConversationOpener.focus_mode, ConversationOpener.topic)
+            .where(ConversationOpener.deck_id == deck_id)
+        )
+        fresh = {tuple(row) for row in current}
+        await db.commit()
+
+    written = 0
+    for settings in opener_settings(topics):
+        if opener_key(settings) in fresh:
+            continue
+
+        # No session is held while the model writes
+        route = llm_router.policy.conversation(settings.immersionLevel, estimate_tokens(OPENING_MESSAGE))
+        system_prompt = build_system_prompt(vocabulary_words, settings, is_first_message=True)
+        messages = [{"role": "user", "content": OPENING_MESSAGE}]
+        async with admission.slot():
+            completion = await llm_router.complete(
+                route,
+                endpoint="conversation_opener",
+                budget=turn_budget(system_prompt, messages),
+                user_id=owner,
+                system=system_prompt,
+                messages=messages
+            )
+
+        bucket, focus_mode, topic = opener_key(settings)
+        values = {
+            "cards_fingerprint": fingerprint,
+            "message": completion.text,
+            "model": completion.model,
+        }
+        async with AsyncSessionLocal() as db:
+            try:
+                await db.execute(
+                    insert(ConversationOpener)
+                    .values(deck_id=deck_id, immersion_bucket=bucket, focus_mode=focus_mode, topic=topic, **values)
+                    .on_conflict_do_update(
+                        index_elements=["deck_id", "immersion_bucket", "focus_mode", "topic"],
+                        set_={**values, "created_at": func.now()},
+                    )
+                )
+                await db.commit()
+            except IntegrityError:
+                # The deck was deleted while we were generating
+                await db.rollback()
+                return written
+        written += 1
+
+    return written
+
+
+class OpenerQueue:
+    def __init__(
+        self,
+        generate,
+        delay: float = 30.0,
+        max_pending: int = 1_000,
+        busy=lambda: False,
+        busy_backoff: float = 1.0,
+        enabled: bool = True,
+        clock=time.monotonic,
+    ):
+        self._generate = generate  # async (deck_id) -> number of openers written
+        self.delay = delay
+        self.max_pending = max_pending
+        self._busy = busy
+        self.busy_backoff = busy_backoff
+        self.enabled = enabled
+        self._clock = clock
+
+        self._due: dict = {}  # deck_id -> when to generate
+        self._wake = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+        self.generated = 0
+        self.failures = 0
+        self.dropped = 0
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._due)
+
+    def enqueue(self, deck_id):
+        """(Re)schedule a deck's openers ``delay`` seconds from now"""
+        if not self.enabled:
+            return
+        if deck_id not in self._due and len(self._due) >= self.max_pending:
+            # Only a latency optimisation: the deck's first turn goes live
+            self.dropped += 1
+            return
+        self._due[deck_id] = self._clock() + self.delay
+        self._wake.set()
+
+    async def start(self):
+        """Start the background generation loop"""
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        """Stop generating; pending decks are dropped"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def run_due(self) -> int:
+        """Generate openers for the decks that are due, returning how many were written"""
+        written = 0
+        now = self._clock()
+        for deck_id in [d for d, due in self._due.items() if due <= now]:
+            if self._busy():
+                # Interactive requests are waiting for LLM slots
+                break
+            del self._due[deck_id]
+            try:
+                written += await self._generate(deck_id)
+            except Exception as e:
+                self.failures += 1
+                logger.warning("Opener generation failed for deck %s: %s", deck_id, e)
+        self.generated += written
+        return written
+
+    def _next_wait(self) -> float | None:
+        if not self._due:
+            return None
+        if self._busy():
+            return self.busy_backoff
+        return max(0.0, min(self._due.values()) - self._clock())
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self._next_wait())
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.run_due()
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "pending": self.pending_count,
+            "generated": self.generated,
+            "failures": self.failures,
+            "dropped": self.dropped,
+        }
+
+
+def get_opener_queue(request: Request) -> OpenerQueue:
+    """Dependency that provides the app's opener queue"""
+    return request.app.state.opener_queue
@@ -0,0 +1,272 @@
+"""
+Maintenance for the monthly partitions of practice_sessions.
+
+practice_sessions is partitioned by month on completed_at
+(migrations/partition_practice_sessions.sql). practice_sessions_2026_10
+holds October 2026 (UTC). A query bounded to one day, like the daily stats,
+reads one partition, and each insert updates only that partition's small
+indexes. Rows outside every partition go to practice_sessions_default.
+
+This job is meant to run daily (cron, or a scheduled task on the host). Each
+run:
+- creates the partitions for the current month and the next
+  ``months_ahead``. Rows that had already landed in the default partition
+  for that month are moved into the new one in the same transaction;
+- archives months older than ``retain_months``. Each partition is copied to
+  ARCHIVE_DIR/practice_sessions_YYYY_MM.csv.gz and then dropped, in one
+  transaction. The partition is locked for the copy, so a late insert can't
+  be lost between the copy and the drop. A late event for an archived month
+  lands in the default partition; the next run sweeps it into
+  practice_sessions_YYYY_MM.2.csv.gz (.3, ...) the same way. The sessions'
+  idempotency keys (practice_session_keys) are deleted with them.
+
+A session-level advisory lock keeps two runs from overlapping.
+
+Usage, from backend/:
+    python -m src.partitions             create and archive partitions
+    python -m src.partitions --dry-run   list what would be done
+    Options: --months-ahead N (3), --retain-months N (12; 0 keeps
+    everything), --archive-dir PATH (backend/archive)
+
+Uses MIGRATIONS_DATABASE_URL if set (a direct, non-pgbouncer connection),
+otherwise DATABASE_URL.
+"""
+import argparse
+import asyncio
+import gzip
+import os
+import re
+import sys
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import NamedTuple
+
+from src.database import asyncpg_dsn
+
+TABLE = "practice_sessions"
+DEFAULT_PARTITION = f"{TABLE}_default"
+PARTITION_RE = re.compile(rf"^{TABLE}_(\d{{4}})_(\d{{2}})$")
+
+ARCHIVE_DIR = Path(__file__).resolve().parent.parent / "archive"
+
+# pg_try_advisory_lock key for the job (src/migrate.py uses 4_172_031)
+LOCK_ID = 4_172_032
+
+
+class MaintenancePlan(NamedTuple):
+    create: list[date]   # first day of each month
+    archive: list[date]
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_of(moment: datetime) -> date:
+    """The first day of the moment's UTC month"""
+    moment = moment.astimezone(timezone.utc)
+    return date(moment.year, moment.month, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{TABLE}_{month.year:04d}_{month.month:02d}"
+
+
+def partition_month(name: str) -> date | None:
+    """The month a partition holds; None for the default partition"""
+    match = PARTITION_RE.match(name)
+    return date(int(match.group(1)), int(match.group(2)), 1) if match else None
+
+
+def bounds(month: date) -> tuple[datetime, datetime]:
+    """[start, end) of the month in UTC"""
+    start = datetime(month.year, month.month, 1, tzinfo=timezone.utc)
+    following = add_months(month, 1)
+    return start, datetime(following.year, following.month, 1, tzinfo=timezone.utc)
+
+
+def plan(
+    existing: list[str],
+    now: datetime,
+    months_ahead: int = 3,
+    retain_months: int = 12,
+    in_default: list[date] = (),
+) -> MaintenancePlan:
+    """The partitions to create and the months to archive
+
+    ``existing`` are the partition names; ``in_default`` the months with
+    rows in the default partition.
+    """
+    current = month_of(now)
+    months = {m for m in map(partition_month, existing) if m is not None}
+    create = [m for m in (add_months(current, i) for i in range(months_ahead + 1)) if m not in months]
+    expired = add_months(current, -retain_months)
+    archive = sorted(m for m in months | set(in_default) if retain_months and m < expired)
+    return MaintenancePlan(create, archive)
+
+
+async def existing_partitions(conn) -> list[str]:
+    rows = await conn.fetch(
+        """
+        SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = $1::regclass
+        """,
+        TABLE,
+    )
+    return [row["relname"] for row in rows]
+
+
+async def create_partition(conn, month: date, has_default: bool = True) -> int:
+    """Create the month's partition; returns the rows moved out of the default partition"""
+    name = partition_name(month)
+    start, end = bounds(month)
+    moved = 0
+    async with conn.transaction():
+        # Filled, then attached: attaching checks the default partition holds
+        # nothing for this month
+        await conn.execute(f"CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+        if has_default:
+            status = await conn.execute(
+                f"""
+                WITH moved AS (
+                    DELETE FROM {DEFAULT_PARTITION} WHERE completed_at >= $1 AND completed_at < $2 RETURNING *
+                )
+                INSERT INTO {name} SELECT * FROM moved
+                """,
+                start,
+                end,
+            )
+            moved = int(status.split()[-1])
+        await conn.execute(
+            f"ALTER TABLE {TABLE} ATTACH PARTITION {name} "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+    return moved
+
+
+def archive_path(directory: Path, month: date) -> Path:
+    """The month's first free archive file (late rows swept later get .2, .3, ...)"""
+    name = partition_name(month)
+    path, n = directory / f"{name}.csv.gz", 1
+    while path.exists():
+        n += 1
+        path = directory / f"{name}.{n}.csv.gz"
+    return path
+
+
+async def archive_month(conn, month: date, directory: Path = ARCHIVE_DIR, partitioned: bool = True) -> tuple[Path, int]:
+    """Copy the month's rows to a gzipped CSV, then remove them; returns (path, rows)
+
+    With ``partitioned`` the month's partition is dropped. Otherwise its
+    partition is already gone, and the rows are the late events for it that
+    landed in the default partition since.
+    """
+    name = partition_name(month) if partitioned else DEFAULT_PARTITION
+    start, end = bounds(month)
+    rows = f"SELECT * FROM {name} WHERE completed_at >= $1 AND completed_at < $2"
+    directory.mkdir(parents=True, exist_ok=True)
+    path = archive_path(directory, month)
+    partial = path.with_name(path.name + ".partial")
+    try:
+        async with conn.transaction():
+            # No late insert can slip in between the copy and the removal
+            await conn.execute(f"LOCK TABLE {name} IN SHARE MODE")
+            with gzip.open(partial, "wb") as out:
+                status = await conn.copy_from_query(rows, start, end, output=out, format="csv", header=True)
+            with open(partial, "rb") as f:
+                os.fsync(f.fileno())
+            # The idempotency keys go with their sessions
+            await conn.execute(
+                f"""
+                DELETE FROM practice_session_keys k USING ({rows}) s
+                WHERE k.user_id = s.user_id AND k.client_event_id = s.client_event_id
+                """,
+                start,
+                end,
+            )
+            if partitioned:
+                await conn.execute(f"DROP TABLE {name}")
+            else:
+                await conn.execute(f"DELETE FROM {name} WHERE completed_at >= $1 AND completed_at < $2", start, end)
+    except BaseException:
+        # The rows are still in the table; the next run archives them again
+        partial.unlink(missing_ok=True)
+        raise
+    # Only once the rows are gone: a failed commit leaves no archive behind
+    partial.replace(path)
+    return path, int(status.split()[-1])
+
+
+async def default_months(conn) -> list[date]:
+    """The months that have rows in the default partition"""
+    rows = await conn.fetch(
+        f"SELECT DISTINCT date_trunc('month', completed_at AT TIME ZONE 'UTC')::date AS month FROM {DEFAULT_PARTITION}"
+    )
+    return [row["month"] for row in rows]
+
+
+async def maintain(
+    database_url: str,
+    months_ahead: int = 3,
+    retain_months: int = 12,
+    archive_dir: Path = ARCHIVE_DIR,
+    dry_run: bool = False,
+    now: datetime | None = None,
+) -> MaintenancePlan | None:
+    """Create and archive partitions; returns what was (or would be) done, None if another run holds the lock"""
+    import asyncpg
+
+    conn = await asyncpg.connect(asyncpg_dsn(database_url))
+    try:
+        if not await conn.fetchval("SELECT pg_try_advisory_lock($1)", LOCK_ID):
+            return None
+        existing = await existing_partitions(conn)
+        in_default = await default_months(conn) if DEFAULT_PARTITION in existing else []
+        todo = plan(existing, now or datetime.now(timezone.utc), months_ahead, retain_months, in_default)
+        if dry_run:
+            return todo
+
+        for month in todo.create:
+            moved = await create_partition(conn, month, has_default=DEFAULT_PARTITION in existing)
+            print(f"Created {partition_name(month)}" + (f" ({moved} rows from the default partition)" if moved else ""))
+        months = {partition_month(name) for name in existing}
+        for month in todo.archive:
+            path, rows = await archive_month(conn, month, archive_dir, partitioned=month in months)
+            print(f"Archived {partition_name(month)} ({rows} rows) to {path}")
+        return todo
+    finally:
+        await conn.close()
+
+
+def main(argv: list[str]) -> int:
+    from dotenv import load_dotenv
+
+    parser = argparse.ArgumentParser(prog="python -m src.partitions")
+    parser.add_argument("--months-ahead", type=int, default=3)
+    parser.add_argument("--retain-months", type=int, default=12)
+    parser.add_argument("--archive-dir", type=Path, default=ARCHIVE_DIR)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    database_url = os.getenv("MIGRATIONS_DATABASE_URL") or os.getenv("DATABASE_URL")
+    if not database_url:
+        print("Set DATABASE_URL (or MIGRATIONS_DATABASE_URL) to maintain partitions")
+        return 1
+
+    todo = asyncio.run(maintain(database_url, args.months_ahead, args.retain_months, args.archive_dir, args.dry_run))
+    if todo is None:
+        print("Another partition maintenance run is in progress")
+    elif args.dry_run:
+        for month in todo.create:
+            print(f"create   {partition_name(month)}")
+        for month in todo.archive:
+            print(f"archive  {partition_name(month)}")
+    elif not todo.create and not todo.archive:
+        print("Partitions are up to date")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
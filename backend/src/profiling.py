@@ -0,0 +1,222 @@
+"""
+Opt-in sampling profiler for live requests.
+
+A request is profiled when it carries ``X-Profile: <PROFILE_TOKEN>`` or is
+picked by PROFILE_SAMPLE_RATE. While any profile is active, one sampler
+thread wakes every PROFILE_INTERVAL_MS and, for each profiled request:
+
+- if the request's task is running on the event loop, records the loop
+  thread's stack from the task's coroutine down (a CPU sample, also counted
+  as wall time);
+- otherwise records where the task is suspended, by walking its coroutine
+  await chain (a wall-only sample: awaiting the database, the LLM, a lock).
+
+Profiles are kept as collapsed stacks ("outer;inner count", the format
+flamegraph.pl and speedscope read) in a ring buffer of the most recent
+PROFILE_KEEP, served by /api/internal/profiles. Work a request hands to
+another task (e.g. coalesced singleflight loads) shows up as waiting.
+
+With no token and a zero sample rate the middleware isn't installed at
+all, so disabled profiling costs nothing.
+"""
+import asyncio
+import hmac
+import itertools
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+from fastapi import HTTPException, Request
+
+PROFILE_HEADER = b"x-profile"
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{getattr(code, 'co_qualname', code.co_name)} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+def await_chain(coro) -> list:
+    """Frames of a suspended coroutine and everything it is awaiting, outermost first"""
+    frames = []
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None) or getattr(coro, "ag_frame", None)
+        if frame is None:
+            break
+        frames.append(frame)
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None) or getattr(coro, "ag_await", None)
+    return frames
+
+
+def thread_stack(frame) -> list:
+    """A thread's frames, outermost first"""
+    frames = []
+    while frame is not None:
+        frames.append(frame)
+        frame = frame.f_back
+    frames.reverse()
+    return frames
+
+
+@dataclass
+class Profile:
+    id: int
+    method: str
+    path: str
+    started_at: datetime
+    interval: float
+    route: str | None = None
+    status: int | None = None
+    duration_ms: float | None = None
+    wall: Counter = field(default_factory=Counter)
+    cpu: Counter = field(default_factory=Counter)
+    # Set while the request is running
+    task: asyncio.Task | None = None
+    thread_id: int | None = None
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "route": self.route,
+            "status": self.status,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": self.duration_ms,
+            "interval_ms": self.interval * 1000,
+            "wall_samples": sum(self.wall.values()),
+            "cpu_samples": sum(self.cpu.values()),
+        }
+
+    def collapsed(self, mode: str = "wall") -> str:
+        samples = self.cpu if mode == "cpu" else self.wall
+        return "".join(f"{stack} {count}\n" for stack, count in samples.most_common())
+
+    def sample(self, frames: dict):
+        task = self.task
+        if task is None or task.done():
+            return
+        chain = await_chain(task.get_coro())
+        if not chain:
+            return
+
+        # Running: the innermost coroutine frame is on the loop thread's stack
+        stack = thread_stack(frames.get(self.thread_id))
+        if chain[-1] in stack:
+            root = stack.index(chain[0]) if chain[0] in stack else 0
+            key = ";".join(_frame_label(f) for f in stack[root:])
+            self.wall[key] += 1
+            self.cpu[key] += 1
+        else:
+            self.wall[";".join(_frame_label(f) for f in chain) + ";<waiting>"] += 1
+
+
+class Profiler:
+    """Ring buffer of finished profiles plus the sampler thread for active ones"""
+
+    def __init__(self, keep: int = 20, interval: float = 0.005):
+        self.interval = interval
+        self.profiles: deque[Profile] = deque(maxlen=keep)
+        self._active: dict[int, Profile] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def start(self, method: str, path: str) -> Profile:
+        profile = Profile(
+            id=next(self._ids),
+            method=method,
+            path=path,
+            started_at=datetime.now(timezone.utc),
+            interval=self.interval,
+            task=asyncio.current_task(),
+            thread_id=threading.get_ident(),
+        )
+        with self._lock:
+            self._active[profile.id] = profile
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+                self._thread.start()
+        return profile
+
+    def finish(self, profile: Profile):
+        with self._lock:
+            self._active.pop(profile.id, None)
+        profile.task = None
+        self.profiles.append(profile)
+
+    def get(self, profile_id: int) -> Profile | None:
+        for profile in self.profiles:
+            if profile.id == profile_id:
+                return profile
+        return None
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                active = list(self._active.values())
+                if not active:
+                    self._thread = None
+                    return
+            frames = sys._current_frames()
+            for profile in active:
+                try:
+                    profile.sample(frames)
+                except Exception:
+                    # The task moved on mid-walk; skip this tick
+                    pass
+
+
+class ProfilingMiddleware:
+    """Profile requests that carry the profile token or are picked by the sample rate"""
+
+    def __init__(self, app, profiler: Profiler, sample_rate: float = 0.0, token: str | None = None):
+        self.app = app
+        self.profiler = profiler
+        self.sample_rate = sample_rate
+        self.token = token.encode() if token else None
+
+    def _wanted(self, scope) -> bool:
+        if self.token is not None and hmac.compare_digest(dict(scope.get("headers", ())).get(PROFILE_HEADER, b""), self.token):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._wanted(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile = self.profiler.start(scope["method"], scope["path"])
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", str(profile.id).encode())]}
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profile.duration_ms = round((time.perf_counter() - start) * 1000, 1)
+            route = scope.get("route")
+            profile.route = route.path if route is not None else None
+            self.profiler.finish(profile)
+
+
+def get_profiler(request: Request) -> Profiler:
+    """Dependency that checks access and provides the app's profiler"""
+    token = request.app.state.settings.profile_token
+    # Staging and preview deployments see real traffic too, so every
+    # environment needs the token
+    if not token:
+        raise HTTPException(status_code=403, detail="Set PROFILE_TOKEN to read profiles")
+    if not hmac.compare_digest(request.headers.get("authorization", "").encode(), f"Bearer {token}".encode()):
+        raise HTTPException(status_code=401, detail="Invalid profile token")
+    return request.app.state.profiler
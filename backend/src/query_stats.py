@@ -0,0 +1,176 @@
+"""
+Per-request SQL instrumentation.
+
+Engine events time every statement and add it to the QueryStats of the
+current request, which lives in a contextvar. SQLAlchemy runs the sync
+events in a greenlet that shares the caller's context, and tasks created
+for coalesced work copy it, so a query is counted against the request that
+caused it.
+
+QueryStatsMiddleware starts tracking for each request. Outside production
+it adds X-DB-Query-Count, X-DB-Time-Ms and X-DB-Slowest-Ms headers. It
+always adds the totals to per-route metrics (/api/internal/stats and
+/metrics).
+
+Tests pin an endpoint's query budget with ``assert_max_queries``.
+"""
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from sqlalchemy import event
+
+from src.metrics import DB_QUERIES_PER_REQUEST, DB_QUERY_SECONDS
+
+logger = logging.getLogger(__name__)
+
+STATEMENT_PREVIEW_CHARS = 500
+
+_current: ContextVar["QueryStats | None"] = ContextVar("query_stats", default=None)
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    total_ms: float = 0.0
+    slowest_ms: float = 0.0
+    slowest_statement: str | None = None
+    # Only filled in when tracking with record_statements=True
+    statements: list[str] | None = None
+
+    def add(self, statement: str, elapsed_ms: float):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        if elapsed_ms > self.slowest_ms:
+            self.slowest_ms = elapsed_ms
+            self.slowest_statement = statement
+        if self.statements is not None:
+            self.statements.append(statement)
+
+
+@dataclass
+class RouteQueryMetrics:
+    requests: int = 0
+    queries: int = 0
+    db_ms: float = 0.0
+    max_queries: int = 0
+    slowest_ms: float = 0.0
+
+
+@dataclass
+class QueryMetrics:
+    """Totals per route template, e.g. "GET /api/decks/{deck_id}" """
+    routes: dict[str, RouteQueryMetrics] = field(default_factory=dict)
+
+    def record(self, route: str, stats: QueryStats):
+        metrics = self.routes.setdefault(route, RouteQueryMetrics())
+        metrics.requests += 1
+        metrics.queries += stats.count
+        metrics.db_ms += stats.total_ms
+        metrics.max_queries = max(metrics.max_queries, stats.count)
+        metrics.slowest_ms = max(metrics.slowest_ms, stats.slowest_ms)
+
+    def snapshot(self) -> dict:
+        return {
+            route: {
+                "requests": m.requests,
+                "queries": m.queries,
+                "queries_per_request": round(m.queries / m.requests, 2),
+                "max_queries": m.max_queries,
+                "db_ms": round(m.db_ms, 1),
+                "slowest_ms": round(m.slowest_ms, 1),
+            }
+            for route, m in sorted(self.routes.items())
+        }
+
+
+def current() -> QueryStats | None:
+    return _current.get()
+
+
+@contextmanager
+def track_queries(record_statements: bool = False):
+    """Collect the queries run inside the block (by this task and tasks it starts)"""
+    stats = QueryStats(statements=[] if record_statements else None)
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def assert_max_queries(limit: int):
+    """Fail if the block runs more than `limit` SQL statements"""
+    with track_queries(record_statements=True) as stats:
+        yield stats
+    if stats.count > limit:
+        listing = "\n".join(f"  {s[:STATEMENT_PREVIEW_CHARS]}" for s in stats.statements)
+        raise AssertionError(f"Expected at most {limit} queries, ran {stats.count}:\n{listing}")
+
+
+def instrument_engine(engine, slow_query_ms: float | None = None):
+    """Attach timing events to an Engine or AsyncEngine"""
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed_ms = (time.perf_counter() - conn.info["query_start"].pop()) * 1000
+        stats = _current.get()
+        if stats is not None:
+            stats.add(statement, elapsed_ms)
+        if slow_query_ms is not None and elapsed_ms >= slow_query_ms:
+            logger.warning("Slow query", extra={
+                "event": "slow_query",
+                "duration_ms": round(elapsed_ms, 1),
+                "statement": statement[:STATEMENT_PREVIEW_CHARS],
+            })
+
+    def handle_error(exception_context):
+        starts = exception_context.connection.info.get("query_start") if exception_context.connection else None
+        if starts:
+            starts.pop()
+
+    event.listen(sync_engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", after_cursor_execute)
+    event.listen(sync_engine, "handle_error", handle_error)
+
+
+class QueryStatsMiddleware:
+    """Track each HTTP request's queries; report them as headers and/or metrics"""
+
+    def __init__(self, app, metrics: QueryMetrics, headers: bool = True):
+        self.app = app
+        self.metrics = metrics
+        self.headers = headers
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_queries() as stats:
+            async def send_with_headers(message):
+                if message["type"] == "http.response.start" and self.headers:
+                    headers = list(message.get("headers", []))
+                    headers += [
+                        (b"x-db-query-count", str(stats.count).encode()),
+                        (b"x-db-time-ms", f"{stats.total_ms:.1f}".encode()),
+                        (b"x-db-slowest-ms", f"{stats.slowest_ms:.1f}".encode()),
+                    ]
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_headers)
+            finally:
+                # The router leaves the matched route in the scope
+                route = scope.get("route")
+                if route is not None:
+                    self.metrics.record(f"{scope['method']} {route.path}", stats)
+                    DB_QUERIES_PER_REQUEST.labels(route.path).observe(stats.count)
+                    DB_QUERY_SECONDS.labels(route.path).inc(stats.total_ms / 1000)
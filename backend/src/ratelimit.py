@@ -0,0 +1,150 @@
+"""
+Admission control and token-bucket rate limiting for the AI endpoints.
+
+Budgets are in estimated LLM tokens rather than requests (see
+src/tokens.py), so one long generation costs more than a short
+conversation turn. Each call first takes its cost from the caller's bucket
+and from the global bucket (``check``), which fails fast with 429 +
+Retry-After before any database or LLM work.
+The LLM call itself then runs inside ``slot()``, which caps concurrent calls
+and how many requests may wait for one. When that queue is full the request
+is rejected straight away instead of piling up.
+
+Everything is in-process and takes an injectable clock, so it can be tested
+without sleeping.
+"""
+import asyncio
+import math
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+
+from fastapi import HTTPException, Request
+
+
+class RateLimitExceeded(HTTPException):
+    def __init__(self, retry_after: float, detail: str):
+        self.retry_after = max(1, math.ceil(retry_after))
+        super().__init__(
+            status_code=429,
+            detail=detail,
+            headers={"Retry-After": str(self.retry_after)},
+        )
+
+
+class TokenBucket:
+    __slots__ = ("capacity", "rate", "tokens", "updated")
+
+    def __init__(self, capacity: float, rate: float, now: float):
+        self.capacity = capacity
+        self.rate = rate  # tokens per second
+        self.tokens = capacity
+        self.updated = now
+
+    def _refill(self, now: float):
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def take(self, amount: float, now: float) -> float:
+        """Take amount if available and return 0, else return seconds until it would be"""
+        self._refill(now)
+        # A request larger than the bucket can still run once the bucket is full
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            self.tokens -= amount
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def refund(self, amount: float):
+        self.tokens = min(self.capacity, self.tokens + min(amount, self.capacity))
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        user_capacity: float = 20_000,
+        user_rate: float = 20_000 / 60,
+        global_capacity: float = 400_000,
+        global_rate: float = 400_000 / 60,
+        max_concurrent: int = 16,
+        max_queue: int = 32,
+        max_users: int = 10_000,
+        clock=time.monotonic,
+    ):
+        self.user_capacity = user_capacity
+        self.user_rate = user_rate
+        self.max_queue = max_queue
+        self.max_users = max_users
+        self._clock = clock
+
+        self._global = TokenBucket(global_capacity, global_rate, clock())
+        self._users: OrderedDict[str, TokenBucket] = OrderedDict()
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._waiting = 0
+        self.in_flight = 0
+
+        # Counters for monitoring
+        self.admitted = 0
+        self.rejected_user = 0
+        self.rejected_global = 0
+        self.rejected_queue = 0
+
+    def _user_bucket(self, user_id: str, now: float) -> TokenBucket:
+        bucket = self._users.get(user_id)
+        if bucket is None:
+            bucket = TokenBucket(self.user_capacity, self.user_rate, now)
+            self._users[user_id] = bucket
+            # Forget the least recently seen users (they come back with a full bucket)
+            if len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        else:
+            self._users.move_to_end(user_id)
+        return bucket
+
+    def check(self, user_id: str, cost: float):
+        """Charge cost tokens to the user and global budgets, or raise RateLimitExceeded"""
+        now = self._clock()
+        user_bucket = self._user_bucket(user_id, now)
+
+        wait = user_bucket.take(cost, now)
+        if wait:
+            self.rejected_user += 1
+            raise RateLimitExceeded(wait, "Rate limit exceeded, please slow down")
+
+        wait = self._global.take(cost, now)
+        if wait:
+            user_bucket.refund(cost)
+            self.rejected_global += 1
+            raise RateLimitExceeded(wait, "Service is busy, please retry shortly")
+
+        self.admitted += 1
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one of the concurrent LLM call slots, rejecting if too many are waiting"""
+        if self._semaphore.locked() and self._waiting >= self.max_queue:
+            self.rejected_queue += 1
+            raise RateLimitExceeded(1, "Service is busy, please retry shortly")
+
+        self._waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._waiting -= 1
+
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    @property
+    def queue_depth(self) -> int:
+        return self._waiting
+
+
+def get_admission(request: Request) -> AdmissionController:
+    """Dependency that provides the app's admission controller"""
+    return request.app.state.admission
@@ -0,0 +1,22 @@
+"""
+Fast JSON responses.
+
+FastJSONResponse renders with orjson, which serializes datetime and UUID
+values natively, so handlers can pass database values straight through
+instead of calling isoformat()/str() on every field. Returning one directly
+from a handler also skips response_model re-validation. The response_model
+is still used for the OpenAPI schema.
+"""
+import orjson
+from fastapi.responses import JSONResponse
+
+
+class FastJSONResponse(JSONResponse):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+# Responses smaller than this are sent uncompressed
+GZIP_MINIMUM_SIZE = 1024
@@ -0,0 +1,82 @@
+import logging
+import uuid
+
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src import transfer
+from src.database import get_db, AsyncSessionLocal
+from src.invalidation import InvalidationBus, get_invalidation
+from src.schema import WordsBatchResponse
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+@router.get("/api/export/words")
+async def export_words(
+    user_id: str = Query(..., description="User ID"),
+    format: str = Query(default="ndjson", pattern="^(ndjson|csv|anki)$", description="Export format: ndjson, csv or anki"),
+):
+    """Stream all of a user's words without loading them into memory"""
+    try:
+        user_uuid = uuid.UUID(user_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid user_id format")
+    
+    media_type, extension = transfer.EXPORT_FORMATS[format]
+    return StreamingResponse(
+        transfer.export_words(AsyncSessionLocal, user_uuid, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="words.{extension}"'},
+    )
+
+@router.get("/api/export/decks")
+async def export_decks(
+    user_id: str = Query(..., description="User ID"),
+    format: str = Query(default="ndjson", pattern="^(ndjson|csv|anki)$", description="Export format: ndjson, csv or anki"),
+):
+    """Stream every flashcard in a user's decks"""
+    try:
+        user_uuid = uuid.UUID(user_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid user_id format")
+    
+    media_type, extension = transfer.EXPORT_FORMATS[format]
+    return StreamingResponse(
+        transfer.export_decks(AsyncSessionLocal, user_uuid, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="decks.{extension}"'},
+    )
+
+@router.post("/api/import/words", response_model=WordsBatchResponse)
+async def import_words(
+    request: Request,
+    user_id: str = Query(..., description="User ID"),
+    format: str = Query(default="ndjson", pattern="^(ndjson|csv)$", description="Import format: ndjson or csv"),
+    db: AsyncSession = Depends(get_db),
+    invalidation: InvalidationBus = Depends(get_invalidation)
+):
+    """Stream words from the request body, skipping ones the user already has"""
+    try:
+        user_uuid = uuid.UUID(user_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid user_id format")
+    
+    try:
+        return await transfer.import_words(db, user_uuid, request.stream(), format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.exception("Error importing words")
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        # A failed import is rolled back whole
+        try:
+            await db.rollback()
+            await invalidation.publish(db, ("words", user_uuid))
+            await db.commit()
+        except Exception:
+            logger.exception("Error invalidating words after import")
+
+# Conversational Practice API endpoints
@@ -0,0 +1,181 @@
+import logging
+import uuid
+
+from fastapi import APIRouter, HTTPException, Depends, Query, WebSocket, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src import conversations
+from src.cache import LocalCache
+from src.conversation_socket import ConversationSocket
+from src.database import get_db
+from src.invalidation import InvalidationBus, get_cache, get_invalidation
+from src.llm import LLMNotConfiguredError
+from src.llm_routing import LLMRouter, get_llm_router
+from src.models import Deck, Flashcard
+from src.ratelimit import AdmissionController, get_admission
+from src.responses import FastJSONResponse
+from src.schema import ConversationCreate, ConversationSettings, ConversationTurn, ConversationTurnResponse
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+async def get_owned_conversation(cache: LocalCache, db: AsyncSession, conversation_id: str, user_id: str):
+    """The conversation if it exists and belongs to user_id, else 400/404"""
+    try:
+        conversation_uuid = uuid.UUID(conversation_id)
+        user_uuid = uuid.UUID(user_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid ID format")
+
+    conversation = await conversations.get_conversation(cache, db, conversation_uuid)
+    if conversation is None or conversation.user_id != user_uuid:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    return conversation
+
+@router.post("/api/conversations", status_code=201)
+async def create_conversation(
+    data: ConversationCreate,
+    db: AsyncSession = Depends(get_db),
+    cache: LocalCache = Depends(get_cache)
+):
+    """Start a conversation over a deck; later turns send only the new message"""
+    try:
+        # Convert IDs to UUID
+        try:
+            deck_uuid = uuid.UUID(data.deck_id)
+            user_uuid = uuid.UUID(data.user_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid ID format")
+
+        # Verify deck ownership (once, for the whole conversation)
+        deck_result = await db.execute(
+            select(Deck.id).where(Deck.id == deck_uuid, Deck.user_id == user_uuid)
+        )
+        if deck_result.scalar_one_or_none() is None:
+            raise HTTPException(status_code=404, detail="Deck not found")
+
+        cards = await db.execute(
+            select(Flashcard.front, Flashcard.back).where(Flashcard.deck_id == deck_uuid)
+        )
+        vocabulary_words = [{"word": front, "definition": back} for front, back in cards]
+
+        if not vocabulary_words:
+            raise HTTPException(status_code=400, detail="Deck has no flashcards")
+
+        settings = (data.settings or ConversationSettings()).model_dump()
+        conversation = await conversations.create_conversation(db, user_uuid, deck_uuid, settings, vocabulary_words)
+        cache.set(conversations.cache_key(conversation.id), conversation)
+
+        return conversations.summary(conversation)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Error creating conversation")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/api/conversations/{conversation_id}/turns", response_model=ConversationTurnResponse)
+async def add_turn(
+    conversation_id: str,
+    turn: ConversationTurn,
+    db: AsyncSession = Depends(get_db),
+    cache: LocalCache = Depends(get_cache),
+    invalidation: InvalidationBus = Depends(get_invalidation),
+    llm_router: LLMRouter = Depends(get_llm_router),
+    admission: AdmissionController = Depends(get_admission)
+):
+    """Send the student's next message and get the tutor's reply"""
+    try:
+        conversation = await get_owned_conversation(cache, db, conversation_id, turn.user_id)
+        result = await conversations.take_turn(
+            db, cache, invalidation, llm_router, admission, conversation, turn.content
+        )
+
+        logger.info("Generated conversation turn", extra={
+            "conversation_id": conversation_id,
+            "turns": result.conversation.turns,
+            "words_used": len(result.words_used),
+            "model": result.completion.model,
+            "output_tokens": result.completion.output_tokens,
+        })
+
+        return {
+            "message": result.completion.text,
+            "words_used": result.words_used,
+            "turns": result.conversation.turns,
+        }
+
+    except HTTPException:
+        raise
+    except LLMNotConfiguredError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    except Exception as e:
+        logger.exception("Error in conversation turn")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/api/conversations/{conversation_id}")
+async def get_conversation(
+    conversation_id: str,
+    user_id: str = Query(..., description="User ID"),
+    db: AsyncSession = Depends(get_db),
+    cache: LocalCache = Depends(get_cache)
+):
+    """A conversation with its full history (e.g. to restore it after a reload)"""
+    try:
+        conversation = await get_owned_conversation(cache, db, conversation_id, user_id)
+        return FastJSONResponse({**conversations.summary(conversation), "messages": conversation.messages})
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Error fetching conversation")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.delete("/api/conversations/{conversation_id}")
+async def delete_conversation(
+    conversation_id: str,
+    user_id: str = Query(..., description="User ID"),
+    db: AsyncSession = Depends(get_db),
+    invalidation: InvalidationBus = Depends(get_invalidation)
+):
+    """Delete a conversation"""
+    try:
+        # Convert IDs to UUID
+        try:
+            conversation_uuid = uuid.UUID(conversation_id)
+            user_uuid = uuid.UUID(user_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid ID format")
+
+        if not await conversations.delete_conversation(db, invalidation, conversation_uuid, user_uuid):
+            raise HTTPException(status_code=404, detail="Conversation not found")
+
+        return {"message": "Conversation deleted successfully"}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Error deleting conversation")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.websocket("/api/conversations/{conversation_id}/ws")
+async def conversation_socket(
+    websocket: WebSocket,
+    conversation_id: str,
+    user_id: str = Query(..., description="User ID"),
+    db: AsyncSession = Depends(get_db)
+):
+    """Practice a conversation over one socket, with streamed replies (see src/conversation_socket.py)"""
+    state = websocket.app.state
+    try:
+        conversation = await get_owned_conversation(state.cache, db, conversation_id, user_id)
+    except HTTPException as e:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=e.detail)
+        return
+    finally:
+        # Don't hold a pooled connection while the socket waits for the first turn
+        await db.close()
+
+    socket = ConversationSocket(websocket, conversation, db, idle_timeout=state.settings.ws_idle_timeout)
+    await socket.run()
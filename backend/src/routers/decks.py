@@ -0,0 +1,307 @@
+import logging
+import uuid
+
+from fastapi import APIRouter, HTTPException, Depends, Query
+from sqlalchemy import select, func, desc, asc
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src import deck_ops
+from src.cache import LocalCache, cached
+from src.database import get_db, AsyncSessionLocal
+from src.invalidation import InvalidationBus, get_cache, get_invalidation
+from src.models import Deck, Flashcard
+from src.openers import OpenerQueue, get_opener_queue
+from src.responses import FastJSONResponse
+from src.schema import DeckUpdate, DeckClone, DeckMerge
+from src.singleflight import SingleFlight, get_singleflight
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+@router.get("/api/my-decks")
+async def get_my_decks(
+    user_id: str = Query(..., description="User ID"),
+    search: str = Query(default="", description="Search query"),
+    sort_by: str = Query(default="created_at", description="Sort by: created_at, title, count"),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get all decks for a specific user"""
+    try:
+        # Convert user_id string to UUID
+        try:
+            user_uuid = uuid.UUID(user_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid user_id format")
+        
+        # Decks with their card counts in one query
+        card_count = func.count(Flashcard.id).label("card_count")
+        decks_query = (
+            select(Deck.id, Deck.title, Deck.difficulty, Deck.created_at, card_count)
+            .outerjoin(Flashcard, Flashcard.deck_id == Deck.id)
+            .where(Deck.user_id == user_uuid)
+            .group_by(Deck.id)
+        )
+        
+        # Add search filter if provided
+        if search:
+            decks_query = decks_query.where(Deck.title.ilike(f"%{search}%"))
+        
+        # Apply sorting
+        if sort_by == "title":
+            decks_query = decks_query.order_by(asc(Deck.title))
+        elif sort_by == "count":
+            decks_query = decks_query.order_by(desc(card_count), desc(Deck.created_at))
+        else:  # created_at (default)
+            decks_query = decks_query.order_by(desc(Deck.created_at))
+        
+        decks_result = await db.execute(decks_query)
+        deck_list = [
+            {
+                "id": deck.id,
+                "title": deck.title or "Untitled Deck",
+                "card_count": deck.card_count,
+                "difficulty": deck.difficulty,
+                "created_at": deck.created_at
+            }
+            for deck in decks_result
+        ]
+        
+        return FastJSONResponse(deck_list)
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Error fetching decks")
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def load_deck(db: AsyncSession, deck_uuid) -> dict | None:
+    """Load a deck and its flashcards as a response dict"""
+    # Query deck (columns only, no ORM objects)
+    result = await db.execute(
+        select(Deck.id, Deck.title, Deck.difficulty, Deck.created_at).where(Deck.id == deck_uuid)
+    )
+    deck = result.one_or_none()
+    
+    if not deck:
+        return None
+    
+    # Query flashcards
+    flashcards_result = await db.execute(
+        select(Flashcard.front, Flashcard.back).where(Flashcard.deck_id == deck_uuid)
+    )
+    flashcards = [
+        {"front": front, "back": back}
+        for front, back in flashcards_result
+    ]
+    
+    return {
+        "deck_id": deck.id,
+        "title": deck.title,
+        "flashcards": flashcards,
+        "count": len(flashcards),
+        "difficulty": deck.difficulty,
+        "created_at": deck.created_at
+    }
+
+async def _load_deck_shared(deck_uuid) -> dict | None:
+    # Shared by coalesced callers, so it uses its own session
+    async with AsyncSessionLocal() as session:
+        return await load_deck(session, deck_uuid)
+
+@router.get("/api/decks/{deck_id}")
+async def get_deck(
+    deck_id: str,
+    cache: LocalCache = Depends(get_cache),
+    flight: SingleFlight = Depends(get_singleflight)
+):
+    """Retrieve a deck and its flashcards by ID"""
+    try:
+        # Convert string to UUID
+        try:
+            deck_uuid = uuid.UUID(deck_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid deck ID format")
+        
+        # Served from the worker cache; concurrent misses share one query
+        deck = await cached(cache, ("deck", deck_uuid), lambda: _load_deck_shared(deck_uuid), flight)
+        
+        if not deck:
+            raise HTTPException(status_code=404, detail="Deck not found")
+        
+        return FastJSONResponse(deck)
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Error fetching deck")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.put("/api/decks/{deck_id}")
+async def update_deck(
+    deck_id: str,
+    deck_data: DeckUpdate,
+    user_id: str = Query(..., description="User ID"),
+    db: AsyncSession = Depends(get_db),
+    invalidation: InvalidationBus = Depends(get_invalidation)
+):
+    """Update a deck"""
+    try:
+        # Convert IDs to UUID
+        try:
+            deck_uuid = uuid.UUID(deck_id)
+            user_uuid = uuid.UUID(user_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid ID format")
+        
+        # Get deck
+        result = await db.execute(
+            select(Deck).where(Deck.id == deck_uuid, Deck.user_id == user_uuid)
+        )
+        deck = result.scalar_one_or_none()
+        
+        if not deck:
+            raise HTTPException(status_code=404, detail="Deck not found")
+        
+        # Update fields if provided
+        if deck_data.title is not None:
+            deck.title = deck_data.title
+        
+        await invalidation.publish(db, ("deck", deck_uuid))
+        await db.commit()
+        await db.refresh(deck)
+        
+        return {
+            "id": str(deck.id),
+            "title": deck.title,
+            "difficulty": deck.difficulty,
+            "created_at": deck.created_at.isoformat()
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Error updating deck")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.delete("/api/decks/{deck_id}")
+async def delete_deck(
+    deck_id: str,
+    user_id: str = Query(..., description="User ID"),
+    db: AsyncSession = Depends(get_db),
+    invalidation: InvalidationBus = Depends(get_invalidation)
+):
+    """Delete a deck"""
+    try:
+        # Convert IDs to UUID
+        try:
+            deck_uuid = uuid.UUID(deck_id)
+            user_uuid = uuid.UUID(user_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid ID format")
+        
+        # Get deck
+        result = await db.execute(
+            select(Deck).where(Deck.id == deck_uuid, Deck.user_id == user_uuid)
+        )
+        deck = result.scalar_one_or_none()
+        
+        if not deck:
+            raise HTTPException(status_code=404, detail="Deck not found")
+        
+        await db.delete(deck)
+        await invalidation.publish(db, ("deck", deck_uuid))
+        await db.commit()
+        
+        return {"message": "Deck deleted successfully"}
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Error deleting deck")
+        raise HTTPException(status_code=500, detail=str(e))
+
+def deck_summary(deck, card_count: int) -> dict:
+    return {
+        "id": str(deck.id),
+        "title": deck.title or "Untitled Deck",
+        "card_count": card_count,
+        "difficulty": deck.difficulty,
+        "created_at": deck.created_at.isoformat()
+    }
+
+@router.post("/api/decks/merge")
+async def merge_decks(
+    merge_data: DeckMerge,
+    db: AsyncSession = Depends(get_db),
+    invalidation: InvalidationBus = Depends(get_invalidation),
+    opener_queue: OpenerQueue = Depends(get_opener_queue)
+):
+    """Combine several decks into a new deck, entirely in SQL"""
+    try:
+        # Convert IDs to UUID (keeping order, dropping repeats)
+        try:
+            user_uuid = uuid.UUID(merge_data.user_id)
+            deck_uuids = list(dict.fromkeys(uuid.UUID(d) for d in merge_data.deck_ids))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid ID format")
+        
+        if len(deck_uuids) < 2:
+            raise HTTPException(status_code=400, detail="At least two different decks are required")
+        
+        deck, card_count = await deck_ops.merge_decks(
+            db,
+            deck_uuids,
+            user_uuid,
+            title=merge_data.title,
+            dedupe=merge_data.dedupe,
+            delete_sources=merge_data.delete_sources,
+        )
+        if deck is None:
+            raise HTTPException(status_code=404, detail="Deck not found")
+        
+        if merge_data.delete_sources:
+            await invalidation.publish(db, *[("deck", d) for d in deck_uuids])
+        await db.commit()
+        opener_queue.enqueue(deck.id)
+        return deck_summary(deck, card_count)
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Error merging decks")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/api/decks/{deck_id}/clone")
+async def clone_deck(
+    deck_id: str,
+    clone_data: DeckClone,
+    user_id: str = Query(..., description="User ID"),
+    db: AsyncSession = Depends(get_db),
+    opener_queue: OpenerQueue = Depends(get_opener_queue)
+):
+    """Duplicate a deck and its flashcards, entirely in SQL"""
+    try:
+        # Convert IDs to UUID
+        try:
+            deck_uuid = uuid.UUID(deck_id)
+            user_uuid = uuid.UUID(user_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid ID format")
+        
+        deck, card_count = await deck_ops.clone_deck(
+            db, deck_uuid, user_uuid, title=clone_data.title, dedupe=clone_data.dedupe
+        )
+        if deck is None:
+            raise HTTPException(status_code=404, detail="Deck not found")
+        
+        await db.commit()
+        opener_queue.enqueue(deck.id)
+        return deck_summary(deck, card_count)
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Error cloning deck")
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Words API endpoints
@@ -0,0 +1,227 @@
+import asyncio
+import logging
+import hashlib
+import json
+import time
+import uuid
+
+from fastapi import APIRouter, HTTPException, Depends
+
+from src import lexicon
+from src.database import AsyncSessionLocal
+from src.llm import Completion, LLMNotConfiguredError
+from src.llm_routing import LLMRouter, get_llm_router
+from src.models import Deck, Flashcard
+from src.openers import OpenerQueue, get_opener_queue
+from src.ratelimit import AdmissionController, get_admission
+from src.schema import TextInput, FlashcardResponse
+from src.singleflight import SingleFlight, get_singleflight
+from src.tokens import generation_budget, generation_chunks, lexicon_budget
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+def generation_key(input_data: TextInput, user_uuid: uuid.UUID) -> tuple:
+    """Identity of a generation request: same user, difficulty, languages and text (whitespace-normalized)"""
+    normalized = " ".join(input_data.text.split())
+    digest = hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+    return (
+        "generate", user_uuid, input_data.difficulty,
+        input_data.source_language, input_data.target_language, digest,
+    )
+
+async def extract_with_lexicon(
+    input_data: TextInput,
+    llm_router: LLMRouter,
+    admission: AdmissionController
+) -> tuple[list[dict], list[lexicon.Translation], list[Completion]]:
+    """Resolve known words from the shared lexicon; only unknown words go to the model"""
+    source, target = input_data.source_language, input_data.target_language
+    words = lexicon.tokenize(input_data.text)
+    async with AsyncSessionLocal() as db:
+        entries = await lexicon.lookup(db, words, source, target)
+    unknown = [w for w in words if w not in entries]
+
+    async def translate(chunk: list[str]) -> tuple[list[lexicon.Translation], Completion]:
+        # No session is held while the model writes
+        route = llm_router.policy.generation(input_data.difficulty, " ".join(chunk))
+        async with admission.slot():
+            completion = await llm_router.complete(
+                route,
+                endpoint="generate_flashcards",
+                budget=lexicon_budget(chunk),
+                user_id=input_data.user_id,
+                messages=[{"role": "user", "content": lexicon.build_prompt(chunk, source, target)}]
+            )
+        return lexicon.parse_translations(completion.text, chunk), completion
+
+    # Long word lists are split so each reply fits its max_tokens
+    chunks = [unknown[i:i + lexicon.MAX_UNKNOWN_WORDS] for i in range(0, len(unknown), lexicon.MAX_UNKNOWN_WORDS)]
+    answers = await asyncio.gather(*(translate(chunk) for chunk in chunks))
+    learned = [entry for chunk_learned, _ in answers for entry in chunk_learned]
+    entries.update((entry.word, entry) for entry in learned)
+
+    logger.info("Resolved words through the lexicon", extra={
+        "words": len(words),
+        "known": len(words) - len(unknown),
+        "unknown": len(unknown),
+    })
+    return lexicon.to_cards(words, entries, input_data.difficulty), learned, [completion for _, completion in answers]
+
+async def extract_from_text(
+    input_data: TextInput,
+    llm_router: LLMRouter,
+    admission: AdmissionController
+) -> tuple[list[dict], list[Completion]]:
+    """Ask the model to pick and translate the vocabulary of the whole text"""
+    async def extract(text: str) -> tuple[list[dict], Completion]:
+        # Easy and short texts go to the fast model
+        route = llm_router.policy.generation(input_data.difficulty, text)
+
+        # Generate flashcards with AI
+        async with admission.slot():
+            completion = await llm_router.complete(
+                route,
+                endpoint="generate_flashcards",
+                budget=generation_budget(text, input_data.difficulty),
+                user_id=input_data.user_id,
+                messages=[{
+                    "role": "user",
+                    "content": f"""
+                    Extract vocabulary words and create flashcards.
+
+                    STRICT RULES:
+                    1. Front: ONE word (e.g., "chien")
+                    2. Back: ONE word translation (e.g., "dog")
+                    3. NO phrases - ONLY single words
+                    4. Return ONLY valid JSON array, no markdown
+
+                    Example: [{{"front": "chien", "back": "dog"}}]
+
+                    Difficulty: {input_data.difficulty}
+                    Text: {text}
+                    """
+                }]
+            )
+
+        # Parse flashcards
+        return parse_flashcards(completion.text), completion
+
+    # A text with more cards than one reply holds is split between sentences
+    answers = await asyncio.gather(*(
+        extract(chunk) for chunk in generation_chunks(input_data.text, input_data.difficulty)
+    ))
+    cards = {}
+    for chunk_cards, _ in answers:
+        for card in chunk_cards:
+            cards.setdefault(card["front"].lower(), card)
+    return list(cards.values()), [completion for _, completion in answers]
+
+async def create_deck_from_text(
+    input_data: TextInput,
+    user_uuid,
+    llm_router: LLMRouter,
+    admission: AdmissionController
+) -> dict:
+    """Extract flashcards from the text and save them as a new deck"""
+    start = time.perf_counter()
+    learned = []
+    if lexicon.supports(input_data.source_language):
+        flashcards_data, learned, completions = await extract_with_lexicon(input_data, llm_router, admission)
+    else:
+        flashcards_data, completions = await extract_from_text(input_data, llm_router, admission)
+
+    # Save to database (own session: the result may be shared by coalesced callers)
+    async with AsyncSessionLocal() as db:
+        # Create deck
+        deck = Deck(
+            id=uuid.uuid4(),
+            title=f"Deck from {input_data.text[:30]}...",
+            source_text=input_data.text[:500],
+            difficulty=input_data.difficulty,
+            user_id=user_uuid
+        )
+        db.add(deck)
+        await db.flush()  # Get the deck ID
+
+        # Create flashcards
+        for card_data in flashcards_data:
+            flashcard = Flashcard(
+                deck_id=deck.id,
+                front=card_data["front"],
+                back=card_data["back"],
+                user_id=user_uuid
+            )
+            db.add(flashcard)
+
+        if learned:
+            await db.execute(lexicon.record_statement(
+                learned, input_data.source_language, input_data.target_language, "generation"
+            ))
+
+        await db.commit()
+
+    logger.info("Saved generated deck", extra={
+        "deck_id": deck.id,
+        "cards": len(flashcards_data),
+        "llm_calls": len(completions),
+        "model": completions[0].model if completions else None,
+        "input_tokens": sum(c.input_tokens for c in completions),
+        "output_tokens": sum(c.output_tokens for c in completions),
+    })
+
+    # Return response with deck_id
+    return {
+        "deck_id": str(deck.id),
+        "flashcards": flashcards_data,
+        "count": len(flashcards_data),
+        "difficulty": input_data.difficulty,
+        "processing_time": round(time.perf_counter() - start, 3)
+    }
+
+@router.post("/api/generate-flashcards", response_model=FlashcardResponse)
+async def generate_flashcards(
+    input_data: TextInput,
+    llm_router: LLMRouter = Depends(get_llm_router),
+    admission: AdmissionController = Depends(get_admission),
+    flight: SingleFlight = Depends(get_singleflight),
+    opener_queue: OpenerQueue = Depends(get_opener_queue)
+):
+    """Generate flashcards from text using AI and save to database"""
+    logger.info("Generating flashcards", extra={
+        "user_id": input_data.user_id,
+        "difficulty": input_data.difficulty,
+        "text_chars": len(input_data.text),
+    })
+
+    try:
+        # Convert user_id string to UUID
+        try:
+            user_uuid = uuid.UUID(input_data.user_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid user_id format")
+
+        # A duplicate of a generation already running (e.g. a double-click)
+        # joins it and gets the same deck, without being charged again
+        key = generation_key(input_data, user_uuid)
+        if not flight.in_flight(key):
+            # Charge the token budgets before doing any work (fast 429)
+            await llm_router.check_quota(user_uuid)
+            admission.check(str(user_uuid), generation_budget(input_data.text, input_data.difficulty).total)
+
+        result = await flight.do(key, lambda: create_deck_from_text(input_data, user_uuid, llm_router, admission))
+
+        # Have the first conversation turn ready before it's practiced
+        opener_queue.enqueue(uuid.UUID(result["deck_id"]))
+        return result
+
+    except HTTPException:
+        raise
+    except LLMNotConfiguredError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    except Exception as e:
+        logger.exception("Error generating flashcards")
+        raise HTTPException(status_code=500, detail=str(e))
+
+def parse_flashcards(ai_response: str) -> list[dict]:
+    return json.loads(ai_response)
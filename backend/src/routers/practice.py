@@ -0,0 +1,173 @@
+import logging
+import uuid
+
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database import get_db
+from src.llm import LLMNotConfiguredError
+from src.llm_routing import LLMRouter, get_llm_router
+from src.models import Deck, Flashcard
+from src.openers import find_opener
+from src.ratelimit import AdmissionController, get_admission
+from src.schema import ConversationRequest, ConversationSettings
+from src.tokens import estimate_conversation_cost, estimate_tokens, turn_budget
+from src.tutor import OPENING_MESSAGE, build_system_prompt, find_words_used
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+@router.post("/api/practice/conversation")
+async def practice_conversation(
+    request: ConversationRequest,
+    db: AsyncSession = Depends(get_db),
+    llm_router: LLMRouter = Depends(get_llm_router),
+    admission: AdmissionController = Depends(get_admission)
+):
+    """Generate AI tutor response for conversational practice"""
+    try:
+        # Convert IDs to UUID
+        try:
+            deck_uuid = uuid.UUID(request.deck_id)
+            user_uuid = uuid.UUID(request.user_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid ID format")
+        
+        # Charge the token budgets before doing any work (fast 429)
+        admission.check(str(user_uuid), estimate_conversation_cost(request.messages))
+        await llm_router.check_quota(user_uuid)
+        
+        # Get deck and verify ownership
+        deck_result = await db.execute(
+            select(Deck).where(Deck.id == deck_uuid, Deck.user_id == user_uuid)
+        )
+        deck = deck_result.scalar_one_or_none()
+        
+        if not deck:
+            raise HTTPException(status_code=404, detail="Deck not found")
+        
+        # Get flashcards for this deck
+        flashcards_result = await db.execute(
+            select(Flashcard).where(Flashcard.deck_id == deck_uuid)
+        )
+        flashcards = flashcards_result.scalars().all()
+        
+        if not flashcards:
+            raise HTTPException(status_code=400, detail="Deck has no flashcards")
+        
+        # Validate messages array
+        if not request.messages or len(request.messages) == 0:
+            raise HTTPException(status_code=400, detail="At least one message is required")
+        
+        # Build vocabulary list
+        vocabulary_words = [{"word": f.front, "definition": f.back} for f in flashcards]
+        
+        # Get settings or use defaults
+        settings = request.settings or ConversationSettings()
+        
+        # Create enhanced system prompt
+        system_prompt = build_system_prompt(vocabulary_words, settings, request.is_first_message)
+        
+        # Validate messages array
+        if not request.messages or len(request.messages) == 0:
+            raise HTTPException(status_code=400, detail="At least one message is required")
+        
+        # Prepare messages for Claude
+        claude_messages = [
+            {"role": msg.role, "content": msg.content}
+            for msg in request.messages
+        ]
+        
+        logger.info("Generating conversation response", extra={
+            "deck_id": request.deck_id,
+            "message_count": len(claude_messages),
+        })
+        
+        # The opening turn is usually pre-generated (see src/openers.py)
+        completion = None
+        if request.is_first_message and [m.content for m in request.messages] == [OPENING_MESSAGE]:
+            completion = await find_opener(db, deck_uuid, settings, vocabulary_words)
+        
+        if completion is None:
+            # Native-level immersion and long histories go to the strong model
+            history_tokens = sum(estimate_tokens(m.content) for m in request.messages)
+            route = llm_router.policy.conversation(settings.immersionLevel, history_tokens)
+            
+            # Call Claude API
+            async with admission.slot():
+                completion = await llm_router.complete(
+                    route,
+                    endpoint="practice_conversation",
+                    budget=turn_budget(system_prompt, claude_messages),
+                    user_id=user_uuid,
+                    system=system_prompt,
+                    messages=claude_messages
+                )
+        
+        ai_response = completion.text
+        
+        # Extract words used (simple pattern matching)
+        words_used = find_words_used(ai_response, vocabulary_words)
+        
+        logger.info("Generated conversation response", extra={
+            "deck_id": request.deck_id,
+            "words_used": len(words_used),
+            "model": completion.model,
+            "output_tokens": completion.output_tokens,
+        })
+        
+        return {
+            "message": ai_response,
+            "words_used": words_used
+        }
+    
+    except HTTPException:
+        raise
+    except LLMNotConfiguredError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    except Exception as e:
+        logger.exception("Error in conversation")
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Practice Session and Stats API endpoints
+
+# Speech-to-Text endpoint for Firefox
+@router.post("/api/speech-to-text")
+async def speech_to_text(audio: UploadFile = File(...)):
+    """
+    Convert audio to text using Web Speech API polyfill or external service.
+    For Firefox compatibility, this endpoint receives audio and returns transcription.
+    """
+    try:
+        # Read audio file
+        audio_bytes = await audio.read()
+        
+        # For now, return a placeholder response
+        # In production, you would:
+        # 1. Use Google Cloud Speech-to-Text API
+        # 2. Use Azure Speech Services
+        # 3. Use AWS Transcribe
+        # 4. Use a local speech recognition library
+        
+        # Placeholder: This would need to be replaced with actual speech recognition
+        # For now, we'll use a simple approach that works with browser's built-in capabilities
+        
+        # Note: For a production implementation, you would:
+        # - Save audio file temporarily
+        # - Call speech recognition API (Google Cloud, Azure, etc.)
+        # - Return transcription
+        
+        # Temporary solution: Return error suggesting to use Chrome/Edge
+        # Or implement with a service like Google Cloud Speech-to-Text
+        
+        raise HTTPException(
+            status_code=501, 
+            detail="Speech-to-text service not configured. Please use Chrome or Edge for voice input, or configure a speech recognition service in the backend."
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Error processing speech-to-text")
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,347 @@
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.cache import LocalCache, cached
+from src.database import get_db, AsyncSessionLocal
+from src.events import BufferedEvent, BufferFullError, BufferClosedError, WriteBehindBuffer
+from src.invalidation import InvalidationBus, get_cache, get_invalidation
+from src.models import PracticeSession, UserSetting
+from src.singleflight import SingleFlight, get_singleflight
+from src.schema import SessionCreate, SessionResponse, EventBatch, EventBatchResponse, UserSettingUpdate
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+def get_event_buffer(request: Request) -> WriteBehindBuffer:
+    """Dependency that provides the app's write-behind event buffer"""
+    return request.app.state.event_buffer
+
+@router.post("/api/sessions", response_model=SessionResponse)
+async def create_session(
+    session_data: SessionCreate,
+    db: AsyncSession = Depends(get_db),
+    invalidation: InvalidationBus = Depends(get_invalidation)
+):
+    """Save a practice session"""
+    try:
+        # Convert user_id string to UUID
+        try:
+            user_uuid = uuid.UUID(session_data.user_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid user_id format")
+        
+        deck_uuid = None
+        if session_data.deck_id:
+            try:
+                deck_uuid = uuid.UUID(session_data.deck_id)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid deck_id format")
+        
+        # Create session
+        # IMPORTANT: duration_seconds must be in SECONDS, not minutes
+        # Frontend sends seconds, we store seconds directly
+        duration_seconds = session_data.duration_seconds
+        if duration_seconds < 1:
+            raise HTTPException(status_code=400, detail="Duration must be at least 1 second")
+        
+        logger.debug("Saving session", extra={"event": "session_saved", "duration_seconds": duration_seconds})
+        
+        session = PracticeSession(
+            id=uuid.uuid4(),
+            user_id=user_uuid,
+            deck_id=deck_uuid,
+            practice_type=session_data.practice_type,
+            duration_seconds=duration_seconds  # Stored as SECONDS
+        )
+        
+        db.add(session)
+        await invalidation.publish(db, ("stats", user_uuid))
+        await db.commit()
+        await db.refresh(session)
+        
+        return {
+            "id": str(session.id),
+            "user_id": str(session.user_id),
+            "deck_id": str(session.deck_id) if session.deck_id else None,
+            "practice_type": session.practice_type,
+            "duration_seconds": session.duration_seconds,
+            "completed_at": session.completed_at.isoformat()
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Error creating session")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/api/events/batch", response_model=EventBatchResponse, status_code=202)
+async def ingest_events(
+    batch_data: EventBatch,
+    event_buffer: WriteBehindBuffer = Depends(get_event_buffer)
+):
+    """Accept a batch of session/review events for buffered, idempotent writing"""
+    try:
+        user_uuid = uuid.UUID(batch_data.user_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid user_id format")
+    
+    buffered = []
+    for event in batch_data.events:
+        deck_uuid = None
+        if event.deck_id:
+            try:
+                deck_uuid = uuid.UUID(event.deck_id)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid deck_id format")
+        
+        occurred_at = event.occurred_at or datetime.now(timezone.utc)
+        if occurred_at.tzinfo is None:
+            occurred_at = occurred_at.replace(tzinfo=timezone.utc)
+        
+        if event.type == "session":
+            if event.duration_seconds is None:
+                raise HTTPException(status_code=400, detail="Session events require duration_seconds")
+            buffered.append(BufferedEvent(
+                table="practice_sessions",
+                user_id=user_uuid,
+                client_event_id=event.idempotency_key,
+                values={
+                    "id": uuid.uuid4(),
+                    "deck_id": deck_uuid,
+                    "practice_type": event.practice_type,
+                    "duration_seconds": event.duration_seconds,  # Stored as SECONDS
+                    "completed_at": occurred_at,
+                },
+            ))
+        else:
+            if event.result is None:
+                raise HTTPException(status_code=400, detail="Review events require result")
+            buffered.append(BufferedEvent(
+                table="review_events",
+                user_id=user_uuid,
+                client_event_id=event.idempotency_key,
+                values={
+                    "id": uuid.uuid4(),
+                    "deck_id": deck_uuid,
+                    "flashcard_id": event.flashcard_id,
+                    "result": event.result,
+                    "response_ms": event.response_ms,
+                    "occurred_at": occurred_at,
+                },
+            ))
+    
+    try:
+        accepted, duplicates = await event_buffer.add(buffered)
+    except (BufferFullError, BufferClosedError) as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    
+    return {"accepted": accepted, "duplicates": duplicates}
+
+async def calculate_stats_for_type(db: AsyncSession, user_uuid, start_of_day, practice_type: str):
+    """Helper function to calculate stats for a specific practice type"""
+    # Bounded on both sides so only this month's partition is read
+    end_of_day = start_of_day + timedelta(days=1)
+    
+    # Query sessions for this type
+    result = await db.execute(
+        select(func.sum(PracticeSession.duration_seconds))
+        .where(
+            PracticeSession.user_id == user_uuid,
+            PracticeSession.completed_at >= start_of_day,
+            PracticeSession.completed_at < end_of_day,
+            PracticeSession.practice_type == practice_type
+        )
+    )
+    # Sum all duration_seconds (which are stored in SECONDS)
+    total_seconds = result.scalar() or 0
+    
+    # Convert to minutes for display (integer division)
+    # IMPORTANT: total_seconds is in SECONDS, we convert to minutes here
+    total_minutes = total_seconds // 60
+    
+    # Get session count
+    count_result = await db.execute(
+        select(func.count(PracticeSession.id))
+        .where(
+            PracticeSession.user_id == user_uuid,
+            PracticeSession.completed_at >= start_of_day,
+            PracticeSession.completed_at < end_of_day,
+            PracticeSession.practice_type == practice_type
+        )
+    )
+    session_count = count_result.scalar() or 0
+    
+    return {
+        "total_minutes": total_minutes,
+        "total_seconds": total_seconds,
+        "session_count": session_count
+    }
+
+async def compute_daily_stats(db: AsyncSession, user_uuid, start_of_day) -> dict:
+    """Today's totals per practice type and combined, against the user's daily goal"""
+    # Get stats for each session type
+    flashcard_stats = await calculate_stats_for_type(db, user_uuid, start_of_day, "flashcard")
+    conversation_stats = await calculate_stats_for_type(db, user_uuid, start_of_day, "conversation")
+    
+    # Calculate combined totals
+    total_minutes = flashcard_stats["total_minutes"] + conversation_stats["total_minutes"]
+    total_seconds = flashcard_stats["total_seconds"] + conversation_stats["total_seconds"]
+    total_session_count = flashcard_stats["session_count"] + conversation_stats["session_count"]
+    
+    # Get user's daily goal
+    settings_result = await db.execute(
+        select(UserSetting).where(UserSetting.user_id == user_uuid)
+    )
+    user_setting = settings_result.scalar_one_or_none()
+    daily_goal_minutes = user_setting.daily_goal_minutes if user_setting else 15
+    
+    return {
+        "flashcard": {
+            **flashcard_stats,
+            "progress_percentage": min(100, int((flashcard_stats["total_minutes"] / daily_goal_minutes) * 100)) if daily_goal_minutes > 0 else 0,
+            "goal_reached": flashcard_stats["total_minutes"] >= daily_goal_minutes
+        },
+        "conversation": {
+            **conversation_stats,
+            "progress_percentage": min(100, int((conversation_stats["total_minutes"] / daily_goal_minutes) * 100)) if daily_goal_minutes > 0 else 0,
+            "goal_reached": conversation_stats["total_minutes"] >= daily_goal_minutes
+        },
+        "combined": {
+            "total_minutes": total_minutes,
+            "total_seconds": total_seconds,
+            "session_count": total_session_count,
+            "daily_goal_minutes": daily_goal_minutes,
+            "progress_percentage": min(100, int((total_minutes / daily_goal_minutes) * 100)) if daily_goal_minutes > 0 else 0,
+            "goal_reached": total_minutes >= daily_goal_minutes
+        }
+    }
+
+async def _load_daily_stats_shared(user_uuid, start_of_day) -> dict:
+    # Shared by coalesced callers, so it uses its own session
+    async with AsyncSessionLocal() as session:
+        return await compute_daily_stats(session, user_uuid, start_of_day)
+
+@router.get("/api/stats/daily")
+async def get_daily_stats(
+    user_id: str = Query(..., description="User ID"),
+    cache: LocalCache = Depends(get_cache),
+    flight: SingleFlight = Depends(get_singleflight)
+):
+    """Get today's practice statistics (separated by session type)"""
+    try:
+        # Convert user_id string to UUID
+        try:
+            user_uuid = uuid.UUID(user_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid user_id format")
+        
+        # Get start of today (UTC)
+        now = datetime.now(timezone.utc)
+        start_of_day = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        
+        # Cached until the user's next session; concurrent misses share one computation
+        return await cached(
+            cache,
+            ("stats", user_uuid, start_of_day),
+            lambda: _load_daily_stats_shared(user_uuid, start_of_day),
+            flight
+        )
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Error fetching daily stats")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/api/user-settings")
+async def get_user_settings(
+    user_id: str = Query(..., description="User ID"),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get user settings"""
+    try:
+        # Convert user_id string to UUID
+        try:
+            user_uuid = uuid.UUID(user_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid user_id format")
+        
+        result = await db.execute(
+            select(UserSetting).where(UserSetting.user_id == user_uuid)
+        )
+        user_setting = result.scalar_one_or_none()
+        
+        # If no settings exist, return defaults
+        if not user_setting:
+            return {
+                "daily_goal_minutes": 15,
+                "created_at": None,
+                "updated_at": None
+            }
+        
+        return {
+            "daily_goal_minutes": user_setting.daily_goal_minutes,
+            "created_at": user_setting.created_at.isoformat(),
+            "updated_at": user_setting.updated_at.isoformat() if user_setting.updated_at else None
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Error fetching user settings")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.put("/api/user-settings")
+async def update_user_settings(
+    user_id: str = Query(..., description="User ID"),
+    settings_data: UserSettingUpdate = ...,
+    db: AsyncSession = Depends(get_db),
+    invalidation: InvalidationBus = Depends(get_invalidation)
+):
+    """Update user settings"""
+    try:
+        # Convert user_id string to UUID
+        try:
+            user_uuid = uuid.UUID(user_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid user_id format")
+        
+        result = await db.execute(
+            select(UserSetting).where(UserSetting.user_id == user_uuid)
+        )
+        user_setting = result.scalar_one_or_none()
+        
+        if not user_setting:
+            # Create new settings
+            user_setting = UserSetting(
+                id=uuid.uuid4(),
+                user_id=user_uuid,
+                daily_goal_minutes=settings_data.daily_goal_minutes
+            )
+            db.add(user_setting)
+        else:
+            # Update existing settings
+            user_setting.daily_goal_minutes = settings_data.daily_goal_minutes
+            user_setting.updated_at = datetime.utcnow()
+        
+        # The daily goal is part of the cached stats
+        await invalidation.publish(db, ("stats", user_uuid))
+        await db.commit()
+        await db.refresh(user_setting)
+        
+        return {
+            "daily_goal_minutes": user_setting.daily_goal_minutes,
+            "created_at": user_setting.created_at.isoformat(),
+            "updated_at": user_setting.updated_at.isoformat() if user_setting.updated_at else None
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Error updating user settings")
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,102 @@
+from typing import Union
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src import metrics
+from src.database import get_db
+from src.profiling import Profiler, get_profiler
+from src.responses import FastJSONResponse
+
+router = APIRouter()
+
+@router.get("/")
+def read_root():
+    return {"Hello": "World"}
+
+@router.get("/api/health")
+def health():
+    """Liveness: the process is up and serving"""
+    return {"status": "ok"}
+
+@router.get("/api/ready")
+def ready(request: Request):
+    """Readiness: startup finished and the connection pool is warm"""
+    state = request.app.state
+    body = {
+        "status": "ready" if state.ready else "starting",
+        "database": state.settings.database_url is not None,
+        "startup_seconds": state.startup_seconds,
+    }
+    return FastJSONResponse(body, status_code=200 if state.ready else 503)
+
+@router.get("/api/internal/stats", dependencies=[Depends(metrics.check_metrics_access)])
+def internal_stats(request: Request):
+    """Counters for duplicate work saved, admission control, LLM routing and usage, background LLM work, token checks, the read cache and SQL per route"""
+    state = request.app.state
+    admission = state.admission
+    cache = state.cache
+    return {
+        "singleflight": state.singleflight.stats(),
+        "admission": {
+            "admitted": admission.admitted,
+            "rejected_user": admission.rejected_user,
+            "rejected_global": admission.rejected_global,
+            "rejected_queue": admission.rejected_queue,
+            "in_flight": admission.in_flight,
+            "queue_depth": admission.queue_depth,
+        },
+        "llm": state.llm_router.stats(),
+        "openers": state.opener_queue.stats(),
+        "enrichment": state.enrichment.stats(),
+        "usage": state.usage.stats(),
+        "auth": state.auth.stats(),
+        "cache": {
+            "enabled": cache.enabled,
+            "entries": len(cache),
+            "hits": cache.hits,
+            "misses": cache.misses,
+            "evictions": cache.evictions,
+            "invalidations_received": state.invalidation.received,
+        },
+        "queries": state.query_metrics.snapshot(),
+    }
+
+@router.get("/metrics", dependencies=[Depends(metrics.check_metrics_access)])
+def prometheus_metrics():
+    """Prometheus scrape endpoint"""
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
+@router.get("/api/internal/profiles")
+def list_profiles(profiler: Profiler = Depends(get_profiler)):
+    """Most recent request profiles, newest first"""
+    return [profile.summary() for profile in reversed(profiler.profiles)]
+
+@router.get("/api/internal/profiles/{profile_id}")
+def download_profile(
+    profile_id: int,
+    mode: str = Query(default="wall", pattern="^(wall|cpu)$", description="wall (includes waiting) or cpu"),
+    profiler: Profiler = Depends(get_profiler)
+):
+    """One profile as collapsed stacks (for flamegraph.pl or speedscope)"""
+    profile = profiler.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(
+        profile.collapsed(mode),
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}-{mode}.txt"'},
+    )
+
+@router.get("/api/test-db")
+async def test_db(db: AsyncSession = Depends(get_db)):
+    try:
+        result = await db.execute(text("SELECT 1"))
+        return {"status": "✅ Database connected!", "result": result.scalar()}
+    except Exception as e:
+        return {"status": "❌ Database connection failed", "error": str(e)}
+
+@router.get("/items/{item_id}")
+def read_item(item_id:int, q: Union[str, None] = None):
+    return {"item_id": item_id, "q": q}
@@ -0,0 +1,64 @@
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from fastapi import APIRouter, HTTPException, Depends, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database import get_db
+from src.models import LLMUsageDaily
+from src.usage import UsageLedger, get_usage_ledger
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+@router.get("/api/usage/daily")
+async def get_daily_usage(
+    user_id: str = Query(..., description="User ID"),
+    days: int = Query(default=7, ge=1, le=90, description="Number of days, including today"),
+    db: AsyncSession = Depends(get_db),
+    ledger: UsageLedger = Depends(get_usage_ledger)
+):
+    """Get the user's AI usage per day (UTC) and today's quota"""
+    try:
+        # Convert user_id string to UUID
+        try:
+            user_uuid = uuid.UUID(user_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid user_id format")
+
+        today = datetime.now(timezone.utc).date()
+        # One primary-key range read, however many calls the user made
+        result = await db.execute(
+            select(LLMUsageDaily)
+            .where(LLMUsageDaily.user_id == user_uuid, LLMUsageDaily.day > today - timedelta(days=days))
+            .order_by(LLMUsageDaily.day.desc())
+        )
+        rows = result.scalars().all()
+
+        used_today = next((r.input_tokens + r.output_tokens for r in rows if r.day == today), 0)
+        quota = ledger.daily_token_quota or None
+        return {
+            "days": [
+                {
+                    "day": r.day.isoformat(),
+                    "calls": r.calls,
+                    "input_tokens": r.input_tokens,
+                    "output_tokens": r.output_tokens,
+                    "processing_seconds": round(r.duration_ms / 1000, 3),
+                }
+                for r in rows
+            ],
+            "today": {
+                "tokens": used_today,
+                "quota": quota,
+                "remaining": max(0, quota - used_today) if quota else None,
+            },
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Error fetching daily usage")
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,266 @@
+import logging
+import uuid
+from datetime import datetime
+
+from fastapi import APIRouter, HTTPException, Depends, Query
+from sqlalchemy import select, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src import transfer
+from src.cache import LocalCache, cached
+from src.database import get_db
+from src.invalidation import InvalidationBus, get_cache, get_invalidation
+from src.models import Word
+from src.responses import FastJSONResponse
+from src.schema import WordCreate, WordUpdate, WordResponse, WordsBatchCreate, WordsBatchResponse
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+WORD_COLUMNS = (Word.id, Word.word, Word.definition, Word.example, Word.pronunciation, Word.created_at, Word.updated_at)
+
+def word_to_dict(word) -> dict:
+    """Shape a Word (or WORD_COLUMNS row) like WordResponse, leaving ids and dates to the JSON encoder"""
+    return {
+        "id": word.id,
+        "word": word.word,
+        "definition": word.definition,
+        "example": word.example if word.example else None,
+        "pronunciation": word.pronunciation if word.pronunciation else None,
+        "created_at": word.created_at,
+        "updated_at": word.updated_at
+    }
+
+async def load_words_page(db: AsyncSession, user_uuid, page: int, page_size: int, search: str) -> list[dict]:
+    """One page of a user's words, most recent first"""
+    # Build query
+    query = select(*WORD_COLUMNS).where(Word.user_id == user_uuid)
+    
+    # Add search filter if provided
+    if search:
+        search_filter = or_(
+            Word.word.ilike(f"%{search}%"),
+            Word.definition.ilike(f"%{search}%"),
+            Word.example.ilike(f"%{search}%")
+        )
+        query = query.where(search_filter)
+    
+    # Order by created_at descending (most recent first)
+    query = query.order_by(Word.created_at.desc())
+    
+    # Apply pagination
+    offset = (page - 1) * page_size
+    query = query.offset(offset).limit(page_size)
+    
+    # Execute query
+    result = await db.execute(query)
+    
+    return [word_to_dict(word) for word in result]
+
+@router.get("/api/my-words", response_model=list[WordResponse])
+async def get_my_words(
+    user_id: str = Query(..., description="User ID"),
+    page: int = Query(default=1, ge=1, description="Page number"),
+    page_size: int = Query(default=20, ge=1, le=100, description="Items per page"),
+    search: str = Query(default="", description="Search query"),
+    db: AsyncSession = Depends(get_db),
+    cache: LocalCache = Depends(get_cache)
+):
+    """Get all words for a specific user with pagination and search"""
+    try:
+        # Convert user_id string to UUID
+        try:
+            user_uuid = uuid.UUID(user_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid user_id format")
+        
+        # Pages are cached per worker until the user's words change
+        words = await cached(
+            cache,
+            ("words", user_uuid, page, page_size, search),
+            lambda: load_words_page(db, user_uuid, page, page_size, search)
+        )
+        
+        return FastJSONResponse(words)
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Error fetching words")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/api/words", response_model=WordResponse)
+async def create_word(
+    word_data: WordCreate,
+    db: AsyncSession = Depends(get_db),
+    invalidation: InvalidationBus = Depends(get_invalidation)
+):
+    """Create a new word"""
+    try:
+        # Convert user_id string to UUID
+        try:
+            user_uuid = uuid.UUID(word_data.user_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid user_id format")
+        
+        # Create word
+        word = Word(
+            id=uuid.uuid4(),
+            user_id=user_uuid,
+            word=word_data.word,
+            definition=word_data.definition,
+            example=word_data.example if word_data.example else None,
+            pronunciation=word_data.pronunciation if word_data.pronunciation else None
+        )
+        
+        db.add(word)
+        await invalidation.publish(db, ("words", user_uuid))
+        try:
+            await db.commit()
+        except IntegrityError:
+            raise HTTPException(status_code=409, detail="Word already exists")
+        await db.refresh(word)
+        
+        return FastJSONResponse(word_to_dict(word))
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Error creating word")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.put("/api/words/{word_id}", response_model=WordResponse)
+async def update_word(
+    word_id: str,
+    word_data: WordUpdate,
+    user_id: str,
+    db: AsyncSession = Depends(get_db),
+    invalidation: InvalidationBus = Depends(get_invalidation)
+):
+    """Update an existing word"""
+    try:
+        # Convert IDs to UUID
+        try:
+            word_uuid = uuid.UUID(word_id)
+            user_uuid = uuid.UUID(user_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid ID format")
+        
+        # Get word
+        result = await db.execute(
+            select(Word).where(Word.id == word_uuid, Word.user_id == user_uuid)
+        )
+        word = result.scalar_one_or_none()
+        
+        if not word:
+            raise HTTPException(status_code=404, detail="Word not found")
+        
+        # Update fields if provided
+        if word_data.word is not None:
+            word.word = word_data.word
+        if word_data.definition is not None:
+            word.definition = word_data.definition
+        if word_data.example is not None:
+            word.example = word_data.example if word_data.example else None
+        if word_data.pronunciation is not None:
+            word.pronunciation = word_data.pronunciation if word_data.pronunciation else None
+        
+        word.updated_at = datetime.utcnow()
+        
+        await invalidation.publish(db, ("words", user_uuid))
+        try:
+            await db.commit()
+        except IntegrityError:
+            raise HTTPException(status_code=409, detail="Word already exists")
+        await db.refresh(word)
+        
+        return FastJSONResponse(word_to_dict(word))
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Error updating word")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.delete("/api/words/{word_id}")
+async def delete_word(
+    word_id: str,
+    user_id: str,
+    db: AsyncSession = Depends(get_db),
+    invalidation: InvalidationBus = Depends(get_invalidation)
+):
+    """Delete a word"""
+    try:
+        # Convert IDs to UUID
+        try:
+            word_uuid = uuid.UUID(word_id)
+            user_uuid = uuid.UUID(user_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid ID format")
+        
+        # Get word
+        result = await db.execute(
+            select(Word).where(Word.id == word_uuid, Word.user_id == user_uuid)
+        )
+        word = result.scalar_one_or_none()
+        
+        if not word:
+            raise HTTPException(status_code=404, detail="Word not found")
+        
+        await db.delete(word)
+        await invalidation.publish(db, ("words", user_uuid))
+        await db.commit()
+        
+        return {"message": "Word deleted successfully"}
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Error deleting word")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/api/words/batch", response_model=WordsBatchResponse)
+async def create_words_batch(
+    batch_data: WordsBatchCreate,
+    db: AsyncSession = Depends(get_db),
+    invalidation: InvalidationBus = Depends(get_invalidation)
+):
+    """Create multiple words at once, skipping duplicates"""
+    try:
+        # Convert user_id string to UUID
+        try:
+            user_uuid = uuid.UUID(batch_data.user_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid user_id format")
+        
+        rows = [
+            {
+                "word": word_data.word,
+                "definition": word_data.definition,
+                "example": word_data.example if word_data.example else None,
+                "pronunciation": word_data.pronunciation if word_data.pronunciation else None
+            }
+            for word_data in batch_data.words
+        ]
+        
+        # One INSERT; duplicates (case-insensitive, against the user's words
+        # and within the batch) are skipped through the unique index
+        saved_count = await transfer.insert_words_batch(db, user_uuid, rows)
+        
+        if saved_count:
+            await invalidation.publish(db, ("words", user_uuid))
+        await db.commit()
+        
+        return {
+            "saved": saved_count,
+            "skipped": len(rows) - saved_count,
+            "errors": []
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Error creating words batch")
+        raise HTTPException(status_code=500, detail=str(e))
+
@@ -0,0 +1,154 @@
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+# Flashcard generation
+
+class TextInput(BaseModel):
+    text: str = Field(..., min_length=1, max_length=10000)
+    difficulty: str = Field(default="medium", pattern="^(easy|medium|hard)$")
+    user_id: str
+    # ISO 639 codes; with a source language, known words come from the shared lexicon
+    source_language: Optional[str] = Field(None, pattern="^[a-z]{2,3}$")
+    target_language: str = Field(default="en", pattern="^[a-z]{2,3}$")
+
+class FlashcardResponse(BaseModel):
+    deck_id: str              # ← Added
+    flashcards: list[dict]
+    count: int
+    difficulty: str           # ← Added
+    processing_time: float
+
+# Decks
+
+class DeckUpdate(BaseModel):
+    title: Optional[str] = Field(None, max_length=200)
+
+class DeckClone(BaseModel):
+    title: Optional[str] = Field(None, max_length=200)
+    dedupe: bool = False  # Drop cards whose normalized front repeats
+
+class DeckMerge(BaseModel):
+    user_id: str
+    deck_ids: list[str] = Field(..., min_length=2, max_length=50)
+    title: Optional[str] = Field(None, max_length=200)
+    dedupe: bool = True
+    delete_sources: bool = False
+
+# Words
+
+class WordCreate(BaseModel):
+    word: str = Field(..., min_length=1, max_length=200)
+    definition: str = Field(..., min_length=1)
+    example: str = Field(default="", max_length=1000)
+    pronunciation: str = Field(default="", max_length=100)
+    user_id: str
+
+class WordUpdate(BaseModel):
+    word: Optional[str] = Field(None, min_length=1, max_length=200)
+    definition: Optional[str] = Field(None, min_length=1)
+    example: Optional[str] = Field(None, max_length=1000)
+    pronunciation: Optional[str] = Field(None, max_length=100)
+
+class WordResponse(BaseModel):
+    id: str
+    word: str
+    definition: str
+    example: str | None
+    pronunciation: str | None
+    created_at: str
+    updated_at: str | None
+
+class WordsBatchCreate(BaseModel):
+    words: list[WordCreate]
+    user_id: str
+
+class WordsBatchResponse(BaseModel):
+    saved: int
+    skipped: int
+    errors: list[str]
+
+# Conversational practice
+
+class ConversationMessage(BaseModel):
+    role: str  # "user" or "assistant"
+    content: str
+
+class ConversationSettings(BaseModel):
+    immersionLevel: int = 50  # 0-100
+    focusMode: str = "deck-focused"  # "deck-focused" or "natural"
+    topic: str = "general"
+    sessionLength: str = "standard"
+
+class ConversationRequest(BaseModel):
+    deck_id: str
+    user_id: str
+    messages: list[ConversationMessage]
+    is_first_message: bool = False
+    settings: ConversationSettings | None = None
+
+class ConversationResponse(BaseModel):
+    message: str
+    words_used: list[str] = []
+
+# Server-side conversation sessions
+
+class ConversationCreate(BaseModel):
+    user_id: str
+    deck_id: str
+    settings: ConversationSettings | None = None
+
+class ConversationTurn(BaseModel):
+    user_id: str
+    content: str = Field(..., min_length=1, max_length=4000, description="The new user message only")
+
+class ConversationTurnResponse(BaseModel):
+    message: str
+    words_used: list[str] = []
+    turns: int
+
+class SocketMessage(BaseModel):
+    type: str = Field(..., pattern="^(message|speech|timing|end|ping)$", description="Frame type (see src/conversation_socket.py)")
+    content: Optional[str] = Field(None, min_length=1, max_length=4000, description="The new user message (message and speech)")
+    action: str = Field(default="resume", pattern="^(pause|resume)$", description="Practice clock action (timing)")
+
+# Practice sessions, events and stats
+
+class SessionCreate(BaseModel):
+    user_id: str
+    deck_id: Optional[str] = None
+    practice_type: str = Field(default="flashcard", pattern="^(flashcard|conversation)$", description="Type of practice: flashcard or conversation")
+    duration_seconds: int = Field(..., ge=1, description="Practice duration in seconds")
+
+class SessionResponse(BaseModel):
+    id: str
+    user_id: str
+    deck_id: str | None
+    practice_type: str
+    duration_seconds: int
+    completed_at: str
+
+class PracticeEvent(BaseModel):
+    idempotency_key: str = Field(..., min_length=1, max_length=100, description="Client-generated key, unique per user")
+    type: str = Field(..., pattern="^(session|review)$", description="Event type: session or review")
+    deck_id: Optional[str] = None
+    occurred_at: Optional[datetime] = None
+    # Session events
+    practice_type: str = Field(default="flashcard", pattern="^(flashcard|conversation)$")
+    duration_seconds: Optional[int] = Field(None, ge=1, description="Practice duration in seconds")
+    # Review events
+    flashcard_id: Optional[int] = None
+    result: Optional[str] = Field(None, pattern="^(correct|incorrect|skipped)$")
+    response_ms: Optional[int] = Field(None, ge=0)
+
+class EventBatch(BaseModel):
+    user_id: str
+    events: list[PracticeEvent] = Field(..., min_length=1, max_length=500)
+
+class EventBatchResponse(BaseModel):
+    accepted: int
+    duplicates: int
+
+class UserSettingUpdate(BaseModel):
+    daily_goal_minutes: int = Field(..., ge=1, le=480, description="Daily goal in minutes (1-480)")
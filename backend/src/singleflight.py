@@ -0,0 +1,55 @@
+"""
+Request coalescing ("singleflight").
+
+Concurrent callers asking for the same key share one in-flight computation
+and all receive its result (or its exception). Keys are tuples whose first
+element names the kind of work ("deck", "stats", "generate"), which is also
+how the duplicate-work counters are grouped.
+
+The computation runs as its own task and callers await it through
+asyncio.shield, so one caller disconnecting does not cancel the work for the
+others. Shared computations must therefore open their own database session
+instead of borrowing the first caller's.
+"""
+import asyncio
+
+from fastapi import Request
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls: dict[tuple, asyncio.Future] = {}
+        # namespace -> {"executions": n, "shared": n}
+        self._counters: dict[str, dict[str, int]] = {}
+
+    def in_flight(self, key: tuple) -> bool:
+        return key in self._calls
+
+    async def do(self, key: tuple, fn):
+        """Run fn() for key, or join the computation already running for it"""
+        counters = self._counters.setdefault(key[0], {"executions": 0, "shared": 0})
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+            counters["executions"] += 1
+        else:
+            counters["shared"] += 1
+        return await asyncio.shield(task)
+
+    def _finish(self, key: tuple, task: asyncio.Future):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Mark the exception as retrieved in case every caller went away
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict:
+        """Per-namespace counts of computations run and duplicate calls saved"""
+        return {name: dict(counts) for name, counts in self._counters.items()}
+
+
+def get_singleflight(request: Request) -> SingleFlight:
+    """Dependency that provides the app's singleflight group"""
+    return request.app.state.singleflight
@@ -0,0 +1,181 @@
+"""
+Local token estimates for LLM calls.
+
+Every call used to ask for a fixed max_tokens (4096 for a generation, 1000
+for a tutor turn) whatever its input, and nothing checked a prompt against
+the model's context window before sending it. These estimates are made
+locally, in microseconds, from the text itself:
+
+- Prompt size: ~4 characters per token for Latin-script text, ~2 for other
+  scripts, plus the prompt scaffolding. For a tutor turn this includes the
+  system prompt, so it grows with the deck.
+- Expected output: for a generation, the text's distinct words x the share
+  that usually become cards at that difficulty x tokens per card. For a
+  tutor turn, a short reply.
+
+A ``TokenBudget`` holds both, and ``max_tokens`` is the expected output
+with headroom, so a small request doesn't reserve a large reply. Its
+``total`` is what the per-user token budgets charge (src/ratelimit.py).
+
+Oversized inputs are dealt with before anything is sent. A generation whose
+cards wouldn't fit in one reply is split at sentence boundaries into
+several calls (``split_text``). A conversation whose history no longer fits
+the context window is refused with 413.
+
+``LLMRouter.complete(..., budget=...)`` logs the estimate next to the
+usage the API reports, and records the ratio in
+llm_token_estimate_ratio, so the constants here can be tuned from
+production traffic.
+"""
+import logging
+import math
+import re
+from dataclasses import dataclass
+
+from fastapi import HTTPException
+
+from src.llm import Completion
+from src.metrics import LLM_TOKEN_ESTIMATE_RATIO
+
+logger = logging.getLogger(__name__)
+
+# Both tiers (src/llm_routing.py)
+CONTEXT_WINDOW = 200_000
+MAX_OUTPUT_TOKENS = 8_192
+
+# Role markers and separators around each message
+MESSAGE_OVERHEAD = 4
+# The fixed instructions of the generation, lexicon and enrichment prompts
+GENERATION_SCAFFOLD = 150
+# {"front": "chien", "back": "dog"},
+TOKENS_PER_CARD = 15
+# Share of a text's distinct words that become cards
+CARD_SHARE = {"easy": 0.25, "medium": 0.35, "hard": 0.5}
+# Expected cards per generation call; longer texts are split
+GENERATION_OUTPUT_LIMIT = 2_048
+# {"word": "chiens", "front": "chien", "back": "dog", "level": "easy"},
+TOKENS_PER_TRANSLATION = 25
+# example sentence, IPA and languages for one saved word
+TOKENS_PER_ENRICHMENT = 60
+TURN_OUTPUT = 300
+TURN_MAX_TOKENS = 1_000
+
+SENTENCE_END_RE = re.compile(r"(?<=[.!?。！？\n])\s+")
+
+
+class ContextLimitExceeded(HTTPException):
+    def __init__(self, detail: str):
+        super().__init__(status_code=413, detail=detail)
+
+
+@dataclass(frozen=True)
+class TokenBudget:
+    prompt_tokens: int  # estimated input
+    output_tokens: int  # expected output
+    max_tokens: int  # output cap sent with the call
+
+    @property
+    def total(self) -> int:
+        return self.prompt_tokens + self.output_tokens
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count: ~4 ASCII characters per token, ~2 for other scripts"""
+    ascii_chars = len(text.encode("ascii", "ignore"))
+    return max(1, ascii_chars // 4 + math.ceil((len(text) - ascii_chars) / 2))
+
+
+def with_headroom(expected: int) -> int:
+    """max_tokens for an expected output: room for twice as much, within the model's cap"""
+    return min(MAX_OUTPUT_TOKENS, max(256, 2 * expected + 100))
+
+
+def generation_budget(text: str, difficulty: str = "medium") -> TokenBudget:
+    """Flashcard extraction from a whole text"""
+    distinct_words = len(set(text.lower().split()))
+    output = 20 + TOKENS_PER_CARD * math.ceil(distinct_words * CARD_SHARE.get(difficulty, CARD_SHARE["medium"]))
+    return TokenBudget(GENERATION_SCAFFOLD + estimate_tokens(text), output, with_headroom(output))
+
+
+def lexicon_budget(words: list[str]) -> TokenBudget:
+    """Translating a list of words unknown to the lexicon"""
+    output = 20 + TOKENS_PER_TRANSLATION * len(words)
+    prompt = GENERATION_SCAFFOLD + sum(estimate_tokens(w) + 2 for w in words)
+    return TokenBudget(prompt, output, with_headroom(output))
+
+
+def enrichment_budget(batch_size: int) -> TokenBudget:
+    """Examples and pronunciations for a batch of saved words"""
+    output = 20 + TOKENS_PER_ENRICHMENT * batch_size
+    return TokenBudget(GENERATION_SCAFFOLD + 20 * batch_size, output, with_headroom(output))
+
+
+def messages_tokens(messages: list[dict]) -> int:
+    return sum(estimate_tokens(m["content"]) + MESSAGE_OVERHEAD for m in messages)
+
+
+def turn_budget(system_prompt: str, messages: list[dict]) -> TokenBudget:
+    """A tutor turn over the system prompt and the whole history; 413 if it can't fit"""
+    prompt = estimate_tokens(system_prompt) + messages_tokens(messages)
+    room = CONTEXT_WINDOW - prompt
+    if room < TURN_OUTPUT:
+        raise ContextLimitExceeded("Conversation is too long to continue, please start a new one")
+    return TokenBudget(prompt, TURN_OUTPUT, min(TURN_MAX_TOKENS, room))
+
+
+def estimate_turn_cost(history_tokens: int) -> int:
+    """Before the deck is loaded: a typical system prompt + history + reply"""
+    return 800 + history_tokens + TURN_OUTPUT
+
+
+def estimate_conversation_cost(messages: list) -> int:
+    return estimate_turn_cost(sum(estimate_tokens(m.content) for m in messages))
+
+
+def split_text(text: str, max_tokens: int) -> list[str]:
+    """Chunks of at most ~max_tokens, cut between sentences where possible"""
+    chunks, current, size = [], [], 0
+    for sentence in SENTENCE_END_RE.split(text.strip()):
+        tokens = estimate_tokens(sentence)
+        if current and size + tokens > max_tokens:
+            chunks.append(" ".join(current))
+            current, size = [], 0
+        if tokens > max_tokens:
+            # One very long sentence: cut between words
+            words = sentence.split()
+            step = max(1, len(words) * max_tokens // tokens)
+            pieces = [" ".join(words[i:i + step]) for i in range(0, len(words), step)]
+            chunks.extend(pieces[:-1])
+            sentence, tokens = pieces[-1], estimate_tokens(pieces[-1])
+        current.append(sentence)
+        size += tokens
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+def generation_chunks(text: str, difficulty: str = "medium") -> list[str]:
+    """The text as one call, or split so each call's cards fit in one reply"""
+    budget = generation_budget(text, difficulty)
+    calls = math.ceil(budget.output_tokens / GENERATION_OUTPUT_LIMIT)
+    if calls <= 1:
+        return [text]
+    return split_text(text, math.ceil(estimate_tokens(text) / calls))
+
+
+def record(endpoint: str, budget: TokenBudget, completion: Completion):
+    """Log the estimate next to the usage the API reported"""
+    if completion.input_tokens:
+        LLM_TOKEN_ESTIMATE_RATIO.labels(endpoint, "input").observe(completion.input_tokens / budget.prompt_tokens)
+    if completion.output_tokens:
+        LLM_TOKEN_ESTIMATE_RATIO.labels(endpoint, "output").observe(completion.output_tokens / budget.output_tokens)
+    logger.info("Token estimate", extra={
+        "endpoint": endpoint,
+        "model": completion.model,
+        "estimated_input_tokens": budget.prompt_tokens,
+        "input_tokens": completion.input_tokens,
+        "estimated_output_tokens": budget.output_tokens,
+        "output_tokens": completion.output_tokens,
+        "max_tokens": budget.max_tokens,
+        "truncated": completion.output_tokens >= budget.max_tokens,
+    })
@@ -0,0 +1,280 @@
+"""
+Streaming bulk export and import of words and decks.
+
+Exports iterate a server-side cursor and yield encoded chunks, so memory
+stays bounded by ``EXPORT_CHUNK_ROWS`` whatever the vocabulary size.
+Imports parse the request body line by line and load it in batches of
+``IMPORT_BATCH_ROWS`` with a multi-row INSERT that skips words the user
+already has (ON CONFLICT on the unique (user_id, lower(word)) index). The whole
+import is one transaction: a body that fails partway (a line too long,
+invalid UTF-8) leaves no words behind.
+"""
+import codecs
+import csv
+import io
+import json
+import uuid
+
+from sqlalchemy import select, text
+
+from src.models import Deck, Flashcard, Word
+
+EXPORT_CHUNK_ROWS = 1000
+IMPORT_BATCH_ROWS = 1000
+MAX_LINE_CHARS = 1_000_000
+MAX_REPORTED_ERRORS = 100
+
+EXPORT_FORMATS = {
+    # format: (media type, file extension)
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "anki": ("text/plain; charset=utf-8", "txt"),
+}
+IMPORT_FORMATS = ("ndjson", "csv")
+
+WORD_FIELDS = ["word", "definition", "example", "pronunciation", "created_at"]
+CARD_FIELDS = ["deck_id", "deck_title", "front", "back"]
+
+
+def _anki_field(value) -> str:
+    # Anki's plain-text importer splits on tabs and newlines
+    if value is None:
+        return ""
+    return str(value).replace("\t", " ").replace("\r", " ").replace("\n", " ")
+
+
+def _csv_chunk(rows: list[list]) -> str:
+    out = io.StringIO()
+    csv.writer(out).writerows(rows)
+    return out.getvalue()
+
+
+async def _stream_rows(session_factory, query):
+    """Yield lists of rows from a server-side cursor"""
+    async with session_factory() as session:
+        result = await session.stream(query.execution_options(yield_per=EXPORT_CHUNK_ROWS))
+        async for partition in result.partitions(EXPORT_CHUNK_ROWS):
+            yield partition
+
+
+async def export_words(session_factory, user_uuid, fmt: str):
+    """Yield encoded chunks of a user's words in the requested format"""
+    query = (
+        select(Word.word, Word.definition, Word.example, Word.pronunciation, Word.created_at)
+        .where(Word.user_id == user_uuid)
+        .order_by(Word.created_at)
+    )
+
+    if fmt == "csv":
+        yield _csv_chunk([WORD_FIELDS])
+    elif fmt == "anki":
+        yield "#separator:tab\n#html:false\n#columns:Front\tBack\tPronunciation\tExample\n"
+
+    async for rows in _stream_rows(session_factory, query):
+        if fmt == "ndjson":
+            yield "".join(
+                json.dumps({
+                    "word": r.word,
+                    "definition": r.definition,
+                    "example": r.example,
+                    "pronunciation": r.pronunciation,
+                    "created_at": r.created_at.isoformat() if r.created_at else None,
+                }, ensure_ascii=False) + "\n"
+                for r in rows
+            )
+        elif fmt == "csv":
+            yield _csv_chunk([
+                [r.word, r.definition, r.example or "", r.pronunciation or "",
+                 r.created_at.isoformat() if r.created_at else ""]
+                for r in rows
+            ])
+        else:
+            yield "".join(
+                "\t".join(_anki_field(v) for v in (r.word, r.definition, r.pronunciation, r.example)) + "\n"
+                for r in rows
+            )
+
+
+async def export_decks(session_factory, user_uuid, fmt: str):
+    """Yield encoded chunks of every flashcard in a user's decks"""
+    query = (
+        select(Deck.id.label("deck_id"), Deck.title.label("deck_title"), Flashcard.front, Flashcard.back)
+        .join(Flashcard, Flashcard.deck_id == Deck.id)
+        .where(Deck.user_id == user_uuid)
+        .order_by(Deck.created_at, Deck.id, Flashcard.id)
+    )
+
+    if fmt == "csv":
+        yield _csv_chunk([CARD_FIELDS])
+    elif fmt == "anki":
+        yield "#separator:tab\n#html:false\n#columns:Front\tBack\tDeck\n#deck column:3\n"
+
+    async for rows in _stream_rows(session_factory, query):
+        if fmt == "ndjson":
+            yield "".join(
+                json.dumps({
+                    "deck_id": str(r.deck_id),
+                    "deck_title": r.deck_title,
+                    "front": r.front,
+                    "back": r.back,
+                }, ensure_ascii=False) + "\n"
+                for r in rows
+            )
+        elif fmt == "csv":
+            yield _csv_chunk([[str(r.deck_id), r.deck_title or "", r.front, r.back] for r in rows])
+        else:
+            yield "".join(
+                "\t".join((_anki_field(r.front), _anki_field(r.back),
+                           _anki_field(f"Giraffe::{r.deck_title or 'Untitled Deck'}"))) + "\n"
+                for r in rows
+            )
+
+
+async def iter_lines(byte_stream):
+    """Decode a UTF-8 byte stream into lines (newline kept), one line in memory at a time"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+    async for chunk in byte_stream:
+        buffer += decoder.decode(chunk)
+        start = 0
+        while True:
+            end = buffer.find("\n", start)
+            if end == -1:
+                break
+            yield buffer[start:end + 1]
+            start = end + 1
+        buffer = buffer[start:]
+        if len(buffer) > MAX_LINE_CHARS:
+            raise ValueError("Line too long")
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer
+
+
+async def iter_records(lines, fmt: str):
+    """Yield (line_number, dict) pairs from NDJSON or CSV lines"""
+    line_number = 0
+    if fmt == "ndjson":
+        async for line in lines:
+            line_number += 1
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                yield line_number, None
+                continue
+            yield line_number, record if isinstance(record, dict) else None
+        return
+
+    # CSV: group physical lines until the quotes balance, so quoted fields
+    # may contain newlines without buffering the whole file
+    header = None
+    pending = ""
+    async for line in lines:
+        line_number += 1
+        pending += line
+        if pending.count('"') % 2:
+            if len(pending) > MAX_LINE_CHARS:
+                raise ValueError("Line too long")
+            continue
+        row = next(csv.reader([pending]), [])
+        pending = ""
+        if not row:
+            continue
+        if header is None:
+            header = [h.strip().lower() for h in row]
+            continue
+        yield line_number, dict(zip(header, row))
+    if pending.strip():
+        yield line_number, None
+
+
+def validate_word_record(record) -> dict | None:
+    """Return a cleaned word dict, or None if the record is unusable"""
+    if not record:
+        return None
+    word = str(record.get("word") or "").strip()
+    definition = str(record.get("definition") or "").strip()
+    example = str(record.get("example") or "").strip()
+    pronunciation = str(record.get("pronunciation") or "").strip()
+    if not word or len(word) > 200 or not definition:
+        return None
+    if len(example) > 1000 or len(pronunciation) > 100:
+        return None
+    return {
+        "word": word,
+        "definition": definition,
+        "example": example or None,
+        "pronunciation": pronunciation or None,
+    }
+
+
+INSERT_WORDS_SQL = text("""
+    INSERT INTO words (id, user_id, word, definition, example, pronunciation, status, created_at, updated_at)
+    SELECT v.id, CAST(:user_id AS uuid), v.word, v.definition, v.example, v.pronunciation, 'pending', now(), now()
+    FROM unnest(
+        CAST(:ids AS uuid[]),
+        CAST(:words AS text[]),
+        CAST(:definitions AS text[]),
+        CAST(:examples AS text[]),
+        CAST(:pronunciations AS text[])
+    ) AS v(id, word, definition, example, pronunciation)
+    ON CONFLICT (user_id, lower(word)) DO NOTHING
+""")
+
+
+async def insert_words_batch(db, user_uuid, rows: list[dict]) -> int:
+    """Insert rows in one statement, skipping existing words; returns rows inserted"""
+    # Deduplicate within the batch (first occurrence wins)
+    unique = {}
+    for row in rows:
+        unique.setdefault(row["word"].lower(), row)
+    batch = list(unique.values())
+    if not batch:
+        return 0
+
+    result = await db.execute(INSERT_WORDS_SQL, {
+        "user_id": user_uuid,
+        "ids": [uuid.uuid4() for _ in batch],
+        "words": [r["word"] for r in batch],
+        "definitions": [r["definition"] for r in batch],
+        "examples": [r["example"] for r in batch],
+        "pronunciations": [r["pronunciation"] for r in batch],
+    })
+    return result.rowcount
+
+
+async def import_words(db, user_uuid, byte_stream, fmt: str) -> dict:
+    """Load words from a streamed NDJSON/CSV body in one transaction
+
+    Batches are inserted as they fill up but only committed at the end; on
+    any error the caller rolls back and nothing is imported.
+    """
+    saved = 0
+    skipped = 0
+    errors = []
+    batch = []
+
+    async def flush():
+        nonlocal saved, skipped
+        inserted = await insert_words_batch(db, user_uuid, batch)
+        saved += inserted
+        skipped += len(batch) - inserted
+        batch.clear()
+
+    async for line_number, record in iter_records(iter_lines(byte_stream), fmt):
+        row = validate_word_record(record)
+        if row is None:
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append(f"Line {line_number}: invalid word record")
+            continue
+        batch.append(row)
+        if len(batch) >= IMPORT_BATCH_ROWS:
+            await flush()
+
+    if batch:
+        await flush()
+    await db.commit()
+
+    return {"saved": saved, "skipped": skipped, "errors": errors}
@@ -0,0 +1,99 @@
+"""
+Prompt and reply handling for the conversational tutor.
+
+Shared by the stateless /api/practice/conversation endpoint, the
+server-side conversation sessions (src/routers/conversations.py) and the
+opener pre-generation (src/openers.py).
+"""
+from src.schema import ConversationSettings
+
+# The message the practice page opens every conversation with
+OPENING_MESSAGE = "Hello! I'm ready to practice my vocabulary."
+
+FOCUS_MODES = ("deck-focused", "natural")
+
+TOPIC_DESCRIPTIONS = {
+    "general": "General conversation",
+    "travel": "Travel & tourism",
+    "business": "Business & work",
+    "daily": "Daily life & hobbies",
+    "food": "Food & dining",
+    "news": "News & current events",
+}
+
+
+def immersion_bucket(immersion_level: int) -> int:
+    """0, 1 or 2: the immersion levels that get the same instructions"""
+    if immersion_level <= 33:
+        return 0
+    if immersion_level <= 66:
+        return 1
+    return 2
+
+
+def build_system_prompt(vocabulary_words: list[dict], settings: ConversationSettings, is_first_message: bool) -> str:
+    """System prompt for a tutor turn over the deck's {"word", "definition"} pairs"""
+    words_list = "\n".join([f"- {w['word']}: {w['definition']}" for w in vocabulary_words])
+    immersion_level = settings.immersionLevel
+    focus_mode = settings.focusMode
+    topic = settings.topic
+
+    # Determine immersion instructions
+    bucket = immersion_bucket(immersion_level)
+    if bucket == 0:
+        immersion_instructions = "Use mostly English with occasional target language words. Provide immediate translations. Keep sentences simple."
+    elif bucket == 1:
+        immersion_instructions = "Use a 50/50 mix of English and target language. Use target language for vocabulary words and common phrases. Provide context clues."
+    else:
+        immersion_instructions = "Respond ENTIRELY in target language. Use natural, native-level language. Only provide English if the user explicitly asks."
+
+    # Determine focus instructions
+    if focus_mode == "deck-focused":
+        focus_instructions = "CRITICAL: You MUST use words from this deck in nearly every response. Try to use 3-5 deck words per message. The conversation should revolve around practicing these specific words."
+    else:
+        focus_instructions = "Use deck words naturally when appropriate, but prioritize natural conversation flow."
+
+    topic_text = TOPIC_DESCRIPTIONS.get(topic, topic) if topic != "custom" else "a topic chosen by the user"
+
+    return f"""You are a friendly and encouraging language tutor helping a student practice vocabulary words.
+
+VOCABULARY WORDS TO PRACTICE:
+{words_list}
+
+IMMERSION LEVEL:
+{immersion_instructions}
+
+CONVERSATION FOCUS:
+{focus_instructions}
+
+CONVERSATION TOPIC: {topic_text}
+
+YOUR ROLE:
+- Have a natural, engaging conversation with the student
+- {focus_instructions}
+- Gently correct mistakes and explain why
+- Ask questions that encourage the student to use vocabulary words
+- Be encouraging and supportive
+- Adapt complexity based on student responses
+
+FORMATTING RULES:
+- When you use a deck vocabulary word, wrap it in <vocab>word</vocab> tags
+- Example: "That's a very <vocab>beneficial</vocab> approach!"
+- When using words that might be challenging for a language learner, wrap them in <unknown>word</unknown> tags
+- Example: "We should <unknown>procrastinate</unknown> less."
+- This helps the student identify which words they're practicing
+
+CONVERSATION STYLE:
+- Keep responses conversational (2-4 sentences)
+- Use clear, natural language
+- If student seems confused, provide simpler explanations
+- Celebrate when they use vocabulary words correctly
+- Don't explicitly list the words you're using - just use them naturally
+
+{f'Start by greeting the student and suggesting an interesting topic to discuss that would allow natural use of the vocabulary words.' if is_first_message else 'Continue the conversation naturally, incorporating vocabulary words.'}"""
+
+
+def find_words_used(ai_response: str, vocabulary_words: list[dict]) -> list[str]:
+    """Deck words that appear in the reply (simple pattern matching)"""
+    response_lower = ai_response.lower()
+    return [vocab["word"] for vocab in vocabulary_words if vocab["word"].lower() in response_lower]
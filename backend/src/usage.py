@@ -0,0 +1,196 @@
+"""
+Usage ledger for LLM calls.
+
+Every call made through LLMRouter is recorded in llm_usage with the user
+it was made for, the endpoint, the model that answered, its outcome, the
+input and output tokens the API reported, and its wall time (hedges
+included). Openers are recorded for the deck's owner. Enrichment batches
+several users' words into one call, so it is recorded without a user.
+
+Records go through a WriteBehindBuffer (src/events.py), so a call never
+waits on the ledger. Each flush is one transaction that:
+- inserts the batch into llm_usage with one multi-row INSERT;
+- adds the batch's per-user, per-day sums to llm_usage_daily with one
+  INSERT ... ON CONFLICT DO UPDATE. A user's daily totals are then a
+  primary-key read, however many calls they made;
+- publishes ("usage", user_id) so every worker drops its cached totals.
+
+Daily quotas (USAGE_DAILY_TOKEN_QUOTA, input + output tokens, 0 disables)
+are checked before a call against the cached daily row. The check can lag
+by the flush interval, so a user can go slightly over their quota, never
+far over it. Past the quota, calls get 429 with Retry-After set to the
+next UTC midnight.
+"""
+import logging
+import uuid
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+
+from fastapi import HTTPException, Request
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+
+from src.cache import LocalCache, cached
+from src.database import AsyncSessionLocal
+from src.events import BufferedEvent, BufferClosedError, BufferFullError, WriteBehindBuffer
+from src.llm import Completion
+from src.models import LLMUsage, LLMUsageDaily
+
+logger = logging.getLogger(__name__)
+
+
+class DailyQuotaExceeded(HTTPException):
+    def __init__(self, retry_after: int):
+        self.retry_after = max(1, retry_after)
+        super().__init__(
+            status_code=429,
+            detail="Daily AI usage limit reached, please try again tomorrow",
+            headers={"Retry-After": str(self.retry_after)},
+        )
+
+
+def daily_totals(rows: list[dict]) -> list[dict]:
+    """Per-(user, UTC day) sums of ledger rows; rows without a user are left out"""
+    totals = defaultdict(lambda: {"calls": 0, "input_tokens": 0, "output_tokens": 0, "duration_ms": 0})
+    for row in rows:
+        if row["user_id"] is None:
+            continue
+        total = totals[row["user_id"], row["created_at"].astimezone(timezone.utc).date()]
+        total["calls"] += 1
+        total["input_tokens"] += row["input_tokens"]
+        total["output_tokens"] += row["output_tokens"]
+        total["duration_ms"] += row["duration_ms"]
+    return [{"user_id": user_id, "day": day, **total} for (user_id, day), total in totals.items()]
+
+
+def daily_statement(totals: list[dict]):
+    """Add per-day sums to llm_usage_daily"""
+    statement = insert(LLMUsageDaily).values(totals)
+    return statement.on_conflict_do_update(
+        index_elements=["user_id", "day"],
+        set_={
+            name: getattr(LLMUsageDaily, name) + getattr(statement.excluded, name)
+            for name in ("calls", "input_tokens", "output_tokens", "duration_ms")
+        },
+    )
+
+
+async def write_usage(batch: list[BufferedEvent], invalidation=None):
+    """Buffer writer: the ledger rows and the daily totals in one transaction"""
+    rows = [dict(event.values, user_id=event.user_id) for event in batch]
+    totals = daily_totals(rows)
+    async with AsyncSessionLocal() as session:
+        await session.execute(insert(LLMUsage).values(rows))
+        if totals:
+            await session.execute(daily_statement(totals))
+            if invalidation is not None:
+                await invalidation.publish(session, *{("usage", t["user_id"]) for t in totals})
+        await session.commit()
+
+
+async def load_day(user_id, day: date) -> dict:
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(LLMUsageDaily.input_tokens, LLMUsageDaily.output_tokens)
+            .where(LLMUsageDaily.user_id == user_id, LLMUsageDaily.day == day)
+        )
+        row = result.first()
+    return {"tokens": (row.input_tokens + row.output_tokens) if row is not None else 0}
+
+
+class UsageLedger:
+    def __init__(
+        self,
+        buffer: WriteBehindBuffer,
+        cache: LocalCache,
+        daily_token_quota: int = 0,
+        enabled: bool = True,
+        load_day=load_day,
+        clock=lambda: datetime.now(timezone.utc),
+    ):
+        self.buffer = buffer
+        self.cache = cache
+        self.daily_token_quota = daily_token_quota
+        self.enabled = enabled
+        self._load_day = load_day
+        self._clock = clock
+
+        self.recorded = 0
+        self.dropped = 0
+        self.rejected = 0
+
+    async def start(self):
+        if self.enabled:
+            await self.buffer.start()
+
+    async def close(self):
+        """Flush the remaining records before shutdown"""
+        await self.buffer.close()
+
+    async def record(
+        self,
+        user_id,
+        endpoint: str,
+        model: str,
+        outcome: str,
+        seconds: float,
+        completion: Completion | None = None
+    ):
+        """Buffer one call's usage; never fails the call"""
+        if not self.enabled:
+            return
+        values = {
+            "endpoint": endpoint,
+            "model": completion.model if completion is not None else model,
+            "outcome": outcome,
+            "input_tokens": completion.input_tokens if completion is not None else 0,
+            "output_tokens": completion.output_tokens if completion is not None else 0,
+            "duration_ms": round(seconds * 1000),
+            "created_at": self._clock(),
+        }
+        try:
+            await self.buffer.add([BufferedEvent(
+                table="llm_usage",
+                user_id=uuid.UUID(str(user_id)) if user_id is not None else None,
+                client_event_id=uuid.uuid4().hex,
+                values=values,
+            )])
+        except (BufferFullError, BufferClosedError) as e:
+            self.dropped += 1
+            logger.warning("Could not record LLM usage: %s", e)
+            return
+        self.recorded += 1
+
+    async def used_today(self, user_id) -> int:
+        """Tokens the user has used today (UTC), as of the last flush"""
+        user_id = uuid.UUID(str(user_id))
+        today = self._clock().date()
+        totals = await cached(self.cache, ("usage", user_id, today), lambda: self._load_day(user_id, today))
+        return totals["tokens"]
+
+    async def check_quota(self, user_id):
+        """Raise 429 once the user has used their daily tokens"""
+        if not self.enabled or not self.daily_token_quota:
+            return
+        if await self.used_today(user_id) >= self.daily_token_quota:
+            self.rejected += 1
+            now = self._clock()
+            midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time(), tzinfo=timezone.utc)
+            raise DailyQuotaExceeded(int((midnight - now).total_seconds()) + 1)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "daily_token_quota": self.daily_token_quota or None,
+            "recorded": self.recorded,
+            "pending": self.buffer.pending_count,
+            "flushed": self.buffer.flushed_count,
+            "flush_failures": self.buffer.flush_failures,
+            "dropped": self.dropped,
+            "rejected": self.rejected,
+        }
+
+
+def get_usage_ledger(request: Request) -> UsageLedger:
+    """Dependency that provides the app's usage ledger"""
+    return request.app.state.usage
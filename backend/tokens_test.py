@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+from llm_routing_test import ScriptedLLM
+from src.llm_routing import LLMRouter, RoutingPolicy
+from src.metrics import REGISTRY
+from src.tokens import (
+    CONTEXT_WINDOW, MAX_OUTPUT_TOKENS, ContextLimitExceeded, TokenBudget, estimate_tokens, generation_budget,
+    generation_chunks, split_text, turn_budget,
+)
+
+
+def test_estimates_scale_with_text_and_difficulty():
+    assert estimate_tokens("le chien " * 500) == 1125
+    # Non-Latin scripts take more tokens per character
+    assert estimate_tokens("犬が好きです") == 3
+
+    short, long = generation_budget("Le chien dort."), generation_budget(" ".join(f"mot{i}" for i in range(2000)))
+    assert short.max_tokens < 4096 < long.output_tokens
+    assert long.max_tokens == MAX_OUTPUT_TOKENS
+    assert generation_budget("a b c d e f g h", "easy").output_tokens < generation_budget("a b c d e f g h", "hard").output_tokens
+
+
+def test_turn_budget_grows_with_the_deck_and_refuses_oversized_histories():
+    messages = [{"role": "user", "content": "Bonjour !"}]
+    small, large = turn_budget("- chien: dog\n", messages), turn_budget("- chien: dog\n" * 500, messages)
+    assert small.max_tokens == large.max_tokens == 1000
+    assert large.prompt_tokens > small.prompt_tokens
+
+    with pytest.raises(ContextLimitExceeded) as error:
+        turn_budget("", [{"role": "user", "content": "mot " * CONTEXT_WINDOW}])
+    assert error.value.status_code == 413
+
+
+def test_long_texts_are_split_between_sentences():
+    text = " ".join(f"Phrase numéro {i} avec le mot{i}." for i in range(100))
+    chunks = split_text(text, 100)
+    assert len(chunks) > 1 and " ".join(chunks) == text
+    assert all(chunk.endswith(".") for chunk in chunks)
+    assert max(estimate_tokens(chunk) for chunk in chunks) <= 100
+
+    # One sentence with no breaks at all is cut between words
+    assert len(split_text("mot " * 1000, 100)) > 1
+
+    assert generation_chunks("Le chien dort.") == ["Le chien dort."]
+    many = " ".join(f"Le mot{i} est nouveau." for i in range(1500))
+    assert len(generation_chunks(many, "hard")) > 1
+
+
+def test_router_sets_max_tokens_and_records_the_estimate():
+    calls = []
+
+    class UsageLLM(ScriptedLLM):
+        async def complete(self, model, endpoint, **kwargs):
+            calls.append(kwargs["max_tokens"])
+            completion = await super().complete(model, endpoint, **kwargs)
+            completion.input_tokens, completion.output_tokens = 120, 45
+            return completion
+
+    router = LLMRouter(UsageLLM(), RoutingPolicy(), hedge_ratio=0)
+    budget = TokenBudget(prompt_tokens=100, output_tokens=50, max_tokens=300)
+    asyncio.run(router.complete(router.policy.enrichment(), endpoint="estimate_test", budget=budget, messages=[]))
+    assert calls == [300]
+
+    metrics = REGISTRY.render()
+    assert 'llm_token_estimate_ratio_bucket{endpoint="estimate_test",direction="input",le="1.25"} 1' in metrics
+    assert 'llm_token_estimate_ratio_bucket{endpoint="estimate_test",direction="output",le="0.9"} 1' in metrics
@@ -0,0 +1,156 @@
+import asyncio
+import json
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+from query_plan_test import SCHEMA_SQL, TEST_DATABASE_URL, needs_database
+from src import database, migrate, transfer
+from src.app import create_app
+from src.config import Settings
+
+USER = uuid.UUID("00000000-0000-0000-0000-000000000001")
+
+
+async def stream(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+
+
+async def collect(iterator) -> list:
+    return [item async for item in iterator]
+
+
+def records(body: bytes, fmt: str, chunk_size: int = 7) -> list:
+    chunks = [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)]
+    return asyncio.run(collect(transfer.iter_records(transfer.iter_lines(stream(*chunks)), fmt)))
+
+
+class FakeDB:
+    """Records statements; every INSERT reports all its rows as inserted"""
+
+    def __init__(self):
+        self.batches = []
+        self.commits = 0
+
+    async def execute(self, statement, params):
+        self.batches.append(params["words"])
+        return type("Result", (), {"rowcount": len(params["words"])})()
+
+    async def commit(self):
+        self.commits += 1
+
+
+def test_lines_survive_chunk_boundaries_and_multibyte_characters():
+    body = "﻿mot,déf\r\nécole,school\nlast".encode("utf-8")
+    lines = asyncio.run(collect(transfer.iter_lines(stream(*(body[i:i + 1] for i in range(len(body)))))))
+    assert lines == ["mot,déf\r\n", "école,school\n", "last"]
+
+    with pytest.raises(ValueError):
+        asyncio.run(collect(transfer.iter_lines(stream(b"\xff\xfe not utf-8\n"))))
+
+
+def test_csv_quoted_fields_may_span_lines():
+    body = 'Word,Definition,Example\nchien,dog,"Le chien\ndort."\nchat,cat,\n"broken,open quote\n'.encode()
+    assert records(body, "csv") == [
+        (3, {"word": "chien", "definition": "dog", "example": "Le chien\ndort."}),
+        (4, {"word": "chat", "definition": "cat", "example": ""}),
+        (5, None),
+    ]
+
+
+def test_ndjson_reports_unparseable_lines():
+    body = b'{"word": "chien", "definition": "dog"}\n\nnot json\n["a list"]\n{"word": "chat"}'
+    assert records(body, "ndjson") == [
+        (1, {"word": "chien", "definition": "dog"}),
+        (3, None),
+        (4, None),
+        (5, {"word": "chat"}),
+    ]
+
+
+def test_word_records_are_validated_and_cleaned():
+    assert transfer.validate_word_record({"word": " chien ", "definition": "dog", "example": ""}) == {
+        "word": "chien", "definition": "dog", "example": None, "pronunciation": None,
+    }
+    for bad in (None, {}, {"word": "chien"}, {"word": " ", "definition": "x"},
+                {"word": "x" * 201, "definition": "x"}, {"word": "chien", "definition": "dog", "example": "x" * 1001}):
+        assert transfer.validate_word_record(bad) is None
+
+
+def test_batches_drop_case_insensitive_duplicates_first_wins():
+    db = FakeDB()
+    rows = [transfer.validate_word_record({"word": w, "definition": d}) for w, d in
+            (("Chien", "dog"), ("chat", "cat"), ("chien", "hound"))]
+    assert asyncio.run(transfer.insert_words_batch(db, USER, rows)) == 2
+    assert db.batches == [["Chien", "chat"]]
+
+
+def test_import_commits_once_and_not_at_all_on_error(monkeypatch):
+    monkeypatch.setattr(transfer, "IMPORT_BATCH_ROWS", 2)
+    good = "".join(json.dumps({"word": f"mot{i}", "definition": "word"}) + "\n" for i in range(5)).encode()
+
+    db = FakeDB()
+    result = asyncio.run(transfer.import_words(db, USER, stream(good, b'{"word": ""}\n'), "ndjson"))
+    assert result == {"saved": 5, "skipped": 0, "errors": ["Line 6: invalid word record"]}
+    assert len(db.batches) == 3 and db.commits == 1
+
+    # Batches were written before the bad bytes arrived, but never committed
+    db = FakeDB()
+    with pytest.raises(ValueError):
+        asyncio.run(transfer.import_words(db, USER, stream(good, b"\xff\n"), "ndjson"))
+    assert len(db.batches) == 2 and db.commits == 0
+
+
+async def _prepare_words():
+    import asyncpg
+
+    conn = await asyncpg.connect(database.asyncpg_dsn(TEST_DATABASE_URL))
+    try:
+        await conn.execute(SCHEMA_SQL)
+        await migrate.migrate(TEST_DATABASE_URL)
+        await conn.execute(
+            "INSERT INTO words (user_id, word, definition) VALUES ($1, 'Chien', 'dog')", USER
+        )
+    finally:
+        await conn.close()
+
+
+async def _word_count() -> int:
+    import asyncpg
+
+    conn = await asyncpg.connect(database.asyncpg_dsn(TEST_DATABASE_URL))
+    try:
+        return await conn.fetchval("SELECT count(*) FROM words WHERE user_id = $1", USER)
+    finally:
+        await conn.close()
+
+
+@needs_database
+def test_import_skips_existing_words_and_rolls_back_failures(monkeypatch):
+    monkeypatch.setattr(transfer, "IMPORT_BATCH_ROWS", 2)
+    asyncio.run(_prepare_words())
+    settings = Settings(database_url=TEST_DATABASE_URL, pool_warmup=False)
+    params = {"user_id": str(USER), "format": "csv"}
+    with TestClient(create_app(settings)) as client:
+        body = "word,definition\nchien,dog\nchat,cat\nCHAT,cat\noiseau,bird\n"
+        response = client.post("/api/import/words", params=params, content=body.encode())
+        assert response.json() == {"saved": 2, "skipped": 2, "errors": []}
+        assert asyncio.run(_word_count()) == 3
+
+        # A batch is inserted before the invalid bytes arrive; nothing is kept
+        body = iter(["word,definition\nvache,cow\ncheval,horse\nlapin,rabbit\n".encode(), b"\xff\n"])
+        response = client.post("/api/import/words", params=params, content=body)
+        assert response.status_code == 400
+        assert asyncio.run(_word_count()) == 3
+
+        # The batch endpoint and single creates go through the same unique index
+        response = client.post("/api/words/batch", json={"user_id": str(USER), "words": [
+            {"word": "OISEAU", "definition": "bird"}, {"word": "vache", "definition": "cow"},
+            {"word": "Vache", "definition": "cow"},
+        ]})
+        assert response.json() == {"saved": 1, "skipped": 2, "errors": []}
+        response = client.post("/api/words", json={"user_id": str(USER), "word": "chien", "definition": "dog"})
+        assert response.status_code == 409
+        assert asyncio.run(_word_count()) == 4
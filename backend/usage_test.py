@@ -0,0 +1,132 @@
+"""
+LLM usage ledger and daily quotas. The last test flushes usage to Postgres
+when TEST_DATABASE_URL is set (see query_plan_test.py).
+"""
+import asyncio
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from llm_routing_test import ScriptedLLM
+from src.cache import LocalCache
+from src.events import WriteBehindBuffer
+from src.llm import Completion
+from src.llm_routing import LLMRouter
+from src.usage import DailyQuotaExceeded, UsageLedger, daily_statement, daily_totals
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+USER = uuid.UUID("00000000-0000-0000-0000-000000000001")
+NOW = datetime(2026, 3, 1, 23, 59, 0, tzinfo=timezone.utc)
+
+
+class UsageLLM(ScriptedLLM):
+    async def complete(self, model, endpoint, **kwargs):
+        completion = await super().complete(model, endpoint, **kwargs)
+        completion.input_tokens, completion.output_tokens = 100, 20
+        return completion
+
+
+def test_every_call_is_recorded_with_its_outcome():
+    written = []
+
+    async def writer(batch):
+        written.extend(batch)
+
+    async def scenario():
+        ledger = UsageLedger(WriteBehindBuffer(writer), LocalCache(), clock=lambda: NOW)
+        router = LLMRouter(UsageLLM((0, None), (0, ValueError("bad request"))), hedge_ratio=0, ledger=ledger)
+        route = router.policy.enrichment()
+        await router.complete(route, endpoint="generate_flashcards", user_id=str(USER), max_tokens=100, messages=[])
+        with pytest.raises(ValueError):
+            await router.complete(route, endpoint="enrich_words", max_tokens=100, messages=[])
+        await ledger.buffer.flush()
+        return ledger
+
+    ledger = asyncio.run(scenario())
+    assert [(e.user_id, e.values["endpoint"], e.values["outcome"], e.values["input_tokens"]) for e in written] == [
+        (USER, "generate_flashcards", "ok", 100),
+        (None, "enrich_words", "error", 0),
+    ]
+    assert ledger.stats()["recorded"] == 2
+
+
+def test_daily_totals_are_summed_per_user_and_utc_day():
+    rows = [
+        {"user_id": USER, "created_at": NOW, "input_tokens": 100, "output_tokens": 20, "duration_ms": 900},
+        {"user_id": USER, "created_at": NOW, "input_tokens": 50, "output_tokens": 10, "duration_ms": 100},
+        {"user_id": USER, "created_at": NOW + timedelta(minutes=2), "input_tokens": 1, "output_tokens": 1, "duration_ms": 1},
+        {"user_id": None, "created_at": NOW, "input_tokens": 500, "output_tokens": 500, "duration_ms": 500},
+    ]
+    assert daily_totals(rows) == [
+        {"user_id": USER, "day": NOW.date(), "calls": 2, "input_tokens": 150, "output_tokens": 30, "duration_ms": 1000},
+        {"user_id": USER, "day": NOW.date() + timedelta(days=1), "calls": 1, "input_tokens": 1, "output_tokens": 1, "duration_ms": 1},
+    ]
+    statement = str(daily_statement(daily_totals(rows)).compile(dialect=postgresql.dialect()))
+    assert "calls = (llm_usage_daily.calls + excluded.calls)" in statement
+
+
+def test_quota_uses_the_cached_daily_row_until_it_is_invalidated():
+    loads = []
+
+    async def load_day(user_id, day):
+        loads.append(day)
+        return {"tokens": 1000}
+
+    cache = LocalCache()
+    ledger = UsageLedger(WriteBehindBuffer(None), cache, daily_token_quota=1000, load_day=load_day, clock=lambda: NOW)
+    with pytest.raises(DailyQuotaExceeded) as error:
+        asyncio.run(ledger.check_quota(USER))
+    assert error.value.status_code == 429
+    # Until the next UTC midnight
+    assert error.value.headers["Retry-After"] == "61"
+
+    with pytest.raises(DailyQuotaExceeded):
+        asyncio.run(ledger.check_quota(USER))
+    assert loads == [NOW.date()]
+
+    cache.evict_group("usage", USER)
+    ledger.daily_token_quota = 5000
+    asyncio.run(ledger.check_quota(USER))
+    assert len(loads) == 2
+
+
+@pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set")
+def test_usage_is_flushed_and_served_from_the_daily_table():
+    import asyncpg
+    from fastapi.testclient import TestClient
+
+    from query_plan_test import SCHEMA_SQL
+    from src import database, migrate
+    from src.app import create_app
+    from src.config import Settings
+
+    user = uuid.uuid4()
+
+    async def prepare():
+        conn = await asyncpg.connect(database.asyncpg_dsn(TEST_DATABASE_URL))
+        try:
+            await conn.execute(SCHEMA_SQL)
+            await migrate.migrate(TEST_DATABASE_URL)
+        finally:
+            await conn.close()
+
+    asyncio.run(prepare())
+    app = create_app(Settings(database_url=TEST_DATABASE_URL, pool_warmup=False, usage_daily_token_quota=500))
+    with TestClient(app) as client:
+        async def record():
+            completion = Completion(text="", model="model", input_tokens=100, output_tokens=20)
+            for _ in range(3):
+                await app.state.usage.record(user, "practice_conversation", "model", "ok", 0.5, completion)
+            await app.state.usage.buffer.flush()
+
+        client.portal.call(record)
+        body = client.get("/api/usage/daily", params={"user_id": str(user)}).json()
+
+    assert body["days"][0]["calls"] == 3
+    assert body["days"][0]["input_tokens"] == 300
+    assert body["days"][0]["processing_seconds"] == 1.5
+    assert body["today"] == {"tokens": 360, "quota": 500, "remaining": 140}